@@ -0,0 +1,330 @@
+import json
+import math
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+from ib_insync import Stock, util
+
+try:
+    from zoneinfo import ZoneInfo
+    NEW_YORK = ZoneInfo("America/New_York")
+except Exception:
+    NEW_YORK = None
+
+try:
+    import pyarrow  # noqa: F401 - parquet motoru varsa kolon bazlı dosya kullan
+    FILE_FORMAT = "parquet"
+except ImportError:
+    FILE_FORMAT = "csv"
+
+BAR_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'average', 'barCount']
+DEFAULT_STORE_DIR = "bar_store"
+MARKET_CLOSE_ET = (16, 15)  # Bu saatten sonra günün barı tamamlanmış sayılır
+FALLBACK_RECHECK_DAYS = 30  # Hatırlanan kısa süre bu kadar gün sonra uzun süreyle yeniden denenir
+
+def last_complete_session(now=None):
+    """Son tamamlanmış işlem gününün tarihi (New York saatine göre, tatiller hariç)"""
+    if now is None:
+        now = datetime.now(NEW_YORK) if NEW_YORK else datetime.now()
+    day = now.date()
+    if (now.hour, now.minute) < MARKET_CLOSE_ET:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+def duration_start(duration, end):
+    """IB durationStr ('15 D', '6 M', '2 Y', ...) için başlangıç tarihi"""
+    amount, unit = duration.split()
+    amount = int(amount)
+    unit = unit.upper()
+    if unit == 'D':
+        return (pd.Timestamp(end) - pd.tseries.offsets.BDay(amount)).date()
+    if unit == 'W':
+        return end - timedelta(weeks=amount)
+    if unit == 'M':
+        return (pd.Timestamp(end) - pd.DateOffset(months=amount)).date()
+    if unit == 'Y':
+        return (pd.Timestamp(end) - pd.DateOffset(years=amount)).date()
+    raise ValueError(f"Desteklenmeyen süre: {duration}")
+
+def days_to_duration(days):
+    """Takvim günü sayısını IB durationStr'e çevir (365 günü aşan istekler yıl cinsinden olmalı)"""
+    days = max(1, int(days))
+    if days <= 365:
+        return f"{days} D"
+    return f"{math.ceil(days / 365)} Y"
+
+def bars_to_frame(bars):
+    """ib_insync bar listesini tarih kolonlu DataFrame'e çevir"""
+    df = util.df(bars) if bars else None
+    if df is None or df.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS)
+    df['date'] = pd.to_datetime(df['date'])
+    return df[[c for c in BAR_COLUMNS if c in df.columns]]
+
+
+class BarStore:
+    """Sembol başına günlük bar dosyaları + manifest.
+
+    Her sembolün günlük TRADES/RTH barları tek dosyada tutulur (pyarrow
+    varsa parquet, yoksa csv). Manifest her sembol için hangi tarihten beri
+    veri istendiğini ve en son hangi işlem gününe kadar güncellendiğini
+    saklar; böylece bir sonraki çalıştırmada sadece eksik kuyruk (son bardan
+    bugüne) IBKR'den çekilir, aynı gün ikinci bir istek hiç yapılmaz.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.manifest_file = os.path.join(root, "manifest.json")
+        self.manifest = self._load_manifest()
+        self._frames = {}  # sembol -> DataFrame (işlem içi önbellek)
+        self._written = set()  # bu süreçte yazılan semboller
+        self._dirty = False  # manifest diske kaydedilmemiş değişiklik içeriyor
+        self._batch_depth = 0
+        self.stats = {'hits': 0, 'tail_requests': 0, 'full_requests': 0, 'failed': 0}
+        self.last_action = None  # son get_bars çağrısı: 'hit', 'tail' ya da 'full'
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_manifest(self):
+        # Aynı depoyu paralel süreçler de güncelleyebilir (bkz. pipeline.py); diskteki
+        # manifest yeniden okunup sadece bu süreçte yazılan semboller üzerine yazılır
+        manifest = self._load_manifest()
+        for symbol in self._written:
+            manifest[symbol] = self.manifest[symbol]
+        manifest.update({s: e for s, e in self.manifest.items() if s not in manifest})
+        self.manifest = manifest
+        tmp = f"{self.manifest_file}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_file)
+        self._dirty = False
+
+    @contextmanager
+    def batch(self):
+        """Blok içindeki yazımların manifestini sonda tek seferde kaydet.
+
+        Manifest her kayıtta yeniden okunup baştan yazıldığı için sembol başına
+        kayıt, evrenin tamamı yazılırken O(N²) olur; bu blokta manifest sadece
+        bellekte güncellenir. İç içe kullanılabilir, en dıştaki blok kaydeder.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._dirty:
+                self.save_manifest()
+
+    def _path(self, symbol):
+        safe = symbol.replace(' ', '_').replace('/', '_')
+        return os.path.join(self.root, f"{safe}.{FILE_FORMAT}")
+
+    def read(self, symbol):
+        """Saklanan tüm barlar (yoksa boş DataFrame)"""
+        if symbol in self._frames:
+            return self._frames[symbol]
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        if FILE_FORMAT == "parquet":
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, parse_dates=['date'])
+        self._frames[symbol] = df
+        return df
+
+    def write(self, symbol, df, requested_from=None, session=None):
+        df = df.sort_values('date').drop_duplicates('date', keep='last').reset_index(drop=True)
+        path = self._path(symbol)
+        tmp = path + ".tmp"
+        if FILE_FORMAT == "parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+        self._frames[symbol] = df
+        self._written.add(symbol)
+        entry = self.manifest.setdefault(symbol, {})
+        if len(df):
+            entry['first'] = df['date'].iloc[0].strftime('%Y-%m-%d')
+            entry['last'] = df['date'].iloc[-1].strftime('%Y-%m-%d')
+        entry['rows'] = len(df)
+        if requested_from is not None:
+            current = entry.get('requested_from')
+            if current is None or str(requested_from) < current:
+                entry['requested_from'] = str(requested_from)
+        if session is not None:
+            entry['checked_session'] = str(session)
+        entry['updated'] = datetime.now().isoformat(timespec='seconds')
+        self._changed(symbol)
+        return df
+
+    def _changed(self, symbol):
+        self._written.add(symbol)
+        self._dirty = True
+        if not self._batch_depth:
+            self.save_manifest()
+
+    def fallback_duration(self, symbol, duration, session=None):
+        """`duration` için daha önce çalışan kısa süre (ör. '2 Y' boş dönüp '1 Y' dolu döndüyse '1 Y')"""
+        fallback = self.manifest.get(symbol, {}).get('fallback')
+        if not fallback or fallback.get('duration') != duration:
+            return None
+        session = session or last_complete_session()
+        since = datetime.strptime(fallback['since'], '%Y-%m-%d').date()
+        if (session - since).days > FALLBACK_RECHECK_DAYS:
+            return None
+        return fallback['used']
+
+    def remember_fallback(self, symbol, duration, used, session=None):
+        """`duration` yerine `used` ile veri alındığını kaydet (used == duration ise kaydı sil)"""
+        entry = self.manifest.setdefault(symbol, {})
+        if used == duration:
+            if entry.pop('fallback', None) is None:
+                return
+        else:
+            current = entry.get('fallback', {})
+            if current.get('duration') == duration and current.get('used') == used:
+                return
+            entry['fallback'] = {'duration': duration, 'used': used, 'since': str(session or last_complete_session())}
+        self._changed(symbol)
+
+    def plan(self, symbol, duration, session=None):
+        """Bu süre için ne yapılmalı: ('hit', None), ('tail', durationStr) veya ('full', durationStr)"""
+        session = session or last_complete_session()
+        start = duration_start(duration, session)
+        entry = self.manifest.get(symbol)
+        if not entry:
+            return 'full', duration
+        covered_from = entry.get('requested_from', entry.get('first'))
+        if covered_from is None or covered_from > str(start):
+            # Daha uzun geçmiş isteniyor; tek istekte baştan çek
+            return 'full', duration
+        if entry.get('checked_session') == str(session) or entry.get('last', '') >= str(session):
+            return 'hit', None
+        if not entry.get('last'):
+            return 'full', duration
+        last = datetime.strptime(entry['last'], '%Y-%m-%d').date()
+        # Son barı da tekrar çek (gün içinde kaydedilmiş/düzeltilmiş olabilir)
+        return 'tail', days_to_duration((session - last).days + 1)
+
+    def _contract(self, symbol, contract, ib):
+        if callable(contract):
+            contract = contract()
+        if contract is None:
+            contract = Stock(symbol, 'SMART', 'USD')
+            ib.qualifyContracts(contract)
+        return contract
+
+    def merge(self, symbol, fetched, action, start, session):
+        """Çekilen barları saklananlarla birleştir ve kaydet"""
+        # Tamamlanmamış günün barı saklanmaz
+        if len(fetched):
+            fetched = fetched[fetched['date'].dt.date <= session]
+        if action == 'full':
+            stored = self.read(symbol)
+            if not len(fetched):
+                # Hata/geçersiz süre olabilir; kapsam kaydedilmez ki daha kısa süreyle tekrar denenebilsin
+                return stored
+            merged = pd.concat([stored, fetched]) if len(stored) else fetched
+            return self.write(symbol, merged, requested_from=start, session=session)
+        merged = pd.concat([self.read(symbol), fetched])
+        return self.write(symbol, merged, session=session)
+
+    def get_bars(self, ib, symbol, duration="2 Y", contract=None):
+        """`duration` kadar günlük bar döndür; eksik kısmı IBKR'den çekip depoya ekler.
+
+        contract: nitelikli kontrat ya da onu döndüren fonksiyon; sadece istek
+        gerekirse kullanılır (hit durumunda kontrat doğrulaması bile yapılmaz).
+        """
+        session = last_complete_session()
+        action, request_duration = self.plan(symbol, duration, session)
+        self.last_action = action
+        if action == 'hit':
+            self.stats['hits'] += 1
+        else:
+            try:
+                contract = self._contract(symbol, contract, ib)
+                bars = ib.reqHistoricalData(
+                    contract,
+                    endDateTime='',
+                    durationStr=request_duration,
+                    barSizeSetting='1 day',
+                    whatToShow='TRADES',
+                    useRTH=True,
+                    formatDate=1
+                )
+                self.stats[f'{action}_requests'] += 1
+                self.merge(symbol, bars_to_frame(bars), action, duration_start(duration, session), session)
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"! {symbol} bar deposu güncelleme hatası: {e}")
+        return self.window(symbol, duration, session)
+
+    async def update_async(self, ib, symbol, duration="2 Y", contract=None, session=None):
+        """get_bars'ın asenkron karşılığı (veriyi döndürmez, depoyu günceller); yapılan işlemi döndürür.
+
+        Çok sayıda sembol için eşzamanlı çağrılabilir (bkz. historical_fetcher).
+        """
+        session = session or last_complete_session()
+        action, request_duration = self.plan(symbol, duration, session)
+        if action == 'hit':
+            self.stats['hits'] += 1
+            return action
+        if contract is None:
+            contract = Stock(symbol, 'SMART', 'USD')
+            await ib.qualifyContractsAsync(contract)
+        bars = await ib.reqHistoricalDataAsync(
+            contract,
+            endDateTime='',
+            durationStr=request_duration,
+            barSizeSetting='1 day',
+            whatToShow='TRADES',
+            useRTH=True,
+            formatDate=1
+        )
+        self.stats[f'{action}_requests'] += 1
+        self.merge(symbol, bars_to_frame(bars), action, duration_start(duration, session), session)
+        return action
+
+    def window(self, symbol, duration, end=None):
+        """Saklanan barlardan `duration` kadarını ('15 D' için son 15 bar) döndür"""
+        df = self.read(symbol)
+        if df.empty:
+            return df.copy()
+        end = end or last_complete_session()
+        amount, unit = duration.split()
+        if unit.upper() == 'D':
+            return df.tail(int(amount)).reset_index(drop=True)
+        start = pd.Timestamp(duration_start(duration, end))
+        return df[df['date'] >= start].reset_index(drop=True)
+
+    def close_on(self, symbol, date):
+        """Verilen tarihteki (ya da öncesindeki son) kapanış fiyatı"""
+        df = self.read(symbol)
+        if df.empty:
+            return None
+        rows = df[df['date'] <= pd.Timestamp(date)]
+        if rows.empty:
+            return None
+        return float(rows['close'].iloc[-1])
+
+
+_default_store = None
+
+def get_store(root=DEFAULT_STORE_DIR):
+    """Süreç içinde paylaşılan BarStore"""
+    global _default_store
+    if _default_store is None or _default_store.root != root:
+        _default_store = BarStore(root)
+    return _default_store
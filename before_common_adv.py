@@ -3,13 +3,22 @@ import datetime
 import time
 import os
 import re
+import numpy as np
 from ib_insync import IB, Stock, util, BarData  # yfinance yerine ib_insync kullanıyoruz
+from bar_store import get_store
+from historical_fetcher import HistoricalFetcher
+from table_io import read_table, write_table
 
 # Veri klasörünü kontrol et, yoksa oluştur
 data_folder = os.path.join(os.path.dirname(__file__), "data")
 if not os.path.exists(data_folder):
     os.makedirs(data_folder)
 
+# ADV kolonu -> gün sayısı; her pencere son (gün + 5) işlem gününün ortalaması
+ADV_WINDOWS = {'ADV_6M': 180, 'ADV_3M': 90, 'ADV_15D': 15}
+ADV_COLUMNS = list(ADV_WINDOWS) + ['AVG_ADV']
+MIN_ADV_BARS = 3  # En az 3 gün veri olsun
+
 def connect_to_ibkr():
     """IBKR Gateway'e bağlanır"""
     ib = IB()
@@ -40,113 +49,50 @@ def connect_to_ibkr():
         print(f"IBKR bağlantı hatası: {e}")
         return None
 
-def get_average_volume(ib, ticker_symbol, period_days):
-    """IBKR Gateway üzerinden belirli bir hisse için ortalama hacim verisini çeker"""
-    try:
-        # Kontrat oluştur
-        contract = Stock(ticker_symbol, exchange='SMART', currency='USD')
-        
-        # Bitiş tarihi bugün
-        end_date = datetime.datetime.now()
-        # Başlangıç tarihi belirtilen gün sayısı kadar geriden
-        start_date = end_date - datetime.timedelta(days=period_days)
-        
-        # IBKR'den günlük veriler al (TRADES 'barlar', '1 day' zaman dilimi)
-        bars = ib.reqHistoricalData(
-            contract=contract,
-            endDateTime=end_date.strftime('%Y%m%d %H:%M:%S'),
-            durationStr=f"{period_days + 5} D",  # Biraz fazla gün istiyoruz, çünkü hafta sonları ve tatiller veri olmayabilir
-            barSizeSetting="1 day",
-            whatToShow="TRADES",
-            useRTH=True,  # Regular Trading Hours
-            formatDate=1
-        )
-        
-        # Eğer veri boşsa veya yetersizse
-        if not bars or len(bars) < 3:  # En az 3 gün veri olsun
-            print(f"  [UYARI] {ticker_symbol} için yeterli veri yok ({len(bars) if bars else 0} gün)")
-            return None
-        
-        # Hacim verilerini al ve ortalama hesapla
-        volumes = [bar.volume for bar in bars]
-        avg_volume = sum(volumes) / len(volumes)
-        
-        return avg_volume
-        
-    except Exception as e:
-        print(f"  [HATA] {ticker_symbol} için hacim verisi çekilirken problem: {e}")
-        return None
-
-def process_dataframe(ib, df, input_file_name, output_file_name):
-    """IBKR Gateway kullanarak DataFrame'deki her hisse için hacim verilerini toplar"""
-    # Sonuçları saklamak için yeni sütunlar ekle
-    df['ADV_6M'] = None
-    df['ADV_3M'] = None
-    df['ADV_15D'] = None
-    df['AVG_ADV'] = None  # Ortalama ADV kolonu
-
-    # İlerlemeyi takip et
+def volume_matrix(symbols, bars):
+    """Her sembolün son `bars` günlük hacmi, sona hizalı (satır: gün, sütun: sembol)"""
+    store = get_store()
+    matrix = np.full((bars, len(symbols)), np.nan)
+    for j, symbol in enumerate(symbols):
+        volume = pd.to_numeric(store.window(symbol, f"{bars} D")['volume'], errors='coerce').to_numpy()
+        if len(volume):
+            matrix[-len(volume):, j] = volume
+    return pd.DataFrame(matrix, columns=symbols)
+
+def compute_adv(ib, symbols):
+    """Tüm semboller için ADV_6M/ADV_3M/ADV_15D/AVG_ADV tablosu (index: sembol).
+
+    Sembol başına tek bir 6 aylık günlük seri çekilir (eşzamanlı, ortak bar
+    deposu üzerinden); kısa pencereler aynı serinin son satırlarından hesaplanır.
+    """
+    symbols = list(dict.fromkeys(s for s in symbols if isinstance(s, str) and s))
+    longest = max(ADV_WINDOWS.values()) + 5
+    util.run(HistoricalFetcher(ib, get_store()).fetch(symbols, f"{longest} D"))
+
+    volume = volume_matrix(symbols, longest)
+    adv = pd.DataFrame(index=pd.Index(symbols, name='PREF IBKR'))
+    for column, days in ADV_WINDOWS.items():
+        window = volume.tail(days + 5)
+        # Yetersiz veri varsa (3 günden az) ADV boş kalır
+        adv[column] = window.mean().where(window.count() >= MIN_ADV_BARS).to_numpy()
+    # AVG_ADV: mevcut pencerelerin ortalaması
+    adv['AVG_ADV'] = adv[list(ADV_WINDOWS)].mean(axis=1)
+    return np.floor(adv).astype('Int64')
+
+def process_dataframe(df, adv, input_file_name, output_file_name):
+    """Önceden hesaplanmış ADV tablosunu DataFrame'e ekler ve sonuçları kaydeder"""
     total_stocks = len(df)
-    success_count = 0
-    error_count = 0
+    for column in ADV_COLUMNS:
+        df[column] = df['PREF IBKR'].map(adv[column]).astype('Int64')
 
-    print(f"\n{input_file_name} dosyasındaki hisseler için ortalama günlük hacim verileri çekiliyor...")
-    print("---------------------------------------------")
-
-    # Her hisse için hacim verilerini çek
-    for i, row in df.iterrows():
-        ticker = row['PREF IBKR']
-        
-        print(f"İşleniyor ({i+1}/{total_stocks}): {ticker}", end="")
-        
-        try:
-            # 6 aylık ortalama günlük hacim
-            adv_6m = get_average_volume(ib, ticker, 180)
-            
-            # 3 aylık ortalama günlük hacim
-            adv_3m = get_average_volume(ib, ticker, 90)
-            
-            # 15 günlük ortalama günlük hacim
-            adv_15d = get_average_volume(ib, ticker, 15)
-            
-            # Sonuçları dataframe'e ekle
-            if adv_6m is not None:
-                df.at[i, 'ADV_6M'] = int(adv_6m)
-            if adv_3m is not None:
-                df.at[i, 'ADV_3M'] = int(adv_3m)
-            if adv_15d is not None:
-                df.at[i, 'ADV_15D'] = int(adv_15d)
-                
-            # AVG_ADV hesapla (mevcut değerlerin ortalaması)
-            adv_values = []
-            if adv_6m is not None:
-                adv_values.append(adv_6m)
-            if adv_3m is not None:
-                adv_values.append(adv_3m)
-            if adv_15d is not None:
-                adv_values.append(adv_15d)
-                
-            if adv_values:
-                df.at[i, 'AVG_ADV'] = int(sum(adv_values) / len(adv_values))
-                
-            # Başarılı sonuç
-            if adv_6m is not None and adv_3m is not None and adv_15d is not None:
-                success_count += 1
-                print(f" - Başarılı! ADV: 6M={int(adv_6m):,}, 3M={int(adv_3m):,}, 15D={int(adv_15d):,}, AVG={df.at[i, 'AVG_ADV']:,}")
-            else:
-                error_count += 1
-                print(" - Kısmen başarılı veya başarısız")
-            
-            # API sınırlamalarını aşmamak için kısa bir bekleme süresi ekle
-            time.sleep(0.5)
-            
-        except Exception as e:
-            error_count += 1
-            print(f" - HATA: {e}")
-            continue
+    complete = df[list(ADV_WINDOWS)].notna().all(axis=1)
+    success_count = int(complete.sum())
+    error_count = total_stocks - success_count
+    for ticker in df.loc[~complete, 'PREF IBKR']:
+        print(f"  [UYARI] {ticker} için yeterli hacim verisi yok")
 
     # Sonuçları yeni bir CSV dosyasına kaydet
-    df.to_csv(output_file_name, index=False)
+    write_table(df, output_file_name, index=False)
 
     print(f"\n{input_file_name} dosyası işleme sonuçları:")
     print("---------------------------------------------")
@@ -194,7 +140,7 @@ def main():
     for file_info in input_files:
         file_name = file_info["file_name"]
         try:
-            df = pd.read_csv(file_name)
+            df = read_table(file_name)
             print(f"{file_name} dosyası başarıyla yüklendi: {len(df)} satır")
             dataframes.append({
                 "df": df,
@@ -216,6 +162,11 @@ def main():
         print("IBKR bağlantısı başarısız oldu. Program sonlandırılıyor.")
         exit(1)
     
+    # İki dosyadaki tüm hisseler için ADV tek geçişte hesaplanır
+    symbols = pd.concat([df_info["df"]['PREF IBKR'] for df_info in dataframes]).dropna().tolist()
+    print(f"\n{len(set(symbols))} hisse için ortalama günlük hacim verileri hesaplanıyor...")
+    adv = compute_adv(ib, symbols)
+    
     # Her bir DataFrame'i işle
     total_success = 0
     total_error = 0
@@ -223,8 +174,8 @@ def main():
     
     for df_info in dataframes:
         processed_df, success, error = process_dataframe(
-            ib, 
             df_info["df"], 
+            adv,
             df_info["input"], 
             df_info["output"]
         )
@@ -240,7 +191,7 @@ def main():
         
         # Birleştirilmiş veriyi kaydet
         combined_output = "final_thg_with_avg_adv.csv"
-        combined_df.to_csv(combined_output, index=False)
+        write_table(combined_df, combined_output, index=False)
         print(f"Birleştirilmiş veri '{combined_output}' dosyasına kaydedildi.")
     
     # IBKR bağlantısını kapat
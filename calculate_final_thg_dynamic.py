@@ -3,6 +3,7 @@ import numpy as np
 import os
 import market_risk_analyzer as mra
 from datetime import datetime
+from table_io import read_table, write_table
 
 
 
@@ -13,7 +14,7 @@ def get_market_weights():
     # Dosya varsa ve bugüne aitse kullan
     if os.path.exists(weights_file):
         try:
-            df = pd.read_csv(weights_file)
+            df = read_table(weights_file)
             if len(df) > 0:
                 today = datetime.now().strftime('%Y-%m-%d')
                 if 'date' in df.columns and df['date'].iloc[0] == today:
@@ -40,14 +41,14 @@ def load_required_data():
     """Load data from all required sources"""
     try:
         # Normalize edilmiş verileri ADV bilgisiyle yükle
-        normalized_df = pd.read_csv('normalize_data_with_adv.csv')
+        normalized_df = read_table('normalize_data_with_adv.csv')
         
         # Yeni solidity skorlarını yükle - filled versiyonu kullan
-        solidity_df = pd.read_csv('scored_stocks_filled.csv')  # scored_stocks.csv yerine filled versiyonu
+        solidity_df = read_table('scored_stocks_filled.csv')  # scored_stocks.csv yerine filled versiyonu
         print("Doldurulmuş SOLIDITY skorları 'scored_stocks_filled.csv' dosyasından yüklendi")
         
         # IBKR verilerini yükle (CUR_YIELD için)
-        ibkr_df = pd.read_csv('sma_results.csv')
+        ibkr_df = read_table('sma_results.csv')
         
         print("Tüm veri dosyaları başarıyla yüklendi!")
         
@@ -329,13 +330,13 @@ def main():
                 print(f"  {row['PREF IBKR']} ({row['CMON']})")
         
         # CSV dosyasını oluştur - filtrelenmiş veri ile (tüm ondalık değerler 2 basamaklı)
-        filtered_df.to_csv('final_thg_results.csv', 
-                      index=False,
-                      float_format='%.2f',  # 2 ondalık basamak
-                      sep=',',              # Virgül ayracını belirt
-                      encoding='utf-8-sig', # Excel için BOM ekle
-                      lineterminator='\n',  # Windows satır sonu
-                      quoting=1)            # Excel için tüm değerleri tırnak içine al
+        write_table(filtered_df, 'final_thg_results.csv', 
+                            index=False,
+                            float_format='%.2f',  # 2 ondalık basamak
+                            sep=',',              # Virgül ayracını belirt
+                            encoding='utf-8-sig', # Excel için BOM ekle
+                            lineterminator='\n',  # Windows satır sonu
+                            quoting=1)            # Excel için tüm değerleri tırnak içine al
     
         print("\nSonuçlar 'final_thg_results.csv' dosyasına kaydedildi.")
         
@@ -1,21 +1,22 @@
 import pandas as pd
 import numpy as np
+from table_io import read_table, write_table
 
 def load_required_data():
     """Load data from all required sources"""
     try:
         # Normalize edilmiş verileri ADV bilgisiyle yükle
-        normalized_df = pd.read_csv('normalize_extlt_with_adv.csv')
+        normalized_df = read_table('normalize_extlt_with_adv.csv')
         
         # Yeni solidity skorlarını yükle - extlt versiyonu kullan
-        solidity_df = pd.read_csv('scored_extlt.csv')  # scored_stocks.csv yerine extlt versiyonu
+        solidity_df = read_table('scored_extlt.csv')  # scored_stocks.csv yerine extlt versiyonu
         print("Doldurulmuş SOLIDITY skorları 'scored_extlt.csv' dosyasından yüklendi")
         
         # IBKR verilerini yükle (CUR_YIELD için)
-        ibkr_df = pd.read_csv('sma_results.csv')
+        ibkr_df = read_table('sma_results.csv')
         
         # Common stock performans verilerini yükle
-        common_stock_df = pd.read_csv('common_stock_results.csv')
+        common_stock_df = read_table('common_stock_results.csv')
         print("Common stock performans verileri 'common_stock_results.csv' dosyasından yüklendi")
         
         print("Tüm veri dosyaları başarıyla yüklendi!")
@@ -290,13 +291,13 @@ def main():
                 print(f"  {row['PREF IBKR']} ({row['CMON']})")
         
         # CSV dosyasını oluştur - filtrelenmiş veri ile (tüm ondalık değerler 2 basamaklı)
-        filtered_df.to_csv('final_extlt.csv', 
-                      index=False,
-                      float_format='%.2f',  # 2 ondalık basamak
-                      sep=',',              # Virgül ayracını belirt
-                      encoding='utf-8-sig', # Excel için BOM ekle
-                      lineterminator='\n',  # Windows satır sonu
-                      quoting=1)            # Excel için tüm değerleri tırnak içine al
+        write_table(filtered_df, 'final_extlt.csv', 
+                            index=False,
+                            float_format='%.2f',  # 2 ondalık basamak
+                            sep=',',              # Virgül ayracını belirt
+                            encoding='utf-8-sig', # Excel için BOM ekle
+                            lineterminator='\n',  # Windows satır sonu
+                            quoting=1)            # Excel için tüm değerleri tırnak içine al
     
         print("\nSonuçlar 'final_extlt.csv' dosyasına kaydedildi.")
         
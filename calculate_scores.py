@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
 import csv
+from score_kernel import (score_ratio, low_score, market_cap_score, custom_score,
+                          change_score, solidity_score, final_solidity_score)
+from table_io import read_table, write_table
 
 def clean_numeric_data(df):
     """Sayısal verileri temizle ve düzelt"""
@@ -14,8 +17,8 @@ def clean_numeric_data(df):
         ]
         
         for col in numeric_columns:
-            if col in df.columns:
-                # String formatındaki sayıları temizle
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+                # String formatındaki sayıları temizle (tipli girdide kolonlar zaten sayısal)
                 df[col] = df[col].astype(str).str.replace(',', '')
                 df[col] = df[col].astype(str).str.replace('$', '')
                 df[col] = df[col].astype(str).str.replace('B', '')
@@ -92,17 +95,12 @@ def calculate_low_scores(df):
     try:
         # 52W LOW için
         df['52W_LOW_CHG'] = (df['COM_LAST_PRICE'] - df['COM_52W_LOW']) / df['COM_52W_LOW']
-        df['52W_LOW_SKOR'] = df['52W_LOW_CHG'].apply(lambda x:
-            10 if pd.isna(x) or x <= 0 else  # Düşüş varsa minimum puan
-            min(90, 10 + (x * 80))  # Artış yüzdesi ile orantılı puan
-        )
+        # Düşüş varsa minimum puan, artış yüzdesi ile orantılı puan
+        df['52W_LOW_SKOR'] = low_score(df['52W_LOW_CHG'])
         
         # 5Y LOW için
         df['5Y_LOW_CHG'] = (df['COM_LAST_PRICE'] - df['COM_5Y_LOW']) / df['COM_5Y_LOW']
-        df['5Y_LOW_SKOR'] = df['5Y_LOW_CHG'].apply(lambda x:
-            10 if pd.isna(x) or x <= 0 else  # Düşüş varsa minimum puan
-            min(90, 10 + (x * 80))  # Artış yüzdesi ile orantılı puan
-        )
+        df['5Y_LOW_SKOR'] = low_score(df['5Y_LOW_CHG'])
         
         return df
     except Exception as e:
@@ -125,29 +123,12 @@ def calculate_change_scores(df):
         print(f"Değişim skoru hesaplama hatası: {e}")
         return df
 
-def calculate_score_ratio(current, high):
-    """Fiyat/High oranını hesapla ve 10-90 arası skora çevir"""
-    try:
-        if pd.isna(current) or pd.isna(high) or high == 0:
-            return 10
-        ratio = current / high
-        return min(90, max(10, 90 * ratio))
-    except:
-        return 10
-
 def calculate_solidity_scores(df):
     """Spreadsheet'teki gibi Solidity hesaplama"""
     try:
         # 1. HIGH score hesaplamaları
-        df['52W_HIGH_SKOR'] = df.apply(
-            lambda x: calculate_score_ratio(x['COM_LAST_PRICE'], x['COM_52W_HIGH']), 
-            axis=1
-        )
-        
-        df['5Y_HIGH_SKOR'] = df.apply(
-            lambda x: calculate_score_ratio(x['COM_LAST_PRICE'], x['COM_5Y_HIGH']), 
-            axis=1
-        )
+        df['52W_HIGH_SKOR'] = score_ratio(df['COM_LAST_PRICE'], df['COM_52W_HIGH'])
+        df['5Y_HIGH_SKOR'] = score_ratio(df['COM_LAST_PRICE'], df['COM_5Y_HIGH'])
         
         # 2. TOTAL HIGH SCORE (ortalama)
         df['TOTAL_HIGH_SCORE'] = (df['52W_HIGH_SKOR'] + df['5Y_HIGH_SKOR']) / 2
@@ -163,39 +144,10 @@ def calculate_solidity_scores(df):
         # 5. Credit Score normalize
         df['CRDT_NORM'] = normalize_custom(df['CRDT_SCORE'])
         
-        # 6. Solidity Hesaplama
-        def calculate_solidity(row):
-            try:
-                total_perf = row['RECENT_TOTAL']
-                
-                # Son dönem performansına göre ağırlıklar
-                if total_perf >= 0.8:
-                    # Yüksek performans - Market Cap'e daha fazla ağırlık
-                    solidity = (
-                        row['TOTAL_HIGH_SCORE'] * 0.26 +
-                        row['MKTCAP_NORM'] * 0.49 +     # Market Cap ağırlığını artır
-                        row['CRDT_NORM'] * 0.25
-                    )
-                else:
-                    # Düşük performans - Total Score'a daha fazla ağırlık
-                    solidity = (
-                        row['TOTAL_HIGH_SCORE'] * 0.42 +
-                        row['MKTCAP_NORM'] * 0.39 +     # Market Cap ağırlığını koru
-                        row['CRDT_NORM'] * 0.20
-                    )
-                
-                # BB bond kontrolü
-                if str(row['BOND_']).strip() == 'BB':
-                    solidity *= 1.02
-                    
-                return solidity
-                
-            except Exception as e:
-                print(f"Satır hesaplama hatası: {e}")
-                return None
-        
-        # 7. Solidity skorunu hesapla
-        df['SOLIDITY_SCORE'] = df.apply(calculate_solidity, axis=1)
+        # 6-7. Solidity skoru: RECENT_TOTAL >= 0.8 ise Market Cap'e daha fazla ağırlık, BB bond'larda x1.02
+        df['SOLIDITY_SCORE'] = solidity_score(
+            df['TOTAL_HIGH_SCORE'], df['MKTCAP_NORM'], df['CRDT_NORM'], df['RECENT_TOTAL'], df.get('BOND_')
+        )
         
         # 8. Common stock verisi eksik olanlar için solidity skoru düşür
         # COM_LAST_PRICE değeri eksik olanlar olarak belirle
@@ -241,18 +193,7 @@ def calculate_solidity_scores(df):
 def calculate_custom_score(series, threshold, multiplier):
     """Excel formülündeki özel skor hesaplama"""
     try:
-        # NaN değerleri filtrele ve ortalama hesapla
-        valid_series = series[pd.notnull(series)]
-        avg = valid_series.mean()
-        
-        def score_formula(x):
-            if pd.isna(x):
-                return 0
-            if x < threshold:
-                return (((x + 1) / (avg + 1) - 1) * 25 * multiplier)
-            return (np.log((x/avg) + 1) + 1) * 25
-            
-        return series.apply(score_formula)
+        return custom_score(series, threshold, multiplier)
         
     except Exception as e:
         print(f"Skor hesaplama hatası: {e}")
@@ -280,36 +221,8 @@ def normalize_custom(series):
 def normalize_market_cap(series):
     """Market Cap için yumuşak logaritmik normalizasyon (milyar dolar bazında)"""
     try:
-        def score_market_cap(x):
-            if pd.isna(x):
-                return 35
-                
-            # Değer zaten milyar dolar cinsinden
-            billions = float(x)
-            
-            # Debug print
-            print(f"\nHesaplanan Market Cap (milyar $): {billions}")
-            
-            # Puanlama aralıkları (milyar dolar bazında)
-            if billions >= 500:      # 500B+ şirketler
-                return 95
-            elif billions >= 200:    # 200-500B arası
-                return 90 + ((billions - 200) / 300) * 5
-            elif billions >= 100:    # 100-200B arası
-                return 85 + ((billions - 100) / 100) * 5
-            elif billions >= 50:     # 50-100B arası
-                return 77 + ((billions - 50) / 50) * 8
-            elif billions >= 10:     # 10-50B arası
-                return 60 + ((billions - 10) / 40) * 17
-            elif billions >= 5:      # 5-10B arası
-                return 50 + ((billions - 5) / 5) * 10
-            elif billions >= 1:      # 1-5B arası
-                return 40 + ((billions - 1) / 4) * 10
-            else:                    # 1B altı
-                return max(35, 35 + (billions * 5))
-            
-        # Debug için print ekleyelim
-        scored_series = series.apply(score_market_cap)
+        # Değer zaten milyar dolar cinsinden; aralıklar score_kernel.MKTCAP_BANDS'de
+        scored_series = market_cap_score(series)
         print("\nÖrnek Market Cap Skorları:")
         sample_data = pd.DataFrame({
             'Market Cap (B$)': series,
@@ -345,18 +258,12 @@ def calculate_all_scores(df):
         
         # 3. 6M değişim hesaplamaları
         df['COM_6M_CHG'] = df['COM_LAST_PRICE'] / df['COM_6M_PRICE'] - 1
-        df['COM_6M_SKOR'] = df['COM_6M_CHG'].apply(lambda x: 
-            (((x + 1) / (df['COM_6M_CHG'].mean() + 1) - 1) * 25 * 1.25) if x < -0.22 
-            else (((x + 1) / (df['COM_6M_CHG'].mean() + 1) - 1) * 25)
-        )
+        df['COM_6M_SKOR'] = change_score(df['COM_6M_CHG'], threshold=-0.22, multiplier=1.25)
         df['COM_6M_NORM'] = normalize_custom(df['COM_6M_SKOR'])
         
         # 4. 3M değişim hesaplamaları
         df['COM_3M_CHG'] = df['COM_LAST_PRICE'] / df['COM_3M_PRICE'] - 1
-        df['COM_3M_SKOR'] = df['COM_3M_CHG'].apply(lambda x: 
-            (((x + 1) / (df['COM_3M_CHG'].mean() + 1) - 1) * 25 * 1.25) if x < -0.22 
-            else (((x + 1) / (df['COM_3M_CHG'].mean() + 1) - 1) * 25)
-        )
+        df['COM_3M_SKOR'] = change_score(df['COM_3M_CHG'], threshold=-0.22, multiplier=1.25)
         df['COM_3M_NORM'] = normalize_custom(df['COM_3M_SKOR'])
         
         return df
@@ -404,34 +311,10 @@ def calculate_final_scores(df):
         df['MKTCAP_NORM'] = log_normalize(df['COM_MKTCAP'])
         
         # 5. Final Solidity Score (AK kolonu)
-        def calculate_solidity(row):
-            try:
-                recent_perf = row['Normalized COM 6M'] + row['Normalized COM 3M']
-                is_bb = str(row['BOND_']).strip() == 'BB'
-                
-                if recent_perf < 80:
-                    # Düşük performans ağırlıkları
-                    base_score = (
-                        row['TOTAL_SCORE_NORM'] * 0.40 +
-                        row['MKTCAP_NORM'] * 0.32 +
-                        row['CRDT_SCORE_NORM'] * 0.28
-                    )
-                else:
-                    # Yüksek performans ağırlıkları
-                    base_score = (
-                        row['TOTAL_SCORE_NORM'] * 0.20 +
-                        row['MKTCAP_NORM'] * 0.42 +
-                        row['CRDT_SCORE_NORM'] * 0.38
-                    )
-                
-                # BB bond kontrolü
-                return base_score * 1.02 if is_bb else base_score
-                
-            except Exception as e:
-                print(f"Solidity hesaplama hatası: {e}")
-                return 0
-        
-        df['SOLIDITY_SCORE'] = df.apply(calculate_solidity, axis=1)
+        recent_perf = df['Normalized COM 6M'] + df['Normalized COM 3M']
+        df['SOLIDITY_SCORE'] = final_solidity_score(
+            df['TOTAL_SCORE_NORM'], df['MKTCAP_NORM'], df['CRDT_SCORE_NORM'], recent_perf, df.get('BOND_')
+        )
         
         return df
         
@@ -485,117 +368,122 @@ def process_data(df):
         print(f"Veri işleme hatası: {e}")
         return df
 
-# Ana hesaplama kısmında şu şekilde kullanılır:
-try:
-    # CSV'yi oku ve sayısal verileri temizle
-    df = pd.read_csv('common_stock_results.csv', encoding='utf-8-sig')
-    df = clean_numeric_data(df)
+def score_universe(input_file, output_file):
+    """common_*.csv dosyasını skorla ve scored_*.csv olarak kaydet (T ve C evrenleri için ortak)"""
+    try:
+        # CSV'yi oku ve sayısal verileri temizle
+        df = read_table(input_file, encoding='utf-8-sig')
+        df = clean_numeric_data(df)
     
-    # HIGH skorlarını hesapla
-    df = calculate_52w_high_score(df)
-    df = calculate_5y_high_score(df)
+        # HIGH skorlarını hesapla
+        df = calculate_52w_high_score(df)
+        df = calculate_5y_high_score(df)
     
-    # LOW skorlarını hesapla
-    df = calculate_low_scores(df)
+        # LOW skorlarını hesapla
+        df = calculate_low_scores(df)
     
-    # Değişim skorlarını hesapla
-    df = calculate_change_scores(df)
+        # Değişim skorlarını hesapla
+        df = calculate_change_scores(df)
     
-    # Solidity skorlarını hesapla
-    df = calculate_solidity_scores(df)
+        # Solidity skorlarını hesapla
+        df = calculate_solidity_scores(df)
     
-    # Özel skorları hesapla
-    df = calculate_all_scores(df)
+        # Özel skorları hesapla
+        df = calculate_all_scores(df)
     
-    # Final skorları hesapla
-    df = calculate_final_scores(df)
+        # Final skorları hesapla
+        df = calculate_final_scores(df)
     
-    # Market Cap normalizasyonu
-    df['MKTCAP_NORM'] = normalize_market_cap(df['COM_MKTCAP'])
+        # Market Cap normalizasyonu
+        df['MKTCAP_NORM'] = normalize_market_cap(df['COM_MKTCAP'])
     
-    # Market Cap skorlarını kontrol et
-    print("\n=== Market Cap Skor Analizi ===")
-    df_sorted = df.sort_values('COM_MKTCAP', ascending=False)
-    print("\nTop 20 Market Cap Şirketleri ve Skorları:")
-    print(df_sorted[['PREF IBKR', 'COM_MKTCAP', 'MKTCAP_NORM']].head(20).to_string(index=False))
+        # Market Cap skorlarını kontrol et
+        print("\n=== Market Cap Skor Analizi ===")
+        df_sorted = df.sort_values('COM_MKTCAP', ascending=False)
+        print("\nTop 20 Market Cap Şirketleri ve Skorları:")
+        print(df_sorted[['PREF IBKR', 'COM_MKTCAP', 'MKTCAP_NORM']].head(20).to_string(index=False))
     
-    # Market Cap aralıklarına göre ortalama skorları göster
-    print("\nMarket Cap Aralıklarına Göre Ortalama Skorlar:")
+        # Market Cap aralıklarına göre ortalama skorları göster
+        print("\nMarket Cap Aralıklarına Göre Ortalama Skorlar:")
     
-    def get_mktcap_range(x):
-        billions = x / 1_000_000_000
-        if billions >= 500: return "500B+ USD"
-        elif billions >= 200: return "200B-500B USD"
-        elif billions >= 100: return "100B-200B USD"
-        elif billions >= 50: return "50B-100B USD"
-        elif billions >= 10: return "10B-50B USD"
-        elif billions >= 5: return "5B-10B USD"
-        elif billions >= 1: return "1B-5B USD"
-        else: return "<1B USD"
+        def get_mktcap_range(x):
+            billions = x / 1_000_000_000
+            if billions >= 500: return "500B+ USD"
+            elif billions >= 200: return "200B-500B USD"
+            elif billions >= 100: return "100B-200B USD"
+            elif billions >= 50: return "50B-100B USD"
+            elif billions >= 10: return "10B-50B USD"
+            elif billions >= 5: return "5B-10B USD"
+            elif billions >= 1: return "1B-5B USD"
+            else: return "<1B USD"
     
-    df['MKTCAP_RANGE'] = df['COM_MKTCAP'].apply(get_mktcap_range)
-    mktcap_stats = df.groupby('MKTCAP_RANGE')['MKTCAP_NORM'].agg([
-        ('Şirket Sayısı', 'count'),
-        ('Ortalama Skor', 'mean'),
-        ('Min Skor', 'min'),
-        ('Max Skor', 'max')
-    ]).round(2)
+        df['MKTCAP_RANGE'] = df['COM_MKTCAP'].apply(get_mktcap_range)
+        mktcap_stats = df.groupby('MKTCAP_RANGE')['MKTCAP_NORM'].agg([
+            ('Şirket Sayısı', 'count'),
+            ('Ortalama Skor', 'mean'),
+            ('Min Skor', 'min'),
+            ('Max Skor', 'max')
+        ]).round(2)
     
-    print(mktcap_stats)
+        print(mktcap_stats)
     
-    # Sonuçları kontrol et
-    print("\n=== Veri Kontrolü ===")
-    numeric_cols = ['COM_LAST_PRICE', 'COM_52W_HIGH', 'COM_5Y_HIGH', 'COM_MKTCAP']
-    print("\nÖrnek veriler:")
-    print(df[numeric_cols].head())
+        # Sonuçları kontrol et
+        print("\n=== Veri Kontrolü ===")
+        numeric_cols = ['COM_LAST_PRICE', 'COM_52W_HIGH', 'COM_5Y_HIGH', 'COM_MKTCAP']
+        print("\nÖrnek veriler:")
+        print(df[numeric_cols].head())
     
-    print("\n=== Skor Dağılımları ===")
-    score_cols = ['52W_HIGH_SKOR', '5Y_HIGH_SKOR', '52W_LOW_SKOR', '5Y_LOW_SKOR']
-    for col in score_cols:
-        print(f"\n{col} dağılımı:")
-        print(df[col].describe())
+        print("\n=== Skor Dağılımları ===")
+        score_cols = ['52W_HIGH_SKOR', '5Y_HIGH_SKOR', '52W_LOW_SKOR', '5Y_LOW_SKOR']
+        for col in score_cols:
+            print(f"\n{col} dağılımı:")
+            print(df[col].describe())
     
-    # Top ve Bottom analizini yap
-    analyze_top_bottom_scores(df)
+        # Top ve Bottom analizini yap
+        analyze_top_bottom_scores(df)
     
-    # Market Cap skorlarını kontrol et
-    print("\n=== Market Cap Skor Analizi ===")
-    df_sorted = df.sort_values('COM_MKTCAP', ascending=False)
-    print("\nTop 20 Market Cap Şirketleri ve Skorları:")
-    print(df_sorted[['PREF IBKR', 'COM_MKTCAP', 'MKTCAP_NORM']].head(20).to_string(index=False))
+        # Market Cap skorlarını kontrol et
+        print("\n=== Market Cap Skor Analizi ===")
+        df_sorted = df.sort_values('COM_MKTCAP', ascending=False)
+        print("\nTop 20 Market Cap Şirketleri ve Skorları:")
+        print(df_sorted[['PREF IBKR', 'COM_MKTCAP', 'MKTCAP_NORM']].head(20).to_string(index=False))
     
-    # Market Cap aralıklarına göre ortalama skorları göster
-    print("\nMarket Cap Aralıklarına Göre Ortalama Skorlar:")
+        # Market Cap aralıklarına göre ortalama skorları göster
+        print("\nMarket Cap Aralıklarına Göre Ortalama Skorlar:")
     
-    def get_mktcap_range(x):
-        billions = x / 1_000_000_000
-        if billions >= 500: return "500B+ USD"
-        elif billions >= 200: return "200B-500B USD"
-        elif billions >= 100: return "100B-200B USD"
-        elif billions >= 50: return "50B-100B USD"
-        elif billions >= 10: return "10B-50B USD"
-        elif billions >= 5: return "5B-10B USD"
-        elif billions >= 1: return "1B-5B USD"
-        else: return "<1B USD"
+        def get_mktcap_range(x):
+            billions = x / 1_000_000_000
+            if billions >= 500: return "500B+ USD"
+            elif billions >= 200: return "200B-500B USD"
+            elif billions >= 100: return "100B-200B USD"
+            elif billions >= 50: return "50B-100B USD"
+            elif billions >= 10: return "10B-50B USD"
+            elif billions >= 5: return "5B-10B USD"
+            elif billions >= 1: return "1B-5B USD"
+            else: return "<1B USD"
     
-    df['MKTCAP_RANGE'] = df['COM_MKTCAP'].apply(get_mktcap_range)
-    print(df.groupby('MKTCAP_RANGE')['MKTCAP_NORM'].agg(['count', 'mean', 'min', 'max']).round(2))
+        df['MKTCAP_RANGE'] = df['COM_MKTCAP'].apply(get_mktcap_range)
+        print(df.groupby('MKTCAP_RANGE')['MKTCAP_NORM'].agg(['count', 'mean', 'min', 'max']).round(2))
     
-    # Solidity sonuçlarını göster
-    print("\n=== Solidity Skor Analizi ===")
-    print("\nTop 10 - Solidity:")
-    print(df.nlargest(30, 'SOLIDITY_SCORE')[['PREF IBKR', 'SOLIDITY_SCORE']].to_string(index=False))
-    print("\nBottom 10 - Solidity:")
-    print(df.nsmallest(30, 'SOLIDITY_SCORE')[['PREF IBKR', 'SOLIDITY_SCORE']].to_string(index=False))
+        # Solidity sonuçlarını göster
+        print("\n=== Solidity Skor Analizi ===")
+        print("\nTop 10 - Solidity:")
+        print(df.nlargest(30, 'SOLIDITY_SCORE')[['PREF IBKR', 'SOLIDITY_SCORE']].to_string(index=False))
+        print("\nBottom 10 - Solidity:")
+        print(df.nsmallest(30, 'SOLIDITY_SCORE')[['PREF IBKR', 'SOLIDITY_SCORE']].to_string(index=False))
     
-    # Sonuçları kaydet
-    df.to_csv('scored_stocks.csv', 
-              index=False, 
-              encoding='utf-8-sig',
-              float_format='%.6f',  # 6 decimal places
-              date_format='%Y-%m-%d',
-              quoting=csv.QUOTE_NONNUMERIC)  # Sadece string'leri quote'la
+        # Sonuçları kaydet
+        write_table(df, output_file, 
+                        index=False, 
+                        encoding='utf-8-sig',
+                        float_format='%.6f',  # 6 decimal places
+                        date_format='%Y-%m-%d',
+                        quoting=csv.QUOTE_NONNUMERIC)  # Sadece string'leri quote'la
+
+    except Exception as e:
+        print(f"Hata oluştu: {e}")
+        raise e
+    return df
 
-except Exception as e:
-    print(f"Hata oluştu: {e}")
-    raise e
\ No newline at end of file
+if __name__ == '__main__':
+    score_universe('common_stock_results.csv', 'scored_stocks.csv')
\ No newline at end of file
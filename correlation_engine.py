@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+LAGS = (1, 2, 3)         # ETF t gününde, hisse t+lag gününde
+MIN_COMMON_DAYS = 30     # Bundan az ya da eşit ortak gün varsa ilişki metrikleri NaN
+MIN_LAG_PAIRS = 20       # Gecikmeli çift sayısı bundan az ya da eşitse o gecikmenin etkisi 0
+MIN_CONDITION_DAYS = 10  # ETF'nin yükseldiği/düştüğü gün sayısı bundan az ya da eşitse tepki 0
+
+# Sembol başına, ETF başına üretilen kolonlar (sırası korunur)
+FEATURES = ('Corr', 'Lag_Effect', 'Direction_Match', 'Up_Response', 'Down_Response')
+
+def return_matrix(frames, column='return', dates=None):
+    """{sembol: DataFrame} -> tarih x sembol getiri matrisi; verisi olmayan günler NaN.
+
+    `dates` verilmezse tüm serilerin tarih birleşimi (sıralı) kullanılır.
+    """
+    series = {}
+    for symbol, df in frames.items():
+        values = df[column].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        series[symbol] = (df.index[valid], values[valid])
+    if dates is None:
+        dates = np.unique(np.concatenate([index.to_numpy() for index, _ in series.values()])) if series else []
+    dates = pd.Index(dates)
+    matrix = np.full((len(dates), len(series)), np.nan)
+    for j, (index, values) in enumerate(series.values()):
+        rows = dates.get_indexer(index)  # Aynı tarih birden çok kez varsa son değer kalır
+        keep = rows >= 0
+        matrix[rows[keep], j] = values[keep]
+    return pd.DataFrame(matrix, index=dates, columns=list(series))
+
+def _masked_corr(x, y, mask):
+    """Kolon bazında, sadece mask'li satırlar üzerinden Pearson korelasyonu (sabit seride NaN).
+
+    x ve y'nin mask dışındaki değerleri 0 olmalıdır.
+    """
+    n = mask.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dx = x - mask * (x.sum(axis=0) / n)
+        dy = y - mask * (y.sum(axis=0) / n)
+        corr = np.einsum('ij,ij->j', dx, dy) / np.sqrt(np.einsum('ij,ij->j', dx, dx) * np.einsum('ij,ij->j', dy, dy))
+    return np.clip(corr, -1, 1)
+
+def _masked_mean(x, mask):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (x * mask).sum(axis=0) / mask.sum(axis=0)
+
+def etf_relationships(stocks, etfs, lags=LAGS, min_common=MIN_COMMON_DAYS,
+                      min_lag_pairs=MIN_LAG_PAIRS, min_condition_days=MIN_CONDITION_DAYS):
+    """Tüm hisse x ETF çiftleri için ilişki metrikleri (sembol indeksli DataFrame).
+
+    `stocks` ve `etfs` aynı tarih indeksli getiri matrisleridir (return_matrix).
+    Her çift yalnızca ikisinin de getirisi olan ortak günler üzerinden
+    değerlendirilir. Her ETF için ortak günler hisse başına tek bir kararlı
+    sıralamayla matrisin başına toplanır; böylece gecikmeli korelasyon ortak
+    gün dizisinde pozisyon kaydırarak (ETF i. ortak günde, hisse i+lag.
+    ortak günde) tüm hisseler için birlikte hesaplanır.
+
+    Kolonlar, ETF başına: Corr_, Lag_Effect_ (gecikmeli korelasyonların
+    ortalaması), Direction_Match_ (aynı yönde hareket oranı), Up_Response_ /
+    Down_Response_ (ETF yükselirken/düşerken ortalama hisse getirisinin
+    ortalama ETF getirisine oranı).
+    """
+    values = stocks.to_numpy(dtype=float, copy=True)
+    valid = ~np.isnan(values)
+    rows = np.arange(len(values))[:, None]
+    result = {}
+
+    for etf in etfs.columns:
+        etf_values = etfs[etf].to_numpy(dtype=float, copy=True)
+        common = valid & ~np.isnan(etf_values)[:, None]
+        n = common.sum(axis=0)
+        enough = n > min_common
+
+        # Ortak günleri her kolonda tarih sırasını bozmadan başa topla
+        order = np.argsort(~common, axis=0, kind='stable')
+        packed = rows < n
+        s = np.where(packed, np.take_along_axis(values, order, axis=0), 0)
+        e = np.where(packed, etf_values[order], 0)
+
+        corr = _masked_corr(s, e, packed)
+
+        lag_corrs = []
+        for lag in lags:
+            pairs = np.maximum(n - lag, 0)
+            lag_mask = rows[:len(rows) - lag] < pairs
+            lag_corr = _masked_corr(e[:len(e) - lag] * lag_mask, s[lag:] * lag_mask, lag_mask)
+            lag_corrs.append(np.where(pairs > min_lag_pairs, lag_corr, 0))
+        lag_effect = np.mean(lag_corrs, axis=0)
+
+        up, down = packed & (e > 0), packed & (e < 0)
+        direction_match = _masked_mean((e > 0) == (s > 0), packed)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            up_response = np.where(up.sum(axis=0) > min_condition_days,
+                                   _masked_mean(s, up) / _masked_mean(e, up), 0)
+            down_response = np.where(down.sum(axis=0) > min_condition_days,
+                                     _masked_mean(s, down) / _masked_mean(e, down), 0)
+
+        for name, feature in zip(FEATURES, (corr, lag_effect, direction_match, up_response, down_response)):
+            result[f'{name}_{etf}'] = np.where(enough, feature, np.nan)
+
+    return pd.DataFrame(result, index=stocks.columns)
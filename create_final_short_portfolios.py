@@ -3,6 +3,11 @@ import numpy as np
 import os
 import sys
 import re
+from table_io import read_table, write_table
+
+SHORT_CANDIDATES = 100  # FINAL_THG en düşük kaç hisse değerlendirilir
+SMI_MAX = 0.28          # Bu fee rate'in altındaki hisseler short'lanabilir
+SMI_WEIGHT = 500        # SHORT_FINAL = FINAL_THG + SMI * SMI_WEIGHT
 
 def extract_company_code(symbol):
     """Sembolden şirket kodunu çıkartır (örn: AAPL PR -> AAPL)"""
@@ -12,6 +17,55 @@ def extract_company_code(symbol):
         return match.group(1)
     return symbol
 
+def select_short_portfolio(df, max_stocks, max_per_company=2, max_per_group=6,
+                           smi_max=SMI_MAX, smi_weight=SMI_WEIGHT, candidates=SHORT_CANDIDATES):
+    """Short portföy seçimi (dosya okuma/yazma yok); COMPANY kolonlu DataFrame, hisse kalmazsa None"""
+    # 1. FINAL_THG değerine göre en düşük `candidates` hisseyi seç
+    df_filtered = df.nsmallest(candidates, "FINAL_THG").copy()
+    print(f"FINAL_THG en düşük {candidates} hisse seçildi.")
+    
+    # 2. SMI değeri smi_max'tan küçük olan hisseleri filtrele
+    df_filtered = df_filtered[df_filtered["SMI"] < smi_max].copy()
+    print(f"SMI < {smi_max} olan hisse sayısı: {len(df_filtered)}")
+    
+    if len(df_filtered) == 0:
+        print("⚠️ Filtreleme sonucunda hisse kalmadı!")
+        return None
+    
+    # 3. SHORT_FINAL skorunu hesapla
+    df_filtered["SHORT_FINAL"] = df_filtered["FINAL_THG"] + (df_filtered["SMI"] * smi_weight)
+    
+    # 4. Şirket kodu oluştur
+    df_filtered["COMPANY"] = df_filtered["PREF IBKR"].apply(extract_company_code)
+    
+    # 5. SHORT_FINAL'a göre sırala
+    df_sorted = df_filtered.sort_values("SHORT_FINAL")
+    
+    # 6. Optimize edilmiş portföy oluştur
+    selected_stocks = []
+    company_counts = {}  # Şirket bazında sayım
+    group_counts = {}    # Grup bazında sayım
+    
+    for _, row in df_sorted.iterrows():
+        company = row["COMPANY"]
+        group = row["GROUP"] if "GROUP" in df_filtered.columns else "NOGROUP"
+        
+        # Şirket ve grup sayılarını kontrol et
+        company_count = company_counts.get(company, 0)
+        group_count = group_counts.get(group, 0)
+        
+        # Limitleri aşmıyorsa ekle
+        if (company_count < max_per_company and 
+            group_count < max_per_group and 
+            len(selected_stocks) < max_stocks):
+            
+            selected_stocks.append(row)
+            company_counts[company] = company_count + 1
+            group_counts[group] = group_count + 1
+    
+    # Seçilen hisseleri DataFrame'e dönüştür
+    return pd.DataFrame(selected_stocks)
+
 def create_optimized_short_portfolio(input_file, output_file, max_stocks, max_per_company=2, max_per_group=6):
     """
     Optimize edilmiş final short portföyü oluşturur
@@ -28,54 +82,12 @@ def create_optimized_short_portfolio(input_file, output_file, max_stocks, max_pe
     
     try:
         # Dosyayı yükle
-        df = pd.read_csv(input_file)
+        df = read_table(input_file)
         print(f"Dosya başarıyla yüklendi: {len(df)} hisse")
         
-        # 1. FINAL_THG değerine göre en düşük 100 hisseyi seç
-        df_filtered = df.nsmallest(100, "FINAL_THG").copy()
-        print(f"FINAL_THG en düşük 100 hisse seçildi.")
-        
-        # 2. SMI değeri 0.28'den küçük olan hisseleri filtrele
-        df_filtered = df_filtered[df_filtered["SMI"] < 0.28].copy()
-        print(f"SMI < 0.28 olan hisse sayısı: {len(df_filtered)}")
-        
-        if len(df_filtered) == 0:
-            print("⚠️ Filtreleme sonucunda hisse kalmadı!")
+        final_df = select_short_portfolio(df, max_stocks, max_per_company, max_per_group)
+        if final_df is None:
             return None
-        
-        # 3. SHORT_FINAL skorunu hesapla
-        df_filtered["SHORT_FINAL"] = df_filtered["FINAL_THG"] + (df_filtered["SMI"] * 500)
-        
-        # 4. Şirket kodu oluştur
-        df_filtered["COMPANY"] = df_filtered["PREF IBKR"].apply(extract_company_code)
-        
-        # 5. SHORT_FINAL'a göre sırala
-        df_sorted = df_filtered.sort_values("SHORT_FINAL")
-        
-        # 6. Optimize edilmiş portföy oluştur
-        selected_stocks = []
-        company_counts = {}  # Şirket bazında sayım
-        group_counts = {}    # Grup bazında sayım
-        
-        for _, row in df_sorted.iterrows():
-            company = row["COMPANY"]
-            group = row["GROUP"] if "GROUP" in df_filtered.columns else "NOGROUP"
-            
-            # Şirket ve grup sayılarını kontrol et
-            company_count = company_counts.get(company, 0)
-            group_count = group_counts.get(group, 0)
-            
-            # Limitleri aşmıyorsa ekle
-            if (company_count < max_per_company and 
-                group_count < max_per_group and 
-                len(selected_stocks) < max_stocks):
-                
-                selected_stocks.append(row)
-                company_counts[company] = company_count + 1
-                group_counts[group] = group_count + 1
-        
-        # Seçilen hisseleri DataFrame'e dönüştür
-        final_df = pd.DataFrame(selected_stocks)
         print(f"Optimize edilmiş portföyde {len(final_df)} hisse seçildi.")
         
         # Detaylı istatistikler göster
@@ -108,7 +120,7 @@ def create_optimized_short_portfolio(input_file, output_file, max_stocks, max_pe
         
         # COMPANY kolonunu çıkar ve dosyayı kaydet
         final_df.drop(columns=["COMPANY"], inplace=True)
-        final_df.to_csv(output_file, index=False)
+        write_table(final_df, output_file, index=False)
         print(f"\nOptimize short portföy '{output_file}' dosyasına kaydedildi.")
         
         return final_df
@@ -1,12 +1,14 @@
 import json
-from ib_insync import IB, Stock
+from ib_insync import IB, util
 import pandas as pd
-import time
 from ibkrtry_checkpoint import CheckpointManager
+from bar_store import get_store
+from historical_fetcher import HistoricalFetcher
 from datetime import datetime, timedelta
 import math
 import sys
 import locale
+from table_io import write_table
 
 # Karakter kodlama sorununu çöz
 sys.stdout.reconfigure(encoding='utf-8', errors='replace')
@@ -31,33 +33,15 @@ def load_extlt_historical_data():
     """Sabit tarihsel verileri yükle"""
     try:
         historical_df = pd.read_csv('extlthistorical.csv')
-        # Tüm kolonları general formata çevir
-        for col in historical_df.columns:
-            if historical_df[col].dtype in ['float64', 'int64']:
-                historical_df[col] = historical_df[col].apply(lambda x: f"{x:.2f}" if pd.notnull(x) else x)
         print("Yüklenen veri satır sayısı:", len(historical_df))
         print("Kolonlar:", historical_df.columns.tolist())
         return historical_df
     except FileNotFoundError:
         return pd.DataFrame()
 
-def get_qualified_contract(ticker, ib):  # ib parametresi eklendi
-    """Otomatik exchange tanımı yapan fonksiyon"""
-    try:
-        base_contract = Stock(symbol=ticker, exchange='SMART', currency='USD')
-        details = ib.reqContractDetails(base_contract)
-        time.sleep(0.5)  # API rate limiting
-        if details:
-            return details[0].contract
-        else:
-            print(f"{ticker}: Contract details alınamadı")
-            return None
-    except Exception as e:
-        print(f"{ticker} için hata: {e}")
-        return None
-
 def update_price_data(df, ib):
     """Son fiyatları ve tüm teknik verileri güncelle"""
+    store = get_store()
     
     # Gerekli kolonları kontrol et ve yoksa oluştur
     required_columns = [
@@ -77,6 +61,9 @@ def update_price_data(df, ib):
     success = 0
     failed = 0
     
+    # Eksik barları tüm semboller için eşzamanlı çek (kısa süre yedekleri dahil); döngü sadece sonuçları okur
+    frames = util.run(HistoricalFetcher(ib, store).fetch(df['PREF IBKR'].dropna().tolist(), '2 Y'))
+    
     for idx, row in df.iterrows():
         ticker = row['PREF IBKR']
         processed += 1
@@ -86,28 +73,15 @@ def update_price_data(df, ib):
             progress = (processed / total_symbols) * 100
             print(f"İşleniyor: {ticker} ({processed}/{total_symbols}, %{progress:.1f})")
             
-            contract = get_qualified_contract(ticker, ib)
-            if contract is None:
-                failed += 1
-                continue
-
-            # 2 yıllık veri çek
-            bars = ib.reqHistoricalData(
-                contract,
-                endDateTime='',
-                durationStr='2 Y',
-                barSizeSetting='1 day',
-                whatToShow='TRADES',
-                useRTH=True
-            )
+            # 2 yıllık (yoksa yedek süreli) günlük barlar; alınamayanlar için tekrar seri istek yapılmaz
+            bars_df = frames.get(ticker)
             
-            if bars and len(bars) > 0:
-                # DataFrame'e çevir ve close değerlerini numeric yap
-                bars_df = pd.DataFrame(bars)
+            if bars_df is not None and len(bars_df) > 0:
+                # close değerlerini numeric yap
                 bars_df['close'] = pd.to_numeric(bars_df['close'], errors='coerce')
                 
                 last_price = float(bars_df['close'].iloc[-1])
-                df.at[idx, 'Last Price'] = f"{last_price:.2f}"
+                df.at[idx, 'Last Price'] = last_price
                 
                 # SMA hesaplamaları - veri kontrolü ekle
                 if len(bars_df) >= 268:
@@ -117,15 +91,15 @@ def update_price_data(df, ib):
                         sma268 = float(bars_df['close'].rolling(window=268).mean().iloc[-1])
                         
                         # SMA değerlerini kaydet
-                        df.at[idx, 'SMA88'] = f"{sma88:.2f}"
-                        df.at[idx, 'SMA268'] = f"{sma268:.2f}"
+                        df.at[idx, 'SMA88'] = sma88
+                        df.at[idx, 'SMA268'] = sma268
                         
                         # SMA değişim yüzdelerini hesapla
                         sma88_chg = ((last_price - sma88) / sma88) * 100
                         sma268_chg = ((last_price - sma268) / sma268) * 100
                         
-                        df.at[idx, 'SMA88 chg'] = f"{sma88_chg:.2f}"
-                        df.at[idx, 'SMA268 chg'] = f"{sma268_chg:.2f}"
+                        df.at[idx, 'SMA88 chg'] = sma88_chg
+                        df.at[idx, 'SMA268 chg'] = sma268_chg
                         
                         print(f"OK - {ticker} SMA değerleri: SMA88={sma88:.2f}, SMA268={sma268:.2f}")
                         success += 1
@@ -141,20 +115,20 @@ def update_price_data(df, ib):
                 if not six_month_data.empty:
                     six_month_high = six_month_data['high'].max()
                     six_month_low = six_month_data['low'].min()
-                    df.at[idx, '6M High'] = f"{six_month_high:.2f}"
-                    df.at[idx, '6M Low'] = f"{six_month_low:.2f}"
+                    df.at[idx, '6M High'] = six_month_high
+                    df.at[idx, '6M Low'] = six_month_low
                 
                 # 1 yıllık high/low hesaplamaları
                 year_high = bars_df['high'].max()
                 year_low = bars_df['low'].min()
-                df.at[idx, '1Y High'] = f"{year_high:.2f}"
-                df.at[idx, '1Y Low'] = f"{year_low:.2f}"
+                df.at[idx, '1Y High'] = year_high
+                df.at[idx, '1Y Low'] = year_low
                 
                 # Aug2022 ve Oct19 farkları
                 if pd.notnull(row.get('Aug2022_Price')):
-                    df.at[idx, 'Aug2022_diff'] = f"{(last_price - float(row['Aug2022_Price'])):.2f}"
+                    df.at[idx, 'Aug2022_diff'] = last_price - float(row['Aug2022_Price'])
                 if pd.notnull(row.get('Oct19_Price')):
-                    df.at[idx, 'Oct19_diff'] = f"{(last_price - float(row['Oct19_Price'])):.2f}"
+                    df.at[idx, 'Oct19_diff'] = last_price - float(row['Oct19_Price'])
                 
                 print(f"OK - {ticker} için tüm veriler güncellendi")
             
@@ -167,14 +141,13 @@ def update_price_data(df, ib):
                       encoding='utf-8-sig')
                 print(f"Ara kayıt yapıldı: {processed}/{total_symbols} işlem tamamlandı")
             
-            ib.sleep(0.5)  # Rate limiting
-            
         except Exception as e:
             print(f"HATA - {ticker} için işlem hatası: {str(e)}")
             failed += 1
             continue
     
     print(f"\nTüm işlemler tamamlandı: {success} başarılı, {failed} başarısız, toplam {processed} hisse")
+    print(f"Bar deposu: {store.stats}")
     return df
 
 def calculate_div_metrics(df):
@@ -226,7 +199,7 @@ def calculate_div_metrics(df):
                 
                 days_factor = (90 - days_until_div) / 90
                 div_adj_price = last_price - (days_factor * div_amount)
-                df.at[idx, 'Div adj.price'] = f"{div_adj_price:.2f}"
+                df.at[idx, 'Div adj.price'] = div_adj_price
                 
                 print(f"OK - {row['PREF IBKR']} için temettü hesaplandı: TIME TO DIV={days_until_div}, Div adj.price={div_adj_price:.2f}")
             except Exception as e:
@@ -272,11 +245,11 @@ def main():
         df = calculate_div_metrics(df)
         
         # Sonuçları kaydet
-        df.to_csv('extlt_results.csv', 
-                  index=False,
-                  float_format='%.2f',  # Tüm sayısal değerler için 2 decimal
-                  sep=',',
-                  encoding='utf-8-sig')
+        write_table(df, 'extlt_results.csv', 
+                        index=False,
+                        float_format='%.2f',  # Tüm sayısal değerler için 2 decimal
+                        sep=',',
+                        encoding='utf-8-sig')
         
         print("\nTüm EXTLT verileri başarıyla kaydedildi.")
         
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import math
+import os
+import time
+from datetime import datetime, timedelta
+
+from ib_insync import Stock, util
+
+from historical_fetcher import MAX_OPEN_REQUESTS, RequestPacer
+
+DEFAULT_CACHE_FILE = "fee_rate_cache.json"
+CACHE_TTL = timedelta(days=1)  # Fee rate günlük değişir; bir günden eski değerler yeniden çekilir
+STREAM_WAIT = 1  # Yöntem 3: shortableShares için bekleme (sn)
+FAILED = object()  # Yöntem hata verdi (geçici olabilir): "değer yok" cevabından ayrı tutulur
+
+def _valid(value):
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+def shortable_fee(shortable):
+    """shortableShares miktarını 0-3% arası yaklaşık fee rate'e çevir (düşük shortable = yüksek fee)"""
+    shortable_pct = min(100, max(0, shortable / 10000))
+    return 3.0 * (1.0 - shortable_pct / 100)
+
+
+class FeeRateCache:
+    """Sembol başına fee rate + çekildiği zaman (JSON dosyası).
+
+    TTL içindeki değerler IBKR'ye hiç gidilmeden döner. Kontratı bulunamayan
+    (method='unknown') ya da hiçbir yöntemin değer döndürmediği (method='none')
+    semboller de rate=None olarak aynı TTL ile saklanır; böylece her
+    çalıştırmada yeniden denenmezler. Bir yöntemin hata verdiği semboller
+    saklanmaz, sonraki çalıştırmada tekrar denenir.
+    Yazma geçici dosya + os.replace ile yapılır; dosya okunamazsa boş
+    önbellekle devam edilir.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def lookup(self, symbol, now=None):
+        """(bulundu mu, fee rate); süresi geçmiş kayıtlar bulunmamış sayılır, bulunan rate None olabilir"""
+        entry = self.entries.get(symbol)
+        if not entry:
+            return False, None
+        now = now or datetime.now()
+        if now - datetime.fromisoformat(entry['fetched_at']) >= self.ttl:
+            return False, None
+        return True, entry['rate']
+
+    def put(self, symbol, rate, method, now=None):
+        self.entries[symbol] = {
+            'rate': None if rate is None else float(rate),
+            'method': method,
+            'fetched_at': (now or datetime.now()).isoformat(timespec='seconds'),
+        }
+
+    def save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+class FeeRateService:
+    """Çok sayıda sembolün short fee rate (SMI) değerini eşzamanlı çeker.
+
+    Önce önbellek okunur; kalan semboller için birincil yöntem (FEE_RATE
+    tarihsel verisi) hepsine aynı anda, en fazla `max_concurrent` açık
+    istekle gönderilir. Yedek yöntemler (SecDefOptParams, ContractDetails,
+    shortableShares) sadece birincil yöntemde değer gelmeyen semboller için
+    çalışır. Bağlantı `connect` ile ancak önbellekte olmayan sembol varsa
+    kurulur, yani sıcak önbellekle IBKR'ye hiç bağlanılmaz.
+    """
+
+    def __init__(self, ib=None, connect=None, cache=None, max_concurrent=MAX_OPEN_REQUESTS,
+                 max_requests_per_window=None, window_seconds=600):
+        self.ib = ib
+        self.connect = connect
+        self.cache = cache or FeeRateCache()
+        self.max_concurrent = max_concurrent
+        self.pacer = RequestPacer(max_requests_per_window, window_seconds)
+        self.stats = {'symbols': 0, 'cached': 0, 'fee_rate': 0, 'fallback': 0, 'failed': 0, 'elapsed_s': 0.0}
+
+    def _ensure_ib(self):
+        if self.ib is None or not self.ib.isConnected():
+            if self.connect is None:
+                raise RuntimeError("IBKR bağlantısı yok")
+            self.ib = self.connect()
+        return self.ib
+
+    async def _qualify(self, symbols):
+        """({sembol: kontrat}, IBKR'nin tanımadığı semboller); hata veren gruptakiler ikisinde de yer almaz"""
+        contracts, unknown = {}, []
+        pending = [Stock(s, 'SMART', 'USD') for s in symbols]
+        for i in range(0, len(pending), self.max_concurrent):
+            chunk = pending[i:i + self.max_concurrent]
+            try:
+                await self.ib.qualifyContractsAsync(*chunk)
+                failed = False
+            except Exception as e:
+                print(f"! Kontrat doğrulama hatası: {e}")
+                failed = True
+            for contract in chunk:
+                if contract.conId:
+                    contracts[contract.symbol] = contract
+                else:
+                    print(f"⚠️ {contract.symbol} için kontrat detaylandırılamadı")
+                    if not failed:
+                        unknown.append(contract.symbol)
+        return contracts, unknown
+
+    async def _fee_rate(self, contract):
+        """YÖNTEM 0: 1 haftalık 4 saatlik FEE_RATE barlarının son kapanışı"""
+        await self.pacer.wait()
+        bars = await self.ib.reqHistoricalDataAsync(
+            contract, endDateTime='', durationStr='1 W', barSizeSetting='4 hours',
+            whatToShow='FEE_RATE', useRTH=True)
+        if bars:
+            fee_rate = bars[-1].close
+            if _valid(fee_rate) and fee_rate > 0:
+                return fee_rate
+        return None
+
+    async def _sec_def(self, contract):
+        """YÖNTEM 1: SecDefOptParams stockType alanındaki sayısal değer"""
+        short_info = await self.ib.reqSecDefOptParamsAsync(
+            contract.symbol, '', contract.secType, contract.conId)
+        if short_info:
+            fee_rate = short_info[0].stockType
+            if isinstance(fee_rate, str) and fee_rate.strip():
+                # Rakamsal olmayan karakterleri kaldır (%, bps gibi)
+                fee_rate = ''.join(c for c in fee_rate if c.isdigit() or c in '.-')
+                if fee_rate:
+                    return float(fee_rate)
+        return None
+
+    async def _contract_details(self, contract):
+        """YÖNTEM 2: ContractDetails.shortableShares'ten yaklaşık değer"""
+        details = await self.ib.reqContractDetailsAsync(contract)
+        if details:
+            shortable = getattr(details[0], 'shortableShares', None)
+            if _valid(shortable) and shortable > 0:
+                return shortable_fee(shortable)
+        return None
+
+    async def _stream(self, contract):
+        """YÖNTEM 3: piyasa verisindeki shortableShares'ten yaklaşık değer"""
+        ticker = self.ib.reqMktData(contract, '', False, False)
+        try:
+            await asyncio.sleep(STREAM_WAIT)
+            shortable = getattr(ticker, 'shortableShares', None)
+            if _valid(shortable) and shortable > 0:
+                return shortable_fee(shortable)
+        finally:
+            self.ib.cancelMktData(contract)
+        return None
+
+    async def _run(self, name, method, contract, semaphore):
+        async with semaphore:
+            try:
+                return await method(contract)
+            except Exception as e:
+                print(f"{contract.symbol} {name} hata: {e}")
+                return FAILED
+
+    async def _fetch(self, symbols):
+        contracts, unknown = await self._qualify(symbols)
+        for symbol in unknown:
+            self.cache.put(symbol, None, 'unknown')
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        rates, errors = {}, set()
+        methods = [('fee_rate', self._fee_rate), ('sec_def', self._sec_def),
+                   ('contract_details', self._contract_details), ('stream', self._stream)]
+        pending = list(contracts)
+        for name, method in methods:
+            if not pending:
+                break
+            results = await asyncio.gather(*(self._run(name, method, contracts[s], semaphore) for s in pending))
+            for symbol, rate in zip(pending, results):
+                if rate is FAILED:
+                    errors.add(symbol)
+                elif rate is not None:
+                    rates[symbol] = rate
+                    self.cache.put(symbol, rate, name)
+                    self.stats['fee_rate' if name == 'fee_rate' else 'fallback'] += 1
+            pending = [s for s in pending if s not in rates]
+            print(f"Fee rate ({name}): {len(rates)}/{len(contracts)} sembol alındı, {len(pending)} eksik")
+        # Hiçbir yöntemin değer döndürmediği semboller TTL boyunca tekrar denenmesin; hata alanlar denensin
+        for symbol in pending:
+            if symbol not in errors:
+                self.cache.put(symbol, None, 'none')
+        return rates
+
+    def get_rates(self, symbols):
+        """{sembol: fee rate} döndür; alınamayan (önbellekte None olanlar dahil) semboller NaN olur"""
+        started = time.perf_counter()
+        symbols = list(dict.fromkeys(s for s in symbols if isinstance(s, str) and s))
+        rates, missing = {}, []
+        for symbol in symbols:
+            found, rate = self.cache.lookup(symbol)
+            if not found:
+                missing.append(symbol)
+            elif rate is not None:
+                rates[symbol] = rate
+        cached = len(symbols) - len(missing)
+        self.stats['cached'] += cached
+        print(f"Fee rate: {cached}/{len(symbols)} sembol önbellekten, {len(missing)} sembol IBKR'den çekilecek")
+
+        if missing:
+            self._ensure_ib()
+            self.ib.reqMarketDataType(3)  # Delayed data
+            rates.update(util.run(self._fetch(missing)))
+            self.cache.save()
+
+        self.stats['symbols'] += len(symbols)
+        self.stats['failed'] += sum(1 for s in symbols if s not in rates)
+        self.stats['elapsed_s'] = round(time.perf_counter() - started, 2)
+        print(f"Fee rate tamamlandı: {self.stats}")
+        return {symbol: rates.get(symbol, float('nan')) for symbol in symbols}
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from score_kernel import score_ratio, market_cap_score, solidity_score, round2
+from table_io import read_table, write_table
 
 def normalize_custom(series):
     """Excel'deki özel normalizasyon formülü"""
@@ -43,7 +45,7 @@ def fill_missing_values():
         
         print("Veri dosyaları yükleniyor...")
         # Mevcut verileri yükle
-        scored_stocks = pd.read_csv('scored_stocks.csv')
+        scored_stocks = read_table('scored_stocks.csv')
         original_len = len(scored_stocks)
         
         print(f"\nToplam hisse sayısı: {original_len}")
@@ -93,27 +95,9 @@ def fill_missing_values():
         # 52W_HIGH_SKOR ve 5Y_HIGH_SKOR değerlerini hesapla
         print("5. HIGH skorları yeniden hesaplanıyor...")
         
-        # Score ratio fonksiyonu
-        def calculate_score_ratio(current, high):
-            """Fiyat/High oranını hesapla ve 10-90 arası skora çevir"""
-            try:
-                if pd.isna(current) or pd.isna(high) or high == 0:
-                    return 10
-                ratio = current / high
-                # 2 ondalık basamağa yuvarla
-                return round(min(90, max(10, 90 * ratio)), 2)
-            except:
-                return 10
-        
-        scored_stocks['52W_HIGH_SKOR'] = scored_stocks.apply(
-            lambda x: calculate_score_ratio(x['COM_LAST_PRICE'], x['COM_52W_HIGH']), 
-            axis=1
-        )
-        
-        scored_stocks['5Y_HIGH_SKOR'] = scored_stocks.apply(
-            lambda x: calculate_score_ratio(x['COM_LAST_PRICE'], x['COM_5Y_HIGH']), 
-            axis=1
-        )
+        # Fiyat/High oranı 10-90 arası skora çevrilir, 2 ondalık basamağa yuvarlanır
+        scored_stocks['52W_HIGH_SKOR'] = round2(score_ratio(scored_stocks['COM_LAST_PRICE'], scored_stocks['COM_52W_HIGH']))
+        scored_stocks['5Y_HIGH_SKOR'] = round2(score_ratio(scored_stocks['COM_LAST_PRICE'], scored_stocks['COM_5Y_HIGH']))
         
         # TOTAL_HIGH_SCORE hesapla
         scored_stocks['TOTAL_HIGH_SCORE'] = ((scored_stocks['52W_HIGH_SKOR'] + scored_stocks['5Y_HIGH_SKOR']) / 2).round(2)
@@ -121,73 +105,17 @@ def fill_missing_values():
         # Market Cap normalize et - normalize_market_cap fonksiyonu ile
         print("6. Market Cap değerleri yeniden normalize ediliyor...")
         
-        # Market Cap normalize fonksiyonu
-        def normalize_market_cap(x):
-            """Market Cap değerini normalize et (milyar $ bazında)"""
-            if pd.isna(x):
-                return 35
-                
-            # Değer zaten milyar dolar cinsinden
-            billions = float(x)
-            
-            # Puanlama aralıkları
-            if billions >= 500:      # 500B+ şirketler
-                return 95
-            elif billions >= 200:    # 200-500B arası
-                return round(90 + ((billions - 200) / 300) * 5, 2)
-            elif billions >= 100:    # 100-200B arası
-                return round(85 + ((billions - 100) / 100) * 5, 2)
-            elif billions >= 50:     # 50-100B arası
-                return round(77 + ((billions - 50) / 50) * 8, 2)
-            elif billions >= 10:     # 10-50B arası
-                return round(60 + ((billions - 10) / 40) * 17, 2)
-            elif billions >= 5:      # 5-10B arası
-                return round(50 + ((billions - 5) / 5) * 10, 2)
-            elif billions >= 1:      # 1-5B arası
-                return round(40 + ((billions - 1) / 4) * 10, 2)
-            else:                    # 1B altı
-                return round(max(35, 35 + (billions * 5)), 2)
-        
-        scored_stocks['MKTCAP_NORM'] = scored_stocks['COM_MKTCAP'].apply(normalize_market_cap)
+        # Değer zaten milyar dolar cinsinden
+        scored_stocks['MKTCAP_NORM'] = round2(market_cap_score(scored_stocks['COM_MKTCAP']))
             
         # SOLIDITY_SCORE değerini yeniden hesapla
         print("7. SOLIDITY_SCORE değerleri yeniden hesaplanıyor...")
 
-        # Solidity hesaplama fonksiyonu
-        def calculate_solidity(row):
-            try:
-                total_perf = row['RECENT_TOTAL']
-                
-                # Son dönem performansına göre ağırlıklar
-                if total_perf >= 0.8:
-                    # Yüksek performans - Market Cap'e daha fazla ağırlık
-                    solidity = (
-                        row['TOTAL_HIGH_SCORE'] * 0.26 +
-                        row['MKTCAP_NORM'] * 0.49 +     # Market Cap ağırlığını artır
-                        row['CRDT_NORM'] * 0.25
-                    )
-                else:
-                    # Düşük performans - Total Score'a daha fazla ağırlık
-                    solidity = (
-                        row['TOTAL_HIGH_SCORE'] * 0.42 +
-                        row['MKTCAP_NORM'] * 0.39 +     # Market Cap ağırlığını koru
-                        row['CRDT_NORM'] * 0.20
-                    )
-                
-                # BB bond kontrolü
-                bond = str(row.get('BOND_', '')).strip()
-                if bond == 'BB':
-                    solidity *= 1.02
-                
-                # 2 ondalık basamağa yuvarla
-                return round(solidity, 2)
-                
-            except Exception as e:
-                print(f"Satır hesaplama hatası ({row.get('PREF IBKR', 'Bilinmeyen')}): {e}")
-                return None
-
-        # Önce normal SOLIDITY_SCORE değerlerini hesapla
-        scored_stocks['ORIGINAL_SOLIDITY'] = scored_stocks.apply(calculate_solidity, axis=1)
+        # Önce normal SOLIDITY_SCORE değerlerini hesapla (RECENT_TOTAL >= 0.8 ağırlıkları, BB bond x1.02)
+        scored_stocks['ORIGINAL_SOLIDITY'] = round2(solidity_score(
+            scored_stocks['TOTAL_HIGH_SCORE'], scored_stocks['MKTCAP_NORM'], scored_stocks['CRDT_NORM'],
+            scored_stocks['RECENT_TOTAL'], scored_stocks.get('BOND_')
+        ))
         
         # Sonra eksik verileri doldurduğumuz hisselerin skorlarını 30 puan düşür
         scored_stocks['SOLIDITY_SCORE'] = scored_stocks['ORIGINAL_SOLIDITY']
@@ -222,7 +150,7 @@ def fill_missing_values():
         
         # Sonuçları yeni bir CSV dosyasına kaydet - 2 ondalık basamak formatıyla
         output_file = 'scored_stocks_filled.csv'
-        scored_stocks.to_csv(output_file, index=False, float_format='%.2f')
+        write_table(scored_stocks, output_file, index=False, float_format='%.2f')
         print(f"\nTamamlanmış veriler '{output_file}' dosyasına kaydedildi.")
         
         # SOLIDITY bileşenlerini analiz et
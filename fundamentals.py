@@ -0,0 +1,210 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_CACHE_FILE = "fundamentals_cache.json"
+CACHE_TTL = timedelta(days=1)  # Aynı gün yeniden çalıştırmada hiç istek yapılmaz
+MAX_WORKERS = 4  # Finviz'e aynı anda en fazla 4 istek
+REQUEST_TIMEOUT = 10
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+
+def parse_market_cap_text(text):
+    """Finviz market cap metnini milyar $'a çevir ('12.3B', '850.5M', '123456789'); çevrilemezse None"""
+    text = text.strip()
+    try:
+        if 'B' in text:
+            return float(text.replace('B', ''))
+        if 'M' in text:
+            return float(text.replace('M', '')) / 1000
+        return float(text) / 1000000000  # Milyar dolara çevir
+    except ValueError:
+        return None
+
+
+class _SnapshotCells(HTMLParser):
+    """snapshot-table2 tablosundaki hücre metinleri (bs4 yoksa)"""
+
+    def __init__(self):
+        super().__init__()
+        self.depth = 0  # snapshot tablosu içindeki <table> derinliği
+        self.cells = []
+        self.cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            classes = (dict(attrs).get('class') or '').split()
+            if self.depth or 'snapshot-table2' in classes:
+                self.depth += 1
+        elif tag == 'td' and self.depth:
+            self.cell = []
+
+    def handle_endtag(self, tag):
+        if tag == 'table' and self.depth:
+            self.depth -= 1
+        elif tag == 'td' and self.cell is not None:
+            self.cells.append(''.join(self.cell))
+            self.cell = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+
+
+def snapshot_cells(content):
+    """Finviz quote sayfasının snapshot tablosundaki hücre metinleri (sırayla: etiket, değer, ...)"""
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        parser = _SnapshotCells()
+        parser.feed(content.decode('utf-8', 'replace') if isinstance(content, bytes) else content)
+        return parser.cells
+    soup = BeautifulSoup(content, 'html.parser')
+    return [cell.text for cell in soup.select('table.snapshot-table2 td')]
+
+
+class FinvizSource:
+    """Finviz quote sayfasından market cap.
+
+    `base_url` değiştirilerek aynı sayfa yapısını sunan yerel bir sunucu
+    (test/benchmark) kullanılabilir.
+    """
+
+    def __init__(self, base_url='https://finviz.com'):
+        self.base_url = base_url.rstrip('/')
+        # Yerel sunucunun değerleri gerçek Finviz önbelleğine karışmasın
+        self.name = 'finviz' if self.base_url == 'https://finviz.com' else f'finviz@{self.base_url}'
+        self.headers = {'User-Agent': USER_AGENT}
+
+    def url(self, ticker):
+        return f"{self.base_url}/quote.ashx?t={ticker}"
+
+    def parse(self, ticker, content):
+        cells = snapshot_cells(content)
+        for label, value in zip(cells, cells[1:]):
+            if "Market Cap" in label:
+                market_cap = parse_market_cap_text(value)
+                if market_cap is None:
+                    print(f"! {ticker}: Finviz market cap değeri dönüştürülemedi: {value.strip()}")
+                return market_cap
+        print(f"! {ticker}: Finviz'de Market Cap bulunamadı")
+        return None
+
+
+class FundamentalsCache:
+    """Ticker başına market cap + kaynak + çekildiği zaman (JSON dosyası).
+
+    Bulunamayan değerler de (None) saklanır ki aynı gün tekrar sorulmasın;
+    HTTP/bağlantı hataları saklanmaz, bir sonraki çalıştırmada yeniden denenir.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def lookup(self, ticker, source, now=None):
+        """(bulundu mu, market cap); süresi geçmiş ya da başka kaynaktan gelen kayıtlar bulunmamış sayılır"""
+        entry = self.entries.get(ticker)
+        if not entry or entry.get('source') != source:
+            return False, None
+        now = now or datetime.now()
+        if now - datetime.fromisoformat(entry['fetched_at']) >= self.ttl:
+            return False, None
+        return True, entry['market_cap']
+
+    def put(self, ticker, source, market_cap, now=None):
+        self.entries[ticker] = {
+            'market_cap': market_cap,
+            'source': source,
+            'fetched_at': (now or datetime.now()).isoformat(timespec='seconds'),
+        }
+
+    def save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+class MarketCapFetcher:
+    """Çok sayıda hissenin market cap değerini tek HTTP oturumu üzerinden eşzamanlı çeker.
+
+    Önbellekte (TTL içinde) olan hisseler için istek yapılmaz; kalanlar en
+    fazla `max_workers` eşzamanlı istekle, bağlantıları yeniden kullanan
+    tek bir requests.Session ile çekilir.
+    """
+
+    def __init__(self, source=None, cache=None, max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT, session=None):
+        self.source = source or FinvizSource()
+        self.cache = cache or FundamentalsCache()
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = session or self._session()
+        self.stats = {'tickers': 0, 'cached': 0, 'requests': 0, 'failed': 0, 'elapsed_s': 0.0}
+
+    def _session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(self.source.headers)
+        return session
+
+    def _fetch_one(self, ticker):
+        """(ticker, market cap, önbelleğe yazılsın mı)"""
+        try:
+            response = self.session.get(self.source.url(ticker), timeout=self.timeout)
+            if response.status_code != 200:
+                print(f"! {ticker}: {self.source.name} verisi alınamadı (HTTP {response.status_code})")
+                return ticker, None, False
+            market_cap = self.source.parse(ticker, response.content)
+            if market_cap is not None:
+                print(f"✓ Market Cap bulundu ({ticker}): {market_cap:.2f}B")
+            return ticker, market_cap, True
+        except Exception as e:
+            print(f"! {ticker} için {self.source.name} market cap verisi alma hatası: {str(e)}")
+            return ticker, None, False
+
+    def fetch(self, tickers):
+        """{ticker: market cap (milyar $) ya da None}"""
+        started = time.perf_counter()
+        tickers = list(dict.fromkeys(t for t in tickers if isinstance(t, str) and t))
+        results, missing = {}, []
+        for ticker in tickers:
+            found, market_cap = self.cache.lookup(ticker, self.source.name)
+            if found:
+                results[ticker] = market_cap
+            else:
+                missing.append(ticker)
+        self.stats['cached'] += len(results)
+        print(f"Market cap: {len(results)}/{len(tickers)} hisse önbellekten, {len(missing)} hisse çekilecek")
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for ticker, market_cap, cacheable in pool.map(self._fetch_one, missing):
+                    results[ticker] = market_cap
+                    if cacheable:
+                        self.cache.put(ticker, self.source.name, market_cap)
+                    else:
+                        self.stats['failed'] += 1
+            self.stats['requests'] += len(missing)
+            self.cache.save()
+
+        self.stats['tickers'] += len(tickers)
+        self.stats['elapsed_s'] = round(time.perf_counter() - started, 2)
+        print(f"Market cap tamamlandı: {self.stats}")
+        return results
@@ -1,10 +1,10 @@
 import pandas as pd
 import numpy as np
-import time
 import os
-from ib_insync import IB, Stock, util
+from ib_insync import IB
 import sys
-import datetime
+from fee_rate_service import FeeRateService
+from table_io import read_table, write_table
 
 def connect_to_ibkr():
     """IBKR'ye bağlanır"""
@@ -33,100 +33,7 @@ def connect_to_ibkr():
     
     return ib
 
-def get_fee_rate(ib, symbol):
-    """Bir hisse için fee rate (SMI) değerini alır"""
-    try:
-        contract = Stock(symbol, 'SMART', 'USD')
-        
-        # Sözleşmeyi detaylandır
-        qualified_contracts = ib.qualifyContracts(contract)
-        if not qualified_contracts:
-            print(f"⚠️ {symbol} için kontrat detaylandırılamadı")
-            return np.nan
-        
-        contract = qualified_contracts[0]
-        
-        # YÖNTEM 0: reqHistoricalData ile FEE_RATE verisi çekme (Birincil Yöntem)
-        try:
-            # Gecikmeli veri isteği
-            ib.reqMarketDataType(3)  # Delayed data
-            
-            # FEE_RATE verisi çek
-            bars = ib.reqHistoricalData(
-                contract,
-                endDateTime='',  # Bugün
-                durationStr='1 W',  # Son 1 hafta
-                barSizeSetting='4 hours',  # 4 saatlik çubuklar
-                whatToShow='FEE_RATE',  # Fee Rate verisi
-                useRTH=True  # Regular Trading Hours
-            )
-            
-            # Veriyi pandas df'e dönüştür
-            if bars and len(bars) > 0:
-                df = util.df(bars)
-                # En son fee rate değerini al
-                fee_rate = df.tail(1)["close"].reset_index(drop=True)[0]
-                if not np.isnan(fee_rate) and fee_rate > 0:
-                    return fee_rate
-        except Exception as e:
-            print(f"Yöntem 0 (FEE_RATE) hata: {e}")
-        
-        # YÖNTEM 1: SecDefOptParams kullanarak fee rate alma
-        try:
-            short_info = ib.reqSecDefOptParams(
-                underlyingSymbol=contract.symbol,
-                futFopExchange='',
-                underlyingSecType=contract.secType,
-                underlyingConId=contract.conId
-            )
-            
-            if short_info and len(short_info) > 0:
-                fee_rate = short_info[0].stockType
-                
-                if isinstance(fee_rate, str) and fee_rate.strip():
-                    # Rakamsal olmayan karakterleri kaldır (%, bps gibi)
-                    fee_rate = ''.join(c for c in fee_rate if c.isdigit() or c in '.-')
-                    if fee_rate:
-                        return float(fee_rate)
-        except Exception as e:
-            print(f"Yöntem 1 hata: {e}")
-        
-        # YÖNTEM 2: reqContractDetails kullanarak fee rate alma
-        try:
-            details = ib.reqContractDetails(contract)
-            if details and len(details) > 0:
-                # shortableShares özelliği ile ilgili bilgiyi kontrol et
-                shortable = details[0].shortableShares
-                if shortable is not None and shortable > 0:
-                    # shortableShares miktarını bir değere dönüştür
-                    # 0-100 arasında bir değere normalize et
-                    shortable_pct = min(100, max(0, shortable / 10000))
-                    # Düşük shortable = yüksek fee rate ilişkisi
-                    return 3.0 * (1.0 - shortable_pct/100)  # 0-3% arasında bir değer
-        except Exception as e:
-            print(f"Yöntem 2 hata: {e}")
-            
-        # YÖNTEM 3: Sözleşme piyasa verilerini kullan
-        try:
-            ib.reqMarketDataType(3)  # Delayed data
-            ticker = ib.reqMktData(contract, '', False, False)
-            time.sleep(1)  # Verilerin gelmesi için bekle
-            
-            # shortableShares veya shortableLastPrice verilerini kontrol et
-            if hasattr(ticker, 'shortableShares') and ticker.shortableShares > 0:
-                shortable_pct = min(100, max(0, ticker.shortableShares / 10000))
-                return 3.0 * (1.0 - shortable_pct/100)
-        except Exception as e:
-            print(f"Yöntem 3 hata: {e}")
-        
-        print(f"⚠️ {symbol} için fee rate bilgisi alınamadı")
-        return np.nan
-    
-    except Exception as e:
-        print(f"❌ {symbol} fee rate hatası: {e}")
-        return np.nan
-
-def process_portfolio_file(ib, input_file, output_file):
+def process_portfolio_file(service, input_file, output_file):
     """Portföy dosyasını işler ve SMI değerlerini ekler"""
     print(f"\n{'-'*50}")
     print(f"İŞLENİYOR: {input_file} -> {output_file}")
@@ -134,7 +41,7 @@ def process_portfolio_file(ib, input_file, output_file):
     
     try:
         # Dosyayı yükle
-        df = pd.read_csv(input_file)
+        df = read_table(input_file)
         print(f"Dosya başarıyla yüklendi: {len(df)} hisse")
         
         # Benzersiz sembolleri al
@@ -144,37 +51,13 @@ def process_portfolio_file(ib, input_file, output_file):
             print(f"HATA: {input_file} dosyasında 'PREF IBKR' kolonu bulunamadı!")
             return
         
-        # SMI kolonu ekle
-        df["SMI"] = np.nan
-        
         print(f"Fee rate bilgileri alınıyor ({len(symbols)} hisse)...")
         
-        # API limit aşımını önlemek için batch işlem
-        batch_size = 30  # Bir seferde işlenecek hisse sayısı
-        delay_seconds = 10  # Her batch sonrası beklenecek süre
+        # Önbellekte olmayanlar eşzamanlı çekilir; pacing FeeRateService'te
+        fee_rates = service.get_rates(symbols)
         
-        for i, symbol in enumerate(symbols):
-            # Batch işlem kontrolü
-            if i > 0 and i % batch_size == 0:
-                print(f"\nAPI limit aşımını önlemek için {delay_seconds} saniye bekleniyor (Batch: {i//batch_size})...")
-                time.sleep(delay_seconds)
-            
-            print(f"[{i+1}/{len(symbols)}] {symbol} işleniyor... ", end="", flush=True)
-            fee_rate = get_fee_rate(ib, symbol)
-            
-            # Sadece o sembolün satırlarını güncelle
-            df.loc[df["PREF IBKR"] == symbol, "SMI"] = fee_rate
-            
-            # Sonucu yazdır
-            if np.isnan(fee_rate):
-                print("❌ Alınamadı")
-            else:
-                print(f"✅ {fee_rate:.2f}%")
-            
-            # API limit aşımı olmaması için her 5 hissede bir kısa bekleme
-            if i % 5 == 0 and i > 0 and i % batch_size != 0:
-                print(f"API limit aşımını önlemek için 3 saniye bekleniyor...")
-                time.sleep(3)
+        # SMI kolonu ekle
+        df["SMI"] = df["PREF IBKR"].map(fee_rates).astype(float)
         
         # NaN değerlerini işle
         missing_fee_rate = df["SMI"].isna().sum()
@@ -224,7 +107,7 @@ def process_portfolio_file(ib, input_file, output_file):
         df.drop(columns=["Short_Score"], inplace=True)
         
         # Dosyayı kaydet
-        df.to_csv(output_file, index=False)
+        write_table(df, output_file, index=False)
         print(f"\nSonuçlar '{output_file}' dosyasına kaydedildi.")
         
         return df
@@ -247,7 +130,7 @@ def create_final_short_portfolio(input_file, output_file, max_stocks=40):
     
     try:
         # Dosyayı yükle
-        df = pd.read_csv(input_file)
+        df = read_table(input_file)
         print(f"Dosya başarıyla yüklendi: {len(df)} hisse")
         
         # 1. SMI değeri 0.28'den küçük olan hisseleri filtrele
@@ -277,7 +160,7 @@ def create_final_short_portfolio(input_file, output_file, max_stocks=40):
         print(final_df[["PREF IBKR", "FINAL_THG", "SMI", "SHORT_FINAL"]].head(10).to_string(index=False))
         
         # Dosyayı kaydet
-        final_df.to_csv(output_file, index=False)
+        write_table(final_df, output_file, index=False)
         print(f"Final short portföy '{output_file}' dosyasına kaydedildi.")
         
         return final_df
@@ -302,8 +185,8 @@ def main():
             print(f"HATA: {file_info['input']} dosyası bulunamadı!")
             sys.exit(1)
     
-    # IBKR'ye bağlan
-    ib = connect_to_ibkr()
+    # IBKR'ye sadece önbellekte olmayan sembol varsa bağlanılır
+    service = FeeRateService(connect=connect_to_ibkr)
     
     # Tüm dosyaları işle
     results = {}
@@ -311,14 +194,14 @@ def main():
         for file_info in input_files:
             # 1. Fee rate bilgilerini çek
             results[file_info["input"]] = process_portfolio_file(
-                ib=ib,
+                service=service,
                 input_file=file_info["input"],
                 output_file=file_info["output"]
             )
         
         # IBKR bağlantısını kapat
-        if ib.isConnected():
-            ib.disconnect()
+        if service.ib and service.ib.isConnected():
+            service.ib.disconnect()
             print("\nIBKR bağlantısı kapatıldı")
         
         # 2. Final short portföyleri oluştur
@@ -334,8 +217,8 @@ def main():
     except Exception as e:
         print(f"HATA: İşlem sırasında bir sorun oluştu: {e}")
         # IBKR bağlantısını kapat (hata durumunda bile)
-        if ib and ib.isConnected():
-            ib.disconnect()
+        if service.ib and service.ib.isConnected():
+            service.ib.disconnect()
             print("\nIBKR bağlantısı kapatıldı")
     
     print("\nTüm işlemler tamamlandı!")
@@ -1,6 +1,8 @@
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
 import jwt
-from cryptography.hazmat.primitives import serialization
+from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 import time
 import json
@@ -15,15 +17,38 @@ _jwks_cache = {
 }
 _JWKS_CACHE_TTL_SECONDS = 3600  # Cache JWKS for 1 hour
 
-def get_jwks():
+# Parsed public keys by kid, so the x5c certificate is only parsed once per JWKS fetch
+_signing_key_cache = {}
+
+# Verified claims by token: token -> (claims, valid_until). Entries expire
+# _CLAIMS_EXPIRY_MARGIN_SECONDS before the token's exp so a cached "valid"
+# never outlives the token itself.
+_claims_cache = {}
+_CLAIMS_EXPIRY_MARGIN_SECONDS = 30
+_CLAIMS_CACHE_MAX_ENTRIES = 64
+
+# Pooled keep-alive HTTP session shared by JWKS and token requests; the
+# adapter's connection pool is thread-safe, so concurrent requests each take
+# their own pooled connection
+_http_session = requests.Session()
+_http_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+def _load_x5c_public_key(x5c_entry):
+    """Parses the first x5c certificate of a JWK into a public key object."""
+    cert_str = f"-----BEGIN CERTIFICATE-----\n{x5c_entry}\n-----END CERTIFICATE-----"
+    cert = x509.load_pem_x509_certificate(cert_str.encode(), backend=default_backend())
+    return cert.public_key()
+
+def get_jwks(force_refresh=False):
     """Fetches JWKS from Alaric Auth server and caches them."""
     current_time = time.time()
-    if current_time - _jwks_cache["last_fetched_time"] > _JWKS_CACHE_TTL_SECONDS or not _jwks_cache["keys"]:
+    if force_refresh or current_time - _jwks_cache["last_fetched_time"] > _JWKS_CACHE_TTL_SECONDS or not _jwks_cache["keys"]:
         try:
-            response = requests.get(settings.ALARIC_JWKS_URL, timeout=10)
+            response = _http_session.get(settings.ALARIC_JWKS_URL, timeout=10)
             response.raise_for_status() # Raise an exception for HTTP errors
             _jwks_cache["keys"] = response.json().get("keys", [])
             _jwks_cache["last_fetched_time"] = current_time
+            _signing_key_cache.clear() # Keys may have rotated
             # print(f"Successfully fetched JWKS: {_jwks_cache['keys']}") # For debugging
         except requests.exceptions.RequestException as e:
             print(f"Error fetching JWKS: {e}")
@@ -49,15 +74,19 @@ def get_signing_key(token_header):
         print("Token header does not contain 'kid'.")
         return None
 
+    cached_key = _signing_key_cache.get(kid)
+    if cached_key is not None:
+        return cached_key
+
     for key_info in jwks:
         if key_info.get("kid") == kid:
             # print(f"Found matching key for kid '{kid}': {key_info}") # For debugging
             # Check for x5c, as mentioned in Alaric docs
             if "x5c" in key_info and key_info["x5c"]:
                 # The first certificate in the x5c array is the one to use.
-                cert_str = f"-----BEGIN CERTIFICATE-----\n{key_info['x5c'][0]}\n-----END CERTIFICATE-----"
                 try:
-                    cert_obj = serialization.load_pem_public_key(cert_str.encode(), backend=default_backend())
+                    cert_obj = _load_x5c_public_key(key_info["x5c"][0])
+                    _signing_key_cache[kid] = cert_obj
                     return cert_obj
                 except Exception as e:
                     print(f"Error loading PEM public key from x5c: {e}")
@@ -71,15 +100,51 @@ def get_signing_key(token_header):
     print(f"No matching signing key found for kid '{kid}' in JWKS.")
     return None
 
+def get_cached_claims(access_token):
+    """Returns the verified claims for a token if they are cached and not near expiry."""
+    entry = _claims_cache.get(access_token)
+    if entry is None:
+        return None
+    claims, valid_until = entry
+    if time.time() >= valid_until:
+        _claims_cache.pop(access_token, None)
+        return None
+    return claims
+
+def _cache_claims(access_token, payload):
+    if len(_claims_cache) >= _CLAIMS_CACHE_MAX_ENTRIES:
+        now = time.time()
+        for token in [t for t, (_, until) in _claims_cache.items() if until <= now] or list(_claims_cache)[:1]:
+            _claims_cache.pop(token, None)
+    exp = payload.get("exp")
+    if exp is not None:
+        _claims_cache[access_token] = (payload, float(exp) - _CLAIMS_EXPIRY_MARGIN_SECONDS)
+
+def token_seconds_remaining(access_token):
+    """Seconds until the token's exp claim (from verified claims when cached), or None."""
+    claims = get_cached_claims(access_token)
+    if claims is None:
+        try:
+            claims = jwt.decode(access_token, options={"verify_signature": False})
+        except jwt.DecodeError:
+            return None
+    exp = claims.get("exp")
+    return None if exp is None else float(exp) - time.time()
+
 def validate_alaric_token(access_token):
     """
     Validates the Alaric JWT access token offline using JWKS.
     Checks signature, expiration, issuer, and audience.
+    Verified claims are cached until shortly before exp, so repeated checks
+    of the same token cost a dict lookup instead of an RSA verification.
     """
     if not access_token:
         print("Access token is missing.")
         return False
 
+    if get_cached_claims(access_token) is not None:
+        return True
+
     public_key = get_signing_key(access_token)
     if not public_key:
         print("Could not retrieve public key for validation.")
@@ -103,6 +168,7 @@ def validate_alaric_token(access_token):
             audience=settings.ALARIC_TOKEN_AUDIENCE # Can be a list or a string
         )
         # print(f"Token validated successfully. Payload: {payload}") # For debugging
+        _cache_claims(access_token, payload)
         return True # Token is valid
     except jwt.ExpiredSignatureError:
         print("Token has expired.")
@@ -161,7 +227,7 @@ def get_alaric_access_token(client_id=None, client_secret=None, username=None, p
     try:
         # print(f"Requesting token from {settings.ALARIC_TOKEN_URL} with grant_type: {grant_type}") # For debugging
         # print(f"Request data: {data}") # For debugging
-        response = requests.post(settings.ALARIC_TOKEN_URL, data=data, headers=headers, timeout=15)
+        response = _http_session.post(settings.ALARIC_TOKEN_URL, data=data, headers=headers, timeout=15)
         response.raise_for_status()  # Raises an exception for 4XX/5XX errors
         
         token_data = response.json()
@@ -192,6 +258,83 @@ def get_alaric_access_token(client_id=None, client_secret=None, username=None, p
     
     return None
 
+class TokenRefresher:
+    """
+    Keeps an Alaric access token fresh in the background.
+    The token is re-fetched `margin_seconds` before exp (and JWKS re-fetched
+    before its TTL) on a worker thread, so connects and reconnects find a
+    validated token and parsed keys already cached. Tokens without a readable
+    exp are refreshed every `unknown_expiry_seconds`, and refreshes are never
+    closer together than `retry_seconds`, even for tokens that live shorter
+    than the margin.
+    """
+
+    def __init__(self, token=None, margin_seconds=120, retry_seconds=15, unknown_expiry_seconds=900,
+                 **token_kwargs):
+        self.token = token
+        self.margin_seconds = margin_seconds
+        self.retry_seconds = retry_seconds
+        self.unknown_expiry_seconds = unknown_expiry_seconds
+        self.token_kwargs = token_kwargs or {
+            "client_id": settings.ALARIC_CLIENT_ID,
+            "client_secret": settings.ALARIC_CLIENT_SECRET
+        }
+        self._task = None
+
+    async def ensure_token(self):
+        """Returns a valid token, fetching one now only if none is usable."""
+        if self.token and validate_alaric_token(self.token):
+            return self.token
+        return await self.refresh()
+
+    async def refresh(self):
+        token = await asyncio.to_thread(get_alaric_access_token, **self.token_kwargs)
+        if token:
+            self.token = token
+        return token
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _token_due(self):
+        """Seconds until the next token refresh"""
+        if not self.token:
+            return 0
+        remaining = token_seconds_remaining(self.token)
+        if remaining is None:
+            # Opaque token or no exp claim: refresh on a fixed interval
+            return self.unknown_expiry_seconds
+        if remaining > self.margin_seconds:
+            return remaining - self.margin_seconds
+        # Short-lived tokens (lifetime <= margin) are refreshed halfway, never faster than retry_seconds
+        return max(self.retry_seconds, remaining / 2)
+
+    async def _run(self):
+        while True:
+            jwks_age = time.time() - _jwks_cache["last_fetched_time"]
+            jwks_due = _JWKS_CACHE_TTL_SECONDS - self.margin_seconds - jwks_age
+            token_due = self._token_due()
+            await asyncio.sleep(max(0, min(token_due, jwks_due)))
+            if jwks_due <= token_due:
+                fetched_before = _jwks_cache["last_fetched_time"]
+                await asyncio.to_thread(get_jwks, True)
+                if _jwks_cache["last_fetched_time"] == fetched_before:
+                    await asyncio.sleep(self.retry_seconds)
+                continue
+            if not await self.refresh():
+                print(f"Background token refresh failed, retrying in {self.retry_seconds}s.")
+                await asyncio.sleep(self.retry_seconds)
+
 # Example usage (for testing this module directly):
 if __name__ == "__main__":
     print("Attempting to get Alaric access token...")
@@ -1,30 +1,35 @@
 import asyncio
 import websockets
-import json
 import ssl
 
 from hammerib.config import settings
-from hammerib.alaric_api.alaric_auth import get_alaric_access_token, validate_alaric_token
+from hammerib.alaric_api.alaric_auth import TokenRefresher, validate_alaric_token
+from hammerib.alaric_api.router import MessageRouter
+from hammerib.alaric_api import codec
 
 class AlaricWebsocketClient:
     def __init__(self, ws_url=None, token=None):
         self.ws_url = ws_url or settings.ALARIC_WEBSOCKET_URL
         self.token = token
+        self.token_refresher = TokenRefresher(token) # Refreshes the token and JWKS before they expire
         self.websocket = None
         self.is_connected = False
         self.message_handler_callback = None # Callback for handling incoming messages
+        self.router = MessageRouter(settings.ALARIC_ROUTER_QUEUE_SIZE, name="alaric",
+                                    shed_types=settings.ALARIC_ROUTER_SHED_TYPES)
+        self.router.set_fallback(self._default_handler)
 
     async def _ensure_token(self):
         """Ensures a valid token is available, fetching a new one if necessary."""
+        # Pick up a token the background refresher obtained since the last connect
+        if self.token_refresher.token and self.token_refresher.token != self.token:
+            self.token = self.token_refresher.token
+        # validate_alaric_token answers from the verified-claims cache for a known token
         if not self.token or not validate_alaric_token(self.token):
             print("No valid token found. Attempting to fetch a new one...")
             # This assumes client_credentials grant for simplicity here.
             # You might need to adjust based on your actual auth flow.
-            self.token = await asyncio.to_thread(
-                get_alaric_access_token, 
-                client_id=settings.ALARIC_CLIENT_ID, 
-                client_secret=settings.ALARIC_CLIENT_SECRET
-            )
+            self.token = await self.token_refresher.refresh()
             if not self.token:
                 print("Failed to obtain a new access token. Cannot connect.")
                 return False
@@ -64,7 +69,9 @@ class AlaricWebsocketClient:
             )
             self.is_connected = True
             print("Successfully connected to Alaric WebSocket API.")
-            # Start a task to listen for messages
+            self.token_refresher.start()
+            # Start the dispatcher and a task to listen for messages
+            self.router.start()
             asyncio.create_task(self._listen())
         except websockets.exceptions.InvalidStatusCode as e:
             print(f"Connection failed: Invalid status code {e.status_code}. Response headers: {e.headers}")
@@ -94,14 +101,8 @@ class AlaricWebsocketClient:
         try:
             async for message in self.websocket:
                 # print(f"Received raw message: {message}") # For debugging
-                try:
-                    data = json.loads(message)
-                    if self.message_handler_callback:
-                        await self.message_handler_callback(data)
-                    else:
-                        print(f"Received data: {data}") # Default handler
-                except json.JSONDecodeError:
-                    print(f"Received non-JSON message: {message}")
+                # Decoding and handlers run on the router's task so reads never wait on them
+                self.router.feed(message)
         except websockets.exceptions.ConnectionClosedError as e:
             print(f"Connection closed by server (error): {e.code} {e.reason}")
             self.is_connected = False
@@ -121,7 +122,7 @@ class AlaricWebsocketClient:
             return False
         
         try:
-            json_message = json.dumps(message_dict)
+            json_message = codec.dumps(message_dict)
             # print(f"Sending message: {json_message}") # For debugging
             await self.websocket.send(json_message)
             return True
@@ -135,6 +136,7 @@ class AlaricWebsocketClient:
 
     async def close(self):
         """Closes the WebSocket connection."""
+        await self.token_refresher.stop()
         if self.websocket and self.is_connected:
             print("Closing WebSocket connection...")
             try:
@@ -144,6 +146,7 @@ class AlaricWebsocketClient:
             finally:
                 self.websocket = None
                 self.is_connected = False
+                await self.router.stop()
                 print("WebSocket connection closed.")
         elif not self.is_connected:
             pass # Already closed or was never open
@@ -152,9 +155,21 @@ class AlaricWebsocketClient:
             
     def set_message_handler(self, callback):
         """Sets a callback function to handle incoming messages.
-        The callback should be an async function that accepts one argument (the message data).
+        The callback may be a sync or async function that accepts one argument (the message data).
         """
+        if self.message_handler_callback:
+            self.router.unregister("*", self.message_handler_callback)
         self.message_handler_callback = callback
+        if callback:
+            self.router.register("*", callback)
+
+    def register_handler(self, message_type, handler):
+        """Registers a sync or async handler for a single messageType."""
+        self.router.register(message_type, handler)
+
+    def _default_handler(self, data):
+        if not self.message_handler_callback:
+            print(f"Received data: {data}") # Default handler
 
 # Example Usage (for testing this module directly)
 async def default_message_processor(message):
@@ -1,15 +1,51 @@
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional
 import logging
 
 class BalanceManager:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.balances: Dict[str, Dict] = {}
+        self.callbacks: Dict[str, List[Callable]] = {}
 
-    def update_balances(self, balances_data: Dict):
-        """Update balances from API response"""
-        self.balances = balances_data
-        self.logger.info(f"Balances updated: {self.balances}")
+    def register_callback(self, event_type: str, callback: Callable):
+        """Register callback(currency, balance, old_balance) for 'balance_changed'; balance is None when removed"""
+        self.callbacks.setdefault(event_type, []).append(callback)
+
+    def _emit(self, currency: str, balance: Optional[Dict], old: Optional[Dict]):
+        for callback in self.callbacks.get("balance_changed", ()):
+            try:
+                callback(currency, balance, old)
+            except Exception as e:
+                self.logger.error(f"Balance callback failed: {str(e)}")
+
+    def update_balances(self, balances_data: Dict, snapshot: bool = False):
+        """Apply balance updates from API response.
+
+        Pushed deltas are merged per currency. A snapshot (the getbalances
+        response) replaces the state: every currency takes exactly the
+        snapshot's fields and currencies missing from it are removed.
+        """
+        changed = 0
+        for currency, update in balances_data.items():
+            old = self.balances.get(currency)
+            if snapshot:
+                balance = dict(update)
+                if balance == old:
+                    continue
+            else:
+                if old is not None and all(old.get(k) == v for k, v in update.items()):
+                    continue
+                balance = dict(old or {})
+                balance.update(update)
+            self.balances[currency] = balance
+            changed += 1
+            self._emit(currency, balance, old)
+        if snapshot:
+            for currency in [c for c in self.balances if c not in balances_data]:
+                changed += 1
+                self._emit(currency, None, self.balances.pop(currency))
+        if changed and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Balances updated: %d currencies changed", changed)
 
     def get_balance(self, currency: str = "USD") -> Optional[Dict]:
         """Get balance for specific currency"""
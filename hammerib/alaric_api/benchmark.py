@@ -0,0 +1,87 @@
+"""
+Order-path benchmark: HammerClient against the local MockHammerServer.
+
+    python -m hammerib.alaric_api.benchmark --orders 5000 --concurrency 64 --ack-latency-ms 2
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict
+
+from hammerib.utils.latency import LatencyHistogram
+from .client import HammerClient
+from .mock_server import MockHammerServer
+
+async def run_benchmark(orders: int = 2000, concurrency: int = 32, ack_latency: float = 0.0,
+                        ack_jitter: float = 0.0, fill_probability: float = 0.0,
+                        reject_rate: float = 0.0, timeout: float = 10.0) -> Dict:
+    """Send `orders` neworders with at most `concurrency` in flight; return throughput and ack latency stats"""
+    histogram = LatencyHistogram()
+    outcomes = {"acked": 0, "rejected": 0, "failed": 0}
+    async with MockHammerServer(ack_latency=ack_latency, ack_jitter=ack_jitter,
+                                fill_probability=fill_probability, reject_rate=reject_rate) as server:
+        client = HammerClient(server.url, "bench_key", "bench_secret", "BENCH")
+        await client.connect()
+        window = asyncio.Semaphore(concurrency)
+        symbols = [f"SYM{i % 50}" for i in range(orders)]
+
+        async def one(symbol: str):
+            async with window:
+                started = time.perf_counter_ns()
+                try:
+                    _, ack = await client.submit_order(symbol, "Buy", 200, "Limit", price=25.0, timeout=timeout)
+                    response = await ack
+                except Exception:
+                    outcomes["failed"] += 1
+                    return
+                histogram.record((time.perf_counter_ns() - started) // 1000)
+                outcomes["acked" if response.get("success", True) else "rejected"] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(s) for s in symbols))
+        elapsed = time.perf_counter() - started
+        connection_stats = client.get_connection_stats()
+        await client.close()
+        server_stats = dict(server.stats)
+
+    summary = histogram.summary()
+    return {
+        "orders": orders,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "orders_per_s": round(orders / elapsed, 1) if elapsed else None,
+        "ack_p50_us": summary["p50_us"],
+        "ack_p99_us": summary["p99_us"],
+        "ack_max_us": summary["max_us"],
+        **outcomes,
+        "server": server_stats,
+        "router": connection_stats["router"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Hammer order path against the local mock server")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--ack-latency-ms", type=float, default=0.0)
+    parser.add_argument("--ack-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--fill-probability", type=float, default=0.0)
+    parser.add_argument("--reject-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    result = asyncio.run(run_benchmark(
+        orders=args.orders,
+        concurrency=args.concurrency,
+        ack_latency=args.ack_latency_ms / 1000,
+        ack_jitter=args.ack_jitter_ms / 1000,
+        fill_probability=args.fill_probability,
+        reject_rate=args.reject_rate,
+    ))
+    print(f"{result['orders']} orders, concurrency {result['concurrency']}: "
+          f"{result['orders_per_s']} orders/s, ack p50 {result['ack_p50_us']}us, "
+          f"p99 {result['ack_p99_us']}us, max {result['ack_max_us']}us")
+    print(f"acked={result['acked']} rejected={result['rejected']} failed={result['failed']} "
+          f"fills={result['server']['fills']} router_high_water={result['router']['high_water']}")
+
+if __name__ == "__main__":
+    main()
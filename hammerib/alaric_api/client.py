@@ -1,13 +1,22 @@
 import asyncio
 import json
 import logging
-from typing import Dict, Optional, Callable, List
-from datetime import datetime
+from typing import Dict, Optional, Callable, List, Tuple
 
 from .websocket import WebSocketClient
+from .correlation import RequestIdGenerator
 from .positions import PositionManager
 from .orders import OrderManager
 from .balances import BalanceManager
+from hammerib.utils.latency import latency_probe
+
+def _consume_result(future: asyncio.Future):
+    """Retrieve a fire-and-forget future's outcome so unawaited timeouts are not reported as errors"""
+    if not future.cancelled():
+        future.exception()
+
+# Snapshot requests sent after every (re)connect to reconcile local state
+RECONCILE_REQUESTS = ("getpositions", "getorders", "getbalances")
 
 class HammerClient:
     def __init__(self, base_url: str, api_key: str, api_secret: str, account: str):
@@ -18,9 +27,10 @@ class HammerClient:
         self.account = account
         
         # Initialize managers
+        self.ids = RequestIdGenerator()
         self.websocket = WebSocketClient(base_url)
         self.positions = PositionManager()
-        self.orders = OrderManager()
+        self.orders = OrderManager(self.ids)
         self.balances = BalanceManager()
         
         # Register message handlers
@@ -28,21 +38,92 @@ class HammerClient:
         self.websocket.register_callback("balances", self._handle_balances)
         self.websocket.register_callback("orders", self._handle_orders)
 
+        # Subscription requests replayed after every reconnect, keyed by subscribe() key
+        self.subscriptions: Dict[str, Dict] = {}
+        self.websocket.add_resume_hook(self._resume_session)
+
+        # Frames shed under backpressure may hide state changes; re-snapshot after any drop
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._reconcile_requested = False
+        self.websocket.router.on_drop = self._on_router_drop
+
     async def connect(self):
-        """Connect to Hammer API"""
+        """Connect to Hammer API; login, subscription replay and reconciliation run on every (re)connect"""
         await self.websocket.connect()
+
+    async def _resume_session(self):
+        """Re-authenticate, replay subscriptions and reconcile state on a fresh session"""
         await self._authenticate()
+        await self._replay_subscriptions()
+        await self._reconcile()
 
     async def _authenticate(self):
         """Authenticate with Hammer API"""
         auth_message = {
             "messageType": "login",
-            "reqId": str(int(datetime.now().timestamp())),
+            "reqId": self.ids.next_req_id(),
             "apiKey": self.api_key,
             "apiSecret": self.api_secret,
             "account": self.account
         }
-        await self.websocket.send_message(auth_message)
+        ack = await self.send_request(auth_message)
+        await ack
+
+    async def subscribe(self, message: Dict, key: Optional[str] = None) -> asyncio.Future:
+        """Send a subscription request and remember it for replay after reconnects"""
+        key = key or f"{message.get('messageType')}:{message.get('symbol', '')}"
+        template = {k: v for k, v in message.items() if k != "reqId"}
+        self.subscriptions[key] = template
+        return await self.send_request(dict(template))
+
+    def unsubscribe(self, key: str):
+        """Stop replaying a subscription (send the matching unsubscribe message separately)"""
+        self.subscriptions.pop(key, None)
+
+    async def _replay_subscriptions(self):
+        if not self.subscriptions:
+            return
+        acks = [await self.send_request(dict(template)) for template in self.subscriptions.values()]
+        results = await asyncio.gather(*acks, return_exceptions=True)
+        for key, result in zip(self.subscriptions, results):
+            if isinstance(result, Exception):
+                self.logger.warning(f"Subscription {key} not confirmed after resume: {str(result)}")
+        self.logger.info(f"Replayed {len(self.subscriptions)} subscriptions")
+
+    async def _reconcile(self):
+        """Request position/order/balance snapshots and apply them"""
+        acks = [await self.send_request({"messageType": message_type, "account": self.account})
+                for message_type in RECONCILE_REQUESTS]
+        results = await asyncio.gather(*acks, return_exceptions=True)
+        for message_type, result in zip(RECONCILE_REQUESTS, results):
+            if isinstance(result, Exception):
+                self.logger.warning(f"Reconcile request {message_type} failed: {str(result)}")
+                continue
+            # Responses typed as positions/orders/balances were already applied by their callbacks
+            if result.get("messageType") in self.websocket.callbacks:
+                continue
+            if "positions" in result:
+                self._handle_positions(result)
+            if "orders" in result:
+                self._handle_orders(result)
+            if "balances" in result:
+                self._handle_balances(result)
+
+    def _on_router_drop(self):
+        """Schedule a reconcile after the router shed a frame (one at a time, rerun if more drops arrive)"""
+        self._reconcile_requested = True
+        if self._reconcile_task is None or self._reconcile_task.done():
+            self._reconcile_task = asyncio.get_running_loop().create_task(self._reconcile_after_drop())
+
+    async def _reconcile_after_drop(self):
+        while self._reconcile_requested:
+            self._reconcile_requested = False
+            if not self.websocket.session.is_ready:
+                return  # The resume hooks reconcile on the next session anyway
+            try:
+                await self._reconcile()
+            except Exception as e:
+                self.logger.warning(f"Reconcile after router drop failed: {str(e)}")
 
     def _handle_positions(self, message: Dict):
         """Handle positions update"""
@@ -50,29 +131,89 @@ class HammerClient:
         self.positions.update_positions(positions_data)
 
     def _handle_balances(self, message: Dict):
-        """Handle balances update"""
+        """Handle balances update; a getbalances response (it carries the reqId) is a full snapshot"""
         balances_data = message.get("balances", {})
-        self.balances.update_balances(balances_data)
+        self.balances.update_balances(balances_data, snapshot="reqId" in message)
 
     def _handle_orders(self, message: Dict):
         """Handle orders update"""
         orders_data = message.get("orders", [])
+        for order in orders_data:
+            key = ("hammer", order.get("clOrdId"))
+            if latency_probe.get_mark(key, "send") is not None:
+                latency_probe.mark(key, "ack")
+                latency_probe.discard(key)
         self.orders.update_orders(orders_data)
 
-    async def place_order(self, symbol: str, side: str, quantity: int, 
-                         order_type: str, price: Optional[float] = None,
-                         stop_price: Optional[float] = None) -> str:
-        """Place a new order"""
+    async def send_request(self, message: Dict, timeout: Optional[float] = None) -> asyncio.Future:
+        """Send a request and return a future resolved by the response carrying its reqId.
+
+        The response is not awaited here, so many requests can be in flight at once.
+        """
+        req_id = message.setdefault("reqId", self.ids.next_req_id())
+        future = self.websocket.pending.register(req_id, timeout)
+        try:
+            await self.websocket.send_message(message)
+        except Exception as e:
+            self.websocket.pending.cancel(req_id, e)
+            raise
+        return future
+
+    async def submit_order(self, symbol: str, side: str, quantity: int,
+                           order_type: str, price: Optional[float] = None,
+                           stop_price: Optional[float] = None,
+                           timeout: Optional[float] = None,
+                           cl_ord_id: Optional[str] = None) -> Tuple[str, asyncio.Future]:
+        """Send a new order and return (clOrdId, ack future) without waiting for the ack"""
         order_data = self.orders.create_order_request(
-            symbol, side, quantity, order_type, price, stop_price
+            symbol, side, quantity, order_type, price, stop_price, cl_ord_id
         )
-        await self.websocket.send_message(order_data)
-        return order_data["clOrdId"]
+        latency_probe.mark(symbol, "order")
+        ack = await self.send_request(order_data, timeout)
+        latency_probe.mark(symbol, "send")
+        latency_probe.transfer(symbol, ("hammer", order_data["clOrdId"]))
+        return order_data["clOrdId"], ack
 
-    async def cancel_order(self, cl_ord_id: str):
+    async def place_order(self, symbol: str, side: str, quantity: int, 
+                         order_type: str, price: Optional[float] = None,
+                         stop_price: Optional[float] = None,
+                         wait_ack: bool = False, timeout: Optional[float] = None,
+                         cl_ord_id: Optional[str] = None) -> str:
+        """Place a new order; with wait_ack=True also wait for its response"""
+        cl_ord_id, ack = await self.submit_order(
+            symbol, side, quantity, order_type, price, stop_price, timeout, cl_ord_id
+        )
+        if wait_ack:
+            await ack
+        else:
+            ack.add_done_callback(_consume_result)
+        return cl_ord_id
+
+    async def place_orders(self, orders: List[Dict], timeout: Optional[float] = None) -> List:
+        """Pipeline a burst of orders over the socket and await all acks independently.
+
+        Each item holds place_order keyword arguments. Returns, per order, the ack
+        message or the exception (e.g. RequestTimeoutError) that ended it.
+        """
+        acks = []
+        for order in orders:
+            try:
+                _, ack = await self.submit_order(timeout=timeout, **order)
+            except Exception as e:
+                self.logger.error(f"Failed to send order {order}: {str(e)}")
+                ack = asyncio.get_running_loop().create_future()
+                ack.set_exception(e)
+            acks.append(ack)
+        return await asyncio.gather(*acks, return_exceptions=True)
+
+    async def cancel_order(self, cl_ord_id: str, wait_ack: bool = False,
+                           timeout: Optional[float] = None):
         """Cancel an existing order"""
         cancel_data = self.orders.create_cancel_request(cl_ord_id)
-        await self.websocket.send_message(cancel_data)
+        ack = await self.send_request(cancel_data, timeout)
+        if wait_ack:
+            return await ack
+        ack.add_done_callback(_consume_result)
 
     def get_position(self, symbol: str) -> Optional[Dict]:
         """Get current position for a symbol"""
@@ -90,13 +231,17 @@ class HammerClient:
         """Get all account balances"""
         return self.balances.get_all_balances()
 
-    def get_open_orders(self) -> Dict:
-        """Get all open orders"""
-        return self.orders.get_open_orders()
+    def get_open_orders(self, symbol: Optional[str] = None) -> Dict:
+        """Get all open orders, optionally for one symbol"""
+        return self.orders.get_open_orders(symbol)
+
+    def get_filled_orders(self, symbol: Optional[str] = None) -> Dict:
+        """Get all filled orders, optionally for one symbol"""
+        return self.orders.get_filled_orders(symbol)
 
-    def get_filled_orders(self) -> Dict:
-        """Get all filled orders"""
-        return self.orders.get_filled_orders()
+    def get_connection_stats(self) -> Dict:
+        """Session (reconnects, recovery times) and router statistics"""
+        return self.websocket.get_stats()
 
     async def close(self):
         """Close the connection"""
@@ -0,0 +1,36 @@
+import json
+from typing import Any, Union
+
+# Use the fastest JSON library available, falling back to the stdlib
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+if _orjson is not None:
+    CODEC_NAME = "orjson"
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Decode a JSON frame (str or bytes)"""
+        return _orjson.loads(data)
+
+    def dumps(obj: Any) -> str:
+        """Encode an object as a JSON text frame"""
+        return _orjson.dumps(obj).decode()
+else:
+    CODEC_NAME = "json"
+    _encoder = json.JSONEncoder(separators=(",", ":"))
+    _decoder = json.JSONDecoder()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Decode a JSON frame (str or bytes)"""
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode()
+        return _decoder.decode(data)
+
+    def dumps(obj: Any) -> str:
+        """Encode an object as a JSON text frame"""
+        return _encoder.encode(obj)
+
+# Both orjson.JSONDecodeError and json.JSONDecodeError derive from ValueError
+DecodeError = ValueError
@@ -0,0 +1,114 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+class RequestIdGenerator:
+    """Monotonic, collision-free reqId/clOrdId source.
+
+    Ids are `<session>-<n>`: the session part is the process start time in
+    milliseconds (base 36), `n` a per-process counter, so ids never repeat
+    within a process and do not collide with a previous run.
+    """
+
+    def __init__(self, session: Optional[str] = None):
+        self.session = session or self._base36(time.time_ns() // 1_000_000)
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _base36(value: int) -> str:
+        digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+        out = ""
+        while value:
+            value, rem = divmod(value, 36)
+            out = digits[rem] + out
+        return out or "0"
+
+    def _next(self) -> int:
+        with self._lock:
+            return next(self._counter)
+
+    def next_req_id(self) -> str:
+        """Get a new request id"""
+        return f"{self.session}-{self._next()}"
+
+    def next_cl_ord_id(self) -> str:
+        """Get a new client order id"""
+        return f"order_{self.session}-{self._next()}"
+
+
+class RequestTimeoutError(asyncio.TimeoutError):
+    """Raised on a pending request's future when no response arrives in time"""
+
+    def __init__(self, req_id: str, timeout: float):
+        super().__init__(f"No response for reqId {req_id} within {timeout}s")
+        self.req_id = req_id
+        self.timeout = timeout
+
+
+class RequestCorrelator:
+    """Maps outstanding reqIds to futures resolved by the matching response.
+
+    Any number of requests may be in flight over one socket; each gets its
+    own timeout timer, so a lost response only fails its own future.
+    """
+
+    def __init__(self, default_timeout: float = 10.0):
+        self.logger = logging.getLogger(__name__)
+        self.default_timeout = default_timeout
+        self._pending: Dict[str, Tuple[asyncio.Future, Optional[asyncio.TimerHandle]]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def register(self, req_id: str, timeout: Optional[float] = None) -> asyncio.Future:
+        """Create the future for `req_id`; must be called before the request is sent"""
+        if req_id in self._pending:
+            raise ValueError(f"reqId {req_id} is already in flight")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        timeout = self.default_timeout if timeout is None else timeout
+        handle = loop.call_later(timeout, self._expire, req_id, timeout) if timeout else None
+        self._pending[req_id] = (future, handle)
+        return future
+
+    def _expire(self, req_id: str, timeout: float):
+        entry = self._pending.pop(req_id, None)
+        if entry and not entry[0].done():
+            self.logger.warning(f"Request {req_id} timed out after {timeout}s")
+            entry[0].set_exception(RequestTimeoutError(req_id, timeout))
+
+    def resolve(self, message: Dict) -> bool:
+        """Resolve the future waiting on `message['reqId']`; returns False if none is pending"""
+        req_id = message.get("reqId")
+        if req_id is None:
+            return False
+        entry = self._pending.pop(str(req_id), None)
+        if entry is None:
+            return False
+        future, handle = entry
+        if handle:
+            handle.cancel()
+        if not future.done():
+            future.set_result(message)
+        return True
+
+    def cancel(self, req_id: str, exc: Optional[BaseException] = None):
+        """Fail a single pending request (e.g. its send failed)"""
+        entry = self._pending.pop(req_id, None)
+        if entry is None:
+            return
+        future, handle = entry
+        if handle:
+            handle.cancel()
+        if not future.done():
+            future.set_exception(exc or ConnectionError(f"Request {req_id} cancelled"))
+
+    def fail_all(self, exc: BaseException):
+        """Fail every pending request, e.g. when the connection drops"""
+        for req_id in list(self._pending):
+            self.cancel(req_id, exc)
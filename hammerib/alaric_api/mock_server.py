@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import random
+from typing import Dict, Optional, Set
+
+import websockets
+
+from . import codec
+
+class MockHammerServer:
+    """Local stand-in for the Hammer/Alaric trading WebSocket.
+
+    Speaks the message types used by HammerClient and AlaricWebsocketClient:
+    login, neworder, cancelorder, getbalances, getpositions and getorders.
+    Every request is answered with a response echoing its reqId after
+    `ack_latency` (+/- `ack_jitter`) seconds; order state changes are pushed
+    as `orders` updates and fills as `positions` updates. Fills and rejects
+    are simulated with `fill_probability`/`fill_delay` and
+    `reject_rate`/`reject_symbols`.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 ack_latency: float = 0.0, ack_jitter: float = 0.0,
+                 fill_probability: float = 0.0, fill_delay: float = 0.0,
+                 reject_rate: float = 0.0, reject_symbols: Optional[Set[str]] = None,
+                 seed: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.host = host
+        self.port = port
+        self.ack_latency = ack_latency
+        self.ack_jitter = ack_jitter
+        self.fill_probability = fill_probability
+        self.fill_delay = fill_delay
+        self.reject_rate = reject_rate
+        self.reject_symbols = set(reject_symbols or ())
+        self.random = random.Random(seed)
+        self.orders: Dict[str, Dict] = {}
+        self.positions: Dict[str, Dict] = {}
+        self.balances: Dict[str, Dict] = {
+            "USD": {"availableCash": 1_000_000.0, "buyingPower": 4_000_000.0, "marginUsed": 0.0, "equity": 1_000_000.0}
+        }
+        self.connections: Set = set()
+        self.stats = {"requests": 0, "acks": 0, "rejects": 0, "fills": 0, "heartbeats": 0}
+        self._server = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        """Start listening; with port=0 an ephemeral port is picked and stored on self.port"""
+        self._server = await websockets.serve(self._handle_connection, self.host, self.port)
+        self.port = next(iter(self._server.sockets)).getsockname()[1]
+        self.logger.info(f"Mock Hammer server listening on {self.url}")
+        return self
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def drop_connections(self):
+        """Close every client connection (to exercise reconnect/resume)"""
+        for ws in list(self.connections):
+            await ws.close()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle_connection(self, ws):
+        self.connections.add(ws)
+        try:
+            async for raw in ws:
+                try:
+                    message = codec.loads(raw)
+                except codec.DecodeError:
+                    continue
+                if message.get("type") == "heartbeat":
+                    self.stats["heartbeats"] += 1
+                    continue
+                self.stats["requests"] += 1
+                # Each request is answered on its own task so responses pipeline like a real gateway
+                self._spawn(self._respond(ws, message))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(ws)
+
+    def _delay(self) -> float:
+        if not self.ack_jitter:
+            return self.ack_latency
+        return max(0.0, self.ack_latency + self.random.uniform(-self.ack_jitter, self.ack_jitter))
+
+    async def _send(self, ws, message: Dict):
+        try:
+            await ws.send(codec.dumps(message))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _respond(self, ws, message: Dict):
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        message_type = message.get("messageType")
+        req_id = message.get("reqId")
+        if message_type == "neworder":
+            await self._new_order(ws, message)
+        elif message_type == "cancelorder":
+            await self._cancel_order(ws, message)
+        elif message_type == "getbalances":
+            await self._send(ws, {"messageType": "balances", "reqId": req_id, "balances": self.balances})
+        elif message_type == "getpositions":
+            positions = [{"symbol": s, **p} for s, p in self.positions.items()]
+            await self._send(ws, {"messageType": "positions", "reqId": req_id, "positions": positions})
+        elif message_type == "getorders":
+            await self._send(ws, {"messageType": "orders", "reqId": req_id, "orders": list(self.orders.values())})
+        else:
+            # login, subscriptions and anything else: plain success response
+            await self._send(ws, {"messageType": message_type, "reqId": req_id, "success": True})
+        self.stats["acks"] += 1
+
+    def _should_reject(self, symbol: str) -> bool:
+        return symbol in self.reject_symbols or (self.reject_rate and self.random.random() < self.reject_rate)
+
+    async def _new_order(self, ws, message: Dict):
+        cl_ord_id = message.get("clOrdId")
+        symbol = message.get("symbol")
+        order = {
+            "clOrdId": cl_ord_id,
+            "symbol": symbol,
+            "side": message.get("side"),
+            "orderQty": message.get("orderQty"),
+            "price": message.get("price"),
+            "ordType": message.get("ordType"),
+        }
+        if self._should_reject(symbol):
+            self.stats["rejects"] += 1
+            order["status"] = "Rejected"
+            self.orders[cl_ord_id] = order
+            await self._send(ws, {"messageType": "neworder", "reqId": message.get("reqId"), "success": False,
+                                  "clOrdId": cl_ord_id, "reason": "Rejected by mock server"})
+            await self._send(ws, {"messageType": "orders", "orders": [order]})
+            return
+        order["status"] = "New"
+        self.orders[cl_ord_id] = order
+        await self._send(ws, {"messageType": "neworder", "reqId": message.get("reqId"), "success": True,
+                              "clOrdId": cl_ord_id})
+        await self._send(ws, {"messageType": "orders", "orders": [order]})
+        if self.fill_probability and self.random.random() < self.fill_probability:
+            self._spawn(self._fill(ws, cl_ord_id))
+
+    async def _fill(self, ws, cl_ord_id: str):
+        if self.fill_delay:
+            await asyncio.sleep(self.fill_delay)
+        order = self.orders.get(cl_ord_id)
+        if not order or order["status"] != "New":
+            return
+        order["status"] = "Filled"
+        qty = float(order.get("orderQty") or 0)
+        price = float(order.get("price") or 0)
+        signed_qty = qty if str(order.get("side", "")).lower().startswith("b") else -qty
+        position = self.positions.setdefault(order["symbol"], {"qty": 0.0, "averagePrice": 0.0})
+        new_qty = position["qty"] + signed_qty
+        if new_qty and (position["qty"] >= 0) == (signed_qty >= 0):
+            position["averagePrice"] = (position["qty"] * position["averagePrice"] + signed_qty * price) / new_qty
+        position["qty"] = new_qty
+        self.stats["fills"] += 1
+        await self._send(ws, {"messageType": "orders", "orders": [order]})
+        await self._send(ws, {"messageType": "positions", "positions": [{"symbol": order["symbol"], **position}]})
+
+    async def _cancel_order(self, ws, message: Dict):
+        cl_ord_id = message.get("clOrdId")
+        order = self.orders.get(cl_ord_id)
+        success = bool(order) and order["status"] in ("New", "PartialFill")
+        if success:
+            order["status"] = "Canceled"
+        await self._send(ws, {"messageType": "cancelorder", "reqId": message.get("reqId"),
+                              "success": success, "clOrdId": cl_ord_id})
+        if success:
+            await self._send(ws, {"messageType": "orders", "orders": [order]})
+
+
+async def serve_forever(**kwargs):
+    async with MockHammerServer(**kwargs) as server:
+        print(f"Mock Hammer server listening on {server.url}")
+        await asyncio.Future()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Local stand-in Hammer/Alaric WebSocket server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ack-latency-ms", type=float, default=0.0)
+    parser.add_argument("--fill-probability", type=float, default=0.0)
+    parser.add_argument("--reject-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve_forever(port=args.port, ack_latency=args.ack_latency_ms / 1000,
+                                  fill_probability=args.fill_probability, reject_rate=args.reject_rate))
+    except KeyboardInterrupt:
+        print("Mock server stopped.")
@@ -1,19 +1,88 @@
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List, Set
 import logging
-from datetime import datetime
+
+from .correlation import RequestIdGenerator
+
+OPEN_STATUSES = frozenset(["Pending New", "New", "PartialFill"])
+FILLED_STATUSES = frozenset(["Filled", "PartialFill"])
 
 class OrderManager:
-    def __init__(self):
+    def __init__(self, ids: Optional[RequestIdGenerator] = None):
         self.logger = logging.getLogger(__name__)
         self.orders: Dict[str, Dict] = {}
+        self.ids = ids or RequestIdGenerator()
+        # Secondary indexes, maintained on every update so lookups cost O(result)
+        self.ids_by_status: Dict[str, Set[str]] = {}
+        self.open_by_symbol: Dict[str, Set[str]] = {}
+        self.filled_by_symbol: Dict[str, Set[str]] = {}
+        self.callbacks: Dict[str, List[Callable]] = {}
+
+    def register_callback(self, event_type: str, callback: Callable):
+        """Register callback(cl_ord_id, order, old_status) for
+        'order_added', 'order_status_changed' or 'order_updated'"""
+        self.callbacks.setdefault(event_type, []).append(callback)
+
+    def _emit(self, event_type: str, cl_ord_id: str, order: Dict, old_status: Optional[str]):
+        for callback in self.callbacks.get(event_type, ()):
+            try:
+                callback(cl_ord_id, order, old_status)
+            except Exception as e:
+                self.logger.error(f"Order callback for {event_type} failed: {str(e)}")
+
+    def _unindex(self, cl_ord_id: str, order: Dict):
+        status = order.get("status")
+        symbol = order.get("symbol")
+        ids = self.ids_by_status.get(status)
+        if ids is not None:
+            ids.discard(cl_ord_id)
+            if not ids:
+                del self.ids_by_status[status]
+        for index, statuses in ((self.open_by_symbol, OPEN_STATUSES), (self.filled_by_symbol, FILLED_STATUSES)):
+            if status in statuses and symbol in index:
+                index[symbol].discard(cl_ord_id)
+                if not index[symbol]:
+                    del index[symbol]
+
+    def _index(self, cl_ord_id: str, order: Dict):
+        status = order.get("status")
+        symbol = order.get("symbol")
+        self.ids_by_status.setdefault(status, set()).add(cl_ord_id)
+        if status in OPEN_STATUSES:
+            self.open_by_symbol.setdefault(symbol, set()).add(cl_ord_id)
+        if status in FILLED_STATUSES:
+            self.filled_by_symbol.setdefault(symbol, set()).add(cl_ord_id)
 
     def update_orders(self, orders_data: List[Dict]):
-        """Update orders from API response"""
-        for order in orders_data:
-            cl_ord_id = order.get("clOrdId")
-            if cl_ord_id:
-                self.orders[cl_ord_id] = order
-        self.logger.info(f"Orders updated: {self.orders}")
+        """Apply order updates from API response; partial updates are merged into the known order"""
+        changed = 0
+        for update in orders_data:
+            cl_ord_id = update.get("clOrdId")
+            if not cl_ord_id:
+                continue
+            order = self.orders.get(cl_ord_id)
+            if order is None:
+                order = self.orders[cl_ord_id] = dict(update)
+                self._index(cl_ord_id, order)
+                self._emit("order_added", cl_ord_id, order, None)
+                changed += 1
+                continue
+            if all(order.get(k) == v for k, v in update.items()):
+                continue
+            old_status = order.get("status")
+            old_symbol = order.get("symbol")
+            reindex = update.get("status", old_status) != old_status or update.get("symbol", old_symbol) != old_symbol
+            if reindex:
+                self._unindex(cl_ord_id, order)
+            order.update(update)
+            changed += 1
+            if reindex:
+                self._index(cl_ord_id, order)
+            if order.get("status") != old_status:
+                self._emit("order_status_changed", cl_ord_id, order, old_status)
+            else:
+                self._emit("order_updated", cl_ord_id, order, old_status)
+        if changed and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Orders updated: %d changed, %d open", changed, self.open_count())
 
     def get_order(self, cl_ord_id: str) -> Optional[Dict]:
         """Get order by client order ID"""
@@ -25,12 +94,12 @@ class OrderManager:
 
     def create_order_request(self, symbol: str, side: str, quantity: int, 
                            order_type: str, price: Optional[float] = None, 
-                           stop_price: Optional[float] = None) -> Dict:
-        """Create a new order request"""
+                           stop_price: Optional[float] = None, cl_ord_id: Optional[str] = None) -> Dict:
+        """Create a new order request (with a caller-allocated clOrdId if given)"""
         order_data = {
             "messageType": "neworder",
-            "reqId": str(int(datetime.now().timestamp())),
-            "clOrdId": f"order_{int(datetime.now().timestamp())}",
+            "reqId": self.ids.next_req_id(),
+            "clOrdId": cl_ord_id or self.ids.next_cl_ord_id(),
             "symbol": symbol,
             "side": side,
             "orderQty": str(quantity),
@@ -50,16 +119,34 @@ class OrderManager:
         """Create a cancel order request"""
         return {
             "messageType": "cancelorder",
-            "reqId": str(int(datetime.now().timestamp())),
+            "reqId": self.ids.next_req_id(),
             "clOrdId": cl_ord_id
         }
 
-    def get_open_orders(self) -> Dict:
-        """Get all open orders"""
-        return {cl_ord_id: order for cl_ord_id, order in self.orders.items() 
-                if order.get("status") in ["Pending New", "New", "PartialFill"]}
+    def _collect(self, ids) -> Dict:
+        return {cl_ord_id: self.orders[cl_ord_id] for cl_ord_id in ids}
+
+    def get_orders_by_status(self, status: str) -> Dict:
+        """Get all orders with the given status"""
+        return self._collect(self.ids_by_status.get(status, ()))
+
+    def open_count(self) -> int:
+        return sum(len(self.ids_by_status.get(s, ())) for s in OPEN_STATUSES)
+
+    def get_open_orders(self, symbol: Optional[str] = None) -> Dict:
+        """Get all open orders, optionally for one symbol"""
+        if symbol is not None:
+            return self._collect(self.open_by_symbol.get(symbol, ()))
+        result = {}
+        for status in OPEN_STATUSES:
+            result.update(self._collect(self.ids_by_status.get(status, ())))
+        return result
 
-    def get_filled_orders(self) -> Dict:
-        """Get all filled orders"""
-        return {cl_ord_id: order for cl_ord_id, order in self.orders.items() 
-                if order.get("status") in ["Filled", "PartialFill"]} 
\ No newline at end of file
+    def get_filled_orders(self, symbol: Optional[str] = None) -> Dict:
+        """Get all filled orders, optionally for one symbol"""
+        if symbol is not None:
+            return self._collect(self.filled_by_symbol.get(symbol, ()))
+        result = {}
+        for status in FILLED_STATUSES:
+            result.update(self._collect(self.ids_by_status.get(status, ())))
+        return result
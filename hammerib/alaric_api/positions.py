@@ -1,26 +1,48 @@
-from typing import Dict, List
+from typing import Callable, Dict, List
 import logging
-from datetime import datetime
+
+EMPTY_POSITION = {"quantity": 0, "average_price": 0.0}
 
 class PositionManager:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.positions: Dict[str, Dict] = {}
+        self.callbacks: Dict[str, List[Callable]] = {}
+
+    def register_callback(self, event_type: str, callback: Callable):
+        """Register callback(symbol, position, old_position) for 'position_changed'"""
+        self.callbacks.setdefault(event_type, []).append(callback)
+
+    def _emit(self, event_type: str, symbol: str, position: Dict, old_position: Dict):
+        for callback in self.callbacks.get(event_type, ()):
+            try:
+                callback(symbol, position, old_position)
+            except Exception as e:
+                self.logger.error(f"Position callback for {event_type} failed: {str(e)}")
 
     def update_positions(self, positions_data: List[Dict]):
-        """Update positions from API response"""
+        """Apply position updates from API response; only changed symbols are touched"""
+        changed = 0
         for position in positions_data:
             symbol = position.get("symbol")
-            if symbol:
-                self.positions[symbol] = {
-                    "quantity": position.get("qty", 0),
-                    "average_price": position.get("averagePrice", 0.0)
-                }
-        self.logger.info(f"Positions updated: {self.positions}")
+            if not symbol:
+                continue
+            old = self.positions.get(symbol, EMPTY_POSITION)
+            new = {
+                "quantity": position.get("qty", old["quantity"]),
+                "average_price": position.get("averagePrice", old["average_price"])
+            }
+            if new == old:
+                continue
+            self.positions[symbol] = new
+            changed += 1
+            self._emit("position_changed", symbol, new, old)
+        if changed and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Positions updated: %d changed, %d held", changed, len(self.positions))
 
     def get_position(self, symbol: str) -> Dict:
         """Get position for a specific symbol"""
-        return self.positions.get(symbol, {"quantity": 0, "average_price": 0.0})
+        return self.positions.get(symbol, dict(EMPTY_POSITION))
 
     def get_all_positions(self) -> Dict:
         """Get all positions"""
@@ -36,4 +58,4 @@ class PositionManager:
         position = self.get_position(symbol)
         if position["quantity"] == 0:
             return 0.0
-        return (current_price - position["average_price"]) * position["quantity"] 
\ No newline at end of file
+        return (current_price - position["average_price"]) * position["quantity"]
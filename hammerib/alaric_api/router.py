@@ -0,0 +1,196 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from . import codec
+
+# Never shed, whatever shed_types says: losing one desyncs OrderManager/PositionManager/BalanceManager
+NEVER_SHED = frozenset({"neworder", "cancelorder", "orders", "positions", "balances", "login"})
+
+class MessageRouter:
+    """Decouples the WebSocket reader from message handlers.
+
+    The reader calls `feed()` with raw frames; it never blocks, so frame reads
+    and pings keep flowing however slow a handler is. A single dispatch task
+    drains the queue, decodes with the fastest available codec and calls
+    any '*' handlers followed by the handlers registered for the frame's
+    `messageType`. Sync handlers are called directly, coroutine handlers awaited.
+
+    `maxsize` bounds the backlog of sheddable frames. Order, position and
+    balance updates (NEVER_SHED), frames without a `messageType` and anything
+    carrying a `reqId` are never dropped: past the bound they are still
+    queued and counted as overflow. Every other frame (market data) is shed
+    while the queue is full; with `shed_types` given, only those
+    messageTypes are. Every shed frame is counted and reported to `on_drop`
+    so the owner can reconcile its state. Below the bound frames are queued
+    raw and decoded once by the dispatch task; past it they are decoded once
+    in `feed()` to classify them and queued decoded.
+    """
+
+    def __init__(self, maxsize: int = 10000, name: str = "alaric", shed_types: Optional[Iterable[str]] = None,
+                 on_drop: Optional[Callable[[], None]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.maxsize = maxsize
+        self.shed_types = None if shed_types is None else frozenset(shed_types) - NEVER_SHED
+        self.on_drop = on_drop
+        self.handlers: Dict[str, List[Callable]] = {}
+        self.fallback: Optional[Callable] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            "enqueued": 0,
+            "dispatched": 0,
+            "dropped": 0,
+            "overflow": 0,
+            "decode_errors": 0,
+            "handler_errors": 0,
+            "high_water": 0,
+            "queue_wait_ms_total": 0.0,
+            "queue_wait_ms_max": 0.0,
+            "handler_ms_max": 0.0,
+        }
+
+    def register(self, message_type: str, handler: Callable):
+        """Register a sync or async handler for a messageType ('*' for every message)"""
+        self.handlers.setdefault(message_type, []).append(handler)
+
+    def unregister(self, message_type: str, handler: Callable):
+        handlers = self.handlers.get(message_type, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def set_fallback(self, handler: Optional[Callable]):
+        """Handler for messages no typed handler is registered for"""
+        self.fallback = handler
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["depth"] = self.depth
+        stats["codec"] = codec.CODEC_NAME
+        if stats["dispatched"]:
+            stats["queue_wait_ms_avg"] = stats["queue_wait_ms_total"] / stats["dispatched"]
+        return stats
+
+    def start(self):
+        """Start the dispatch task on the running loop (idempotent)"""
+        if self._task and not self._task.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue()  # Bounded in feed(): only never-shed frames go past maxsize
+        self._task = asyncio.create_task(self._dispatch_loop(), name=f"{self.name}-dispatch")
+
+    async def stop(self, drain: bool = False):
+        """Stop the dispatch task, optionally dispatching what is still queued first"""
+        if drain and self._queue is not None and self._task and not self._task.done():
+            await self._queue.join()
+        if self._task:
+            self._task.cancel()
+            if self._task is asyncio.current_task():
+                # Stopped from inside a handler; the cancellation lands on return
+                self._task = None
+                return
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def feed(self, raw: Union[str, bytes]):
+        """Enqueue a raw frame; called from the socket reader, never blocks"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()  # Bounded in feed(): only never-shed frames go past maxsize
+        if self._queue.qsize() >= self.maxsize:
+            try:
+                raw = codec.loads(raw)  # Queued decoded, so dispatch does not decode it again
+            except codec.DecodeError:
+                pass  # Queued raw; dispatch counts the decode error
+            if self._sheddable(raw):
+                self.stats["dropped"] += 1
+                if self.stats["dropped"] in (1, 10, 100) or self.stats["dropped"] % 1000 == 0:
+                    self.logger.warning(f"{self.name} router backlog over {self.maxsize}, "
+                                        f"{self.stats['dropped']} market data frames shed so far")
+                if self.on_drop:
+                    self.on_drop()
+                return
+            self.stats["overflow"] += 1
+            if self.stats["overflow"] in (1, 10, 100) or self.stats["overflow"] % 1000 == 0:
+                self.logger.warning(f"{self.name} router backlog over {self.maxsize}, "
+                                    f"{self.stats['overflow']} frames queued past the threshold")
+        self._queue.put_nowait((time.perf_counter(), raw))
+        self.stats["enqueued"] += 1
+        depth = self._queue.qsize()
+        if depth > self.stats["high_water"]:
+            self.stats["high_water"] = depth
+
+    def _sheddable(self, data) -> bool:
+        """Decoded frames with a messageType outside NEVER_SHED (and in shed_types if set), never with a reqId"""
+        if not isinstance(data, dict) or "reqId" in data:
+            return False
+        message_type = data.get("messageType")
+        if not message_type or message_type in NEVER_SHED:
+            return False
+        return self.shed_types is None or message_type in self.shed_types
+
+    async def _dispatch_loop(self):
+        queue = self._queue
+        while True:
+            enqueued_at, raw = await queue.get()
+            try:
+                wait_ms = (time.perf_counter() - enqueued_at) * 1000
+                self.stats["queue_wait_ms_total"] += wait_ms
+                if wait_ms > self.stats["queue_wait_ms_max"]:
+                    self.stats["queue_wait_ms_max"] = wait_ms
+                await self.dispatch(raw)
+            finally:
+                queue.task_done()
+
+    async def dispatch(self, raw: Union[str, bytes, Dict]):
+        """Decode (if needed) and hand a frame to its handlers"""
+        if isinstance(raw, dict):
+            data = raw
+        else:
+            try:
+                data = codec.loads(raw)
+            except codec.DecodeError:
+                self.stats["decode_errors"] += 1
+                self.logger.warning(f"Received non-JSON message: {raw!r:.200}")
+                return
+        if not isinstance(data, dict):
+            self.stats["decode_errors"] += 1
+            self.logger.warning(f"Received non-object JSON message: {data!r:.200}")
+            return
+        self.stats["dispatched"] += 1
+        # '*' handlers (e.g. reqId correlation) run first so acks are not held up by typed handlers
+        for handler in self.handlers.get("*", ()):
+            await self._call(handler, data)
+        handlers = self.handlers.get(data.get("messageType"))
+        if handlers:
+            for handler in handlers:
+                await self._call(handler, data)
+        elif self.fallback:
+            await self._call(self.fallback, data)
+
+    async def _call(self, handler: Callable, data: Dict):
+        started = time.perf_counter()
+        try:
+            result = handler(data)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            self.stats["handler_errors"] += 1
+            self.logger.error(f"Handler {getattr(handler, '__name__', handler)} failed for "
+                              f"{data.get('messageType')}: {str(e)}")
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms > self.stats["handler_ms_max"]:
+                self.stats["handler_ms_max"] = elapsed_ms
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import websockets
+
+from hammerib.utils.latency import latency_probe
+from .correlation import RequestCorrelator
+from .router import MessageRouter
+from . import codec
+
+class ExponentialBackoff:
+    """Jittered exponential backoff: delay n is uniform in [d/2, d], d = min(cap, base * 2**n)"""
+
+    def __init__(self, initial: float = 0.5, maximum: float = 30.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        delay = min(self.maximum, self.initial * (2 ** self.attempt))
+        self.attempt += 1
+        return random.uniform(delay / 2, delay)
+
+    def reset(self):
+        self.attempt = 0
+
+
+class SessionSupervisor:
+    """Owns the WebSocket connection and its tasks for the lifetime of a client.
+
+    Each session runs exactly one reader, one heartbeat and one writer task.
+    When any of them ends the supervisor tears the whole session down, fails
+    pending requests, waits a jittered exponential backoff and reconnects;
+    nothing else is allowed to reconnect, so reconnect storms cannot happen.
+    After every (re)connect the resume hooks run in order (authenticate,
+    replay subscriptions, reconcile state) before the session counts as up.
+    """
+
+    def __init__(self, url: str, router: MessageRouter, pending: RequestCorrelator,
+                 heartbeat_interval: float = 30.0, backoff: Optional[ExponentialBackoff] = None,
+                 connect_kwargs: Optional[Dict] = None, name: str = "hammer"):
+        self.logger = logging.getLogger(__name__)
+        self.url = url
+        self.router = router
+        self.pending = pending
+        self.heartbeat_interval = heartbeat_interval
+        self.backoff = backoff or ExponentialBackoff()
+        self.connect_kwargs = connect_kwargs or {}
+        self.name = name
+        self.resume_hooks: List[Callable[[], Awaitable]] = []
+        self.ws = None
+        self.is_connected = False  # socket open (resume hooks may still be running)
+        self.is_ready = False      # resume hooks finished
+        self.last_heartbeat = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._session_tasks: List[asyncio.Task] = []
+        self._run_task: Optional[asyncio.Task] = None
+        self._first_session: Optional[asyncio.Future] = None
+        self._stopping = False
+        self.recovery_times = deque(maxlen=100)
+        self.stats = {
+            "connects": 0,
+            "disconnects": 0,
+            "failed_attempts": 0,
+            "last_recovery_s": None,
+            "max_recovery_s": None,
+        }
+
+    def add_resume_hook(self, hook: Callable[[], Awaitable]):
+        """Register a coroutine function run after every successful (re)connect"""
+        self.resume_hooks.append(hook)
+
+    async def start(self, wait: bool = True):
+        """Start supervising; with wait=True return once the first session is up.
+
+        With wait=True a failed first connect stops the supervisor and raises,
+        like a plain connect would; with wait=False it keeps retrying.
+        """
+        if self._run_task and not self._run_task.done():
+            return
+        self._stopping = False
+        self._first_session = asyncio.get_running_loop().create_future()
+        self.router.start()
+        self._run_task = asyncio.create_task(self._run(), name=f"{self.name}-session")
+        if wait:
+            try:
+                await asyncio.shield(self._first_session)
+            except Exception:
+                await self.stop()
+                raise
+
+    def _report_first(self, exc: Optional[BaseException] = None):
+        if self._first_session and not self._first_session.done():
+            if exc is None:
+                self._first_session.set_result(None)
+            else:
+                self._first_session.set_exception(exc)
+                self._first_session.exception()  # Mark retrieved when start(wait=False)
+
+    async def _run(self):
+        down_since = None
+        while not self._stopping:
+            try:
+                self.ws = await websockets.connect(self.url, **self.connect_kwargs)
+            except Exception as e:
+                self.stats["failed_attempts"] += 1
+                self.logger.error(f"Failed to connect to WebSocket: {str(e)}")
+                self._report_first(e)
+                if down_since is None:
+                    down_since = time.perf_counter_ns()
+                await asyncio.sleep(self.backoff.next_delay())
+                continue
+
+            self.is_connected = True
+            self.stats["connects"] += 1
+            self.logger.info(f"Connected to WebSocket ({self.name})")
+            self._outbox = asyncio.Queue()
+            self._session_tasks = [
+                asyncio.create_task(self._reader(self.ws), name=f"{self.name}-reader"),
+                asyncio.create_task(self._writer(self.ws, self._outbox), name=f"{self.name}-writer"),
+                asyncio.create_task(self._heartbeat(), name=f"{self.name}-heartbeat"),
+            ]
+            try:
+                for hook in self.resume_hooks:
+                    await hook()
+            except Exception as e:
+                self.logger.error(f"Session resume failed: {str(e)}")
+                self._report_first(e)
+            else:
+                self.is_ready = True
+                self.backoff.reset()
+                if down_since is not None:
+                    self._record_recovery(down_since)
+                    down_since = None
+                self._report_first()
+                await asyncio.wait(self._session_tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                await self._teardown()
+
+            if self._stopping:
+                break
+            self.stats["disconnects"] += 1
+            if down_since is None:
+                down_since = time.perf_counter_ns()
+            delay = self.backoff.next_delay()
+            self.logger.warning(f"WebSocket session ended, reconnecting in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def _record_recovery(self, down_since: int):
+        seconds = (time.perf_counter_ns() - down_since) / 1e9
+        self.recovery_times.append(seconds)
+        self.stats["last_recovery_s"] = round(seconds, 3)
+        if self.stats["max_recovery_s"] is None or seconds > self.stats["max_recovery_s"]:
+            self.stats["max_recovery_s"] = round(seconds, 3)
+        latency_probe.measure(f"{self.name}_recovery", down_since)
+        self.logger.info(f"WebSocket session recovered in {seconds:.3f}s")
+
+    async def _teardown(self):
+        self.is_connected = False
+        self.is_ready = False
+        current = asyncio.current_task()
+        for task in self._session_tasks:
+            if task is not current:
+                task.cancel()
+        await asyncio.gather(*(t for t in self._session_tasks if t is not current), return_exceptions=True)
+        self._session_tasks = []
+        if self._outbox is not None:
+            while not self._outbox.empty():
+                _, future = self._outbox.get_nowait()
+                if not future.done():
+                    future.set_exception(ConnectionError("WebSocket session ended"))
+            self._outbox = None
+        if self.ws is not None:
+            try:
+                await self.ws.close()
+            except Exception as e:
+                self.logger.debug(f"Error closing WebSocket: {str(e)}")
+            self.ws = None
+        self.pending.fail_all(ConnectionError("WebSocket session ended"))
+
+    async def _reader(self, ws):
+        try:
+            async for raw in ws:
+                self.router.feed(raw)
+            self.logger.warning("WebSocket closed by server")
+        except websockets.exceptions.ConnectionClosed as e:
+            self.logger.warning(f"WebSocket connection closed: {e}")
+        except Exception as e:
+            self.logger.error(f"Error reading WebSocket: {str(e)}")
+
+    async def _writer(self, ws, outbox: asyncio.Queue):
+        while True:
+            payload, future = await outbox.get()
+            try:
+                await ws.send(payload)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.set_exception(ConnectionError("WebSocket session ended"))
+                raise
+            except Exception as e:
+                self.logger.error(f"Failed to send message: {str(e)}")
+                if not future.done():
+                    future.set_exception(e)
+                return
+            if not future.done():
+                future.set_result(None)
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                await self.send({"type": "heartbeat"})
+            except Exception as e:
+                self.logger.error(f"Heartbeat failed: {str(e)}")
+                return
+            self.last_heartbeat = time.time()
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def send(self, message: Dict):
+        """Queue a message for the writer task and wait until it is on the wire"""
+        if not self.is_connected or self._outbox is None:
+            raise ConnectionError("Not connected to WebSocket")
+        future = asyncio.get_running_loop().create_future()
+        self._outbox.put_nowait((codec.dumps(message), future))
+        await future
+
+    def request_reconnect(self):
+        """End the current session; the supervisor reconnects after backoff"""
+        for task in self._session_tasks:
+            if task.get_name().endswith("-reader"):
+                task.cancel()
+
+    async def stop(self):
+        """Stop supervising and close the connection"""
+        self._stopping = True
+        if self._run_task:
+            self._run_task.cancel()
+            try:
+                await self._run_task
+            except asyncio.CancelledError:
+                pass
+            self._run_task = None
+        await self._teardown()
+        await self.router.stop()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["connected"] = self.is_connected
+        stats["ready"] = self.is_ready
+        stats["in_flight"] = self.pending.in_flight
+        stats["outbox"] = self._outbox.qsize() if self._outbox else 0
+        return stats
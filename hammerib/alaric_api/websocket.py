@@ -1,89 +1,87 @@
 import asyncio
-import json
 import logging
-from typing import Dict, Optional, Callable
-import websockets
-from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from hammerib.config import settings
+from .correlation import RequestCorrelator
+from .router import MessageRouter
+from .session import ExponentialBackoff, SessionSupervisor
 
 class WebSocketClient:
     def __init__(self, base_url: str):
         self.logger = logging.getLogger(__name__)
         self.base_url = base_url
-        self.ws = None
-        self.is_connected = False
         self.callbacks: Dict[str, Callable] = {}
-        self.last_heartbeat = None
+        self.pending = RequestCorrelator(settings.ALARIC_REQUEST_TIMEOUT)  # reqId -> Future
+        self.router = MessageRouter(settings.ALARIC_ROUTER_QUEUE_SIZE, name="hammer",
+                                    shed_types=settings.ALARIC_ROUTER_SHED_TYPES)
+        self.router.register("*", self.pending.resolve)
+        self.router.set_fallback(self._handle_unknown)
+        self.session = SessionSupervisor(
+            base_url, self.router, self.pending,
+            heartbeat_interval=settings.ALARIC_HEARTBEAT_INTERVAL,
+            backoff=ExponentialBackoff(settings.ALARIC_RECONNECT_BACKOFF_INITIAL,
+                                       settings.ALARIC_RECONNECT_BACKOFF_MAX),
+            name="hammer"
+        )
+
+    @property
+    def ws(self):
+        return self.session.ws
+
+    @property
+    def is_connected(self) -> bool:
+        return self.session.is_connected
+
+    @property
+    def last_heartbeat(self):
+        return self.session.last_heartbeat
 
     async def connect(self):
-        """Establish WebSocket connection"""
+        """Start the session supervisor and wait for the first session to come up"""
         try:
-            self.ws = await websockets.connect(self.base_url)
-            self.is_connected = True
+            await self.session.start()
             self.logger.info("Connected to WebSocket")
-            
-            # Start heartbeat and message handling
-            asyncio.create_task(self._heartbeat())
-            asyncio.create_task(self._handle_messages())
-            
         except Exception as e:
             self.logger.error(f"Failed to connect to WebSocket: {str(e)}")
             raise
 
-    async def _heartbeat(self):
-        """Send periodic heartbeat to keep connection alive"""
-        while self.is_connected:
-            try:
-                await self.ws.send(json.dumps({"type": "heartbeat"}))
-                self.last_heartbeat = datetime.now()
-                await asyncio.sleep(30)  # Send heartbeat every 30 seconds
-            except Exception as e:
-                self.logger.error(f"Heartbeat failed: {str(e)}")
-                await self.reconnect()
-
-    async def _handle_messages(self):
-        """Handle incoming WebSocket messages"""
-        while self.is_connected:
-            try:
-                message = await self.ws.recv()
-                data = json.loads(message)
-                
-                # Handle different message types
-                msg_type = data.get("messageType")
-                if msg_type in self.callbacks:
-                    await self.callbacks[msg_type](data)
-                else:
-                    self.logger.warning(f"Unhandled message type: {msg_type}")
-                    
-            except Exception as e:
-                self.logger.error(f"Error handling message: {str(e)}")
-                await self.reconnect()
+    def add_resume_hook(self, hook: Callable[[], Awaitable]):
+        """Run `hook` after every (re)connect, e.g. login and subscription replay"""
+        self.session.add_resume_hook(hook)
 
     async def reconnect(self):
-        """Reconnect to WebSocket if connection is lost"""
-        self.is_connected = False
-        if self.ws:
-            await self.ws.close()
-        await asyncio.sleep(5)  # Wait before reconnecting
-        await self.connect()
+        """Drop the current session; the supervisor reconnects with backoff"""
+        self.session.request_reconnect()
 
     async def send_message(self, message: Dict) -> None:
         """Send a message through WebSocket"""
-        if not self.is_connected:
-            raise ConnectionError("Not connected to WebSocket")
-
         try:
-            await self.ws.send(json.dumps(message))
+            await self.session.send(message)
         except Exception as e:
             self.logger.error(f"Failed to send message: {str(e)}")
             raise
 
     def register_callback(self, message_type: str, callback: Callable):
-        """Register callback for specific message types"""
+        """Register a sync or async callback for specific message types"""
+        previous = self.callbacks.get(message_type)
+        if previous:
+            self.router.unregister(message_type, previous)
         self.callbacks[message_type] = callback
+        self.router.register(message_type, callback)
+
+    def _handle_unknown(self, data: Dict):
+        if "reqId" in data:
+            # Plain responses are consumed by the reqId correlator
+            self.logger.debug(f"Response without callback: {data.get('messageType')} ({data['reqId']})")
+        else:
+            self.logger.warning(f"Unhandled message type: {data.get('messageType')}")
+
+    def get_stats(self) -> Dict:
+        """Session and router statistics (recovery times, queue depth, drops)"""
+        return {"session": self.session.get_stats(), "router": self.router.get_stats()}
 
     async def close(self):
         """Close the WebSocket connection"""
-        self.is_connected = False
-        if self.ws:
-            await self.ws.close()
-        self.logger.info("Disconnected from WebSocket") 
\ No newline at end of file
+        await self.session.stop()
+        self.logger.info("Disconnected from WebSocket")
@@ -39,6 +39,14 @@ ALARIC_ACCESS_TOKEN = None # Will be populated after successful authentication
 ALARIC_TOKEN_ISSUER = ALARIC_BASE_AUTH_URL # As per documentation: "iss": "https://auth-dev.alaricsecurities.net"
 ALARIC_TOKEN_AUDIENCE = ["DemoProtectedAPI", "TradeReportingAPI"] # Example from docs, adjust as needed
 
+# Request/response correlation
+ALARIC_REQUEST_TIMEOUT = 10.0 # Seconds to wait for the response to a reqId before failing its future
+ALARIC_ROUTER_QUEUE_SIZE = 10000 # Router backlog bound: market data is shed above it, never-shed frames are counted as overflow
+ALARIC_ROUTER_SHED_TYPES = None # None sheds every messageType except orders/positions/balances/acks; a list limits shedding to those types
+ALARIC_HEARTBEAT_INTERVAL = 30.0 # Seconds between heartbeat messages
+ALARIC_RECONNECT_BACKOFF_INITIAL = 0.5 # First reconnect delay (seconds), doubled per failed attempt with jitter
+ALARIC_RECONNECT_BACKOFF_MAX = 30.0 # Upper bound for the reconnect delay (seconds)
+
 # IB API Configuration (Placeholders for now)
 # -------------------
 IB_HOST = "127.0.0.1"
@@ -50,4 +58,8 @@ IB_CLIENT_ID = 0 # IB API client ID for this connection
 LOG_LEVEL = "INFO" # e.g., DEBUG, INFO, WARNING, ERROR
 LOG_FILE = "hammerib_app.log"
 
+# Latency instrumentation (quote -> score -> order -> send -> ack)
+LATENCY_PROBES_ENABLED = True
+LATENCY_DUMP_FILE = "latency_stats.json"
+
 # Add other global settings as needed 
\ No newline at end of file
@@ -0,0 +1,285 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Nightly outputs of calculate_final_thg_dynamic.py (T) and calculate_finalextlt.py (C)
+UNIVERSE_FILES = {'T': 'final_thg_results.csv', 'C': 'final_extlt.csv'}
+BAR_STORE_DIR = 'bar_store'
+
+SMA_WINDOWS = {'SMA88': 88, 'SMA268': 268}
+SIX_MONTH_BARS = 180
+CHG_BAND = (-15, 15)     # normalize_values in normalize_data.py
+DIFF_BAND = (-8, 15)     # normalize_6m_values in normalize_data.py
+FILL_QUANTILE = 0.12     # missing components get the worst 12% value
+DEFAULT_WEIGHTS = {'solidity_weight': 2.5, 'yield_weight': 600, 'adv_weight': 0.00025}
+
+# Per-universe FINAL_THG weights, same terms and order as the nightly scripts
+# (market_weights: solidity/yield weights come from market_risk_analyzer instead of the fixed 2.5)
+FORMULAS = {
+    'T': {'sma88': 0.6, 'sma268': 0.9, 'window': 0.35, 'reversal': True, 'market_weights': True, 'cs_factor': False},
+    'C': {'sma88': 2.2, 'sma268': 1.7, 'window': 0.25, 'reversal': False, 'market_weights': False, 'cs_factor': True},
+}
+
+def normalize_band(values: np.ndarray, lower: float, upper: float, max_score: float = 90,
+                   score_range: float = 80) -> np.ndarray:
+    """Cross-sectional min/max score inside [lower, upper): the most negative value scores max_score, others NaN"""
+    with np.errstate(invalid='ignore'):
+        mask = (values >= lower) & (values < upper)
+    out = np.full(len(values), np.nan)
+    if not mask.any():
+        return out
+    inside = values[mask]
+    low, high = inside.min(), inside.max()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[mask] = max_score - (inside - low) / (high - low) * score_range
+    return out
+
+def fill_worst(values: np.ndarray, q: float = FILL_QUANTILE) -> np.ndarray:
+    """Replace NaN with the (rounded) q-quantile of the known values"""
+    missing = np.isnan(values)
+    if missing.any() and not missing.all():
+        values = values.copy()
+        values[missing] = np.round(np.quantile(values[~missing], q), 2)
+    return values
+
+def final_thg_score(c: Dict[str, np.ndarray], formula: Dict, weights: Dict = DEFAULT_WEIGHTS,
+                    cs_factor: Optional[np.ndarray] = None) -> np.ndarray:
+    """FINAL_THG from rounded, filled components (the *_norm columns, SOLIDITY_SCORE, CUR_YIELD, AVG_ADV)"""
+    thg = c['SMA88_chg_norm'] * formula['sma88'] + c['SMA268_chg_norm'] * formula['sma268']
+    thg = thg + (c['6M_High_diff_norm'] + c['6M_Low_diff_norm'] + c['1Y_High_diff_norm'] +
+                 c['1Y_Low_diff_norm'] * 1.2) * formula['window']
+    if formula['reversal']:
+        thg = thg + (c['Aug4_chg_norm'] * 0.7 + c['Oct19_chg_norm'] * 1.3) * 0.25
+    if formula['market_weights']:
+        thg = thg + c['SOLIDITY_SCORE'] * weights['solidity_weight']
+        thg = thg + c['CUR_YIELD'] * weights['yield_weight']
+    else:
+        thg = thg + c['SOLIDITY_SCORE'] * DEFAULT_WEIGHTS['solidity_weight']
+    if 'AVG_ADV' in c:
+        thg = thg + c['AVG_ADV'] * weights['adv_weight']
+    thg = np.round(thg, 2)
+    if formula['cs_factor'] and cs_factor is not None:
+        thg = np.round(thg * cs_factor, 2)
+    return thg
+
+def _bar_path(symbol: str, root: str) -> Optional[str]:
+    safe = symbol.replace(' ', '_').replace('/', '_')
+    for ext in ('parquet', 'csv'):
+        path = os.path.join(root, f"{safe}.{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+def read_store_bars(symbol: str, root: str = BAR_STORE_DIR) -> Optional[pd.DataFrame]:
+    """Stored daily bars of a symbol (with a date column); None when missing or unreadable"""
+    path = _bar_path(symbol, root)
+    if path is None:
+        return None
+    try:
+        return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path, parse_dates=['date'])
+    except Exception:
+        return None
+
+def load_bar_terms(symbols: Iterable[str], root: str = BAR_STORE_DIR) -> pd.DataFrame:
+    """Exact price-independent terms from the shared daily bar store (see bar_store.py).
+
+    For each symbol: the sum of the last n-1 completed closes for every SMA
+    window (today's price completes the window), and the highs/lows of the
+    6M window (minus the bar that rolls out when today is added) and of the
+    2Y history the nightly 1Y High/Low is taken from.
+    Symbols without stored bars are left out.
+    """
+    rows = {}
+    for symbol in symbols:
+        bars = read_store_bars(symbol, root)
+        if bars is None or bars.empty:
+            continue
+        bars = bars[bars['date'] >= bars['date'].iloc[-1] - pd.DateOffset(years=2)]
+        close = pd.to_numeric(bars['close'], errors='coerce').to_numpy()
+        high = pd.to_numeric(bars['high'], errors='coerce').to_numpy()
+        low = pd.to_numeric(bars['low'], errors='coerce').to_numpy()
+        terms = {}
+        for name, n in SMA_WINDOWS.items():
+            terms[f'{name}_BASE'] = close[-(n - 1):].sum() if len(close) >= n else np.nan
+        terms['6M High'] = np.nanmax(high[-(SIX_MONTH_BARS - 1):])
+        terms['6M Low'] = np.nanmin(low[-(SIX_MONTH_BARS - 1):])
+        terms['1Y High'] = np.nanmax(high)
+        terms['1Y Low'] = np.nanmin(low)
+        rows[symbol] = terms
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+class LiveFinalThg:
+    """Intraday FINAL_THG for a whole universe, recomputed from live prices.
+
+    Everything that does not depend on today's price (SMA sums, window
+    highs/lows, dividend adjustment, solidity, ADV, market weights, CS
+    factor) is taken once from the nightly universe file and, when present,
+    the bar store. A recompute turns the current price vector into SMA
+    changes and window diffs, normalizes them across the universe exactly
+    like normalize_data.py, and applies the nightly FINAL_THG formula.
+
+    Quotes may arrive on any thread via on_quote(); they are only recorded.
+    recompute() applies the pending batch and is a no-op when nothing
+    changed, so windows can call it as often as they redraw.
+    """
+
+    def __init__(self, df: pd.DataFrame, benchmark_type: str = 'T', bar_terms: Optional[pd.DataFrame] = None,
+                 symbol_column: str = 'PREF IBKR'):
+        self.benchmark_type = benchmark_type
+        self.formula = FORMULAS[benchmark_type]
+        df = df.dropna(subset=[symbol_column]).drop_duplicates(subset=[symbol_column]).reset_index(drop=True)
+        self.symbols: List[str] = df[symbol_column].astype(str).tolist()
+        self.index: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+        n = len(self.symbols)
+
+        def column(name, default=np.nan):
+            if name in df.columns:
+                return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float, copy=True)
+            return np.full(n, default, dtype=float)
+
+        self.price = column('Last Price')
+        # Without bars the other n-1 closes of the nightly window are rebuilt from SMA and SMA chg:
+        # sum = SMA * n - nightly close, nightly close = SMA * (1 + chg / 100)
+        self.sma_base = {}
+        for name, length in SMA_WINDOWS.items():
+            sma = column(name)
+            self.sma_base[name] = sma * length - sma * (1 + column(f'{name} chg') / 100)
+        self.windows = {name: column(name) for name in ('6M High', '6M Low', '1Y High', '1Y Low')}
+        if bar_terms is not None and len(bar_terms):
+            rows = np.array([self.index.get(s, -1) for s in bar_terms.index])
+            found = rows >= 0
+            for name in SMA_WINDOWS:
+                values = bar_terms[f'{name}_BASE'].to_numpy(dtype=float)[found]
+                self.sma_base[name][rows[found]] = values
+            for name in self.windows:
+                self.windows[name][rows[found]] = bar_terms[name].to_numpy(dtype=float)[found]
+        # Div adj.price = price - ((90 - TIME TO DIV) / 90) * DIV AMOUNT
+        self.div_offset = np.nan_to_num((90 - column('TIME TO DIV')) / 90 * column('DIV AMOUNT'))
+        self.reversal_refs = (column('Aug2022_Price'), column('Oct19_Price'))
+        if 'COUPON' in df.columns:
+            self.coupon = pd.to_numeric(df['COUPON'].astype(str).str.replace('%', ''), errors='coerce').to_numpy(dtype=float)
+        else:
+            self.coupon = np.full(n, np.nan)
+        self.solidity = np.round(column('SOLIDITY_SCORE'), 2)
+        self.adv = np.round(column('AVG_ADV'), 2)
+        self.use_adv = 'AVG_ADV' in df.columns
+        self.cs_factor = column('CS_FACTOR', 1.0)
+        self.weights = dict(DEFAULT_WEIGHTS)
+        for key, col in (('solidity_weight', 'SOLIDITY_WEIGHT_USED'), ('yield_weight', 'YIELD_WEIGHT_USED')):
+            if col in df.columns and df[col].notna().any():
+                self.weights[key] = float(df[col].dropna().iloc[0])
+
+        self._pending: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.columns: Dict[str, np.ndarray] = {}
+        self.version = 0  # bumped on every recompute that changed something
+        self._compute()
+
+    @classmethod
+    def from_csv(cls, benchmark_type: str = 'T', path: Optional[str] = None, bar_root: Optional[str] = BAR_STORE_DIR):
+        df = pd.read_csv(path or UNIVERSE_FILES[benchmark_type])
+        df.columns = [c.strip() for c in df.columns]
+        bar_terms = None
+        if bar_root and os.path.isdir(bar_root):
+            bar_terms = load_bar_terms(df['PREF IBKR'].dropna().astype(str), bar_root)
+        return cls(df, benchmark_type, bar_terms)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def on_quote(self, symbol: str, fields: Dict):
+        """Record the latest tradable price of a universe symbol; safe to call from the IB loop thread"""
+        if symbol not in self.index:
+            return
+        price = live_price(fields.get('bid'), fields.get('ask'), fields.get('last'))
+        if price is not None:
+            with self._lock:
+                self._pending[symbol] = price
+
+    def set_prices(self, prices: Dict[str, float]):
+        for symbol, price in prices.items():
+            self.on_quote(symbol, {'last': price})
+
+    def recompute(self) -> bool:
+        """Apply the pending price batch; returns True if FINAL_THG was recomputed"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        changed = False
+        for symbol, price in pending.items():
+            row = self.index[symbol]
+            if self.price[row] != price:
+                self.price[row] = price
+                changed = True
+        if changed:
+            self._compute()
+        return changed
+
+    def _compute(self):
+        p = self.price
+        px = p - self.div_offset
+        components = {}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for name, length in SMA_WINDOWS.items():
+                sma = (self.sma_base[name] + p) / length
+                components[f'{name}_chg_norm'] = normalize_band((p - sma) / sma * 100, *CHG_BAND)
+            window = self.windows
+            components['6M_High_diff_norm'] = normalize_band(px - np.fmax(window['6M High'], p), *DIFF_BAND)
+            components['6M_Low_diff_norm'] = normalize_band(px - np.fmin(window['6M Low'], p), *DIFF_BAND)
+            components['1Y_High_diff_norm'] = normalize_band(px - np.fmax(window['1Y High'], p), *DIFF_BAND)
+            components['1Y_Low_diff_norm'] = normalize_band(px - np.fmin(window['1Y Low'], p), *DIFF_BAND)
+            if self.formula['reversal']:
+                aug, oct19 = self.reversal_refs
+                components['Aug4_chg_norm'] = normalize_band(px - aug, *DIFF_BAND)
+                components['Oct19_chg_norm'] = normalize_band(px - oct19, *DIFF_BAND)
+            components['SOLIDITY_SCORE'] = self.solidity
+            if self.formula['market_weights']:
+                components['CUR_YIELD'] = np.where(p != 0, 25 * self.coupon / p / 100, np.nan)
+            if self.use_adv:
+                components['AVG_ADV'] = self.adv
+        # The nightly scripts round every input to 2 decimals before the formula
+        c = {name: fill_worst(np.round(values, 2)) for name, values in components.items()}
+        thg = final_thg_score(c, self.formula, self.weights, self.cs_factor)
+        c['FINAL_THG'] = thg
+        order = np.argsort(np.where(np.isnan(thg), -np.inf, -thg), kind='stable')
+        rank = np.empty(len(thg))
+        rank[order] = np.arange(1, len(thg) + 1)
+        c['RANK'] = rank
+        self.columns = c
+        self.version += 1
+
+    def get(self, symbol: str, column: str = 'FINAL_THG') -> Optional[float]:
+        row = self.index.get(symbol)
+        if row is None:
+            return None
+        value = self.columns[column][row]
+        return None if np.isnan(value) else float(value)
+
+    def ranked(self, symbols: Optional[Iterable[str]] = None) -> List[str]:
+        """Symbols (all, or the given subset) ordered by live FINAL_THG, best first; unknown symbols last"""
+        if symbols is None:
+            rows = np.argsort(self.columns['RANK'])
+            return [self.symbols[r] for r in rows]
+        rank = self.columns['RANK']
+        return sorted(symbols, key=lambda s: rank[self.index[s]] if s in self.index else np.inf)
+
+    def frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.columns)
+        df.insert(0, 'PREF IBKR', self.symbols)
+        df.insert(1, 'Live Price', self.price)
+        return df
+
+
+def live_price(bid, ask, last) -> Optional[float]:
+    """Last trade if valid, otherwise the bid/ask midpoint"""
+    def valid(x):
+        return x is not None and x == x and x > 0
+
+    if valid(last):
+        return float(last)
+    if valid(bid) and valid(ask):
+        return (float(bid) + float(ask)) / 2
+    return None
@@ -1,14 +1,15 @@
 import pandas as pd
 from ib_insync import IB, util, Stock
+import asyncio
 import logging
-import time
+
+PORTS = [7497, 7496, 4001]  # TWS ve Gateway portları
 
 def try_connect_ibkr(host='127.0.0.1', client_id=1, timeout=20, readonly=True):
     util.logToConsole(logging.WARNING)
     ib = IB()
-    ports = [7497, 7496, 4001]  # TWS ve Gateway portları
     connected = False
-    for port in ports:
+    for port in PORTS:
         try:
             print(f"Port {port} ile bağlantı deneniyor...")
             ib.connect(host, port, clientId=client_id, readonly=readonly, timeout=timeout)
@@ -26,6 +27,7 @@ class MarketDataManager:
     def __init__(self, connect_on_init=False):
         self.ib = None
         self.connected = False
+        self.runtime = None  # AsyncRuntime whose loop owns self.ib, see attach_runtime()
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         if connect_on_init:
@@ -35,17 +37,50 @@ class MarketDataManager:
         self.active_contracts = {}
         self.market_data = {}
     
+    def attach_runtime(self, runtime):
+        """Run ib_insync on the given AsyncRuntime loop instead of blocking the caller"""
+        self.runtime = runtime
+
+    def _run(self, coro):
+        """Run a coroutine to completion from sync code, on the runtime loop if one is attached"""
+        if self.runtime is not None:
+            return self.runtime.run(coro)
+        return util.run(coro)
+
+    def _on_loop(self, fn, *args):
+        """Call fn on the thread owning the IB socket (ib_insync is not thread-safe)"""
+        if self.runtime is not None:
+            return self.runtime.call(fn, *args)
+        return fn(*args)
+
     def connect(self):
         if not self.connected:
-            self.ib, self.connected = try_connect_ibkr()
-            if self.connected:
-                self.logger.info('Connected to IBKR')
-                # Önce gecikmeli, sonra canlı veri iste
-                self.ib.reqMarketDataType(3)
-                time.sleep(0.2)
-                self.ib.reqMarketDataType(1)
-            else:
-                self.logger.error('IBKR bağlantısı başarısız!')
+            self._run(self.connect_async())
+
+    async def connect_async(self, host='127.0.0.1', client_id=1, timeout=20, readonly=True):
+        if self.connected:
+            return
+        util.logToConsole(logging.WARNING)
+        self.ib = IB()
+        for port in PORTS:
+            try:
+                print(f"Port {port} ile bağlantı deneniyor...")
+                await self.ib.connectAsync(host, port, clientId=client_id, readonly=readonly, timeout=timeout)
+                if self.ib.isConnected():
+                    print(f"IBKR bağlantısı başarılı! Port: {port}")
+                    self.connected = True
+                    break
+            except Exception as e:
+                print(f"Port {port} bağlantı hatası: {e}")
+        if self.connected:
+            self.logger.info('Connected to IBKR')
+            # Önce gecikmeli, sonra canlı veri iste
+            self.ib.reqMarketDataType(3)
+            await asyncio.sleep(0.2)
+            self.ib.reqMarketDataType(1)
+        else:
+            print("Hiçbir IBKR portuna bağlanılamadı! TWS/Gateway açık mı?")
+            self.logger.error('IBKR bağlantısı başarısız!')
     
     def get_historical_tickers(self, start_idx, end_idx):
         """Get tickers from historical data for the given page range."""
@@ -64,23 +99,34 @@ class MarketDataManager:
     
     def subscribe_page_tickers(self, tickers):
         """Subscribe only to tickers on the current page."""
+        self._run(self.subscribe_page_tickers_async(tickers))
+
+    async def subscribe_page_tickers_async(self, tickers):
         self.cancel_unsubscribed_tickers(tickers)
-        for ticker in tickers:
-            if not self.connected:
-                continue
-            if ticker not in self.active_contracts:
-                try:
-                    contract = Stock(ticker, 'SMART', 'USD')
-                    self.ib.qualifyContracts(contract)
-                    self.active_contracts[ticker] = contract
-                    self.ib.reqMktData(contract)
-                    self.logger.info(f"Subscribed to {ticker}")
-                    time.sleep(0.05)  # Flood koruması için kısa bekleme
-                except Exception as e:
-                    self.logger.error(f"Error subscribing to {ticker}: {str(e)}")
+        if not self.connected:
+            return
+        new_contracts = [Stock(ticker, 'SMART', 'USD') for ticker in tickers if ticker not in self.active_contracts]
+        if not new_contracts:
+            return
+        try:
+            # One batched qualify round trip instead of one blocking call per symbol
+            await self.ib.qualifyContractsAsync(*new_contracts)
+        except Exception as e:
+            self.logger.error(f"Error qualifying page tickers: {str(e)}")
+        for contract in new_contracts:
+            try:
+                self.active_contracts[contract.symbol] = contract
+                self.ib.reqMktData(contract)
+                self.logger.info(f"Subscribed to {contract.symbol}")
+                await asyncio.sleep(0.05)  # Flood koruması için kısa bekleme
+            except Exception as e:
+                self.logger.error(f"Error subscribing to {contract.symbol}: {str(e)}")
     
     def cancel_unsubscribed_tickers(self, page_tickers):
         """Cancel subscriptions for tickers not on the current page."""
+        self._on_loop(self._cancel_unsubscribed_tickers, page_tickers)
+
+    def _cancel_unsubscribed_tickers(self, page_tickers):
         to_cancel = [t for t in self.active_contracts if t not in page_tickers]
         for ticker in to_cancel:
             try:
@@ -95,6 +141,9 @@ class MarketDataManager:
         """Get current market data for all active contracts."""
         if not self.connected:
             return {}
+        return self._on_loop(self._get_market_data)
+
+    def _get_market_data(self):
         for ticker, contract in self.active_contracts.items():
             ticker_data = self.ib.ticker(contract)
             if ticker_data:
@@ -110,6 +159,9 @@ class MarketDataManager:
         """Disconnect from IB and clean up."""
         if not self.connected or not self.ib:
             return
+        self._on_loop(self._disconnect)
+
+    def _disconnect(self):
         try:
             # Cancel all market data subscriptions
             for contract in self.active_contracts.values():
@@ -0,0 +1,52 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from hammerib.utils.latency import latency_probe
+
+COLUMNS = ('Span', 'Count', 'Mean (us)', 'p50 (us)', 'p90 (us)', 'p99 (us)', 'p99.9 (us)', 'Max (us)')
+
+class LatencyWindow(tk.Toplevel):
+    def __init__(self, parent, probe=None, refresh_ms=1000):
+        super().__init__(parent)
+        self.title('Latency (quote -> score -> order -> send -> ack)')
+        self.probe = probe or latency_probe
+        self.refresh_ms = refresh_ms
+        self.table = ttk.Treeview(self, columns=COLUMNS, show='headings', height=12)
+        for col in COLUMNS:
+            self.table.heading(col, text=col)
+            self.table.column(col, width=140 if col == 'Span' else 90, anchor='center')
+        self.table.pack(fill='both', expand=True)
+        action_frame = ttk.Frame(self)
+        action_frame.pack(fill='x', pady=4)
+        ttk.Button(action_frame, text='Dosyaya Kaydet', command=self.dump).pack(side='left', padx=2)
+        ttk.Button(action_frame, text='Sıfırla', command=self.reset).pack(side='left', padx=2)
+        self.protocol('WM_DELETE_WINDOW', self.on_close)
+        self._job = None
+        self.refresh()
+
+    def refresh(self):
+        snapshot = self.probe.snapshot()
+        for span, stats in snapshot.items():
+            values = (span, stats['count'], stats['mean_us'], stats['p50_us'], stats['p90_us'],
+                      stats['p99_us'], stats['p999_us'], stats['max_us'])
+            if self.table.exists(span):
+                self.table.item(span, values=values)
+            else:
+                self.table.insert('', 'end', iid=span, values=values)
+        self._job = self.after(self.refresh_ms, self.refresh)
+
+    def dump(self):
+        try:
+            path = self.probe.dump()
+            messagebox.showinfo('Latency', f"Histogramlar kaydedildi: {path}")
+        except Exception as e:
+            messagebox.showerror('Latency', f"Kaydedilemedi: {e}")
+
+    def reset(self):
+        self.probe.reset()
+        self.table.delete(*self.table.get_children())
+
+    def on_close(self):
+        if self._job:
+            self.after_cancel(self._job)
+            self._job = None
+        self.destroy()
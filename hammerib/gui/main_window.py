@@ -1,24 +1,32 @@
 import tkinter as tk
 from tkinter import ttk
-import threading
 import pandas as pd
 from hammerib.ib_api.manager import IBKRManager, ETF_SYMBOLS
-import time
+from hammerib.hib_core.runtime import AsyncRuntime
 from hammerib.gui.etf_panel import ETFPanel
 from hammerib.gui.opt_buttons import create_opt_buttons
 from hammerib.gui.benchmark_panel import BenchmarkPanel
-from hammerib.gui.maltopla_window import MaltoplaWindow
+from hammerib.gui.maltopla_window import MaltoplaWindow, LIVE_THG_REFRESH_MS
 from hammerib.gui.pos_orders_buttons import create_pos_orders_buttons
 from hammerib.gui.top_movers_buttons import create_top_movers_buttons
 from hammerib.gui.orderable_table import OrderableTableFrame
+from hammerib.gui.latency_window import LatencyWindow
+from hammerib.gui.tk_bridge import TkBridge
+from hammerib.utils.latency import latency_probe
+from hammerib.data.live_thg import LiveFinalThg
 
 class MainWindow(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Stock Tracker Modular")
+        # ib_insync runs on the runtime loop thread; widgets are only touched here, via the bridge
+        self.runtime = AsyncRuntime().start()
+        self.bridge = TkBridge(self)
         self.ibkr = IBKRManager()
+        self.ibkr.attach_runtime(self.runtime)
         self.historical_tickers = pd.read_csv('historical_data.csv')['PREF IBKR'].dropna().tolist()
         self.extended_tickers = pd.read_csv('extlthistorical.csv')['PREF IBKR'].dropna().tolist()
+        self.live_thg = {}  # 'T'/'C' -> LiveFinalThg, shared by all windows
         self.items_per_page = 20
         self.historical_page = 0
         self.extended_page = 0
@@ -33,8 +41,9 @@ class MainWindow(tk.Tk):
         self.historical_benchmark.pack(fill='x', padx=5, pady=5)
         self.extended_benchmark = BenchmarkPanel(self.extended_frame)
         self.extended_benchmark.pack(fill='x', padx=5, pady=5)
-        self.data_thread = None
+        self.data_job = None
         self.after(1000, self.update_etf_panel)
+        self.protocol('WM_DELETE_WINDOW', self.close)
 
     def setup_ui(self):
         top = ttk.Frame(self)
@@ -50,6 +59,8 @@ class MainWindow(tk.Tk):
         self.btn_take_profit_longs.pack(side='left', padx=2)
         self.btn_take_profit_shorts = ttk.Button(top, text='Take Profit Shorts', command=self.open_take_profit_shorts_window)
         self.btn_take_profit_shorts.pack(side='left', padx=2)
+        self.btn_latency = ttk.Button(top, text='Latency', command=self.open_latency_window)
+        self.btn_latency.pack(side='left', padx=2)
         self.status_label = ttk.Label(top, text="Durum: Bekleniyor")
         self.status_label.pack(side='left', padx=10)
         self.notebook = ttk.Notebook(self)
@@ -88,12 +99,18 @@ class MainWindow(tk.Tk):
         return {'frame': nav, 'btn_prev': btn_prev, 'btn_next': btn_next, 'lbl': lbl}
 
     def connect_ibkr(self):
-        self.ibkr.connect()
+        self.status_label.config(text="Durum: IBKR'ye bağlanıyor...")
+        self.bridge.submit(self.runtime, self.ibkr.connect_async(),
+                           on_done=self.on_ibkr_connected, on_error=self.on_ibkr_error)
+
+    def on_ibkr_connected(self, _=None):
         self.status_label.config(text="Durum: IBKR'ye bağlı")
         self.subscribe_visible()
-        if not self.data_thread:
-            self.data_thread = threading.Thread(target=self.update_data_loop, daemon=True)
-            self.data_thread.start()
+        if not self.data_job:
+            self.update_data_loop()
+
+    def on_ibkr_error(self, exc):
+        self.status_label.config(text=f"Durum: Bağlantı hatası ({exc})")
 
     def subscribe_visible(self):
         if not self.ibkr.connected:
@@ -102,8 +119,7 @@ class MainWindow(tk.Tk):
             tickers = self.get_visible_tickers(self.historical_tickers, self.historical_page)
         else:
             tickers = self.get_visible_tickers(self.extended_tickers, self.extended_page)
-        self.ibkr.clear_subscriptions()
-        self.ibkr.subscribe_tickers(tickers)
+        self.bridge.submit(self.runtime, self.ibkr.resubscribe_async(tickers))
 
     def get_visible_tickers(self, ticker_list, page):
         start = page * self.items_per_page
@@ -125,28 +141,28 @@ class MainWindow(tk.Tk):
             table.insert('', 'end', values=(ticker, 'N/A', 'N/A', 'N/A', 'N/A'))
 
     def update_data_loop(self):
-        while True:
-            if self.active_tab == 0:
-                tickers = self.get_visible_tickers(self.historical_tickers, self.historical_page)
-                table = self.historical_table
-                benchmark_panel = self.historical_benchmark
-            else:
-                tickers = self.get_visible_tickers(self.extended_tickers, self.extended_page)
-                table = self.extended_table
-                benchmark_panel = self.extended_benchmark
-            data = self.ibkr.get_market_data(tickers)
-            for item in table.get_children():
-                try:
-                    ticker = table.item(item)['values'][0]
-                    d = data.get(ticker)
-                    if d:
-                        table.item(item, values=(ticker, d['bid'], d['ask'], d['last'], d['volume']))
-                except tk.TclError:
-                    # Item not found, skip
-                    pass
-            benchmark_data = self.ibkr.calculate_benchmarks()
-            benchmark_panel.update(benchmark_data)
-            time.sleep(1)
+        # Runs on the Tk thread every second; ticker objects are updated in place by the IB loop
+        if self.active_tab == 0:
+            tickers = self.get_visible_tickers(self.historical_tickers, self.historical_page)
+            table = self.historical_table
+            benchmark_panel = self.historical_benchmark
+        else:
+            tickers = self.get_visible_tickers(self.extended_tickers, self.extended_page)
+            table = self.extended_table
+            benchmark_panel = self.extended_benchmark
+        data = self.ibkr.get_market_data(tickers)
+        for item in table.get_children():
+            try:
+                ticker = table.item(item)['values'][0]
+                d = data.get(ticker)
+                if d:
+                    table.item(item, values=(ticker, d['bid'], d['ask'], d['last'], d['volume']))
+            except tk.TclError:
+                # Item not found, skip
+                pass
+        benchmark_data = self.ibkr.calculate_benchmarks()
+        benchmark_panel.update(benchmark_data)
+        self.data_job = self.after(1000, self.update_data_loop)
 
     def prev_historical(self):
         if self.historical_page > 0:
@@ -191,8 +207,13 @@ class MainWindow(tk.Tk):
         self.mainloop()
 
     def close(self):
+        if self.data_job:
+            self.after_cancel(self.data_job)
+            self.data_job = None
+        self.bridge.close()
         if self.ibkr:
             self.ibkr.disconnect()
+        self.runtime.stop()
         self.destroy()
 
     def open_extlt35_window(self):
@@ -244,6 +265,26 @@ class MainWindow(tk.Tk):
     def open_extlt35_maltopla_window(self):
         MaltoplaWindow(self, self.ibkr, 'optimized_35_extlt.csv', 'C')
 
+    def get_live_thg(self, benchmark_type):
+        """Live FINAL_THG engine of the T or C universe (created on first use, fed by every quote)"""
+        engine = self.live_thg.get(benchmark_type)
+        if engine is None:
+            try:
+                engine = LiveFinalThg.from_csv(benchmark_type)
+            except Exception as e:
+                print(f"! {benchmark_type} canlı FINAL_THG yüklenemedi: {e}")
+                return None
+            for symbol, entry in list(self.ibkr.tickers.items()):
+                t = entry.get('ticker')
+                if t is not None:
+                    engine.on_quote(symbol, {'bid': t.bid, 'ask': t.ask, 'last': t.last})
+            self.ibkr.add_quote_listener(engine.on_quote)
+            self.live_thg[benchmark_type] = engine
+        return engine
+
+    def open_latency_window(self):
+        LatencyWindow(self)
+
     def open_positions_window(self):
         win = tk.Toplevel(self)
         win.title('Pozisyonlarım')
@@ -299,7 +340,7 @@ class MainWindow(tk.Tk):
         win.title(f"{pref_type}-{'çok düşenler' if direction=='losers' else 'çok yükselenler'}")
         etf_panel = ETFPanel(win, ETF_SYMBOLS, compact=True)
         etf_panel.pack(fill='x', padx=2, pady=2)
-        columns = ('Seç', 'Ticker', 'Bid', 'Ask', 'Last', 'Prev Close', 'TP Price', 'CPF', 'Skor')
+        columns = ('Seç', 'Ticker', 'Bid', 'Ask', 'Last', 'Prev Close', 'TP Price', 'CPF', 'Skor', 'FINAL_THG')
         table = ttk.Treeview(win, columns=columns, show='headings')
         for col in columns:
             table.heading(col, text=col)
@@ -308,6 +349,9 @@ class MainWindow(tk.Tk):
         checked = set()
         items_per_page = 20
         page = [0]
+        live_thg = self.get_live_thg(pref_type)
+        sort_by = ['skor']  # 'skor' ya da canlı 'FINAL_THG'
+        thg_version = [None]
         if pref_type == 'T':
             tickers = self.historical_tickers
         else:
@@ -343,6 +387,7 @@ class MainWindow(tk.Tk):
                     tp_price = 'N/A'
                     cpf = 'N/A'
                     skor = -99999
+                final_thg = live_thg.get(symbol) if live_thg else None
                 scored_tickers.append({
                     'symbol': symbol,
                     'bid': bid,
@@ -351,12 +396,16 @@ class MainWindow(tk.Tk):
                     'prev_close': prev_close,
                     'tp_price': tp_price,
                     'cpf': cpf,
-                    'skor': skor
+                    'skor': skor,
+                    'final_thg': final_thg if final_thg is not None else 'N/A'
                 })
+            if sort_by[0] == 'FINAL_THG':
+                return sorted(scored_tickers, key=lambda x: x['final_thg'] if x['final_thg'] != 'N/A' else float('-inf'), reverse=True)
             return sorted(scored_tickers, key=lambda x: x['skor'], reverse=True)
         def populate():
             table.delete(*table.get_children())
-            scored_tickers = calculate_scores()
+            with latency_probe.timed('score_pass'):
+                scored_tickers = calculate_scores()
             start = page[0] * items_per_page
             end = min(start + items_per_page, len(scored_tickers))
             for ticker in scored_tickers[start:end]:
@@ -364,9 +413,29 @@ class MainWindow(tk.Tk):
                 table.insert('', 'end', iid=ticker['symbol'], values=(
                     sel, ticker['symbol'], ticker['bid'], ticker['ask'],
                     ticker['last'], ticker['prev_close'], ticker['tp_price'],
-                    ticker['cpf'], ticker['skor']
+                    ticker['cpf'], ticker['skor'], ticker['final_thg']
                 ))
             nav_lbl.config(text=f'Page {page[0]+1} / {max(1, (len(scored_tickers)-1)//items_per_page+1)}')
+        def toggle_thg_sort():
+            sort_by[0] = 'skor' if sort_by[0] == 'FINAL_THG' else 'FINAL_THG'
+            table.heading('FINAL_THG', text='FINAL_THG ▼' if sort_by[0] == 'FINAL_THG' else 'FINAL_THG')
+            populate()
+        table.heading('FINAL_THG', command=toggle_thg_sort)
+        def refresh_live_thg():
+            # Her yeni fiyat grubunda FINAL_THG kolonunu güncelle; FINAL_THG sıralamasında tabloyu yeniden sırala
+            if not win.winfo_exists():
+                return
+            if live_thg is not None:
+                live_thg.recompute()
+                if live_thg.version != thg_version[0]:
+                    thg_version[0] = live_thg.version
+                    if sort_by[0] == 'FINAL_THG':
+                        populate()
+                    else:
+                        for symbol in table.get_children():
+                            value = live_thg.get(symbol)
+                            table.set(symbol, 'FINAL_THG', value if value is not None else 'N/A')
+            win.after(LIVE_THG_REFRESH_MS, refresh_live_thg)
         def on_table_click(event):
             region = table.identify('region', event.x, event.y)
             if region != 'cell': return
@@ -415,11 +484,13 @@ class MainWindow(tk.Tk):
                 else:
                     price = round(ask - spread * 0.15, 2)
                     action = 'SELL'
+                latency_probe.mark(symbol, 'score')
                 contract = Stock(symbol, 'SMART', 'USD')
                 order = LimitOrder(action, 200, price)
                 order.hidden = True
+                latency_probe.mark(symbol, 'order')
                 try:
-                    self.ibkr.ib.placeOrder(contract, order)
+                    self.ibkr.place_order(contract, order)
                     sent += 1
                 except Exception as e:
                     errors.append(f"{symbol}: {e}")
@@ -443,6 +514,7 @@ class MainWindow(tk.Tk):
             win.after(1000, update_etf_panel)
         update_etf_panel()
         populate()
+        refresh_live_thg()
 
     def toggle_loop(self):
         if self.loop_running:
@@ -622,11 +694,13 @@ class MainWindow(tk.Tk):
                     continue
                 spread = ask - bid
                 price = round(ask - spread * 0.15, 2)
+                latency_probe.mark(symbol, 'score')
                 contract = Stock(symbol, 'SMART', 'USD')
                 order = LimitOrder('SELL', 200, price)
                 order.hidden = True
+                latency_probe.mark(symbol, 'order')
                 try:
-                    self.ibkr.ib.placeOrder(contract, order)
+                    self.ibkr.place_order(contract, order)
                     sent += 1
                 except Exception as e:
                     errors.append(f"{symbol}: {e}")
@@ -778,11 +852,13 @@ class MainWindow(tk.Tk):
                     continue
                 spread = ask - bid
                 price = round(bid + spread * 0.15, 2)
+                latency_probe.mark(symbol, 'score')
                 contract = Stock(symbol, 'SMART', 'USD')
                 order = LimitOrder('BUY', 200, price)
                 order.hidden = True
+                latency_probe.mark(symbol, 'order')
                 try:
-                    self.ibkr.ib.placeOrder(contract, order)
+                    self.ibkr.place_order(contract, order)
                     sent += 1
                 except Exception as e:
                     errors.append(f"{symbol}: {e}")
@@ -7,6 +7,9 @@ from hammerib.gui.etf_panel import ETFPanel
 from hammerib.ib_api.manager import ETF_SYMBOLS
 from ib_insync import LimitOrder, Stock  # GEREKLİ İMPORT
 from tkinter import messagebox  # messagebox fix
+from hammerib.utils.latency import latency_probe
+
+LIVE_THG_REFRESH_MS = 250  # canlı FINAL_THG yeniden hesaplama/sıralama aralığı
 
 CHECKED = '\u2611'  # ☑
 UNCHECKED = '\u2610'  # ☐
@@ -16,6 +19,9 @@ class MaltoplaWindow(tk.Toplevel):
         super().__init__(parent)
         self.title(f"{csv_path} Maltopla Analiz")
         self.ibkr = ibkr_manager
+        # Ticker events fire on the IB runtime thread; the parent's TkBridge brings them to the Tk thread
+        self.bridge = getattr(parent, 'bridge', None)
+        self.runtime = getattr(parent, 'runtime', None)
         self.csv_path = csv_path
         self.benchmark_type = benchmark_type  # 'T' or 'C'
         self.ticker_info = self.load_tickers_info()  # symbol -> dict with csv data
@@ -26,6 +32,11 @@ class MaltoplaWindow(tk.Toplevel):
         self.ticker_cache = {}  # symbol -> data dict
         self.ticker_handlers = {}  # symbol -> handler ref
         self.checked_tickers = set()
+        # Live FINAL_THG engine shared through the main window; fed by every streamed quote
+        self.live_thg = parent.get_live_thg(benchmark_type) if hasattr(parent, 'get_live_thg') else None
+        self.sort_by = 'skor'  # 'skor' or live 'FINAL_THG'
+        self._thg_version = None
+        self._thg_job = None
         self.etf_panel = ETFPanel(self, ETF_SYMBOLS, compact=True)
         self.etf_panel.pack(fill='x', padx=2, pady=2)
         self.after(1000, self.update_etf_panel)
@@ -36,6 +47,7 @@ class MaltoplaWindow(tk.Toplevel):
                     'FINAL_THG', 'Final_Shares', 'Mevcut Shares'):
             self.table.heading(col, text=col)
             self.table.column(col, width=90 if col=='Seç' else 110, anchor='center')
+        self.table.heading('FINAL_THG', command=self.toggle_thg_sort)
         self.table.pack(fill='both', expand=True)
         self.table.bind('<Button-1>', self.on_table_click)
         # Selection buttons
@@ -69,6 +81,7 @@ class MaltoplaWindow(tk.Toplevel):
         self._running = True
         self.subscribe_visible()
         self.populate_table_from_cache()
+        self.refresh_live_thg()
 
     def load_tickers_info(self):
         info = {}
@@ -105,14 +118,31 @@ class MaltoplaWindow(tk.Toplevel):
                         ticker_obj.updateEvent -= handler
                     except Exception:
                         pass
-        # Subscribe new
-        self.ibkr.subscribe_tickers(self.get_visible_tickers())
+        # Subscribe new; qualify round trip runs on the IB runtime, handlers attach on the Tk thread when it is done
+        if self.bridge and self.runtime:
+            self.bridge.submit(self.runtime, self.ibkr.subscribe_tickers_async(self.get_visible_tickers()),
+                               on_done=self._attach_visible_handlers)
+            self.populate_table_from_cache()  # new page shows cached rows until the subscription is up
+        else:
+            self.ibkr.subscribe_tickers(self.get_visible_tickers())
+            self._attach_visible_handlers()
+
+    def _attach_visible_handlers(self, _=None):
+        try:
+            if not self.winfo_exists():
+                return
+        except tk.TclError:
+            return  # window closed while subscribing
+        # Page may have changed while subscribing; attach to whatever is visible now
         for symbol in self.get_visible_tickers():
             ticker_obj = self.ibkr.tickers.get(symbol, {}).get('ticker')
             if ticker_obj and symbol not in self.ticker_handlers:
                 def make_handler(sym):
                     def handler(ticker):
-                        self.on_ticker_update(sym, ticker)
+                        if self.bridge:
+                            self.bridge.post(self.on_ticker_update, sym, ticker)
+                        else:
+                            self.on_ticker_update(sym, ticker)
                     return handler
                 handler = make_handler(symbol)
                 ticker_obj.updateEvent += handler
@@ -129,9 +159,42 @@ class MaltoplaWindow(tk.Toplevel):
             'prev_close': prev_close,
             'timestamp': time.time()
         }
-        self.update_row(symbol)
+        with latency_probe.timed('tk_row_update'):
+            self.update_row(symbol)
+
+    def toggle_thg_sort(self):
+        self.sort_by = 'skor' if self.sort_by == 'FINAL_THG' else 'FINAL_THG'
+        self.table.heading('FINAL_THG', text='FINAL_THG ▼' if self.sort_by == 'FINAL_THG' else 'FINAL_THG')
+        self.page = 0
+        self.populate_table_from_cache()
+
+    def refresh_live_thg(self):
+        """Coalesce the quotes received since the last tick into one FINAL_THG recompute"""
+        if not self._running:
+            return
+        if self.live_thg is not None:
+            self.live_thg.recompute()
+            if self.live_thg.version != self._thg_version:
+                self._thg_version = self.live_thg.version
+                if self.sort_by == 'FINAL_THG':
+                    self.populate_table_from_cache()
+                else:
+                    for symbol in self.table.get_children():
+                        self.insert_or_update_row(symbol)
+        self._thg_job = self.after(LIVE_THG_REFRESH_MS, self.refresh_live_thg)
+
+    def live_final_thg(self, symbol):
+        """Live FINAL_THG if the engine knows the symbol, otherwise the nightly CSV value"""
+        value = self.live_thg.get(symbol) if self.live_thg is not None else None
+        if value is None:
+            return self.ticker_info.get(symbol, {}).get('FINAL_THG', '')
+        return value
 
     def populate_table_from_cache(self):
+        with latency_probe.timed('tk_populate'):
+            self._populate_table_from_cache()
+
+    def _populate_table_from_cache(self):
         self.table.delete(*self.table.get_children())
         # Tüm tickerlar için skor hesapla
         scored_tickers = []
@@ -169,8 +232,18 @@ class MaltoplaWindow(tk.Toplevel):
                 'cpf': cpf if 'cpf' in locals() else 'N/A',
                 'skor': skor
             })
-        # Skor'a göre yüksekten düşüğe sırala
-        scored_tickers.sort(key=lambda x: x['skor'], reverse=True)
+        if self.sort_by == 'FINAL_THG':
+            # Canlı FINAL_THG'ye göre sırala; değeri olmayanlar en altta
+            def thg_key(x):
+                value = self.live_final_thg(x['symbol'])
+                try:
+                    return float(value)
+                except (TypeError, ValueError):
+                    return float('-inf')
+            scored_tickers.sort(key=thg_key, reverse=True)
+        else:
+            # Skor'a göre yüksekten düşüğe sırala
+            scored_tickers.sort(key=lambda x: x['skor'], reverse=True)
         # Sadece görünen sayfadaki tickerları göster
         start = self.page * self.items_per_page
         end = min(start + self.items_per_page, len(scored_tickers))
@@ -215,8 +288,8 @@ class MaltoplaWindow(tk.Toplevel):
             tp_price = 'N/A'
             cpf = 'N/A'
             skor = 'N/A'
-        # CSV'den FINAL_THG ve Final_Shares
-        final_thg = self.ticker_info.get(symbol, {}).get('FINAL_THG', '')
+        # Canlı FINAL_THG (yoksa CSV'deki gece değeri) ve CSV'den Final_Shares
+        final_thg = self.live_final_thg(symbol)
         final_shares = self.ticker_info.get(symbol, {}).get('Final_Shares', '')
         # Mevcut Shares (IBKR pozisyonlarından)
         mevcut_shares = 0
@@ -295,10 +368,12 @@ class MaltoplaWindow(tk.Toplevel):
                 bid = float(bid)
                 ask = float(ask)
                 price = round(bid + (ask - bid) * 0.15, 2)
+                latency_probe.mark(symbol, 'score')
                 contract = Stock(symbol, 'SMART', 'USD')
                 order = LimitOrder('BUY', 200, price)
                 order.hidden = True
-                self.ibkr.ib.placeOrder(contract, order)
+                latency_probe.mark(symbol, 'order')
+                self.ibkr.place_order(contract, order)
                 sent_orders += 1
             except Exception as e:
                 errors.append(f"{symbol}: {e}")
@@ -325,10 +400,12 @@ class MaltoplaWindow(tk.Toplevel):
                 bid = float(bid)
                 ask = float(ask)
                 price = round(ask - (ask - bid) * 0.15, 2)
+                latency_probe.mark(symbol, 'score')
                 contract = Stock(symbol, 'SMART', 'USD')
                 order = LimitOrder('SELL', 200, price)
                 order.hidden = True
-                self.ibkr.ib.placeOrder(contract, order)
+                latency_probe.mark(symbol, 'order')
+                self.ibkr.place_order(contract, order)
                 sent_orders += 1
             except Exception as e:
                 errors.append(f"{symbol}: {e}")
@@ -344,6 +421,11 @@ class MaltoplaWindow(tk.Toplevel):
 
     def on_close(self):
         self._running = False
+        if self._thg_job is not None:
+            try:
+                self.after_cancel(self._thg_job)
+            except Exception:
+                pass
         # Unsubscribe all event handlers
         for symbol, handler in self.ticker_handlers.items():
             ticker_obj = self.ibkr.tickers.get(symbol, {}).get('ticker')
@@ -353,7 +435,10 @@ class MaltoplaWindow(tk.Toplevel):
                 except Exception:
                     pass
         self.ticker_handlers.clear()
-        if self.ibkr and hasattr(self.ibkr, 'clear_subscriptions'):
+        # Cancel on the IB runtime without waiting; the Tk thread must not block on the IB loop
+        if self.bridge and self.runtime and hasattr(self.ibkr, 'clear_subscriptions_async'):
+            self.bridge.submit(self.runtime, self.ibkr.clear_subscriptions_async())
+        elif self.ibkr and hasattr(self.ibkr, 'clear_subscriptions'):
             self.ibkr.clear_subscriptions()
         self.destroy()
 
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from ib_insync import LimitOrder, Stock
 import time
+from hammerib.utils.latency import latency_probe
 
 CHECKED = '\u2611'  # ☑
 UNCHECKED = '\u2610'  # ☐
@@ -126,10 +127,12 @@ class OrderableTableFrame(ttk.Frame):
                 bid = float(bid)
                 ask = float(ask)
                 price = price_func(bid, ask)
+                latency_probe.mark(symbol, 'score')
                 contract = Stock(symbol, 'SMART', 'USD')
                 order = LimitOrder(order_type, 200, price)
                 order.hidden = True
-                self.ibkr.ib.placeOrder(contract, order)
+                latency_probe.mark(symbol, 'order')
+                self.ibkr.place_order(contract, order)
                 sent_orders += 1
             except Exception as e:
                 errors.append(f"{symbol}: {e}")
@@ -0,0 +1,66 @@
+import queue
+import tkinter as tk
+from typing import Awaitable, Callable, Optional
+
+class TkBridge:
+    """Thread-safe hand-off of callbacks to the Tk main thread.
+
+    Tk widgets may only be touched from the thread running mainloop(). Other
+    threads (the AsyncRuntime loop) post callables here; the Tk thread drains
+    them every `interval_ms` with after().
+    """
+
+    def __init__(self, root: tk.Misc, interval_ms: int = 20):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._calls = queue.SimpleQueue()
+        self._job = None
+        self._closed = False
+        self._job = self.root.after(self.interval_ms, self._drain)
+
+    def post(self, fn: Callable, *args):
+        """Run fn(*args) on the Tk thread; safe to call from any thread"""
+        if not self._closed:
+            self._calls.put((fn, args))
+
+    def submit(self, runtime, coro: Awaitable, on_done: Optional[Callable] = None,
+               on_error: Optional[Callable] = None):
+        """Run a coroutine on the runtime loop and deliver its result (or error) on the Tk thread"""
+        future = runtime.submit(coro)
+
+        def done(f):
+            if f.cancelled():
+                return
+            exc = f.exception()
+            if exc is not None:
+                if on_error:
+                    self.post(on_error, exc)
+                else:
+                    print(f"! Arka plan işlemi hatası: {exc}")
+            elif on_done:
+                self.post(on_done, f.result())
+
+        future.add_done_callback(done)
+        return future
+
+    def _drain(self):
+        while True:
+            try:
+                fn, args = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"! Tk callback hatası: {e}")
+        if not self._closed:
+            self._job = self.root.after(self.interval_ms, self._drain)
+
+    def close(self):
+        self._closed = True
+        if self._job is not None:
+            try:
+                self.root.after_cancel(self._job)
+            except tk.TclError:
+                pass
+            self._job = None
@@ -0,0 +1,27 @@
+import time
+from typing import Any, Dict, Optional
+
+# Event kinds handled by the TradingOrchestrator
+QUOTE = "quote"          # key: symbol, data: latest merged quote fields
+ORDER = "order"          # key: clOrdId, data: order dict
+POSITION = "position"    # key: symbol, data: position dict
+BALANCE = "balance"      # key: currency, data: balance dict
+TIMER = "timer"          # key: timer name, data: None
+
+EVENT_KINDS = (QUOTE, ORDER, POSITION, BALANCE, TIMER)
+
+# Dispatch order within a batch: account state first so strategies see fresh positions for the quotes that follow
+BATCH_PRIORITY = {ORDER: 0, POSITION: 1, BALANCE: 2, TIMER: 3, QUOTE: 4}
+
+class Event:
+    """A typed event with the perf_counter_ns timestamp it was posted at"""
+    __slots__ = ("kind", "key", "data", "ts")
+
+    def __init__(self, kind: str, key: Any, data: Optional[Dict] = None, ts: Optional[int] = None):
+        self.kind = kind
+        self.key = key
+        self.data = data
+        self.ts = ts if ts is not None else time.perf_counter_ns()
+
+    def __repr__(self):
+        return f"Event({self.kind}, {self.key!r})"
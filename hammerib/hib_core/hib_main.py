@@ -7,7 +7,8 @@ from typing import Dict
 import json
 
 from ..alaric_api.client import HammerClient
-from ..ib_api.client import IBClient
+from ..config import settings
+from ..ib_api.manager import IBKRManager
 from ..strategies.basic_strategy import BasicStrategy
 from .orchestrator import TradingOrchestrator
 
@@ -42,22 +43,27 @@ class TradingSystem:
             self.orchestrator.hammer_client = HammerClient(
                 api_key=hammer_config.get('api_key'),
                 api_secret=hammer_config.get('api_secret'),
-                base_url=hammer_config.get('base_url')
+                base_url=hammer_config.get('base_url', settings.ALARIC_WEBSOCKET_URL),
+                account=hammer_config.get('account')
             )
 
-            # Initialize IBKR client
+            # Initialize IBKR client: ib_insync runs on this asyncio loop next to the Hammer socket
             ib_config = self.config.get('ibkr', {})
-            self.orchestrator.ib_client = IBClient()
-            self.orchestrator.ib_client.connect_and_start(
-                host=ib_config.get('host', '127.0.0.1'),
-                port=ib_config.get('port', 7497),
+            ibkr = IBKRManager()
+            await ibkr.connect_async(
+                host=ib_config.get('host', settings.IB_HOST),
+                port=ib_config.get('port', settings.IB_PORT),
                 client_id=ib_config.get('client_id', 1)
             )
+            if ib_config.get('symbols'):
+                await ibkr.subscribe_tickers_async(ib_config['symbols'])
+            self.orchestrator.ib_client = ibkr
 
             # Initialize strategies
             for strategy_config in self.config.get('strategies', []):
                 strategy = BasicStrategy(strategy_config['name'])
                 self.strategies[strategy_config['name']] = strategy
+                self.orchestrator.add_strategy(strategy)
 
             # Initialize orchestrator
             await self.orchestrator.initialize()
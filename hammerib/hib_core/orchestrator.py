@@ -1,9 +1,24 @@
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional
 import asyncio
 import logging
-from datetime import datetime
+import time
+
+from hammerib.alaric_api.correlation import RequestIdGenerator
+from hammerib.utils.latency import latency_probe
+from . import events
+from .events import Event
 
 class TradingOrchestrator:
+    """Event-driven trading loop.
+
+    IB quotes, Hammer order/position/balance changes and timers are posted as
+    typed events onto one asyncio queue; the loop wakes only when something
+    happens, drains everything queued as a batch and hands it to the
+    registered handlers and strategies. Quotes are coalesced per symbol, so a
+    burst of ticks for one symbol costs one strategy evaluation on its latest
+    state. Events may be posted from other threads via the *_threadsafe methods.
+    """
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.hammer_client = None  # Will be initialized with Hammer API client
@@ -12,91 +27,232 @@ class TradingOrchestrator:
         self.market_data: Dict = {}
         self.balances: Dict = {}
         self.orders: Dict = {}
+        self.strategies: List = []
+        self.handlers: Dict[str, List[Callable]] = {kind: [] for kind in events.EVENT_KINDS}
         self.is_running = False
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.events: Optional[asyncio.Queue] = None
+        self._quote_buffer: Dict[str, Dict] = {}  # symbol -> fields not yet dispatched
+        self._timers: Dict[str, asyncio.Task] = {}
+        self._order_tasks = set()
+        self.order_ids = RequestIdGenerator()  # clOrdIds while no Hammer client is attached
+        self._initialized = False
+        self.stats = {
+            "events": 0,
+            "batches": 0,
+            "quotes_coalesced": 0,
+            "max_batch": 0,
+            "handler_errors": 0,
+        }
 
     async def initialize(self):
-        """Initialize both API clients and establish connections"""
+        """Connect the API clients and wire their updates into the event queue"""
         try:
+            self.loop = asyncio.get_running_loop()
+            if self.events is None:
+                self.events = asyncio.Queue()
+
             if self.hammer_client:
                 await self.hammer_client.connect()
-                
-                # Register callbacks for Hammer API updates
-                self.hammer_client.register_callback("positions_update", self._handle_positions_update)
-                self.hammer_client.register_callback("balances_update", self._handle_balances_update)
-                self.hammer_client.register_callback("orders_update", self._handle_orders_update)
-                
-                # Get initial data
-                self.active_positions = await self.hammer_client.get_positions()
-                self.balances = await self.hammer_client.get_balances()
-                self.orders = await self.hammer_client.get_orders()
-            
-            if self.ib_client:
-                # Initialize IBKR client
-                pass
-                
+
+                # Manager change callbacks fire on the loop thread for every applied diff
+                self.hammer_client.positions.register_callback("position_changed", self._on_position_changed)
+                self.hammer_client.balances.register_callback("balance_changed", self._on_balance_changed)
+                for event_type in ("order_added", "order_status_changed", "order_updated"):
+                    self.hammer_client.orders.register_callback(event_type, self._on_order_changed)
+
+                # Snapshot whatever the connect-time reconciliation already applied
+                self.active_positions = dict(self.hammer_client.get_all_positions())
+                self.balances = dict(self.hammer_client.get_all_balances())
+                self.orders = dict(self.hammer_client.orders.get_all_orders())
+
+            if self.ib_client and hasattr(self.ib_client, "add_quote_listener"):
+                # IBKRManager driven by ib_insync on this same loop: no thread hop
+                self.ib_client.add_quote_listener(self.post_quote)
+            elif self.ib_client and hasattr(self.ib_client, "register_callback"):
+                # IBClient calls back from its own reader thread
+                self.ib_client.register_callback("price_update", self._on_ib_tick)
+                self.ib_client.register_callback("size_update", self._on_ib_tick)
+
+            self._initialized = True
             self.is_running = True
             self.logger.info("Trading Orchestrator initialized successfully")
         except Exception as e:
             self.logger.error(f"Failed to initialize Trading Orchestrator: {str(e)}")
             raise
 
-    def _handle_positions_update(self, positions: Dict):
-        """Handle position updates from Hammer API"""
-        self.active_positions = positions
-        self.logger.info(f"Positions updated: {positions}")
+    def add_strategy(self, strategy):
+        """Feed a strategy quote and position events and route its orders to Hammer"""
+        strategy.order_handler = self.submit_strategy_order
+        self.strategies.append(strategy)
+
+    def subscribe(self, kind: str, handler: Callable[[Event], None]):
+        """Register a handler called with each Event of the given kind"""
+        self.handlers[kind].append(handler)
+
+    # --- event producers ---
+
+    def post(self, event: Event):
+        """Queue an event (loop thread only)"""
+        if self.events is None:
+            self.events = asyncio.Queue()
+        self.events.put_nowait(event)
 
-    def _handle_balances_update(self, balances: Dict):
-        """Handle balance updates from Hammer API"""
-        self.balances = balances
-        self.logger.info(f"Balances updated: {balances}")
+    def post_quote(self, symbol: str, fields: Dict):
+        """Queue a quote update; updates for a symbol already queued are merged into it"""
+        latency_probe.mark(symbol, "quote")
+        pending = self._quote_buffer.get(symbol)
+        if pending is not None:
+            pending.update(fields)
+            self.stats["quotes_coalesced"] += 1
+            return
+        self._quote_buffer[symbol] = dict(fields)
+        self.post(Event(events.QUOTE, symbol))
 
-    def _handle_orders_update(self, orders: Dict):
-        """Handle order updates from Hammer API"""
-        self.orders = orders
-        self.logger.info(f"Orders updated: {orders}")
+    def post_threadsafe(self, event: Event):
+        """Queue an event from another thread"""
+        self.loop.call_soon_threadsafe(self.post, event)
+
+    def post_quote_threadsafe(self, symbol: str, fields: Dict):
+        """Queue a quote update from another thread"""
+        self.loop.call_soon_threadsafe(self.post_quote, symbol, fields)
+
+    def add_timer(self, name: str, interval: float):
+        """Post a TIMER event named `name` every `interval` seconds"""
+        self.cancel_timer(name)
+        self._timers[name] = asyncio.create_task(self._timer(name, interval), name=f"timer-{name}")
+
+    def cancel_timer(self, name: str):
+        task = self._timers.pop(name, None)
+        if task:
+            task.cancel()
+
+    async def _timer(self, name: str, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.post(Event(events.TIMER, name))
+
+    def _on_ib_tick(self, symbol: str, field: str, value):
+        self.post_quote_threadsafe(symbol, {field: value})
+
+    def _on_position_changed(self, symbol: str, position: Dict, old_position: Dict):
+        self.post(Event(events.POSITION, symbol, position))
+
+    def _on_balance_changed(self, currency: str, balance: Optional[Dict], old_balance: Optional[Dict]):
+        self.post(Event(events.BALANCE, currency, balance))
+
+    def _on_order_changed(self, cl_ord_id: str, order: Dict, old_status: Optional[str]):
+        self.post(Event(events.ORDER, cl_ord_id, order))
+
+    # --- event loop ---
 
     async def start(self):
-        """Start the main trading loop"""
-        if not self.is_running:
+        """Run the event loop until shutdown()"""
+        if not self._initialized:
             await self.initialize()
-        
+        self.is_running = True
+
         try:
             while self.is_running:
-                # Main trading loop
-                await self.update_market_data()
-                await self.check_positions()
-                await self.execute_trading_logic()
-                await asyncio.sleep(1)  # Prevent CPU overload
+                batch = [await self.events.get()]
+                while not self.events.empty():
+                    batch.append(self.events.get_nowait())
+                self._dispatch_batch(batch)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             self.logger.error(f"Error in main trading loop: {str(e)}")
             await self.shutdown()
 
-    async def update_market_data(self):
-        """Update market data from IBKR"""
-        try:
-            # TODO: Implement market data updates from IBKR
-            pass
-        except Exception as e:
-            self.logger.error(f"Error updating market data: {str(e)}")
+    def _dispatch_batch(self, batch: List[Event]):
+        self.stats["batches"] += 1
+        self.stats["events"] += len(batch)
+        if len(batch) > self.stats["max_batch"]:
+            self.stats["max_batch"] = len(batch)
+        if len(batch) > 1:
+            batch.sort(key=lambda event: events.BATCH_PRIORITY.get(event.kind, 99))
+        for event in batch:
+            if event.kind is None:  # shutdown sentinel
+                continue
+            if event.kind == events.QUOTE:
+                event.data = self._quote_buffer.pop(event.key, None)
+                if event.data is None:
+                    continue
+            self._apply(event)
+            for handler in self.handlers.get(event.kind, ()):
+                try:
+                    handler(event)
+                except Exception as e:
+                    self.stats["handler_errors"] += 1
+                    self.logger.error(f"Handler for {event.kind} event failed: {str(e)}")
+            latency_probe.measure(f"event_{event.kind}", event.ts)
+        for strategy in self.strategies:
+            try:
+                strategy.on_batch_end()
+            except Exception as e:
+                self.stats["handler_errors"] += 1
+                self.logger.error(f"Strategy {strategy.name} batch evaluation failed: {str(e)}")
 
-    async def check_positions(self):
-        """Check current positions via Hammer API"""
-        try:
-            if self.hammer_client:
-                self.active_positions = await self.hammer_client.get_positions()
-        except Exception as e:
-            self.logger.error(f"Error checking positions: {str(e)}")
+    def _apply(self, event: Event):
+        """Update local state and fan the event out to strategies"""
+        if event.kind == events.QUOTE:
+            quote = self.market_data.setdefault(event.key, {})
+            quote.update(event.data)
+            quote["last_update"] = time.time()
+            if self.strategies:
+                latency_probe.mark(event.key, "score")
+                for strategy in self.strategies:
+                    strategy.update_market_data(event.key, quote)
+        elif event.kind == events.POSITION:
+            self.active_positions[event.key] = event.data
+            for strategy in self.strategies:
+                strategy.update_position(event.key, event.data)
+        elif event.kind == events.ORDER:
+            self.orders[event.key] = event.data
+            for strategy in self.strategies:
+                strategy.update_order(event.key, event.data)
+        elif event.kind == events.BALANCE:
+            if event.data is None:
+                self.balances.pop(event.key, None)  # Currency gone from a balance snapshot
+            else:
+                self.balances[event.key] = event.data
 
-    async def execute_trading_logic(self):
-        """Execute trading strategies based on market data and positions"""
-        try:
-            # TODO: Implement trading strategy execution
-            pass
-        except Exception as e:
-            self.logger.error(f"Error executing trading logic: {str(e)}")
+    # --- order routing ---
+
+    def submit_strategy_order(self, order: Dict):
+        """Order handler given to strategies: send a generate_order() dict to Hammer without blocking the loop.
+
+        The clOrdId is allocated here and written back into `order`, so the
+        strategy can match later order events (fills, cancels, rejects) to it.
+        """
+        if not order.get("clOrdId"):
+            ids = self.hammer_client.ids if self.hammer_client else self.order_ids
+            order["clOrdId"] = ids.next_cl_ord_id()
+        task = asyncio.create_task(self.place_order(
+            symbol=order["symbol"],
+            side="Buy" if order["action"].upper() == "BUY" else "Sell",
+            quantity=order["quantity"],
+            order_type=order["order_type"].capitalize(),
+            price=order.get("price"),
+            cl_ord_id=order.get("clOrdId"),
+        ))
+        self._order_tasks.add(task)
+        task.add_done_callback(lambda t: self._order_done(t, order))
+
+    def _order_done(self, task: asyncio.Task, order: Dict):
+        self._order_tasks.discard(task)
+        if task.cancelled() or task.exception() is None:  # errors already logged by place_order
+            return
+        # Never reached Hammer: report it to the strategies as rejected so they release its pending quantity
+        if order.get("clOrdId"):
+            rejected = {"clOrdId": order["clOrdId"], "symbol": order["symbol"], "status": "Rejected",
+                        "text": str(task.exception())}
+            for strategy in self.strategies:
+                strategy.update_order(order["clOrdId"], rejected)
 
     async def place_order(self, symbol: str, side: str, quantity: int, order_type: str, 
-                         price: Optional[float] = None, stop_price: Optional[float] = None):
+                         price: Optional[float] = None, stop_price: Optional[float] = None,
+                         cl_ord_id: Optional[str] = None):
         """Place an order via Hammer API"""
         try:
             if not self.hammer_client:
@@ -108,7 +264,8 @@ class TradingOrchestrator:
                 quantity=quantity,
                 order_type=order_type,
                 price=price,
-                stop_price=stop_price
+                stop_price=stop_price,
+                cl_ord_id=cl_ord_id
             )
             self.logger.info(f"Order placed: {result}")
             return result
@@ -130,41 +287,32 @@ class TradingOrchestrator:
             raise
 
     async def get_positions(self) -> Dict:
-        """Get current positions"""
-        try:
-            if not self.hammer_client:
-                raise RuntimeError("Hammer API client not initialized")
-                
-            return await self.hammer_client.get_positions()
-        except Exception as e:
-            self.logger.error(f"Error getting positions: {str(e)}")
-            raise
+        """Get current positions (kept up to date by position events)"""
+        return self.active_positions
 
     async def get_balances(self) -> Dict:
-        """Get current balances"""
-        try:
-            if not self.hammer_client:
-                raise RuntimeError("Hammer API client not initialized")
-                
-            return await self.hammer_client.get_balances()
-        except Exception as e:
-            self.logger.error(f"Error getting balances: {str(e)}")
-            raise
+        """Get current balances (kept up to date by balance events)"""
+        return self.balances
 
     async def get_orders(self) -> Dict:
-        """Get current orders"""
-        try:
-            if not self.hammer_client:
-                raise RuntimeError("Hammer API client not initialized")
-                
-            return await self.hammer_client.get_orders()
-        except Exception as e:
-            self.logger.error(f"Error getting orders: {str(e)}")
-            raise
+        """Get current orders (kept up to date by order events)"""
+        return self.orders
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["queue_depth"] = self.events.qsize() if self.events else 0
+        stats["orders_in_flight"] = len(self._order_tasks)
+        return stats
 
     async def shutdown(self):
         """Gracefully shutdown the orchestrator"""
         self.is_running = False
+        if self.events is not None:
+            self.events.put_nowait(Event(None, None))  # Wake the loop so start() returns
+        for name in list(self._timers):
+            self.cancel_timer(name)
         if self.hammer_client:
             await self.hammer_client.close()
-        self.logger.info("Trading Orchestrator shutdown complete") 
\ No newline at end of file
+        if self.ib_client and hasattr(self.ib_client, "disconnect"):
+            self.ib_client.disconnect()
+        self.logger.info("Trading Orchestrator shutdown complete")
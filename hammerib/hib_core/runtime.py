@@ -0,0 +1,96 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+class AsyncRuntime:
+    """One asyncio loop, on its own thread, for every network client.
+
+    ib_insync, the Alaric WebSocket and the TradingOrchestrator all run on
+    this loop, so quotes, strategy evaluation and order sends never cross a
+    thread and their shared state needs no locks. Other threads (the Tk main
+    thread) hand work to it with submit()/call()/run() and get results back
+    through concurrent futures or a TkBridge.
+    """
+
+    def __init__(self, name: str = "hib-runtime"):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self.loop is not None and self.loop.is_running()
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def start(self):
+        """Start the loop thread (idempotent); returns once the loop is running"""
+        if self.is_running:
+            return self
+        self.loop = asyncio.new_event_loop()
+        self._started.clear()
+        self._thread = threading.Thread(target=self._run_loop, name=self.name, daemon=True)
+        self._thread.start()
+        self._started.wait()
+        self.logger.info(f"Async runtime {self.name} started")
+        return self
+
+    def _run_loop(self):
+        # ib_insync looks the loop up with asyncio.get_event_loop(), so make this thread's loop current
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop from any thread"""
+        if not self.is_running:
+            raise RuntimeError(f"Async runtime {self.name} is not running")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block the calling (non-loop) thread for its result"""
+        if self.in_loop_thread():
+            raise RuntimeError("AsyncRuntime.run() would deadlock on the loop thread; await the coroutine instead")
+        return self.submit(coro).result(timeout)
+
+    def call(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Call a plain function on the loop thread and return its result"""
+        if self.in_loop_thread():
+            return fn(*args)
+        future = concurrent.futures.Future()
+
+        def invoke():
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+        self.loop.call_soon_threadsafe(invoke)
+        return future.result(timeout)
+
+    def call_soon(self, fn: Callable, *args):
+        """Queue a plain function on the loop thread without waiting"""
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the loop, cancel its remaining tasks and join the thread"""
+        if not self.is_running:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if not self.in_loop_thread():
+            self._thread.join(timeout)
+        self.logger.info(f"Async runtime {self.name} stopped")
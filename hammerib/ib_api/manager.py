@@ -1,6 +1,7 @@
-from ib_insync import IB, Stock
+from ib_insync import IB, Stock, util
+import asyncio
 import threading
-import time
+from hammerib.utils.latency import latency_probe
 
 ETF_SYMBOLS = ['PFF', 'TLT', 'SPY', 'IWM', 'KRE']
 
@@ -13,30 +14,65 @@ class IBKRManager:
         self.prev_closes = {}  # symbol -> previous close
         self.filled_trades = []  # Her fill burada tutulacak
         self.ib.execDetailsEvent += self.on_fill  # Fill event handler
+        self.ib.pendingTickersEvent += self.on_pending_tickers  # Quote receipt timestamps
+        self.ib.orderStatusEvent += self.on_order_status  # placeOrder -> first orderStatus
+        self.runtime = None  # AsyncRuntime whose loop owns self.ib, see attach_runtime()
+        self.quote_listeners = []  # callback(symbol, fields) for every pending ticker
 
-    def connect(self):
-        self.ib.connect('127.0.0.1', 4001, clientId=1)
+    def attach_runtime(self, runtime):
+        """Run ib_insync on the given AsyncRuntime loop instead of its own blocking helpers"""
+        self.runtime = runtime
+
+    def _run(self, coro):
+        """Run a coroutine to completion from sync code, on the runtime loop if one is attached"""
+        if self.runtime is not None:
+            return self.runtime.run(coro)
+        return util.run(coro)
+
+    def _on_loop(self, fn, *args):
+        """Call fn on the thread owning the IB socket (ib_insync is not thread-safe)"""
+        if self.runtime is not None:
+            return self.runtime.call(fn, *args)
+        return fn(*args)
+
+    def add_quote_listener(self, callback):
+        """callback(symbol, fields) is called on the IB loop for every ticker update"""
+        self.quote_listeners.append(callback)
+
+    def connect(self, host='127.0.0.1', port=4001, client_id=1):
+        self._run(self.connect_async(host, port, client_id))
+
+    async def connect_async(self, host='127.0.0.1', port=4001, client_id=1):
+        await self.ib.connectAsync(host, port, clientId=client_id)
         self.ib.reqMarketDataType(3)
-        time.sleep(0.2)
+        await asyncio.sleep(0.2)
         self.ib.reqMarketDataType(1)
         self.connected = True
-        self.subscribe_etfs()
+        await self.subscribe_etfs_async()
+
+    def disconnect(self):
+        if self.connected:
+            self._on_loop(self.ib.disconnect)
+            self.connected = False
 
     def subscribe_etfs(self):
-        with self.lock:
-            for symbol in ETF_SYMBOLS:
-                if symbol not in self.tickers:
-                    contract = Stock(symbol, 'SMART', 'USD')
-                    self.ib.qualifyContracts(contract)
-                    ticker = self.ib.reqMktData(contract, '', False, False, [])
-                    self.tickers[symbol] = {'contract': contract, 'ticker': ticker}
-                    # Previous close için historical data iste
-                    bars = self.ib.reqHistoricalData(contract, endDateTime='', durationStr='2 D', barSizeSetting='1 day', whatToShow='TRADES', useRTH=True)
-                    if bars and len(bars) >= 2:
-                        self.prev_closes[symbol] = bars[-2].close
-                    else:
-                        self.prev_closes[symbol] = None
-                    time.sleep(0.05)
+        self._run(self.subscribe_etfs_async())
+
+    async def subscribe_etfs_async(self):
+        for symbol in ETF_SYMBOLS:
+            if symbol in self.tickers:
+                continue
+            contract = Stock(symbol, 'SMART', 'USD')
+            await self.ib.qualifyContractsAsync(contract)
+            ticker = self.ib.reqMktData(contract, '', False, False, [])
+            with self.lock:
+                self.tickers[symbol] = {'contract': contract, 'ticker': ticker}
+            # Previous close için historical data iste
+            bars = await self.ib.reqHistoricalDataAsync(contract, endDateTime='', durationStr='2 D', barSizeSetting='1 day', whatToShow='TRADES', useRTH=True)
+            if bars and len(bars) >= 2:
+                self.prev_closes[symbol] = bars[-2].close
+            else:
+                self.prev_closes[symbol] = None
 
     def get_etf_data(self):
         with self.lock:
@@ -60,6 +96,10 @@ class IBKRManager:
             return data
 
     def clear_subscriptions(self):
+        self._run(self.clear_subscriptions_async())
+
+    async def clear_subscriptions_async(self):
+        # The lock only guards the dict against readers on the Tk thread; never hold it across an await
         with self.lock:
             for symbol in list(self.tickers.keys()):
                 try:
@@ -68,26 +108,35 @@ class IBKRManager:
                     del self.tickers[symbol]
                 except Exception as e:
                     print(f"! Abonelik iptal hatası ({symbol}): {e}")
-            # Market data tipi sıfırla
-            self.ib.reqMarketDataType(3)
-            time.sleep(0.2)
-            self.ib.reqMarketDataType(1)
+        # Market data tipi sıfırla
+        self.ib.reqMarketDataType(3)
+        await asyncio.sleep(0.2)
+        self.ib.reqMarketDataType(1)
 
     def subscribe_tickers(self, symbols):
+        self._run(self.subscribe_tickers_async(symbols))
+
+    async def subscribe_tickers_async(self, symbols):
+        new_contracts = [Stock(symbol, 'SMART', 'USD') for symbol in symbols if symbol not in self.tickers]
+        if new_contracts:
+            # One batched qualify round trip instead of one blocking call per symbol
+            await self.ib.qualifyContractsAsync(*new_contracts)
         with self.lock:
-            for symbol in symbols:
-                if symbol not in self.tickers:
-                    contract = Stock(symbol, 'SMART', 'USD')
-                    self.ib.qualifyContracts(contract)
+            for contract in new_contracts:
+                if contract.symbol not in self.tickers:
                     ticker = self.ib.reqMktData(contract)
-                    self.tickers[symbol] = {'contract': contract, 'ticker': ticker}
-                    time.sleep(0.05)
+                    self.tickers[contract.symbol] = {'contract': contract, 'ticker': ticker}
             # Eski abonelikleri iptal et
             to_cancel = [t for t in self.tickers if t not in symbols]
             for symbol in to_cancel:
                 self.ib.cancelMktData(self.tickers[symbol]['contract'])
                 del self.tickers[symbol]
 
+    async def resubscribe_async(self, symbols):
+        """clear_subscriptions + subscribe_tickers as one step on the IB loop"""
+        await self.clear_subscriptions_async()
+        await self.subscribe_tickers_async(symbols)
+
     def get_market_data(self, symbols):
         with self.lock:
             data = {}
@@ -139,6 +188,37 @@ class IBKRManager:
                 })
             return result
 
+    def on_pending_tickers(self, tickers):
+        now = latency_probe.now()
+        for t in tickers:
+            latency_probe.mark(t.contract.symbol, 'quote', now)
+        if self.quote_listeners:
+            for t in tickers:
+                fields = {'bid': t.bid, 'ask': t.ask, 'last': t.last, 'volume': t.volume,
+                          'bidSize': t.bidSize, 'askSize': t.askSize}
+                for listener in self.quote_listeners:
+                    listener(t.contract.symbol, fields)
+
+    def place_order(self, contract, order):
+        """placeOrder with send/ack latency probes; use this instead of self.ib.placeOrder.
+
+        Safe to call from the Tk thread: the send is done on the IB loop thread.
+        """
+        return self._on_loop(self._place_order, contract, order)
+
+    def _place_order(self, contract, order):
+        symbol = contract.symbol
+        trade = self.ib.placeOrder(contract, order)
+        latency_probe.mark(symbol, 'send')
+        latency_probe.transfer(symbol, ('ib', trade.order.orderId))
+        return trade
+
+    def on_order_status(self, trade):
+        key = ('ib', trade.order.orderId)
+        if latency_probe.get_mark(key, 'send') is not None:
+            latency_probe.mark(key, 'ack')
+            latency_probe.discard(key)
+
     def on_fill(self, trade, fill):
         symbol = fill.contract.symbol
         qty = fill.execution.shares
@@ -0,0 +1,314 @@
+"""
+Bar-replay backtester for VectorStrategy subclasses.
+
+    python -m hammerib.strategies.backtest --data mastermind_data --factors optimized_50_stocks_portfolio.csv
+
+PFF/TLT bars for the benchmark are read from the data directory (mastermind
+saves its ETFs there) and otherwise from the shared bar store.
+"""
+import argparse
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from ..data.live_thg import BAR_STORE_DIR, read_store_bars
+from .vectorized import HiddenBidStrategy, QuoteBoard, VectorStrategy
+
+# Benchmark levels as used by IBKRManager (T: 0.7*PFF + 0.1*TLT, C: 1.3*PFF - 0.1*TLT)
+BENCHMARK_WEIGHTS = {
+    "T": {"PFF": 0.7, "TLT": 0.1},
+    "C": {"PFF": 1.3, "TLT": -0.1},
+}
+BENCHMARK_ETFS = ("PFF", "TLT")
+# ETFs mastermind.py saves next to the preferreds; they are not traded by the backtest
+ETF_SYMBOLS = ("TLT", "IEF", "SHY", "SPY", "KRE", "IWM", "HYG", "PFF", "PGF", "PGX")
+
+class BarPanel:
+    """Aligned bars for many symbols: one (dates x symbols) float array per field"""
+
+    FIELDS = ("close", "low", "high", "volume")
+
+    def __init__(self, dates: pd.DatetimeIndex, symbols: List[str], fields: Dict[str, np.ndarray]):
+        self.dates = dates
+        self.symbols = symbols
+        self.close = fields["close"]
+        # Files without low/high (mastermind stores close and volume) fall back to the close
+        self.low = fields.get("low", self.close)
+        self.high = fields.get("high", self.close)
+        self.volume = fields.get("volume", np.zeros_like(self.close))
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame]) -> "BarPanel":
+        """Outer-join per-symbol bar frames (DatetimeIndex, close[/low/high/volume] columns) on their dates"""
+        frames = {s: df for s, df in frames.items() if df is not None and not df.empty and "close" in df.columns}
+        symbols = list(frames)
+        dates = pd.DatetimeIndex(sorted(set().union(*(df.index for df in frames.values())))) if frames else pd.DatetimeIndex([])
+        fields = {}
+        for field in cls.FIELDS:
+            if not all(field in df.columns for df in frames.values()):
+                continue
+            wide = pd.concat({s: frames[s][field] for s in symbols}, axis=1).reindex(dates)
+            fields[field] = wide.to_numpy(dtype=float)
+        if "close" not in fields:
+            fields["close"] = np.empty((len(dates), 0))
+        return cls(dates, symbols, fields)
+
+    @classmethod
+    def load_dir(cls, input_dir: str = "mastermind_data", symbols: Optional[Iterable[str]] = None,
+                 exclude: Iterable[str] = ()) -> "BarPanel":
+        """Load `<symbol>_historical.csv` files as written by MastermindAnalysis.save_historical_data"""
+        if symbols is None:
+            symbols = [f[:-len("_historical.csv")] for f in sorted(os.listdir(input_dir)) if f.endswith("_historical.csv")]
+        exclude = set(exclude)
+        symbols = [s for s in symbols if s not in exclude]
+        frames = {}
+        for symbol in symbols:
+            path = os.path.join(input_dir, f"{symbol}_historical.csv")
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path, parse_dates=["date"], index_col="date")
+            frames[symbol] = df
+        return cls.from_frames(frames)
+
+    @classmethod
+    def load_etfs(cls, input_dir: str = "mastermind_data", store_root: str = BAR_STORE_DIR,
+                  symbols: Iterable[str] = BENCHMARK_ETFS) -> "BarPanel":
+        """Benchmark ETF bars: `<etf>_historical.csv` in input_dir, else the shared bar store"""
+        frames = {}
+        for symbol in symbols:
+            path = os.path.join(input_dir, f"{symbol}_historical.csv")
+            if os.path.exists(path):
+                frames[symbol] = pd.read_csv(path, parse_dates=["date"], index_col="date")
+                continue
+            bars = read_store_bars(symbol, store_root)
+            if bars is not None and not bars.empty:
+                frames[symbol] = bars.set_index("date")
+        return cls.from_frames(frames)
+
+    def series(self, symbol: str) -> Optional[np.ndarray]:
+        if symbol not in self.symbols:
+            return None
+        return self.close[:, self.symbols.index(symbol)]
+
+    def slice(self, start=None, end=None) -> "BarPanel":
+        mask = np.ones(len(self.dates), dtype=bool)
+        if start is not None:
+            mask &= self.dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= self.dates <= pd.Timestamp(end)
+        return BarPanel(self.dates[mask], self.symbols, {
+            "close": self.close[mask], "low": self.low[mask], "high": self.high[mask], "volume": self.volume[mask]
+        })
+
+
+class BacktestResult:
+    def __init__(self, daily: pd.DataFrame, fills: pd.DataFrame, by_symbol: pd.DataFrame, elapsed_s: float):
+        self.daily = daily
+        self.fills = fills
+        self.by_symbol = by_symbol
+        self.elapsed_s = elapsed_s
+
+    def summary(self) -> Dict:
+        last = self.daily.iloc[-1] if len(self.daily) else None
+        return {
+            "days": len(self.daily),
+            "symbols_traded": int((self.by_symbol["fills"] > 0).sum()) if len(self.by_symbol) else 0,
+            "fills": len(self.fills),
+            "pnl": round(float(last["pnl"]), 2) if last is not None else 0.0,
+            "benchmark_pnl": round(float(last["benchmark_pnl"]), 2) if last is not None else 0.0,
+            "excess_pnl": round(float(last["excess_pnl"]), 2) if last is not None else 0.0,
+            "elapsed_s": round(self.elapsed_s, 3),
+        }
+
+
+class Backtester:
+    """Replays bars through a VectorStrategy and simulates hidden limit fills.
+
+    On every bar the strategy sees the whole universe on a QuoteBoard with a
+    synthetic quote of close -/+ spread/2 and the simulated positions. Its
+    intents are day orders for the next bar: a buy fills if that bar trades at
+    or below the limit (low, or close when no low is stored), a sell if it
+    trades at or above it. At most one intent per symbol per bar is used.
+    P&L is marked to the close and compared with holding the T or C benchmark
+    (by symbol) over the same fills.
+    """
+
+    def __init__(self, panel: BarPanel, strategy: VectorStrategy,
+                 factors: Optional[pd.DataFrame] = None, symbol_column: str = "PREF IBKR",
+                 spread: Union[float, Dict[str, float]] = 0.10,
+                 benchmark_types: Optional[Dict[str, str]] = None, default_benchmark: str = "T",
+                 etf_panel: Optional[BarPanel] = None):
+        self.panel = panel
+        self.strategy = strategy
+        self.board = QuoteBoard(panel.symbols)
+        if factors is not None:
+            # Factor rows without bars would add board rows the panel has no columns for
+            self.board.load_factors(factors[factors[symbol_column].isin(panel.symbols)], symbol_column)
+        n = len(panel.symbols)
+        if isinstance(spread, dict):
+            self.spread = np.array([spread.get(s, np.nan) for s in panel.symbols])
+        else:
+            self.spread = np.full(n, float(spread))
+        self.benchmark = self._benchmark_levels(etf_panel if etf_panel is not None else panel,
+                                                benchmark_types or {}, default_benchmark)
+
+    def _benchmark_levels(self, etf_panel: BarPanel, benchmark_types: Dict[str, str], default: str) -> np.ndarray:
+        """(dates x symbols) benchmark level for each symbol's T/C type"""
+        dates = self.panel.dates
+        missing = [name for name in BENCHMARK_ETFS if etf_panel.series(name) is None]
+        if missing:
+            raise ValueError(f"Benchmark bars missing for {', '.join(missing)}; pass an etf_panel with PFF and TLT")
+        etf = {}
+        for name in BENCHMARK_ETFS:
+            values = etf_panel.series(name)
+            etf[name] = pd.Series(values, index=etf_panel.dates).reindex(dates).ffill().to_numpy()
+        levels = {kind: sum(w * etf[name] for name, w in weights.items()) for kind, weights in BENCHMARK_WEIGHTS.items()}
+        kinds = [benchmark_types.get(s, default) for s in self.panel.symbols]
+        return np.column_stack([levels[k] for k in kinds]) if kinds else np.zeros_like(self.panel.close)
+
+    def run(self) -> BacktestResult:
+        started = time.perf_counter()
+        panel = self.panel
+        board = self.board
+        cols = board.columns
+        n_dates, n = panel.close.shape
+        quantity = np.zeros(n)
+        avg_price = np.zeros(n)
+        avg_bench = np.zeros(n)
+        realized = np.zeros(n)
+        realized_bench = np.zeros(n)
+        fill_count = np.zeros(n, dtype=np.int64)
+        fills: List[tuple] = []
+        daily_pnl = np.zeros(n_dates)
+        daily_bench = np.zeros(n_dates)
+        half_spread = self.spread / 2
+        last_close = np.full(n, np.nan)
+
+        for t in range(n_dates):
+            close = panel.close[t]
+            valid = np.isfinite(close)
+            prev_close = last_close
+            last_close = np.where(valid, close, last_close)
+
+            # Mark to market
+            marked = np.isfinite(last_close)
+            unrealized = np.where(marked, quantity * (last_close - avg_price), 0.0)
+            bench_now = self.benchmark[t]
+            unrealized_bench = quantity * (bench_now - avg_bench)
+            daily_pnl[t] = realized.sum() + unrealized.sum()
+            daily_bench[t] = realized_bench.sum() + unrealized_bench.sum()
+
+            if t == n_dates - 1:
+                break
+
+            # Present this bar to the strategy
+            cols["bid"][:] = close - half_spread
+            cols["ask"][:] = close + half_spread
+            cols["last"][:] = close
+            cols["volume"][:] = panel.volume[t]
+            cols["prev_close"][:] = prev_close
+            cols["quantity"][:] = quantity
+            cols["average_price"][:] = avg_price
+            cols["pending_qty"][:] = 0.0
+            rows = np.flatnonzero(valid)
+            if not len(rows):
+                continue
+            intents = self.strategy.evaluate(board.view(rows))
+            if intents is None or not len(intents):
+                continue
+
+            # Unique rows, last intent wins
+            _, last_idx = np.unique(intents.rows[::-1], return_index=True)
+            keep = len(intents.rows) - 1 - last_idx
+            r = intents.rows[keep]
+            side = intents.side[keep].astype(float)
+            qty = intents.quantity[keep].astype(float)
+            price = intents.price[keep]
+
+            # Fill against the next bar
+            low = panel.low[t + 1, r]
+            high = panel.high[t + 1, r]
+            with np.errstate(invalid="ignore"):
+                filled = ((side > 0) & (low <= price)) | ((side < 0) & (high >= price))
+            filled &= qty > 0
+            if not filled.any():
+                continue
+            r, side, qty, price = r[filled], side[filled], qty[filled], price[filled]
+            bench_fill = self.benchmark[t + 1, r]
+            signed = side * qty
+            old_qty = quantity[r]
+
+            # Closing part realizes P&L against the average entry
+            closing = np.where(np.sign(old_qty) == -np.sign(signed), np.minimum(np.abs(old_qty), qty), 0.0)
+            close_signed = closing * np.sign(old_qty)
+            realized[r] += close_signed * (price - avg_price[r])
+            realized_bench[r] += close_signed * (bench_fill - avg_bench[r])
+
+            # Opening part moves the average entry
+            new_qty = old_qty + signed
+            opening = qty - closing
+            open_signed = opening * side
+            remaining = old_qty - close_signed
+            with np.errstate(invalid="ignore", divide="ignore"):
+                grow = opening > 0
+                avg_price[r] = np.where(grow, (remaining * avg_price[r] + open_signed * price) / np.where(new_qty == 0, 1, new_qty), avg_price[r])
+                avg_bench[r] = np.where(grow, (remaining * avg_bench[r] + open_signed * bench_fill) / np.where(new_qty == 0, 1, new_qty), avg_bench[r])
+            flat = new_qty == 0
+            avg_price[r[flat]] = 0.0
+            avg_bench[r[flat]] = 0.0
+            quantity[r] = new_qty
+            fill_count[r] += 1
+            day = panel.dates[t + 1]
+            fills.extend((day, panel.symbols[i], int(s), q, p) for i, s, q, p in zip(r.tolist(), side.tolist(), qty.tolist(), price.tolist()))
+
+        final_unrealized = np.where(np.isfinite(last_close), quantity * (last_close - avg_price), 0.0)
+        final_bench = quantity * (self.benchmark[-1] - avg_bench) if n_dates else np.zeros(n)
+        daily = pd.DataFrame({"pnl": daily_pnl, "benchmark_pnl": daily_bench}, index=panel.dates)
+        daily["excess_pnl"] = daily["pnl"] - daily["benchmark_pnl"]
+        by_symbol = pd.DataFrame({
+            "fills": fill_count,
+            "quantity": quantity,
+            "average_price": avg_price,
+            "pnl": realized + final_unrealized,
+            "benchmark_pnl": realized_bench + final_bench,
+        }, index=pd.Index(panel.symbols, name="symbol"))
+        by_symbol["excess_pnl"] = by_symbol["pnl"] - by_symbol["benchmark_pnl"]
+        fills_df = pd.DataFrame(fills, columns=["date", "symbol", "side", "quantity", "price"])
+        return BacktestResult(daily, fills_df, by_symbol, time.perf_counter() - started)
+
+
+def load_benchmark_types(t_csv: str = "historical_data.csv", c_csv: str = "extlthistorical.csv") -> Dict[str, str]:
+    """Map each preferred to its benchmark: T for historical_data.csv, C for extlthistorical.csv"""
+    types = {}
+    for path, kind in ((t_csv, "T"), (c_csv, "C")):
+        if os.path.exists(path):
+            for symbol in pd.read_csv(path)["PREF IBKR"].dropna():
+                types[symbol] = kind
+    return types
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the hidden-bid strategy over stored daily bars")
+    parser.add_argument("--data", default="mastermind_data")
+    parser.add_argument("--factors", default="optimized_50_stocks_portfolio.csv")
+    parser.add_argument("--bar-store", default=BAR_STORE_DIR)
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--spread", type=float, default=0.10)
+    parser.add_argument("--min-final-thg", type=float, default=0.0)
+    parser.add_argument("--lot", type=int, default=100)
+    args = parser.parse_args()
+    panel = BarPanel.load_dir(args.data, exclude=ETF_SYMBOLS).slice(args.start, args.end)
+    etf_panel = BarPanel.load_etfs(args.data, args.bar_store)
+    factors = pd.read_csv(args.factors) if os.path.exists(args.factors) else None
+    strategy = HiddenBidStrategy(min_final_thg=args.min_final_thg, lot=args.lot)
+    result = Backtester(panel, strategy, factors, spread=args.spread,
+                        benchmark_types=load_benchmark_types(), etf_panel=etf_panel).run()
+    for key, value in result.summary().items():
+        print(f"{key}: {value}")
+    print(result.by_symbol.sort_values("excess_pnl", ascending=False).head(20).to_string())
+
+if __name__ == "__main__":
+    main()
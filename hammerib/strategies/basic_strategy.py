@@ -1,4 +1,4 @@
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 import logging
 from datetime import datetime
 
@@ -9,6 +9,7 @@ class BasicStrategy:
         self.positions: Dict[str, Dict] = {}
         self.market_data: Dict[str, Dict] = {}
         self.is_active = False
+        self.order_handler: Optional[Callable[[Dict], None]] = None  # Set by the TradingOrchestrator
 
     def update_market_data(self, symbol: str, data: Dict):
         """Update market data for a symbol"""
@@ -19,6 +20,10 @@ class BasicStrategy:
         """Update position data for a symbol"""
         self.positions[symbol] = position_data
 
+    def update_order(self, order_id: str, order: Dict):
+        """Order status update (fill, cancel, reject) for an order this or another strategy sent"""
+        pass
+
     def _check_conditions(self, symbol: str):
         """Check trading conditions for a symbol"""
         if not self.is_active:
@@ -57,6 +62,17 @@ class BasicStrategy:
             "timestamp": datetime.now().isoformat()
         }
 
+    def on_batch_end(self):
+        """Called by the orchestrator after each batch of events; batched strategies evaluate here"""
+        pass
+
+    def submit_order(self, order: Dict):
+        """Hand an order from generate_order() to the orchestrator for execution"""
+        if self.order_handler is None:
+            self.logger.warning(f"Strategy {self.name} has no order handler, order dropped: {order}")
+            return
+        self.order_handler(order)
+
     def start(self):
         """Start the strategy"""
         self.is_active = True
@@ -0,0 +1,367 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+import logging
+
+import numpy as np
+import pandas as pd
+
+from hammerib.alaric_api.correlation import RequestIdGenerator
+from hammerib.utils.latency import latency_probe
+from .basic_strategy import BasicStrategy
+
+QUOTE_COLUMNS = ("bid", "ask", "last", "volume", "bidSize", "askSize", "prev_close")
+POSITION_COLUMNS = ("quantity", "average_price", "pending_qty")
+FACTOR_COLUMNS = ("FINAL_THG", "Final_Shares")
+# Order statuses after which nothing more of the order can fill
+DONE_STATUSES = frozenset(["Filled", "Canceled", "Cancelled", "Rejected", "Expired", "Done For Day"])
+FILLED_QTY_FIELDS = ("filledQty", "cumQty", "executedQty")
+
+class QuoteBoard:
+    """Columnar state of the whole universe: one float64 array per column, one row per symbol.
+
+    Quotes, positions and static factors (FINAL_THG, Final_Shares, group) live
+    side by side so a strategy can read any of them for many symbols with a
+    single fancy-index. Rows touched since the last take_dirty() are flagged.
+    `pending_qty` is the signed quantity of the orders registered with
+    add_pending() that the position does not reflect yet: the unfilled part
+    of working orders plus fills not yet seen in a position update. Order
+    updates move fills from the first part to the second and release what is
+    cancelled; position updates consume the second. A position update that
+    runs ahead of the fill reports is kept as credit against the row's
+    working orders, so the late fill does not count twice.
+    """
+
+    def __init__(self, symbols: Sequence[str] = (), factor_columns: Sequence[str] = FACTOR_COLUMNS):
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.columns: Dict[str, np.ndarray] = {}
+        for name in QUOTE_COLUMNS + tuple(factor_columns):
+            self.columns[name] = np.empty(0)
+        for name in POSITION_COLUMNS:
+            self.columns[name] = np.empty(0)
+        self.group = np.empty(0, dtype=np.int32)  # index into group_names, -1 if unknown
+        self.group_names: List[str] = []
+        self._dirty = np.empty(0, dtype=bool)
+        self.working: Dict[str, List] = {}  # order id -> [row, signed quantity, signed filled quantity]
+        self.unposted: Dict[int, float] = {}  # row -> signed fills not yet in the position
+        self.ahead: Dict[int, float] = {}  # row -> signed position change not yet reported as fills
+        self.add_symbols(symbols)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def add_symbols(self, symbols: Iterable[str]):
+        """Append rows for symbols not on the board yet"""
+        new = [s for s in dict.fromkeys(symbols) if s not in self.index]
+        if not new:
+            return
+        for symbol in new:
+            self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        n = len(new)
+        for name, values in self.columns.items():
+            fill = 0.0 if name in POSITION_COLUMNS else np.nan
+            self.columns[name] = np.concatenate([values, np.full(n, fill)])
+        self.group = np.concatenate([self.group, np.full(n, -1, dtype=np.int32)])
+        self._dirty = np.concatenate([self._dirty, np.zeros(n, dtype=bool)])
+
+    def load_factors(self, df: pd.DataFrame, symbol_column: str = "PREF IBKR", group_column: Optional[str] = None):
+        """Load static factor columns (and optionally the group) from a DataFrame such as optimized_50_stocks_portfolio.csv"""
+        self.add_symbols(df[symbol_column].dropna().astype(str))
+        rows = df[symbol_column].map(self.index)
+        valid = rows.notna().to_numpy()
+        rows = rows[valid].astype(int).to_numpy()
+        for name in self.columns:
+            if name in df.columns and name not in QUOTE_COLUMNS + POSITION_COLUMNS:
+                self.columns[name][rows] = pd.to_numeric(df[name], errors="coerce").to_numpy()[valid]
+        if group_column and group_column in df.columns:
+            codes, names = pd.factorize(df[group_column].astype(str))
+            self.group_names = list(names)
+            self.group[rows] = codes[valid]
+        self._dirty[rows] = True
+
+    def load_factors_csv(self, path: str, symbol_column: str = "PREF IBKR", group_column: Optional[str] = None):
+        self.load_factors(pd.read_csv(path), symbol_column, group_column)
+
+    def update_quote(self, symbol: str, fields: Dict) -> Optional[int]:
+        """Write the known quote fields for one symbol; unknown symbols are ignored"""
+        row = self.index.get(symbol)
+        if row is None:
+            return None
+        columns = self.columns
+        for name, value in fields.items():
+            if value is not None and name in columns:
+                columns[name][row] = value
+        self._dirty[row] = True
+        return row
+
+    def update_position(self, symbol: str, position: Dict) -> Optional[int]:
+        row = self.index.get(symbol)
+        if row is None:
+            return None
+        quantity = position.get("quantity", 0) or 0
+        change = quantity - self.columns["quantity"][row]
+        self.columns["quantity"][row] = quantity
+        self.columns["average_price"][row] = position.get("average_price", 0.0) or 0.0
+        if change:
+            self._post(row, change)
+        self._dirty[row] = True
+        return row
+
+    def add_pending(self, order_id: str, row: int, signed_qty: float):
+        """Register a working order for a row; its quantity counts as pending until the position reflects it"""
+        self.working[order_id] = [row, signed_qty, 0.0]
+        self._refresh_pending(row)
+
+    def update_order(self, order_id: str, order: Dict) -> Optional[int]:
+        """Move a working order's new fills to the unposted part of its row; release the unfilled rest when it is done.
+
+        Orders not registered with add_pending() are ignored.
+        """
+        entry = self.working.get(order_id)
+        if entry is None:
+            return None
+        row, signed_qty, filled = entry
+        status = order.get("status")
+        reported = next((order[f] for f in FILLED_QTY_FIELDS if order.get(f) not in (None, "")), None)
+        if reported is not None:
+            now_filled = np.sign(signed_qty) * min(abs(signed_qty), abs(float(reported)))
+        elif status == "Filled":
+            now_filled = signed_qty
+        else:
+            now_filled = filled
+        if abs(now_filled) > abs(filled):
+            entry[2] = now_filled
+            fill = now_filled - filled
+            # Fills the position already showed only use up the credit
+            used = self._take(self.ahead, row, fill)
+            if fill != used:
+                self.unposted[row] = self.unposted.get(row, 0.0) + fill - used
+        if status in DONE_STATUSES:
+            del self.working[order_id]
+            self._cap_ahead(row)
+        self._refresh_pending(row)
+        return row
+
+    def _post(self, row: int, change: float):
+        """A position change consumes unposted fills; the rest is credit for fills still to be reported"""
+        change -= self._take(self.unposted, row, change)
+        if change:
+            self.ahead[row] = self.ahead.get(row, 0.0) + change
+            self._cap_ahead(row)
+        self._refresh_pending(row)
+
+    def _open_qty(self, row: int) -> float:
+        return sum(signed_qty - filled for r, signed_qty, filled in self.working.values() if r == row)
+
+    def _cap_ahead(self, row: int):
+        """Credit never exceeds the unfilled quantity of the row's working orders in the same direction"""
+        ahead = self.ahead.pop(row, 0.0)
+        open_qty = self._open_qty(row)
+        if ahead * open_qty > 0:
+            self.ahead[row] = np.sign(ahead) * min(abs(ahead), abs(open_qty))
+
+    @staticmethod
+    def _take(values: Dict[int, float], row: int, amount: float) -> float:
+        """Use up to `amount` of the same-signed quantity stored for a row; returns the part used"""
+        stored = values.get(row, 0.0)
+        if stored * amount <= 0:
+            return 0.0
+        used = np.sign(amount) * min(abs(stored), abs(amount))
+        if stored == used:
+            del values[row]
+        else:
+            values[row] = stored - used
+        return used
+
+    def _refresh_pending(self, row: int):
+        self.columns["pending_qty"][row] = self._open_qty(row) + self.unposted.get(row, 0.0) - self.ahead.get(row, 0.0)
+        self._dirty[row] = True
+
+    def take_dirty(self) -> np.ndarray:
+        """Return the rows changed since the last call and clear the flags"""
+        rows = np.flatnonzero(self._dirty)
+        if len(rows):
+            self._dirty[rows] = False
+        return rows
+
+    def view(self, rows: Optional[np.ndarray] = None) -> "BoardView":
+        if rows is None:
+            rows = np.arange(len(self.symbols))
+        return BoardView(self, rows)
+
+
+class BoardView:
+    """Read-only gather of board columns for a set of rows; each column is fetched once and cached"""
+
+    def __init__(self, board: QuoteBoard, rows: np.ndarray):
+        self.board = board
+        self.rows = rows
+        self._cache: Dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        values = self._cache.get(name)
+        if values is None:
+            if name == "group":
+                values = self.board.group[self.rows]
+            else:
+                values = self.board.columns[name][self.rows]
+            self._cache[name] = values
+        return values
+
+    @property
+    def symbols(self) -> List[str]:
+        symbols = self.board.symbols
+        return [symbols[r] for r in self.rows]
+
+
+class OrderIntents:
+    """Orders a strategy wants, as parallel arrays over board rows (side: +1 buy, -1 sell)"""
+
+    def __init__(self, rows: np.ndarray, side: np.ndarray, quantity: np.ndarray, price: np.ndarray):
+        self.rows = rows
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def from_mask(cls, view: BoardView, mask: np.ndarray, side, quantity, price) -> "OrderIntents":
+        """Pick the masked rows of a view; side/quantity/price may be scalars or arrays aligned with the view"""
+        idx = np.flatnonzero(mask)
+        n = len(idx)
+
+        def pick(values):
+            values = np.asarray(values)
+            return values[idx] if values.ndim else np.full(n, values)
+
+        return cls(view.rows[idx], pick(side).astype(np.int8), pick(quantity).astype(np.int64), pick(price).astype(float))
+
+    @classmethod
+    def empty(cls) -> "OrderIntents":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int64), np.empty(0))
+
+
+class VectorStrategy:
+    """Base class for strategies evaluated on batches of symbols.
+
+    Subclasses list the board columns they read in `columns` and implement
+    evaluate(view), returning OrderIntents (or None) for the rows in the view.
+    """
+
+    columns: Sequence[str] = ()
+
+    def __init__(self, name: str):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.is_active = True
+
+    def evaluate(self, view: BoardView) -> Optional[OrderIntents]:
+        raise NotImplementedError
+
+
+class HiddenBidStrategy(VectorStrategy):
+    """Buy toward Final_Shares with a hidden limit at bid + spread_ratio * spread.
+
+    Only symbols with FINAL_THG >= min_final_thg and a spread of at least
+    min_spread are bought, `lot` shares at a time, never beyond Final_Shares
+    including orders still working.
+    """
+
+    columns = ("bid", "ask", "FINAL_THG", "Final_Shares", "quantity", "pending_qty")
+
+    def __init__(self, name: str = "hidden_bid", min_final_thg: float = 0.0, min_spread: float = 0.05,
+                 spread_ratio: float = 0.15, lot: int = 100):
+        super().__init__(name)
+        self.min_final_thg = min_final_thg
+        self.min_spread = min_spread
+        self.spread_ratio = spread_ratio
+        self.lot = lot
+
+    def evaluate(self, view: BoardView) -> Optional[OrderIntents]:
+        bid = view["bid"]
+        ask = view["ask"]
+        spread = ask - bid
+        room = view["Final_Shares"] - view["quantity"] - view["pending_qty"]
+        with np.errstate(invalid="ignore"):
+            mask = (bid > 0) & (spread >= self.min_spread) & (view["FINAL_THG"] >= self.min_final_thg) & (room >= self.lot)
+        if not mask.any():
+            return None
+        quantity = np.minimum(self.lot, np.floor(room / self.lot) * self.lot)
+        price = np.round(bid + spread * self.spread_ratio, 2)
+        return OrderIntents.from_mask(view, mask, 1, quantity, price)
+
+
+class VectorStrategyRunner(BasicStrategy):
+    """Drives VectorStrategy instances from the TradingOrchestrator.
+
+    Quote, position and order events only write into the QuoteBoard; at the
+    end of each orchestrator batch every active strategy is evaluated once
+    over all rows that changed, and its intents are sent through the order
+    handler. Each sent order is numbered here and stays pending on its row
+    until the position reflects its fills or order events report the rest
+    cancelled or rejected.
+    """
+
+    def __init__(self, name: str, board: Optional[QuoteBoard] = None):
+        super().__init__(name)
+        self.board = board or QuoteBoard()
+        self.strategies: List[VectorStrategy] = []
+        self.ids = RequestIdGenerator()  # clOrdIds of the orders this runner sends
+        self.stats = {"evaluations": 0, "rows_evaluated": 0, "intents": 0}
+
+    def add_strategy(self, strategy: VectorStrategy):
+        missing = [c for c in strategy.columns if c not in self.board.columns and c != "group"]
+        if missing:
+            raise ValueError(f"Strategy {strategy.name} needs columns not on the board: {missing}")
+        self.strategies.append(strategy)
+
+    def update_market_data(self, symbol: str, data: Dict):
+        self.board.update_quote(symbol, data)
+
+    def update_position(self, symbol: str, position_data: Dict):
+        self.board.update_position(symbol, position_data)
+
+    def update_order(self, order_id: str, order: Dict):
+        self.board.update_order(order_id, order)
+
+    def on_batch_end(self):
+        """Evaluate every strategy over the rows changed in this batch"""
+        rows = self.board.take_dirty()
+        if not self.is_active or not len(rows):
+            return
+        view = self.board.view(rows)
+        for strategy in self.strategies:
+            if not strategy.is_active:
+                continue
+            with latency_probe.timed(f"vector_eval_{strategy.name}"):
+                try:
+                    intents = strategy.evaluate(view)
+                except Exception as e:
+                    self.logger.error(f"Strategy {strategy.name} evaluation failed: {str(e)}")
+                    continue
+            self.stats["evaluations"] += 1
+            self.stats["rows_evaluated"] += len(rows)
+            if intents is not None and len(intents):
+                self._submit_intents(strategy, intents)
+
+    def _submit_intents(self, strategy: VectorStrategy, intents: OrderIntents):
+        symbols = self.board.symbols
+        self.stats["intents"] += len(intents)
+        for row, side, quantity, price in zip(intents.rows.tolist(), intents.side.tolist(),
+                                              intents.quantity.tolist(), intents.price.tolist()):
+            if quantity <= 0:
+                continue
+            order = self.generate_order(symbols[row], "BUY" if side > 0 else "SELL", quantity, "LIMIT", price)
+            order["strategy"] = strategy.name
+            if self.order_handler is None:
+                self.submit_order(order)  # Logged and dropped: nothing was sent, nothing to track
+                continue
+            # Numbered before sending so the order is tracked whichever handler sends it
+            order["clOrdId"] = self.ids.next_cl_ord_id()
+            self.submit_order(order)
+            self.board.add_pending(order["clOrdId"], row, quantity * side)
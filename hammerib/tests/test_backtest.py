@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from hammerib.strategies.backtest import Backtester, BarPanel
+from hammerib.strategies.vectorized import HiddenBidStrategy
+
+
+def make_panel(symbols, days=5):
+    dates = pd.date_range("2024-01-02", periods=days, freq="B")
+    frames = {}
+    for i, symbol in enumerate(symbols):
+        close = 20.0 + i + np.arange(days) * 0.1
+        frames[symbol] = pd.DataFrame({"close": close, "low": close - 0.2, "high": close + 0.2}, index=dates)
+    return BarPanel.from_frames(frames)
+
+
+def make_etf_panel(days=5, pff_step=0.5):
+    dates = pd.date_range("2024-01-02", periods=days, freq="B")
+    return BarPanel.from_frames({
+        "PFF": pd.DataFrame({"close": 30.0 + np.arange(days) * pff_step}, index=dates),
+        "TLT": pd.DataFrame({"close": np.full(days, 90.0)}, index=dates),
+    })
+
+
+class BacktesterFactorsTest(unittest.TestCase):
+    def test_factor_only_symbol_is_ignored(self):
+        panel = make_panel(["AAA", "BBB"])
+        factors = pd.DataFrame({
+            "PREF IBKR": ["AAA", "BBB", "NOBARS"],
+            "FINAL_THG": [10.0, 10.0, 10.0],
+            "Final_Shares": [200, 200, 200],
+        })
+        backtester = Backtester(panel, HiddenBidStrategy(lot=100), factors, etf_panel=make_etf_panel())
+        self.assertEqual(backtester.board.symbols, ["AAA", "BBB"])
+
+        result = backtester.run()
+        self.assertEqual(list(result.by_symbol.index), ["AAA", "BBB"])
+        self.assertTrue((result.by_symbol["quantity"] <= 200).all())
+        self.assertGreater(len(result.fills), 0)
+
+    def test_missing_benchmark_etfs_raise(self):
+        with self.assertRaises(ValueError):
+            Backtester(make_panel(["AAA"]), HiddenBidStrategy(lot=100))
+
+    def test_benchmark_pnl_follows_etf_bars(self):
+        panel = make_panel(["AAA"])
+        factors = pd.DataFrame({"PREF IBKR": ["AAA"], "FINAL_THG": [10.0], "Final_Shares": [100]})
+        result = Backtester(panel, HiddenBidStrategy(lot=100), factors, etf_panel=make_etf_panel()).run()
+        self.assertGreater(len(result.fills), 0)
+        # T benchmark = 0.7 * PFF + 0.1 * TLT; PFF rises 0.5 a day, TLT is flat
+        row = result.by_symbol.loc["AAA"]
+        fill = result.fills.iloc[0]
+        held_days = len(panel.dates) - 1 - panel.dates.get_loc(fill["date"])
+        self.assertAlmostEqual(row["benchmark_pnl"], row["quantity"] * 0.7 * 0.5 * held_days)
+
+
+if __name__ == "__main__":
+    unittest.main()
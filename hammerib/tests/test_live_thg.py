@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from hammerib.data.live_thg import DEFAULT_WEIGHTS, LiveFinalThg
+
+
+def nightly_normalize(series, lower, upper, max_score=90, score_range=80):
+    """normalize_values / normalize_6m_values of normalize_data.py"""
+    mask = (series >= lower) & (series < upper)
+    inside = series[mask]
+    normalized = pd.Series(np.nan, index=series.index)
+    normalized[mask] = max_score - (inside - inside.min()) / (inside.max() - inside.min()) * score_range
+    return normalized
+
+
+def make_nightly(n=40, days=300, seed=7):
+    """A T universe as the nightly chain writes it: ibkrtry columns, normalize_data norms, FINAL_THG"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        close = 25 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+        high, low = close * 1.005, close * 0.995
+        last = close[-1]
+        sma88, sma268 = close[-88:].mean(), close[-268:].mean()
+        time_to_div, div_amount = rng.integers(1, 90), rng.uniform(0.2, 0.5)
+        rows.append({
+            'PREF IBKR': f'P{i:02d}', 'Last Price': last,
+            'SMA88': sma88, 'SMA268': sma268,
+            'SMA88 chg': (last - sma88) / sma88 * 100, 'SMA268 chg': (last - sma268) / sma268 * 100,
+            '6M High': high[-180:].max(), '6M Low': low[-180:].min(),
+            '1Y High': high.max(), '1Y Low': low.min(),
+            'TIME TO DIV': time_to_div, 'DIV AMOUNT': div_amount,
+            'Div adj.price': last - (90 - time_to_div) / 90 * div_amount,
+            'Aug2022_Price': close[0], 'Oct19_Price': close[20],
+            'COUPON': f'{rng.uniform(4, 8):.3f}%', 'SOLIDITY_SCORE': rng.uniform(20, 60),
+        })
+    df = pd.DataFrame(rows)
+
+    px = df['Div adj.price']
+    norms = {
+        'SMA88_chg_norm': nightly_normalize(df['SMA88 chg'], -15, 15),
+        'SMA268_chg_norm': nightly_normalize(df['SMA268 chg'], -15, 15),
+        '6M_High_diff_norm': nightly_normalize(px - df['6M High'], -8, 15),
+        '6M_Low_diff_norm': nightly_normalize(px - df['6M Low'], -8, 15),
+        '1Y_High_diff_norm': nightly_normalize(px - df['1Y High'], -8, 15),
+        '1Y_Low_diff_norm': nightly_normalize(px - df['1Y Low'], -8, 15),
+        'Aug4_chg_norm': nightly_normalize(px - df['Aug2022_Price'], -8, 15),
+        'Oct19_chg_norm': nightly_normalize(px - df['Oct19_Price'], -8, 15),
+        'SOLIDITY_SCORE': df['SOLIDITY_SCORE'],
+        'CUR_YIELD': 25 * pd.to_numeric(df['COUPON'].str.replace('%', '')) / df['Last Price'] / 100,
+    }
+    # calculate_final_thg_dynamic.py: round to 2 decimals, fill gaps with the 12% quantile
+    c = {}
+    for name, values in norms.items():
+        values = values.round(2)
+        if values.isna().any():
+            values = values.fillna(values.dropna().quantile(0.12).round(2))
+        c[name] = values
+    df['FINAL_THG'] = (
+        (c['SMA88_chg_norm'] * 0.6 + c['SMA268_chg_norm'] * 0.9) +
+        (c['6M_High_diff_norm'] + c['6M_Low_diff_norm'] + c['1Y_High_diff_norm'] +
+         c['1Y_Low_diff_norm'] * 1.2) * 0.35 +
+        (c['Aug4_chg_norm'] * 0.7 + c['Oct19_chg_norm'] * 1.3) * 0.25 +
+        c['SOLIDITY_SCORE'] * DEFAULT_WEIGHTS['solidity_weight'] +
+        c['CUR_YIELD'] * DEFAULT_WEIGHTS['yield_weight']
+    ).round(2)
+    return df
+
+
+class LiveFinalThgTest(unittest.TestCase):
+    def test_nightly_prices_reproduce_nightly_final_thg(self):
+        nightly = make_nightly()
+        engine = LiveFinalThg(nightly, 'T')
+        np.testing.assert_allclose(engine.columns['FINAL_THG'], nightly['FINAL_THG'], atol=1e-9)
+
+        # Streaming the nightly prices back in changes nothing
+        engine.set_prices({s: p * 1.01 for s, p in zip(nightly['PREF IBKR'], nightly['Last Price'])})
+        engine.recompute()
+        engine.set_prices(dict(zip(nightly['PREF IBKR'], nightly['Last Price'])))
+        self.assertTrue(engine.recompute())
+        np.testing.assert_allclose(engine.columns['FINAL_THG'], nightly['FINAL_THG'], atol=1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main()
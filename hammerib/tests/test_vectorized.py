@@ -0,0 +1,62 @@
+import unittest
+
+import pandas as pd
+
+from hammerib.strategies.vectorized import HiddenBidStrategy, QuoteBoard, VectorStrategyRunner
+
+
+def make_runner(final_shares=200):
+    board = QuoteBoard(["AAA"])
+    board.load_factors(pd.DataFrame({"PREF IBKR": ["AAA"], "FINAL_THG": [10.0], "Final_Shares": [final_shares]}))
+    runner = VectorStrategyRunner("runner", board)
+    runner.add_strategy(HiddenBidStrategy(lot=100))
+    sent = []
+    runner.order_handler = sent.append
+    runner.start()
+    return board, runner, sent
+
+
+def tick(runner):
+    runner.update_market_data("AAA", {"bid": 25.0, "ask": 25.2})
+    runner.on_batch_end()
+
+
+class PendingQuantityTest(unittest.TestCase):
+    def test_fill_stays_pending_until_position_update(self):
+        board, runner, sent = make_runner()
+        tick(runner)
+        tick(runner)
+        self.assertEqual(len(sent), 2)
+
+        runner.update_order(sent[0]["clOrdId"], {"status": "Filled"})
+        tick(runner)
+        self.assertEqual(len(sent), 2)  # Filled but not in the position yet: no re-buy
+        self.assertEqual(board.columns["pending_qty"][0], 200)
+
+        runner.update_position("AAA", {"quantity": 100})
+        tick(runner)
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(board.columns["pending_qty"][0], 100)
+
+    def test_position_ahead_of_fill_is_not_counted_twice(self):
+        board, runner, sent = make_runner()
+        tick(runner)
+        tick(runner)
+        runner.update_position("AAA", {"quantity": 150})
+        self.assertEqual(board.columns["pending_qty"][0], 50)
+
+        runner.update_order(sent[0]["clOrdId"], {"status": "Filled"})
+        runner.update_order(sent[1]["clOrdId"], {"status": "Canceled", "filledQty": 50})
+        self.assertEqual(board.columns["pending_qty"][0], 0)
+        tick(runner)
+        self.assertEqual(len(sent), 2)  # 150 held + 0 pending leaves less than a lot
+
+    def test_orders_are_tracked_without_a_numbering_handler(self):
+        board, runner, sent = make_runner()
+        tick(runner)
+        self.assertTrue(sent[0]["clOrdId"])
+        self.assertEqual(board.columns["pending_qty"][0], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,221 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Hashable, Optional
+
+from hammerib.config import settings
+
+# Pipeline stages, in the order a quote travels towards the broker
+STAGES = ('quote', 'score', 'order', 'send', 'ack')
+
+# (start stage, end stage) intervals recorded automatically by LatencyProbe.mark
+STAGE_SPANS = (
+    ('quote', 'score'),
+    ('score', 'order'),
+    ('order', 'send'),
+    ('send', 'ack'),
+    ('quote', 'send'),   # tick-to-order
+    ('quote', 'ack'),    # tick-to-ack
+)
+
+_SUB_BUCKET_BITS = 7
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS       # 128 linear buckets below 128us
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT >> 1       # 64 buckets per power of two above
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of microsecond latencies.
+
+    Values below 128us are counted exactly; above that every power of two is
+    split into 64 buckets, so the relative error stays under ~1.6% while the
+    whole histogram is a fixed-size list of ints and `record` is O(1).
+    """
+
+    def __init__(self, max_value_us: int = 1 << 36):
+        self.max_value_us = max_value_us
+        self.counts = [0] * (self._index(max_value_us) + 1)
+        self.total = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us: Optional[int] = None
+
+    @staticmethod
+    def _index(value_us: int) -> int:
+        if value_us < _SUB_BUCKET_COUNT:
+            return value_us
+        shift = value_us.bit_length() - _SUB_BUCKET_BITS
+        return _SUB_BUCKET_COUNT + (shift - 1) * _SUB_BUCKET_HALF + ((value_us >> shift) - _SUB_BUCKET_HALF)
+
+    @staticmethod
+    def _upper_bound(index: int) -> int:
+        if index < _SUB_BUCKET_COUNT:
+            return index
+        offset = index - _SUB_BUCKET_COUNT
+        shift = offset // _SUB_BUCKET_HALF + 1
+        mantissa = offset % _SUB_BUCKET_HALF + _SUB_BUCKET_HALF
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value_us: int):
+        """Record a single latency sample (microseconds)"""
+        if value_us < 0:
+            value_us = 0
+        elif value_us > self.max_value_us:
+            value_us = self.max_value_us
+        self.counts[self._index(value_us)] += 1
+        self.total += 1
+        self.sum_us += value_us
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if self.max_us is None or value_us > self.max_us:
+            self.max_us = value_us
+
+    def percentile(self, pct: float) -> Optional[int]:
+        """Return the latency (us) at the given percentile, e.g. 99.0"""
+        if not self.total:
+            return None
+        target = max(1, int(round(self.total * pct / 100.0)))
+        running = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            running += count
+            if running >= target:
+                return min(self._upper_bound(index), self.max_us)
+        return self.max_us
+
+    def summary(self) -> Dict:
+        """Get count, mean, min, max and the usual percentiles (us)"""
+        return {
+            'count': self.total,
+            'mean_us': round(self.sum_us / self.total, 1) if self.total else None,
+            'min_us': self.min_us,
+            'p50_us': self.percentile(50),
+            'p90_us': self.percentile(90),
+            'p99_us': self.percentile(99),
+            'p999_us': self.percentile(99.9),
+            'max_us': self.max_us,
+        }
+
+    def nonzero_buckets(self) -> Dict[int, int]:
+        """Get {bucket upper bound (us): count} for all populated buckets"""
+        return {self._upper_bound(i): c for i, c in enumerate(self.counts) if c}
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.total = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = None
+
+
+class LatencyProbe:
+    """Collects stage timestamps per key (symbol or order id) into histograms.
+
+    `mark(key, stage)` stores a perf_counter timestamp and records every
+    STAGE_SPANS interval that ends at `stage`. `measure`/`timed` record
+    free-standing spans such as Tk refreshes or scoring passes.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._marks: Dict[Hashable, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+
+    @staticmethod
+    def now() -> int:
+        return time.perf_counter_ns()
+
+    def _record(self, name: str, elapsed_ns: int):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(elapsed_ns // 1000)
+
+    def mark(self, key: Hashable, stage: str, ts: Optional[int] = None):
+        """Timestamp `stage` for `key`; a 'quote' mark starts a new chain"""
+        if not self.enabled:
+            return
+        ts = ts if ts is not None else time.perf_counter_ns()
+        with self._lock:
+            if stage == 'quote':
+                self._marks[key] = {'quote': ts}
+                return
+            marks = self._marks.setdefault(key, {})
+            marks[stage] = ts
+            for start, end in STAGE_SPANS:
+                if end == stage and start in marks:
+                    self._record(f"{start}->{end}", ts - marks[start])
+
+    def get_mark(self, key: Hashable, stage: str) -> Optional[int]:
+        return self._marks.get(key, {}).get(stage)
+
+    def transfer(self, src_key: Hashable, dst_key: Hashable):
+        """Carry the marks of `src_key` over to `dst_key` (e.g. symbol -> order id)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            marks = self._marks.get(src_key)
+            if marks:
+                self._marks[dst_key] = dict(marks)
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._marks.pop(key, None)
+
+    def measure(self, name: str, start_ns: int, end_ns: Optional[int] = None):
+        """Record the span between `start_ns` and `end_ns` (default: now)"""
+        if not self.enabled:
+            return
+        end_ns = end_ns if end_ns is not None else time.perf_counter_ns()
+        with self._lock:
+            self._record(name, end_ns - start_ns)
+
+    @contextmanager
+    def timed(self, name: str):
+        """Context manager recording the duration of the wrapped block"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.measure(name, start)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Get summaries for all histograms, keyed by span name"""
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.reset()
+            self._marks.clear()
+            self._started_at = time.time()
+
+    def dump(self, path: Optional[str] = None) -> str:
+        """Write summaries and raw buckets to a JSON file and return its path"""
+        path = path or settings.LATENCY_DUMP_FILE
+        with self._lock:
+            payload = {
+                'started_at': self._started_at,
+                'dumped_at': time.time(),
+                'spans': {
+                    name: {'summary': h.summary(), 'buckets_us': h.nonzero_buckets()}
+                    for name, h in sorted(self.histograms.items())
+                },
+            }
+        with open(path, 'w') as f:
+            json.dump(payload, f, indent=2)
+        self.logger.info(f"Latency histograms written to {path}")
+        return path
+
+
+# Process-wide probe shared by IBKRManager, the GUI order handlers and the Alaric client
+latency_probe = LatencyProbe(enabled=settings.LATENCY_PROBES_ENABLED)
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import deque
+
+from ib_insync import Stock
+
+from bar_store import get_store
+
+# IB: aynı anda en fazla 50 açık tarihsel veri isteği
+MAX_OPEN_REQUESTS = 45
+FALLBACK_DURATIONS = ["3 Y", "2 Y", "1 Y", "6 M"]
+
+def duration_days(duration):
+    amount, unit = duration.split()
+    return int(amount) * {'S': 1 / 86400, 'D': 1, 'W': 7, 'M': 30, 'Y': 365}[unit.upper()]
+
+class RequestPacer:
+    """Kayan pencerede en fazla `max_requests` istek (ör. küçük barlar için IB'nin 10 dakikada 60 istek kuralı)"""
+
+    def __init__(self, max_requests=None, window_seconds=600):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.sent = deque()
+
+    async def wait(self):
+        if not self.max_requests:
+            return
+        while True:
+            now = time.monotonic()
+            while self.sent and now - self.sent[0] >= self.window_seconds:
+                self.sent.popleft()
+            if len(self.sent) < self.max_requests:
+                self.sent.append(now)
+                return
+            await asyncio.sleep(self.window_seconds - (now - self.sent[0]) + 0.01)
+
+
+class HistoricalFetcher:
+    """Çok sayıda sembolün günlük barlarını reqHistoricalDataAsync ile eşzamanlı çeker.
+
+    Aynı anda en fazla `max_concurrent` istek açık tutulur (IB sınırı 50);
+    istenirse RequestPacer ile pencere başına istek sayısı da sınırlanır.
+    Veri gelmeyen semboller sırayla daha kısa sürelerle yeniden denenir; işe
+    yarayan kısa süre depoda hatırlanır ve sonraki çalıştırmalarda uzun süre
+    yeniden denenmeden doğrudan o istenir.
+    Sonuçlar BarStore'a yazılır, yani zaten güncel olan semboller için hiç
+    istek yapılmaz; toplam süre N x (gecikme + bekleme) yerine pacing
+    sınırına yaklaşır.
+    """
+
+    def __init__(self, ib, store=None, max_concurrent=MAX_OPEN_REQUESTS,
+                 fallback_durations=FALLBACK_DURATIONS, max_requests_per_window=None,
+                 window_seconds=600, progress_every=25):
+        self.ib = ib
+        self.store = store or get_store()
+        self.max_concurrent = max_concurrent
+        self.fallback_durations = fallback_durations
+        self.pacer = RequestPacer(max_requests_per_window, window_seconds)
+        self.progress_every = progress_every
+        self.stats = {'symbols': 0, 'hits': 0, 'requests': 0, 'retries': 0, 'failed': 0, 'elapsed_s': 0.0}
+
+    def _durations(self, symbol, duration):
+        """İstenen süre + ondan kısa olan yedek süreler; sembol için çalışan yedek hatırlanıyorsa ondan başlanır"""
+        shorter = [d for d in self.fallback_durations if duration_days(d) < duration_days(duration)]
+        remembered = self.store.fallback_duration(symbol, duration)
+        if remembered in shorter:
+            return shorter[shorter.index(remembered):]
+        return [duration] + shorter
+
+    async def _qualify(self, symbols, contracts):
+        """Kontratları olmayan sembolleri parça parça, eşzamanlı doğrula"""
+        missing = [Stock(s, 'SMART', 'USD') for s in symbols if s not in contracts]
+        for i in range(0, len(missing), self.max_concurrent):
+            chunk = missing[i:i + self.max_concurrent]
+            try:
+                await self.ib.qualifyContractsAsync(*chunk)
+            except Exception as e:
+                print(f"! Kontrat doğrulama hatası: {e}")
+            for contract in chunk:
+                if contract.conId:
+                    contracts[contract.symbol] = contract
+        return contracts
+
+    async def _fetch_one(self, symbol, duration, contract, semaphore, progress):
+        for attempt, dur in enumerate(self._durations(symbol, duration)):
+            if attempt:
+                self.stats['retries'] += 1
+            try:
+                async with semaphore:
+                    if self.store.plan(symbol, dur)[0] != 'hit':
+                        await self.pacer.wait()
+                        self.stats['requests'] += 1
+                    else:
+                        self.stats['hits'] += 1
+                    await self.store.update_async(self.ib, symbol, dur, contract=contract)
+                df = self.store.window(symbol, dur)
+                if len(df) > 0:
+                    # Hangi sürenin çalıştığı saklanır; ertesi gece uzun süre boşuna tekrar istenmez
+                    self.store.remember_fallback(symbol, duration, dur)
+                    progress(symbol)
+                    return symbol, df
+            except Exception as e:
+                print(f"! {symbol} tarihsel veri hatası ({dur}): {e}")
+        self.stats['failed'] += 1
+        progress(symbol)
+        return symbol, None
+
+    async def fetch(self, symbols, duration="2 Y", contracts=None):
+        """{sembol: DataFrame} döndür; verisi alınamayan semboller sonuçta yer almaz"""
+        started = time.perf_counter()
+        symbols = list(dict.fromkeys(s for s in symbols if s))
+        contracts = dict(contracts or {})
+        total = len(symbols)
+        done = [0]
+
+        def progress(symbol):
+            done[0] += 1
+            if done[0] % self.progress_every == 0 or done[0] == total:
+                print(f"Tarihsel veri: {done[0]}/{total} sembol ({time.perf_counter() - started:.1f} sn)")
+
+        # Sadece istek gerekecek semboller için kontrat doğrula
+        need = [s for s in symbols if self.store.plan(s, self._durations(s, duration)[0])[0] != 'hit']
+        if need:
+            await self._qualify(need, contracts)
+
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        with self.store.batch():  # Manifest sembol başına değil, sonda bir kez kaydedilir
+            results = await asyncio.gather(*(
+                self._fetch_one(s, duration, contracts.get(s), semaphore, progress) for s in symbols
+            ))
+        self.stats['symbols'] += total
+        self.stats['elapsed_s'] = round(time.perf_counter() - started, 2)
+        print(f"Tarihsel veri tamamlandı: {self.stats}")
+        return {symbol: df for symbol, df in results if df is not None}
@@ -3,6 +3,8 @@ import numpy as np
 import os
 from datetime import datetime, timedelta
 from ib_insync import IB, Stock, util
+from bar_store import get_store
+from table_io import read_table, write_table
 
 # Risk analizi için kullanılacak ETF'ler ve endeksler
 RISK_INDICATORS = {
@@ -44,10 +46,23 @@ def get_historical_data(ib, symbols, duration="15 D", bar_size="1 day"):
     bar_size: "1 day", "1 hour", etc.
     """
     all_data = {}
+    store = get_store() if bar_size == "1 day" else None
     
     for symbol in symbols:
         try:
             print(f"{symbol} için veri çekiliyor...")
+            if store is not None:
+                # Günlük barlar ortak bar deposundan; sadece eksik kuyruk IBKR'den çekilir
+                df = store.get_bars(ib, symbol, duration)
+                if len(df) > 0:
+                    all_data[symbol] = df
+                    print(f"✅ {symbol}: {len(df)} gün veri alındı")
+                else:
+                    print(f"⚠️ {symbol} için veri alınamadı")
+                if store.last_action != 'hit':
+                    ib.sleep(1)
+                continue
+            
             contract = Stock(symbol, 'SMART', 'USD')
             
             # Kontratı doğrula
@@ -259,7 +274,7 @@ def save_market_weights(market_weights):
         
         # Pandas DataFrame'e dönüştür ve kaydet
         df = pd.DataFrame([market_weights])
-        df.to_csv('market_weights.csv', index=False)
+        write_table(df, 'market_weights.csv', index=False)
         print("\nPiyasa ağırlıkları 'market_weights.csv' dosyasına kaydedildi.")
         
         return True
@@ -271,7 +286,7 @@ def get_saved_market_weights():
     """Kaydedilmiş piyasa ağırlıklarını yükler"""
     try:
         if os.path.exists('market_weights.csv'):
-            df = pd.read_csv('market_weights.csv')
+            df = read_table('market_weights.csv')
             if len(df) > 0:
                 # Bugünün tarihi mi kontrol et
                 today = datetime.now().strftime('%Y-%m-%d')
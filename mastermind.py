@@ -4,6 +4,10 @@ import os
 import time
 from datetime import datetime, timedelta
 from ib_insync import IB, Stock, Contract, util
+from bar_store import get_store
+from correlation_engine import etf_relationships, return_matrix
+from historical_fetcher import HistoricalFetcher
+from table_io import write_table
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.cluster import KMeans, AgglomerativeClustering
@@ -46,6 +50,7 @@ class MastermindAnalysis:
         self.n_groups = 12        # Oluşturulacak grup sayısı
         self.lstm_encodings = {}  # LSTM tabanlı kodlamalar (hisselerin davranış parmak izleri)
         self.optimal_weights = None  # Otomatik bulunan optimal ağırlıklar
+        self.bar_store = get_store()  # Diğer scriptlerle paylaşılan günlük bar deposu
         
     def connect_to_ibkr(self):
         """IBKR'ye bağlan"""
@@ -139,6 +144,13 @@ class MastermindAnalysis:
         for dur in durations:
             try:
                 print(f"{symbol} için {dur} tarihsel veri alınıyor...")
+                if bar_size == "1 day":
+                    # Ortak bar deposu: önceki çalıştırmalardan kalan barlar okunur, sadece eksik kuyruk çekilir
+                    df = self.bar_store.get_bars(self.ib, symbol, dur, contract=contract)
+                    if len(df) > 0:
+                        print(f"{symbol} için {len(df)} veri noktası alındı")
+                        return df
+                    continue
                 bars = self.ib.reqHistoricalData(
                     contract,
                     endDateTime='',
@@ -168,34 +180,29 @@ class MastermindAnalysis:
         # Tarihsel verileri saklamak için dictionary
         self.historical_data = {}
         
-        # Preferred hisseler için tarihsel veri al
-        for symbol in tqdm(self.pref_symbols, desc="Preferred Hisseler"):
-            df = self.get_historical_data(symbol)
-            if not df.empty:
+        # Tüm semboller eşzamanlı istenir (en fazla 45 açık istek); depoda güncel olanlar için istek yapılmaz
+        fetcher = HistoricalFetcher(self.ib, self.bar_store)
+        frames = util.run(fetcher.fetch(self.pref_symbols, "3 Y"))
+        for symbol in self.pref_symbols:
+            df = frames.get(symbol)
+            if df is not None and not df.empty:
                 # Tarih sütununu index olarak ayarla
-                df['date'] = pd.to_datetime(df['date'])
-                df.set_index('date', inplace=True)
+                df = df.set_index(pd.to_datetime(df['date']))
                 
                 # Sadece close ve volume sütunlarını sakla
                 self.historical_data[symbol] = df[['close', 'volume']]
-            
-            # API limit aşımlarına karşı bekle
-            time.sleep(1)
         
         # ETF'ler için tarihsel veri al
         print("ETF'lerin tarihsel verileri alınıyor...")
-        for etf in tqdm(ETFS, desc="ETF'ler"):
-            df = self.get_historical_data(etf)
-            if not df.empty:
+        frames = util.run(fetcher.fetch(ETFS, "3 Y"))
+        for etf in ETFS:
+            df = frames.get(etf)
+            if df is not None and not df.empty:
                 # Tarih sütununu index olarak ayarla
-                df['date'] = pd.to_datetime(df['date'])
-                df.set_index('date', inplace=True)
+                df = df.set_index(pd.to_datetime(df['date']))
                 
                 # Sadece close sütununu sakla
                 self.etf_data[etf] = df[['close']]
-            
-            # API limit aşımlarına karşı bekle
-            time.sleep(1)
         
         print(f"{len(self.historical_data)} preferred hisse ve {len(self.etf_data)} ETF için tarihsel veri alındı")
         
@@ -287,12 +294,12 @@ class MastermindAnalysis:
         print("Günlük getiriler hesaplandı")
     
     def calculate_correlations_with_etfs(self):
-        """Her hissenin ETF'lerle ilişkisini makine öğrenimi teknikleriyle analiz et"""
+        """Her hissenin ETF'lerle ilişkisini tarih hizalı getiri matrisleri üzerinden analiz et"""
         print("ETF ilişkileri gelişmiş analiz ile hesaplanıyor...")
         
         correlation_data = []
+        qualified = []  # ETF ilişkisi hesaplanacak (yeterli verisi olan) hisseler
         
-        # Her hisse için ETF'lerle ilişkiyi analiz et
         for symbol, df in self.historical_data.items():
             symbol_data = {'Symbol': symbol}
             
@@ -303,6 +310,7 @@ class MastermindAnalysis:
             # Volatilite ve hacim metrikleri
             returns = df['return'].dropna()
             if len(returns) > 10:  # Yeterli veri var mı?
+                qualified.append(symbol)
                 symbol_data['Volatility'] = returns.std() * np.sqrt(252)  # Yıllık volatilite
                 
                 # Hacim verisini kontrol et - yoksa varsayılan değer kullan
@@ -313,72 +321,22 @@ class MastermindAnalysis:
                     symbol_data['Avg_Volume'] = 0
                     # Log uyarısı ekle
                     print(f"UYARI: {symbol} için 'volume' verisi bulunamadı, 0 olarak varsayıldı")
-                
-                # Her ETF için gelişmiş ilişki analizi
-                for etf in ETFS:
-                    if etf in self.etf_data:
-                        etf_returns = self.etf_data[etf]['return'].dropna()
-                        
-                        # Ortak tarihlerdeki getiriler
-                        common_dates = returns.index.intersection(etf_returns.index)
-                        
-                        if len(common_dates) > 30:  # En az 30 ortak gün
-                            # 1. Basit korelasyon
-                            corr = returns.loc[common_dates].corr(etf_returns.loc[common_dates])
-                            symbol_data[f'Corr_{etf}'] = corr
-                            
-                            # 2. ETF'nin gecikmeli etkileri (ETF hareketinden sonraki 1-3 gün)
-                            lag_effects = []
-                            for lag in range(1, 4):  # 1, 2, 3 günlük gecikmeler
-                                # ETF t gününde, hisse t+lag gününde
-                                paired_data = pd.DataFrame({
-                                    'etf': etf_returns.loc[common_dates].values[:-lag] if lag < len(common_dates) else [],
-                                    'stock': returns.loc[common_dates].values[lag:] if lag < len(common_dates) else []
-                                })
-                                
-                                if len(paired_data) > 20:  # Yeterli veri var mı
-                                    lag_corr = paired_data['etf'].corr(paired_data['stock'])
-                                    lag_effects.append(lag_corr)
-                                else:
-                                    lag_effects.append(0)
-                            
-                            # Gecikme etkilerinin ortalaması
-                            symbol_data[f'Lag_Effect_{etf}'] = np.mean(lag_effects)
-                            
-                            # 3. Hisse ve ETF hareket yönleri arasındaki ilişki
-                            # (Pozitif veya negatif hareketin uyumluluğu)
-                            etf_up = etf_returns.loc[common_dates] > 0
-                            stock_up = returns.loc[common_dates] > 0
-                            direction_match = (etf_up & stock_up) | (~etf_up & ~stock_up)  # Aynı yönde hareket
-                            direction_match_ratio = direction_match.mean()  # Yön uyumu oranı
-                            symbol_data[f'Direction_Match_{etf}'] = direction_match_ratio
-                            
-                            # 4. Koşullu ilişki: ETF yükselirken/düşerken hissenin tepkisi
-                            etf_up_days = etf_returns.loc[common_dates] > 0
-                            etf_down_days = etf_returns.loc[common_dates] < 0
-                            
-                            if sum(etf_up_days) > 10:
-                                up_response = returns.loc[common_dates][etf_up_days].mean() / etf_returns.loc[common_dates][etf_up_days].mean()
-                                symbol_data[f'Up_Response_{etf}'] = up_response
-                            else:
-                                symbol_data[f'Up_Response_{etf}'] = 0
-                                
-                            if sum(etf_down_days) > 10:
-                                down_response = returns.loc[common_dates][etf_down_days].mean() / etf_returns.loc[common_dates][etf_down_days].mean()
-                                symbol_data[f'Down_Response_{etf}'] = down_response
-                            else:
-                                symbol_data[f'Down_Response_{etf}'] = 0
-                        else:
-                            # Yeterli veri yoksa NaN değerler
-                            symbol_data[f'Corr_{etf}'] = np.nan
-                            symbol_data[f'Lag_Effect_{etf}'] = np.nan
-                            symbol_data[f'Direction_Match_{etf}'] = np.nan
-                            symbol_data[f'Up_Response_{etf}'] = np.nan
-                            symbol_data[f'Down_Response_{etf}'] = np.nan
             
             correlation_data.append(symbol_data)
         
         self.correlation_data = pd.DataFrame(correlation_data)
+        
+        # Tüm hisse x ETF çiftleri tek seferde: korelasyon, 1-3 gün gecikmeli etki,
+        # yön uyumu ve ETF yükselirken/düşerken hissenin tepkisi (bkz. correlation_engine)
+        etfs = [etf for etf in ETFS if etf in self.etf_data]
+        if qualified and etfs:
+            started = time.perf_counter()
+            stock_returns = return_matrix({symbol: self.historical_data[symbol] for symbol in qualified})
+            etf_returns = return_matrix({etf: self.etf_data[etf] for etf in etfs}, dates=stock_returns.index)
+            relations = etf_relationships(stock_returns, etf_returns)
+            self.correlation_data = self.correlation_data.join(relations, on='Symbol')
+            print(f"{len(qualified)} hisse x {len(etfs)} ETF ilişkisi {time.perf_counter() - started:.2f} sn'de hesaplandı")
+        
         print(f"{len(correlation_data)} hisse için gelişmiş ETF ilişki analizi hesaplandı")
         
         return self.correlation_data
@@ -1054,7 +1012,7 @@ class MastermindAnalysis:
                 })
             
             hist_df = pd.DataFrame(hist_results)
-            hist_df.to_csv("mastermind_historical_results.csv", index=False)
+            write_table(hist_df, "mastermind_historical_results.csv", index=False)
             print(f"Historical sonuçlar 'mastermind_historical_results.csv' dosyasına kaydedildi.")
         
         # EXTLT hisseler için sonuçlar
@@ -1068,7 +1026,7 @@ class MastermindAnalysis:
                 })
             
             extlt_df = pd.DataFrame(extlt_results)
-            extlt_df.to_csv("mastermind_extlt_results.csv", index=False)
+            write_table(extlt_df, "mastermind_extlt_results.csv", index=False)
             print(f"EXTLT sonuçlar 'mastermind_extlt_results.csv' dosyasına kaydedildi.")
         
         # Tüm sonuçları birleştirip kaydet
@@ -1090,7 +1048,7 @@ class MastermindAnalysis:
         
         if all_results:
             all_df = pd.DataFrame(all_results)
-            all_df.to_csv("mastermind_all_results.csv", index=False)
+            write_table(all_df, "mastermind_all_results.csv", index=False)
             print(f"Tüm sonuçlar 'mastermind_all_results.csv' dosyasına kaydedildi.")
         
         print("Sonuçlar başarıyla kaydedildi.")
@@ -1,4 +1,5 @@
 import pandas as pd
+from table_io import read_table, write_table
 
 def merge_group_data():
     print("Mastermind Grup verilerini CSV dosyalarına aktarma işlemi başlatılıyor...")
@@ -9,11 +10,11 @@ def merge_group_data():
         print("Historical veri setleri yükleniyor...")
         
         # Ana veri dosyası (volume verileri ile)
-        final_thg = pd.read_csv('final_thg_results.csv')
+        final_thg = read_table('final_thg_results.csv')
         print(f"final_thg_results.csv yüklendi: {len(final_thg)} satır")
         
         # Grup bilgisi dosyası
-        mastermind_hist = pd.read_csv('mastermind_historical_results.csv')
+        mastermind_hist = read_table('mastermind_historical_results.csv')
         print(f"mastermind_historical_results.csv yüklendi: {len(mastermind_hist)} satır")
         
         # Ortak sütun belirleme - genellikle ticker/sembol sütunu
@@ -78,7 +79,7 @@ def merge_group_data():
         print(group_stats.to_string(index=False))
         
         # Yeni CSV dosyasına kaydet
-        final_thg_with_group.to_csv('mastermind_histport.csv', index=False)
+        write_table(final_thg_with_group, 'mastermind_histport.csv', index=False)
         print(f"mastermind_histport.csv dosyası oluşturuldu: {len(final_thg_with_group)} satır")
         
         # Eksik grup bilgisi olanları kontrol et
@@ -95,7 +96,7 @@ def merge_group_data():
                 final_thg_with_group['Group'] = final_thg_with_group['Group'].fillna(largest_group)
                 
                 # Güncellenmiş dosyayı tekrar kaydet
-                final_thg_with_group.to_csv('mastermind_histport.csv', index=False)
+                write_table(final_thg_with_group, 'mastermind_histport.csv', index=False)
                 print(f"Güncellenmiş mastermind_histport.csv dosyası oluşturuldu")
         
     except Exception as e:
@@ -107,11 +108,11 @@ def merge_group_data():
         print("\nEXTLT veri setleri yükleniyor...")
         
         # Ana veri dosyası
-        final_extlt = pd.read_csv('final_extlt.csv')
+        final_extlt = read_table('final_extlt.csv')
         print(f"final_extlt.csv yüklendi: {len(final_extlt)} satır")
         
         # Grup bilgisi dosyası
-        mastermind_extlt = pd.read_csv('mastermind_extlt_results.csv')
+        mastermind_extlt = read_table('mastermind_extlt_results.csv')
         print(f"mastermind_extlt_results.csv yüklendi: {len(mastermind_extlt)} satır")
         
         # Ortak sütun belirleme
@@ -173,7 +174,7 @@ def merge_group_data():
         print(group_stats.to_string(index=False))
         
         # Yeni CSV dosyasına kaydet
-        final_extlt_with_group.to_csv('mastermind_extltport.csv', index=False)
+        write_table(final_extlt_with_group, 'mastermind_extltport.csv', index=False)
         print(f"mastermind_extltport.csv dosyası oluşturuldu: {len(final_extlt_with_group)} satır")
         
         # Eksik grup bilgisi olanları kontrol et
@@ -190,7 +191,7 @@ def merge_group_data():
                 final_extlt_with_group['Group'] = final_extlt_with_group['Group'].fillna(largest_group)
                 
                 # Güncellenmiş dosyayı tekrar kaydet
-                final_extlt_with_group.to_csv('mastermind_extltport.csv', index=False)
+                write_table(final_extlt_with_group, 'mastermind_extltport.csv', index=False)
                 print(f"Güncellenmiş mastermind_extltport.csv dosyası oluşturuldu")
         
     except Exception as e:
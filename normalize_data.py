@@ -1,143 +1,11 @@
 import pandas as pd
 import numpy as np
-import time
-from ib_insync import IB, Stock, util  # yfinance yerine ib_insync kullanacağız
-
-def get_last_prices(symbols):
-    """IBKR Gateway'den son fiyatları al"""
-    last_prices = {}
-    print("\nIBKR Gateway'den son fiyatlar alınıyor...")
-    
-    # IBKR'ye bağlan
-    ib = IB()
-    connected = False
-    
-    try:
-        # TWS ve Gateway portlarını dene
-        ports = [7496, 4001]  # TWS ve Gateway portları
-        for port in ports:
-            try:
-                ib.connect('127.0.0.1', port, clientId=10, readonly=True)
-                connected = True
-                print(f"✓ IBKR {port} portu ile bağlantı başarılı!")
-                break
-            except Exception as e:
-                print(f"! IBKR {port} bağlantı hatası: {e}")
-        
-        if not connected:
-            print("! Hiçbir porta bağlanılamadı. TWS veya Gateway çalışıyor mu?")
-            return {}
-        
-        # Delayed data (gerçek hesap yoksa)
-        ib.reqMarketDataType(3)
-        
-        # Sembolleri gruplara böl (50 sembol/batch)
-        batch_size = 50
-        symbol_batches = [symbols[i:i+batch_size] for i in range(0, len(symbols), batch_size)]
-        
-        for batch_idx, symbol_batch in enumerate(symbol_batches):
-            print(f"Batch {batch_idx+1}/{len(symbol_batches)} işleniyor ({len(symbol_batch)} sembol)")
-            
-            # Bu batch için kontratları ve istekleri hazırla
-            contracts = {}
-            
-            for symbol in symbol_batch:
-                try:
-                    # Sembol geçerlilik kontrolü
-                    if pd.isna(symbol) or symbol == '-':
-                        continue
-                    
-                    # Kontrat oluştur
-                    contract = Stock(symbol=symbol, exchange='SMART', currency='USD')
-                    contracts[symbol] = contract
-                    
-                    # Market verisi iste
-                    ib.reqMktData(contract, '', False, False)
-                    
-                    # Her 10 istekte bir kısa bekleme yap
-                    if len(contracts) % 10 == 0:
-                        time.sleep(0.2)
-                        
-                except Exception as e:
-                    print(f"! {symbol} veri isteği hatası: {e}")
-            
-            # Verilerin gelmesini bekle
-            time.sleep(2)  # İlk verilerin gelmesi için bekle
-            
-            # Toplanan verileri işle
-            max_wait_time = 8  # Maksimum 8 saniye bekle
-            start_time = time.time()
-            collected = 0
-            
-            while time.time() - start_time < max_wait_time:
-                # IBKR olaylarını işle
-                ib.sleep(0.5)
-                
-                # Gelen verileri kontrol et ve kaydet
-                for ticker in ib.tickers():
-                    symbol = ticker.contract.symbol
-                    
-                    # Tercihli hisse kontrolü
-                    if hasattr(ticker.contract, 'localSymbol') and ticker.contract.localSymbol:
-                        if ' PR' in ticker.contract.localSymbol:
-                            symbol = ticker.contract.localSymbol
-                    
-                    # Bu sembol batch'te var mı ve henüz kaydedilmemiş mi?
-                    if symbol in symbol_batch and symbol not in last_prices:
-                        # Son fiyat veya kapanış fiyatını kullan
-                        if ticker.last and not pd.isna(ticker.last):
-                            last_prices[symbol] = float(ticker.last)
-                            collected += 1
-                            print(f"✓ {symbol} son fiyat: ${ticker.last:.2f}")
-                        elif ticker.close and not pd.isna(ticker.close):
-                            last_prices[symbol] = float(ticker.close)
-                            collected += 1
-                            print(f"✓ {symbol} kapanış fiyatı: ${ticker.close:.2f}")
-                
-                # Tüm fiyatlar alındı mı?
-                if collected >= len(symbol_batch) * 0.8:  # En az %80'i alınırsa yeterli say
-                    break
-                elif (time.time() - start_time) % 2 < 0.1:  # Her 2 saniyede bir durum raporu ver
-                    print(f"İşleniyor... {collected}/{len(symbol_batch)} sembol alındı (%{collected/len(symbol_batch)*100:.1f})")
-            
-            # Market verisi aboneliklerini iptal et
-            for contract in contracts.values():
-                try:
-                    ib.cancelMktData(contract)
-                except:
-                    pass
-            
-            # Batch'ler arası bekleme yap
-            if batch_idx < len(symbol_batches) - 1:
-                print(f"Rate limit'e takılmamak için 5 saniye bekleniyor...")
-                time.sleep(5)
-        
-        # Eksik sembolleri raporla
-        missing = [s for s in symbols if s not in last_prices and s != '-' and not pd.isna(s)]
-        if missing:
-            print(f"\n! {len(missing)} sembol için fiyat alınamadı:")
-            if len(missing) <= 20:
-                for symbol in missing:
-                    print(f"- {symbol}")
-            else:
-                print(f"- İlk 20 sembol: {missing[:20]}...")
-        
-        print(f"\nToplam {len(last_prices)} sembol için fiyat alındı ({len(last_prices)/len([s for s in symbols if s != '-' and not pd.isna(s)])*100:.1f}%)")
-        
-    except Exception as e:
-        print(f"Veri çekme hatası: {e}")
-    
-    finally:
-        # Bağlantıyı her durumda kapat
-        if ib.isConnected():
-            ib.disconnect()
-            print("IBKR bağlantısı kapatıldı.")
-    
-    return last_prices
+from snapshot_prices import get_last_prices  # snapshot istekleri, sembol başına future
+from table_io import read_table, write_table
 
 # CSV dosyasını oku - dosya adını kontrol et
 try:
-    df = pd.read_csv('sma_results.csv', sep=',')  # CSV ayracını belirt
+    df = read_table('sma_results.csv', sep=',')  # CSV ayracını belirt
     print("CSV dosyası başarıyla okundu.")
     print("\nOkunan kolonlar:", df.columns.tolist())
 
@@ -326,13 +194,13 @@ try:
         df[col] = df[col].astype(float)
 
     # CSV dosyasını oluştur
-    df.to_csv('normalized_results.csv', 
-             index=False,
-             float_format='%.6f',
-             sep=',',                
-             encoding='utf-8-sig',   
-             lineterminator='\n',    
-             quoting=1)              # Tüm değerleri tırnak içine al
+    write_table(df, 'normalized_results.csv', 
+                   index=False,
+                   float_format='%.6f',
+                   sep=',',                
+                   encoding='utf-8-sig',   
+                   lineterminator='\n',    
+                   quoting=1)              # Tüm değerleri tırnak içine al
 
     print("\nSonuçlar 'normalized_results.csv' dosyasına kaydedildi.")
 
@@ -1,9 +1,21 @@
+import argparse
+import time
 import pandas as pd
 import numpy as np
 import math
+from portfolio_solver import LOT_SIZE, MIN_SHARES, select_max_weight, size_to_budget
+from table_io import read_table, write_table
 
 print("Portföy optimizasyonu ve pozisyon boyutlandırma işlemi başlatılıyor...")
 
+# En kalabalık gruptan başlayarak grup başına hisse limitleri; listede olmayan gruplar DEFAULT_GROUP_LIMIT
+GROUP_LIMIT_VALUES = {
+    "Historical": [11, 8, 7, 6, 5, 4],  # 50 hisseye göre ayarlanmış
+    "EXTLT": [9, 7, 6, 5, 4],           # 35 hisseye göre ayarlanmış
+}
+DEFAULT_GROUP_LIMIT = 4
+DEFAULT_PRICE = 35.0  # Fiyatı bilinmeyen hisseler için varsayılan ortalama hisse fiyatı
+
 def select_top_stocks(data, num_stocks=35, max_stocks_per_company=2, group_limits=None):
     """
     En yüksek FINAL_THG değerlerine göre hisseleri seçer,
@@ -95,6 +107,44 @@ def select_top_stocks(data, num_stocks=35, max_stocks_per_company=2, group_limit
     
     return selected_portfolio
 
+def select_top_stocks_exact(data, num_stocks=35, max_stocks_per_company=2, group_limits=None):
+    """
+    select_top_stocks ile aynı limitler (şirket başına, grup başına, toplam hisse),
+    ama toplam FINAL_THG'yi kesin olarak en büyükleyen seçim (min-cost flow).
+    Sıralı açgözlü seçim bir şirketin ya da grubun kotasını erken doldurup
+    daha iyi bir kombinasyonu kaçırabilir; burada bu olmaz.
+    """
+    print(f"\nKesin optimizasyonla {num_stocks} hisse seçiliyor (şirket başına en fazla {max_stocks_per_company})...")
+    
+    required_columns = ['PREF IBKR', 'CMON', 'FINAL_THG']
+    if group_limits:
+        required_columns.append('Group')
+    for col in required_columns:
+        if col not in data.columns:
+            print(f"HATA: {col} kolonu verilerinizde bulunamadı!")
+            return None
+    
+    sorted_data = data.sort_values('FINAL_THG', ascending=False).copy()
+    sorted_data = sorted_data[sorted_data['FINAL_THG'].notna()]
+    groups = sorted_data['Group'].fillna(-1).tolist() if group_limits else [-1] * len(sorted_data)
+    
+    started = time.perf_counter()
+    chosen = select_max_weight(sorted_data['FINAL_THG'].to_numpy(), sorted_data['CMON'].tolist(), groups,
+                               num_stocks, max_stocks_per_company, group_limits)
+    selected_portfolio = sorted_data.iloc[sorted(chosen)].copy()
+    print(f"Seçilen hisse sayısı: {len(selected_portfolio)} (çözüm süresi {(time.perf_counter() - started) * 1000:.1f} ms)")
+    print(f"Toplam FINAL_THG: {selected_portfolio['FINAL_THG'].sum():,.2f}")
+    
+    if group_limits and 'Group' in selected_portfolio.columns:
+        print("\nGruplara göre hisse dağılımı:")
+        group_distribution = selected_portfolio['Group'].fillna(-1).astype(int).value_counts().sort_index()
+        for group, count in group_distribution.items():
+            group_name = f"Grup {group}" if group != -1 else "Tanımlanmamış Grup"
+            limit_info = f" (Limit: {group_limits.get(group, 'Sınırsız')})" if group in group_limits else ""
+            print(f"  {group_name}: {count} hisse{limit_info}")
+    
+    return selected_portfolio
+
 def optimize_portfolio(portfolio_data, target_shares=25000, target_dollars=None):
     """
     Verilen portföyü optimize eder ve hisse dağılımlarını belirler
@@ -206,7 +256,76 @@ def optimize_portfolio(portfolio_data, target_shares=25000, target_dollars=None)
     
     return portfolio_data
 
-def process_file(input_file, output_file, num_stocks=50, max_stocks_per_company=2, target_shares=25000, target_dollars=None, group_limits=None):
+def position_weights(portfolio_data):
+    """optimize_portfolio'daki Normalized_THG / Normalized_ADV / Raw_Size hesaplarının vektörel hali"""
+    thg = portfolio_data["FINAL_THG"].to_numpy(dtype=float)
+    thg_range = thg.max() - thg.min()
+    normalized_thg = 0.1 + 0.9 * ((thg - thg.min()) / thg_range if thg_range else np.ones_like(thg))
+    portfolio_data["Normalized_THG"] = normalized_thg ** 1.5
+    
+    adv = portfolio_data["AVG_ADV"].to_numpy(dtype=float)
+    min_adv = adv.min() if adv.min() > 0 else 1
+    adv_range = adv.max() - min_adv
+    with np.errstate(divide='ignore', invalid='ignore'):
+        normalized_adv = (0.1 + 0.9 * (adv - min_adv) / adv_range) ** 1.3
+    portfolio_data["Normalized_ADV"] = np.where(adv <= 0, 0.1, normalized_adv)
+    
+    portfolio_data["Raw_Size"] = (portfolio_data["Normalized_THG"] * 0.8 + portfolio_data["Normalized_ADV"] * 0.2) * 1000
+    return portfolio_data
+
+def sizing_prices(portfolio_data):
+    """Dolar bütçesinde kullanılan fiyatlar: LAST, yoksa Last Price; eksik fiyatlar DEFAULT_PRICE"""
+    price_column = next((c for c in ("LAST", "Last Price") if c in portfolio_data.columns), None)
+    if price_column is None:
+        return np.full(len(portfolio_data), DEFAULT_PRICE)
+    return pd.to_numeric(portfolio_data[price_column], errors='coerce').fillna(DEFAULT_PRICE).to_numpy()
+
+def optimize_portfolio_exact(portfolio_data, target_shares=25000, target_dollars=None):
+    """
+    optimize_portfolio'nun kesin hali: Raw_Size ağırlıklarıyla orantılı, LOT_SIZE katı,
+    en az MIN_SHARES hisselik pozisyonlar; toplam maliyet hedef doları (yoksa toplam
+    hisse hedefi) aşmadan ideal dağılıma en yakın tam sayı çözüm (sırt çantası DP).
+    """
+    portfolio_data = position_weights(portfolio_data)
+    portfolio_data["Recommended_Shares"] = ((portfolio_data["Raw_Size"] / 100).round() * 100).astype(int)
+    scaling_factor = target_shares / portfolio_data["Recommended_Shares"].sum()
+    portfolio_data["Scaled_Shares"] = ((portfolio_data["Recommended_Shares"] * scaling_factor / LOT_SIZE).round() * LOT_SIZE).astype(int)
+    
+    if target_dollars is None:
+        # Hisse bazlı hedef: her hissenin "fiyatı" 1
+        prices = np.ones(len(portfolio_data))
+        budget = target_shares
+    else:
+        if not {"LAST", "Last Price"} & set(portfolio_data.columns):
+            print("UYARI: Fiyat kolonu bulunamadı, varsayılan $35 fiyatla dolar bütçesi uygulanıyor")
+        prices = sizing_prices(portfolio_data)
+        budget = target_dollars
+    
+    started = time.perf_counter()
+    portfolio_data["Final_Shares"] = size_to_budget(portfolio_data["Raw_Size"].to_numpy(), prices, budget)
+    total = float((portfolio_data["Final_Shares"] * prices).sum())
+    label = "maliyet" if target_dollars is not None else "hisse sayısı"
+    print(f"Kesin boyutlandırma: toplam {label} {total:,.2f} / hedef {budget:,.2f} "
+          f"(kalan {budget - total:,.2f}, çözüm süresi {(time.perf_counter() - started) * 1000:.1f} ms)")
+    
+    if "LAST" in portfolio_data.columns:
+        portfolio_data["Estimated_Cost"] = portfolio_data["Final_Shares"] * portfolio_data["LAST"]
+        if target_dollars is not None:
+            portfolio_data["Dollar_Scaled_Shares"] = portfolio_data["Final_Shares"]
+    
+    print(f"Son toplam hisse sayısı: {portfolio_data['Final_Shares'].sum():,.0f}")
+    return portfolio_data
+
+def build_portfolio(data, num_stocks=50, max_stocks_per_company=2, target_shares=25000, target_dollars=None, group_limits=None, method="exact"):
+    """Seçim + pozisyon boyutlandırma (dosya okuma/yazma yok); portföy oluşturulamazsa None"""
+    select = select_top_stocks_exact if method == "exact" else select_top_stocks
+    portfolio = select(data, num_stocks, max_stocks_per_company, group_limits)
+    if portfolio is None or len(portfolio) == 0:
+        return None
+    optimize = optimize_portfolio_exact if method == "exact" else optimize_portfolio
+    return optimize(portfolio, target_shares=target_shares, target_dollars=target_dollars)
+
+def process_file(input_file, output_file, num_stocks=50, max_stocks_per_company=2, target_shares=25000, target_dollars=None, group_limits=None, method="exact"):
     """
     Verilen dosyayı işler ve portföyü optimize eder
     
@@ -226,29 +345,23 @@ def process_file(input_file, output_file, num_stocks=50, max_stocks_per_company=
         Hedef toplam dolar değeri (default: None)
     group_limits : dict, optional
         Grup başına maksimum hisse limitleri (default: None)
+    method : str, optional
+        'exact' (min-cost flow seçim + sırt çantası boyutlandırma) ya da
+        'greedy' (FINAL_THG sırasıyla seçim + ölçeklendirme) (default: 'exact')
     """
     try:
         print(f"\n{input_file} dosyası işleniyor...")
-        data = pd.read_csv(input_file)
+        data = read_table(input_file)
         print(f"Toplam {len(data)} hisse yüklendi.")
         
-        # En iyi hisseleri seç
-        portfolio = select_top_stocks(data, num_stocks, max_stocks_per_company, group_limits)
+        # En iyi hisseleri seç ve portföyü optimize et
+        portfolio_results = build_portfolio(data, num_stocks, max_stocks_per_company, target_shares,
+                                            target_dollars, group_limits, method)
         
-        if portfolio is None or len(portfolio) == 0:
+        if portfolio_results is None:
             print(f"HATA: Portföy oluşturulamadı! Lütfen giriş verilerinizi kontrol edin.")
             return None
         
-        # Portföyü optimize et
-        optimized_portfolio = optimize_portfolio(
-            portfolio,
-            target_shares=target_shares,
-            target_dollars=target_dollars
-        )
-        
-        # Optimize edilmiş portföyü döndür
-        portfolio_results = optimized_portfolio
-        
         # Sonuçları göster
         print("\nSeçilen hisseler ve önerilen pozisyon boyutları:")
         if len(portfolio_results) <= 15:
@@ -273,7 +386,7 @@ def process_file(input_file, output_file, num_stocks=50, max_stocks_per_company=
                     print(f"  Grup {int(group)}: {count} hisse")
         
         # Çıktıyı dosyaya kaydet
-        portfolio_results.to_csv(output_file, index=False)
+        write_table(portfolio_results, output_file, index=False)
         print(f"\nSonuçlar '{output_file}' dosyasına kaydedildi.")
         
         # İstatistikler
@@ -334,13 +447,20 @@ def process_file(input_file, output_file, num_stocks=50, max_stocks_per_company=
         print(f"HATA: {input_file} dosyası işlenirken bir sorun oluştu: {e}")
         return None
 
-def setup_group_limits(data_file, type_name="Historical"):
+def group_limits_for(groups, limit_values, default_limit=DEFAULT_GROUP_LIMIT):
+    """En çok hisse içeren gruptan başlayarak sırayla limit_values, kalan gruplara default_limit"""
+    group_counts = pd.Series(groups).fillna(-1).value_counts().sort_values(ascending=False)
+    return {group: limit_values[i] if i < len(limit_values) else default_limit
+            for i, group in enumerate(group_counts.index)}
+
+def setup_group_limits(data_file, type_name="Historical", limit_values=None):
     """
     Grup limitlerini hesaplar ve grup başına hisse limitlerini döndürür
+    (limit_values verilmezse GROUP_LIMIT_VALUES[type_name])
     """
     try:
         # Dosyayı yükle ve grup dağılımını bul
-        data = pd.read_csv(data_file)
+        data = read_table(data_file)
         
         if 'Group' not in data.columns:
             print(f"UYARI: {data_file} dosyasında 'Group' sütunu yok!")
@@ -355,42 +475,22 @@ def setup_group_limits(data_file, type_name="Historical"):
             group_name = f"Grup {int(group)}" if group != -1 else "Tanımlanmamış Grup"
             print(f"  {group_name}: {count} hisse")
         
-        # En çok hisse içeren gruplar
-        top_groups = group_counts.index.tolist()
-        
-        # Historical için özel limitler (50 hisseye göre ayarlanmış)
-        if type_name == "Historical":
-            limits = {}
-            # Yeni limitler: 11, 8, 7, 6, 5, 4 ve diğerleri için 4
-            limit_values = [11, 8, 7, 6, 5, 4]
-            
-            for i, group in enumerate(top_groups):
-                if i < len(limit_values):
-                    limits[group] = limit_values[i]
-                else:
-                    limits[group] = 4  # Diğer gruplar için limit 4
-            
-            return limits
-            
-        # EXTLT için özel limitler (35 hisseye göre ayarlanmış)
-        elif type_name == "EXTLT":
-            limits = {}
-            # Yeni limitler: 9, 7, 6, 5, 4 ve diğerleri için 4
-            limit_values = [9, 7, 6, 5, 4]
-            
-            for i, group in enumerate(top_groups):
-                if i < len(limit_values):
-                    limits[group] = limit_values[i]
-                else:
-                    limits[group] = 4  # Diğer gruplar için limit 4
-            
-            return limits
+        if limit_values is None:
+            limit_values = GROUP_LIMIT_VALUES.get(type_name)
+        if limit_values is None:
+            return None
+        return group_limits_for(data['Group'], limit_values)
             
     except Exception as e:
         print(f"HATA: Grup limitleri hesaplanırken bir sorun oluştu: {e}")
         return None
 
 def main():
+    parser = argparse.ArgumentParser(description="Portföy seçimi ve pozisyon boyutlandırma")
+    parser.add_argument('--method', choices=['exact', 'greedy'], default='exact',
+                        help="exact: kesin seçim + bütçeye tam sayı boyutlandırma, greedy: eski sıralı seçim")
+    args = parser.parse_args()
+    
     # Toplam hedef: 1 milyon dolar
     # Historical: 650K, EXTLT: 350K
     
@@ -426,7 +526,8 @@ def main():
             max_stocks_per_company=2,
             target_shares=25000,
             target_dollars=file_info["target_dollars"],
-            group_limits=group_limits
+            group_limits=group_limits,
+            method=args.method
         )
     
     print("\nTüm portföy optimizasyonları tamamlandı!")
@@ -0,0 +1,325 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(ROOT, "pipeline_state.json")
+LOG_DIR = os.path.join(ROOT, "pipeline_logs")
+
+class Stage:
+    """Gece zincirindeki tek bir script: okuduğu ve yazdığı CSV'ler.
+
+    live=True olan aşamalar IBKR'den veri çeker; girdileri değişmese bile
+    her yeni işlem gününde bir kez çalıştırılır. client_ids aynı anda
+    kullanılamayacak IBKR clientId'leridir (aynı id'yi kullanan iki aşama
+    paralel çalışmaz). Script'in (dolaylı olanlar dahil) import ettiği yerel
+    modüller otomatik bulunur (bkz. local_imports); sources sadece import
+    ile bulunamayan ek dosyalar içindir.
+    """
+
+    def __init__(self, name, inputs=(), outputs=(), live=False, client_ids=(), script=None, sources=()):
+        self.name = name
+        self.script = script or f"{name}.py"
+        self.sources = list(sources)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.live = live
+        self.client_ids = set(client_ids)
+
+    def __repr__(self):
+        return f"Stage({self.name})"
+
+
+# T (historical) ve C (extlt) zincirleri; bağımlılıklar girdi/çıktı dosyalarından çıkarılır
+STAGES = [
+    # T zinciri
+    Stage("ibkrtry", ["historical_data.csv"], ["sma_results.csv"], live=True, client_ids=[2981]),
+    Stage("normalize_data", ["sma_results.csv"], ["normalized_results.csv"], live=True, client_ids=[10]),
+    Stage("calculate_scores", ["common_stock_results.csv"], ["scored_stocks.csv"]),
+    Stage("fill_missing_solidity_data", ["scored_stocks.csv"], ["scored_stocks_filled.csv"]),
+    # C zinciri
+    Stage("extltib", ["extlthistorical.csv"], ["extlt_results.csv"], live=True, client_ids=[2]),
+    Stage("normalize_extlt", ["extlt_results.csv"], ["normalized_extlt.csv"], live=True, client_ids=[10]),
+    Stage("calculate_extlt", ["common_extlt.csv"], ["scored_extlt.csv"]),
+    # Ortak aşamalar
+    # common_stocks + common_extlt: iki evrenin common'ları tek geçişte çekilir
+    Stage("universe_engine", ["sma_results.csv", "extlt_results.csv"],
+          ["common_stock_results.csv", "common_extlt.csv"], live=True, client_ids=[189]),
+    Stage("market_risk_analyzer", [], ["market_weights.csv"], live=True, client_ids=[2]),
+    Stage("before_common_adv", ["normalized_results.csv", "normalized_extlt.csv"],
+          ["normalize_data_with_adv.csv", "normalize_extlt_with_adv.csv", "final_thg_with_avg_adv.csv"],
+          live=True, client_ids=[10]),
+    Stage("calculate_final_thg_dynamic",
+          ["normalize_data_with_adv.csv", "scored_stocks_filled.csv", "sma_results.csv", "market_weights.csv"],
+          ["final_thg_results.csv"]),
+    Stage("calculate_finalextlt",
+          ["normalize_extlt_with_adv.csv", "scored_extlt.csv", "sma_results.csv", "common_stock_results.csv"],
+          ["final_extlt.csv"]),
+    Stage("mastermind", ["historical_data.csv", "extlthistorical.csv"],
+          ["mastermind_historical_results.csv", "mastermind_extlt_results.csv", "mastermind_all_results.csv"],
+          live=True, client_ids=[1]),
+    Stage("merge_group_data",
+          ["final_thg_results.csv", "final_extlt.csv", "mastermind_historical_results.csv", "mastermind_extlt_results.csv"],
+          ["mastermind_histport.csv", "mastermind_extltport.csv"]),
+    Stage("optimize_portfolio_positions", ["mastermind_histport.csv", "mastermind_extltport.csv"],
+          ["optimized_50_stocks_portfolio.csv", "optimized_35_extlt.csv"]),
+    Stage("get_short_fee_rates", ["mastermind_histport.csv", "mastermind_extltport.csv"],
+          ["short_histport.csv", "short_extlt.csv", "final_short_histport.csv", "final_short_extlt.csv"],
+          live=True, client_ids=[1]),
+    Stage("create_final_short_portfolios", ["short_histport.csv", "short_extlt.csv"],
+          ["short_opt20_port.csv", "short_extlt10.csv"]),
+]
+
+def file_hash(path):
+    """Dosya içeriğinin sha256'sı (dosya yoksa None)"""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def local_imports(script, root=ROOT):
+    """Script'in import ettiği, root'taki .py modülleri; dolaylı importlar dahil, sıralı dosya adları"""
+    found, todo = set(), [script]
+    while todo:
+        path = os.path.join(root, todo.pop())
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError, ValueError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = f"{name.split('.')[0]}.py"
+                if module != script and module not in found and os.path.isfile(os.path.join(root, module)):
+                    found.add(module)
+                    todo.append(module)
+    return sorted(found)
+
+def current_session():
+    """Canlı aşamalar için anahtar: son tamamlanmış işlem günü"""
+    try:
+        from bar_store import last_complete_session
+        return str(last_complete_session())
+    except ImportError:
+        return datetime.now().strftime('%Y-%m-%d')
+
+
+class Pipeline:
+    """Aşamaları bağımlılık sırasıyla, bağımsız dalları paralel süreçlerde çalıştırır.
+
+    Her aşamanın anahtarı script'inin ve girdi dosyalarının içerik hash'idir
+    (canlı aşamalarda işlem günü de eklenir). Anahtarı son başarılı
+    çalıştırmayla aynı olan ve çıktıları duran aşamalar atlanır; bir aşama
+    yeniden çalışıp çıktısı değişmezse ondan sonrakiler de atlanır. Böylece
+    bir ağırlık değiştirildiğinde sadece o script ve aşağısı yeniden hesaplanır.
+    """
+
+    def __init__(self, stages=STAGES, root=ROOT, state_file=STATE_FILE, log_dir=LOG_DIR, jobs=4):
+        self.stages = {s.name: s for s in stages}
+        self.root = root
+        self.state_file = state_file
+        self.log_dir = log_dir
+        self.jobs = jobs
+        self.producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                self.producers[output] = stage.name
+        self.deps = {
+            s.name: sorted({self.producers[i] for i in s.inputs if i in self.producers and self.producers[i] != s.name})
+            for s in stages
+        }
+        self.state = self._load_state()
+        self._sources = {}
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self):
+        tmp = self.state_file + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.state_file)
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def select(self, targets=None):
+        """Hedef aşamalar ve onların tüm üst aşamaları"""
+        if not targets:
+            return set(self.stages)
+        unknown = [t for t in targets if t not in self.stages]
+        if unknown:
+            raise ValueError(f"Bilinmeyen aşama: {', '.join(unknown)}")
+        selected, todo = set(), list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in selected:
+                selected.add(name)
+                todo.extend(self.deps[name])
+        return selected
+
+    def downstream(self, names):
+        """Verilen aşamalar ve onlara bağlı tüm alt aşamalar"""
+        result, todo = set(), list(names)
+        while todo:
+            name = todo.pop()
+            if name not in result:
+                result.add(name)
+                todo.extend(n for n, deps in self.deps.items() if name in deps)
+        return result
+
+    def sources(self, stage):
+        """Aşamanın anahtarına giren yerel modüller: import edilenler + elle verilen sources"""
+        if stage.name not in self._sources:
+            self._sources[stage.name] = sorted(set(local_imports(stage.script, self.root)) | set(stage.sources))
+        return self._sources[stage.name]
+
+    def stage_key(self, stage):
+        h = hashlib.sha256()
+        h.update(f"script:{file_hash(self._path(stage.script))}".encode())
+        for name in self.sources(stage):
+            h.update(f"source:{name}:{file_hash(self._path(name))}".encode())
+        for name in sorted(stage.inputs):
+            h.update(f"{name}:{file_hash(self._path(name))}".encode())
+        if stage.live:
+            h.update(f"session:{current_session()}".encode())
+        return h.hexdigest()
+
+    def is_current(self, stage, key):
+        entry = self.state.get(stage.name)
+        if not entry or entry.get('key') != key:
+            return False
+        return all(os.path.exists(self._path(o)) for o in stage.outputs)
+
+    def _run_stage(self, stage):
+        """Script'i ayrı bir Python sürecinde çalıştır; çıktısı pipeline_logs/<aşama>.log dosyasına yazılır"""
+        os.makedirs(self.log_dir, exist_ok=True)
+        log_path = os.path.join(self.log_dir, f"{stage.name}.log")
+        env = dict(os.environ, PYTHONIOENCODING="utf-8", PYTHONUNBUFFERED="1")
+        started = time.perf_counter()
+        with open(log_path, 'w', encoding='utf-8') as log:
+            result = subprocess.run([sys.executable, stage.script], cwd=self.root, stdout=log,
+                                    stderr=subprocess.STDOUT, env=env)
+        return result.returncode, time.perf_counter() - started, log_path
+
+    def run(self, targets=None, force=(), dry_run=False):
+        """Seçilen aşamaları çalıştır; {aşama: 'ran' | 'skipped' | 'failed' | 'blocked'} döndürür"""
+        selected = self.select(targets)
+        forced = self.downstream(self.stages if 'all' in force else force) & selected
+        pending = {n for n in selected}
+        status = {}
+        running = {}  # future -> (stage, key)
+        busy_clients = set()
+        started = time.perf_counter()
+
+        def ready(name):
+            return all(status.get(d) in ('ran', 'skipped') or d not in selected for d in self.deps[name])
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                # Üst aşaması başarısız olanlar çalıştırılmaz
+                for name in sorted(pending):
+                    if any(status.get(d) in ('failed', 'blocked') for d in self.deps[name]):
+                        pending.discard(name)
+                        status[name] = 'blocked'
+                        print(f"- {name}: atlandı (üst aşama başarısız)")
+
+                for name in sorted(pending):
+                    if not ready(name) or len(running) >= self.jobs:
+                        continue
+                    stage = self.stages[name]
+                    key = self.stage_key(stage)
+                    # Kuru çalıştırmada üst aşama çalışacaksa girdisi de değişecek sayılır
+                    upstream_runs = dry_run and any(status.get(d) == 'ran' for d in self.deps[name])
+                    if name not in forced and not upstream_runs and self.is_current(stage, key):
+                        pending.discard(name)
+                        status[name] = 'skipped'
+                        print(f"= {name}: güncel, atlandı")
+                        continue
+                    if stage.client_ids & busy_clients:
+                        continue
+                    pending.discard(name)
+                    if dry_run:
+                        status[name] = 'ran'
+                        print(f"> {name}: çalıştırılacak")
+                        continue
+                    print(f"> {name}: başlatıldı")
+                    busy_clients |= stage.client_ids
+                    running[pool.submit(self._run_stage, stage)] = (stage, key)
+
+                if not running:
+                    if pending and not any(ready(n) for n in pending):
+                        break
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, key = running.pop(future)
+                    busy_clients -= stage.client_ids
+                    try:
+                        returncode, elapsed, log_path = future.result()
+                    except Exception as e:
+                        returncode, elapsed, log_path = -1, 0.0, str(e)
+                    missing = [o for o in stage.outputs if not os.path.exists(self._path(o))]
+                    if returncode != 0 or missing:
+                        status[stage.name] = 'failed'
+                        reason = f"çıkış kodu {returncode}" if returncode != 0 else f"eksik çıktı: {', '.join(missing)}"
+                        print(f"! {stage.name}: BAŞARISIZ ({reason}, {elapsed:.1f} sn) - log: {log_path}")
+                        continue
+                    status[stage.name] = 'ran'
+                    self.state[stage.name] = {
+                        'key': key,
+                        'outputs': {o: file_hash(self._path(o)) for o in stage.outputs},
+                        'finished': datetime.now().isoformat(timespec='seconds'),
+                        'elapsed_s': round(elapsed, 1),
+                    }
+                    self._save_state()
+                    print(f"✓ {stage.name}: tamamlandı ({elapsed:.1f} sn)")
+
+        counts = {s: sum(1 for v in status.values() if v == s) for s in ('ran', 'skipped', 'failed', 'blocked')}
+        print(f"\nPipeline bitti ({time.perf_counter() - started:.1f} sn): "
+              f"{counts['ran']} çalıştı, {counts['skipped']} atlandı, {counts['failed']} başarısız, {counts['blocked']} engellendi")
+        return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gece skor zincirini bağımlılık sırasıyla çalıştırır")
+    parser.add_argument('targets', nargs='*', help="Sadece bu aşamalar ve üst aşamaları (varsayılan: hepsi)")
+    parser.add_argument('--force', nargs='*', default=[], help="Bu aşamaları (ve alt aşamalarını) yeniden çalıştır; 'all' hepsi")
+    parser.add_argument('--jobs', type=int, default=4, help="Aynı anda çalışacak en fazla süreç sayısı")
+    parser.add_argument('--dry-run', action='store_true', help="Çalıştırmadan hangi aşamaların çalışacağını göster")
+    parser.add_argument('--list', action='store_true', help="Aşamaları ve bağımlılıklarını listele")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(jobs=args.jobs)
+    if args.list:
+        for name, stage in pipeline.stages.items():
+            deps = ', '.join(pipeline.deps[name]) or '-'
+            print(f"{name:<32} {'canlı' if stage.live else '':<6} <- {deps}")
+        return
+    status = pipeline.run(args.targets, force=args.force, dry_run=args.dry_run)
+    if any(v in ('failed', 'blocked') for v in status.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import heapq
+import math
+
+import numpy as np
+
+LOT_SIZE = 50
+MIN_SHARES = 200
+
+class _Flow:
+    """Tam sayı maliyetli min-cost flow (ardışık en kısa yollar, potansiyelli Dijkstra)"""
+
+    def __init__(self, n):
+        self.graph = [[] for _ in range(n)]
+
+    def add_edge(self, u, v, cap, cost):
+        """Kenarı ekle; (u, kenar indeksi) döndürür"""
+        self.graph[u].append([v, cap, cost, len(self.graph[v])])
+        self.graph[v].append([u, 0, -cost, len(self.graph[u]) - 1])
+        return u, len(self.graph[u]) - 1
+
+    def _initial_potential(self, order):
+        """Başlangıçta graf DAG: topolojik sırada en kısa mesafeler (negatif maliyetler için)"""
+        pot = [0] * len(self.graph)
+        seen = [False] * len(self.graph)
+        seen[order[0]] = True
+        for u in order:
+            if not seen[u]:
+                continue
+            for v, cap, cost, _ in self.graph[u]:
+                if cap > 0 and (not seen[v] or pot[u] + cost < pot[v]):
+                    pot[v] = pot[u] + cost
+                    seen[v] = True
+        return pot
+
+    def min_cost_flow(self, s, t, max_flow, order):
+        """s'den t'ye en fazla `max_flow` birim, her adımda akış başına en ucuz yoldan; gönderilen akış"""
+        n = len(self.graph)
+        pot = self._initial_potential(order)
+        flow = 0
+        while flow < max_flow:
+            dist = [math.inf] * n
+            prev = [None] * n
+            done = [False] * n
+            dist[s] = 0
+            heap = [(0, s)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if done[u]:
+                    continue
+                done[u] = True
+                if u == t:
+                    break
+                for i, (v, cap, cost, _) in enumerate(self.graph[u]):
+                    if cap > 0 and not done[v]:
+                        nd = d + cost + pot[u] - pot[v]
+                        if nd < dist[v]:
+                            dist[v] = nd
+                            prev[v] = (u, i)
+                            heapq.heappush(heap, (nd, v))
+            if not done[t]:
+                break
+            # Sadece kesinleşen düğümlerin potansiyeli güncellenir; indirgenmiş maliyetler negatif olmaz
+            for v in range(n):
+                if done[v]:
+                    pot[v] += dist[v] - dist[t]
+            v = t
+            while v != s:
+                u, i = prev[v]
+                edge = self.graph[u][i]
+                edge[1] -= 1
+                self.graph[v][edge[3]][1] += 1
+                v = u
+            flow += 1
+        return flow
+
+
+def select_max_weight(weights, companies, groups, num_items, company_cap, group_caps=None):
+    """Şirket ve grup limitleri altında en fazla `num_items` kalemi toplam ağırlığı en büyük olacak şekilde seç.
+
+    Kaynak -> şirket (kapasite `company_cap`) -> kalem (kapasite 1) -> grup
+    (kapasite `group_caps[grup]`, tanımsızsa sınırsız) -> hedef ağında min-cost
+    flow olarak kesin çözülür. Önce seçilen kalem sayısı, sonra toplam ağırlık
+    en büyüklenir. Ağırlıklar 0.01 hassasiyetle tam sayıya çevrilir.
+    Seçilen kalemlerin indekslerini döndürür.
+    """
+    weights = np.round(np.asarray(weights, dtype=float) * 100).astype(np.int64)
+    company_ids = {c: i for i, c in enumerate(dict.fromkeys(companies))}
+    group_ids = {g: i for i, g in enumerate(dict.fromkeys(groups))}
+    source, sink = 0, 1
+    company_base = 2
+    group_base = company_base + len(company_ids)
+    flow = _Flow(group_base + len(group_ids))
+
+    # Her ek kalem, ağırlık farklarından daha değerli olmalı (önce kalem sayısı)
+    bonus = int(np.abs(weights).sum()) * 2 + 1
+    for i in company_ids.values():
+        flow.add_edge(source, company_base + i, company_cap, 0)
+    edges = []
+    for w, company, group in zip(weights, companies, groups):
+        edges.append(flow.add_edge(company_base + company_ids[company], group_base + group_ids[group], 1, -(int(w) + bonus)))
+    for group, i in group_ids.items():
+        cap = (group_caps or {}).get(group, num_items)
+        flow.add_edge(group_base + i, sink, max(0, int(cap)), 0)
+
+    order = [source] + [company_base + i for i in company_ids.values()] + \
+            [group_base + i for i in group_ids.values()] + [sink]
+    flow.min_cost_flow(source, sink, num_items, order)
+    return [k for k, (u, i) in enumerate(edges) if flow.graph[u][i][1] == 0]
+
+
+def ideal_shares(weights, prices, budget, min_shares=MIN_SHARES):
+    """Bütçeyi ağırlıklarla orantılı dağıt; minimumun altında kalanlar minimuma sabitlenip kalan bütçe yeniden dağıtılır"""
+    weights = np.asarray(weights, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    fixed = np.zeros(len(weights), dtype=bool)
+    while True:
+        free_budget = budget - (min_shares * prices[fixed]).sum()
+        denom = (weights * prices)[~fixed].sum()
+        shares = np.where(fixed, float(min_shares),
+                          weights * free_budget / denom if denom > 0 else float(min_shares))
+        below = ~fixed & (shares < min_shares)
+        if not below.any():
+            return shares
+        fixed |= below
+
+
+def size_to_budget(weights, prices, budget, lot=LOT_SIZE, min_shares=MIN_SHARES):
+    """Ağırlıklara göre lot katı tam sayı pozisyonlar; toplam maliyet bütçeyi aşmaz.
+
+    Her pozisyon ideal (orantılı) değerinin altındaki ya da üstündeki lota
+    yuvarlanır; hangilerinin yukarı yuvarlanacağı 0/1 sırt çantası (dolar
+    çözünürlüğünde, tam doluluk DP'si) ile seçilir. Amaç sıralıdır: önce
+    bütçeyi aşmadan harcanan tutar en büyüklenir, aynı harcamayı veren
+    seçimler arasında ideal dağılımdan toplam dolar sapması en aza indirilir.
+    Bu yüzden sapmayı artıran yukarı yuvarlamalar da kalan bütçeyi
+    doldurmak için seçilebilir.
+    """
+    prices = np.asarray(prices, dtype=float)
+    ideal = ideal_shares(weights, prices, budget, min_shares)
+    floor = np.maximum(min_shares, np.floor(ideal / lot) * lot)
+    spare = budget - (floor * prices).sum()
+    if spare < 0:
+        print(f"UYARI: Minimum {min_shares} hisse şartıyla bütçe {-spare:,.2f} aşılıyor")
+        return floor.astype(int)
+
+    # Yukarı yuvarlama kalemi: maliyet = bir lot (dolar, yukarı yuvarlanmış), kazanç = sapmadaki azalma (negatif olabilir)
+    gain = prices * (2 * (ideal - floor) - lot)
+    costs = np.ceil(lot * prices).astype(np.int64)
+    capacity = int(math.floor(spare))
+    # best[c]: tam olarak c dolar harcayan seçimlerin en büyük kazancı (-inf: c'ye ulaşılamaz)
+    best = np.full(capacity + 1, -np.inf)
+    best[0] = 0
+    taken = np.zeros((len(prices), capacity + 1), dtype=bool)
+    for j, (cost, value) in enumerate(zip(costs, gain)):
+        if cost > capacity:
+            continue
+        with_item = best[:-cost] + value if cost else best + value
+        improved = with_item > best[cost:]
+        taken[j, cost:] = improved
+        best[cost:] = np.where(improved, with_item, best[cost:])
+
+    shares = floor.copy()
+    c = int(np.flatnonzero(best > -np.inf)[-1])  # Bütçeyi aşmayan en büyük harcama
+    for j in range(len(prices) - 1, -1, -1):
+        if taken[j, c]:
+            shares[j] += lot
+            c -= costs[j]
+    return shares.astype(int)
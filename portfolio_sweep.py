@@ -0,0 +1,220 @@
+import argparse
+import contextlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from create_final_short_portfolios import SMI_MAX, SMI_WEIGHT, select_short_portfolio
+from optimize_portfolio_positions import GROUP_LIMIT_VALUES, build_portfolio, group_limits_for, sizing_prices
+from table_io import read_table, write_table
+
+DEFAULT_OUTPUT = "portfolio_sweep.csv"
+TARGET_SHARES = 25000
+
+# Evren başına girdiler, mevcut (karşılaştırma) portföyler ve bugünkü parametreler
+SWEEP_UNIVERSES = {
+    'T': {
+        'input': "mastermind_histport.csv", 'current': "optimized_50_stocks_portfolio.csv", 'type': "Historical",
+        'num_stocks': 50, 'target_dollars': 650000,
+        'short_input': "short_histport.csv", 'short_current': "short_opt20_port.csv", 'max_stocks': 20,
+    },
+    'C': {
+        'input': "mastermind_extltport.csv", 'current': "optimized_35_extlt.csv", 'type': "EXTLT",
+        'num_stocks': 35, 'target_dollars': 350000,
+        'short_input': "short_extlt.csv", 'short_current': "short_extlt10.csv", 'max_stocks': 10,
+    },
+}
+
+# Varsayılan ızgara bugünkü değerlerin etrafında; JSON ile verilen anahtarlar bunların yerine geçer
+def default_grid(universe):
+    base = SWEEP_UNIVERSES[universe]
+    limits = GROUP_LIMIT_VALUES[base['type']]
+    return {
+        'long': {
+            'num_stocks': [base['num_stocks'] + d for d in (-10, -5, 0, 5, 10)],
+            'max_stocks_per_company': [1, 2, 3],
+            'group_limit_values': [[max(1, round(v * scale)) for v in limits] for scale in (0.8, 1.0, 1.25)],
+            'target_dollars': [round(base['target_dollars'] * f) for f in (0.9, 1.0, 1.1)],
+            'method': ['exact'],
+        },
+        'short': {
+            'max_stocks': [base['max_stocks'] + d for d in (-5, 0, 5)],
+            'max_per_company': [1, 2, 3],
+            'smi_max': [0.2, SMI_MAX, 0.35, 0.5],
+            'smi_weight': [250, SMI_WEIGHT, 1000],
+        },
+    }
+
+def expand(grid):
+    """{parametre: [değerler]} -> her kombinasyon için {parametre: değer}"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def turnover(new_weights, current_weights):
+    """Ağırlık değişimi: 0.5 x sum |w_yeni - w_mevcut| (0 = aynı portföy, 1 = tamamen farklı)"""
+    if current_weights is None:
+        return np.nan
+    symbols = new_weights.index.union(current_weights.index)
+    diff = new_weights.reindex(symbols, fill_value=0) - current_weights.reindex(symbols, fill_value=0)
+    return 0.5 * float(diff.abs().sum())
+
+def row_weights(portfolio, column=None):
+    """Satır başına portföy ağırlıkları (column verilmezse eşit ağırlık); toplamı 1"""
+    values = portfolio[column].to_numpy(dtype=float) if column else np.ones(len(portfolio))
+    return values / values.sum()
+
+def weights(portfolio, column=None):
+    """Sembol indeksli portföy ağırlıkları (aynı sembol birden çok satırdaysa toplanır)"""
+    return pd.Series(row_weights(portfolio, column), index=portfolio['PREF IBKR'].to_numpy()).groupby(level=0).sum()
+
+def group_concentration(portfolio, column=None):
+    """(Herfindahl endeksi, en büyük grubun ağırlığı); Group kolonu yoksa NaN"""
+    if 'Group' not in portfolio.columns:
+        return np.nan, np.nan
+    by_group = pd.Series(row_weights(portfolio, column),
+                         index=portfolio['Group'].fillna(-1).to_numpy()).groupby(level=0).sum()
+    return float((by_group ** 2).sum()), float(by_group.max())
+
+# --- İşçi süreçler ---
+# Girdi tabloları havuz kurulmadan önce bu sözlüğe konur; fork ile başlayan işçiler
+# onları kopyalamadan (copy-on-write) paylaşır, diğer platformlarda initializer ile bir kez gönderilir.
+_FRAMES = {}
+
+def _init_worker(frames):
+    _FRAMES.update(frames)
+
+def _run_long(task):
+    universe, params = task
+    data = _FRAMES[(universe, 'long')]
+    current = _FRAMES.get((universe, 'long_current'))
+    limits = group_limits_for(data['Group'], params['group_limit_values']) if 'Group' in data.columns else None
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        portfolio = build_portfolio(data, params['num_stocks'], params['max_stocks_per_company'], TARGET_SHARES,
+                                    params['target_dollars'], limits, params['method'])
+    row = {'universe': universe, 'kind': 'long', **{k: json.dumps(v) if isinstance(v, list) else v for k, v in params.items()}}
+    if portfolio is None:
+        return row
+    w = weights(portfolio, 'Final_Shares')
+    hhi, max_group = group_concentration(portfolio, 'Final_Shares')
+    row.update({
+        'stocks': len(portfolio),
+        'thg_mean': portfolio['FINAL_THG'].mean(),
+        'thg_min': portfolio['FINAL_THG'].min(),
+        'turnover': turnover(w, weights(current, 'Final_Shares') if current is not None else None),
+        'group_hhi': hhi,
+        'max_group_weight': max_group,
+        'total_shares': int(portfolio['Final_Shares'].sum()),
+        # Çözücünün bütçede kullandığı fiyatlarla (LAST, Last Price, varsayılan $35)
+        'est_cost': float((portfolio['Final_Shares'].to_numpy() * sizing_prices(portfolio)).sum()),
+    })
+    return row
+
+def _run_short(task):
+    universe, params = task
+    data = _FRAMES[(universe, 'short')]
+    current = _FRAMES.get((universe, 'short_current'))
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        portfolio = select_short_portfolio(data, params['max_stocks'], params['max_per_company'],
+                                           smi_max=params['smi_max'], smi_weight=params['smi_weight'])
+    row = {'universe': universe, 'kind': 'short', **params}
+    if portfolio is None or len(portfolio) == 0:
+        return row
+    w = weights(portfolio)
+    hhi, max_group = group_concentration(portfolio)
+    row.update({
+        'stocks': len(portfolio),
+        'thg_mean': portfolio['FINAL_THG'].mean(),
+        'smi_mean': portfolio['SMI'].mean(),
+        'short_final_mean': portfolio['SHORT_FINAL'].mean(),
+        'turnover': turnover(w, weights(current) if current is not None else None),
+        'group_hhi': hhi,
+        'max_group_weight': max_group,
+    })
+    return row
+
+def _run(task):
+    kind, universe, params = task
+    return (_run_long if kind == 'long' else _run_short)((universe, params))
+
+# --- Ana akış ---
+
+def load_frames(universes):
+    """Girdi ve mevcut portföy tablolarını bir kez oku; olmayan dosyalar atlanır"""
+    frames = {}
+    for universe in universes:
+        base = SWEEP_UNIVERSES[universe]
+        for key, path in (('long', base['input']), ('long_current', base['current']),
+                          ('short', base['short_input']), ('short_current', base['short_current'])):
+            if os.path.exists(path):
+                frames[(universe, key)] = read_table(path)
+            elif not key.endswith('_current'):
+                print(f"UYARI: {path} bulunamadı, {universe} {key} varyantları atlanacak")
+    return frames
+
+def make_pool(workers, frames):
+    if 'fork' in multiprocessing.get_all_start_methods():
+        _FRAMES.clear()
+        _FRAMES.update(frames)
+        return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+    return ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(frames,))
+
+def run_sweep(universes=('T', 'C'), grid=None, workers=None, output=DEFAULT_OUTPUT):
+    """Izgaradaki her uzun/short portföy varyantını süreç havuzunda kur ve karşılaştırma tablosunu döndür"""
+    started = time.perf_counter()
+    frames = load_frames(universes)
+    tasks = []
+    for universe in universes:
+        spec = default_grid(universe)
+        for kind in ('long', 'short'):
+            spec[kind].update((grid or {}).get(kind, {}))
+            if (universe, kind) in frames:
+                tasks += [(kind, universe, params) for params in expand(spec[kind])]
+    if not tasks:
+        print("HATA: Çalıştırılacak varyant yok!")
+        return None
+
+    workers = workers or os.cpu_count() or 1
+    print(f"{len(tasks)} varyant {workers} süreçte çalıştırılıyor...")
+    with make_pool(workers, frames) as pool:
+        rows = list(pool.map(_run, tasks, chunksize=max(1, math.ceil(len(tasks) / (workers * 4)))))
+    results = pd.DataFrame(rows)
+    write_table(results, output, index=False)
+    print(f"{len(results)} varyant {time.perf_counter() - started:.1f} sn'de tamamlandı, sonuçlar '{output}' dosyasına kaydedildi.")
+
+    for universe, kind in dict.fromkeys((row['universe'], row['kind']) for row in rows):
+        # Her tablo kendi satırlarından kurulur ki tam sayı kolonlar float'a dönmesin
+        table = pd.DataFrame([row for row in rows if row['universe'] == universe and row['kind'] == kind])
+        if 'thg_mean' not in table.columns:
+            continue
+        # Long'da yüksek, short'ta düşük FINAL_THG daha iyi
+        table = table.sort_values('thg_mean', ascending=(kind == 'short'))
+        print(f"\n{universe} {kind} - en iyi 10 varyant:")
+        print(table.drop(columns=['universe', 'kind']).head(10).to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Portföy parametreleri için paralel tarama")
+    # nargs='*' ile choices varsayılan listeyi reddeder; seçim elle doğrulanır
+    parser.add_argument('universes', nargs='*', default=['T', 'C'], help=f"Evrenler: {', '.join(sorted(SWEEP_UNIVERSES))}")
+    parser.add_argument('--grid', help='{"long": {parametre: [değerler]}, "short": {...}} biçiminde JSON dosyası')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+    unknown = sorted(set(args.universes) - set(SWEEP_UNIVERSES))
+    if unknown:
+        parser.error(f"Bilinmeyen evren: {', '.join(unknown)}")
+    grid = None
+    if args.grid:
+        with open(args.grid, 'r') as f:
+            grid = json.load(f)
+    run_sweep(args.universes, grid, args.workers, args.output)
+
+if __name__ == "__main__":
+    main()
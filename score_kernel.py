@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+# Solidity ağırlıkları: (TOTAL_HIGH_SCORE, MKTCAP_NORM, CRDT_NORM)
+SOLIDITY_HIGH_PERF_WEIGHTS = (0.26, 0.49, 0.25)  # RECENT_TOTAL >= 0.8: Market Cap'e daha fazla ağırlık
+SOLIDITY_LOW_PERF_WEIGHTS = (0.42, 0.39, 0.20)   # Düşük performans: Total Score'a daha fazla ağırlık
+RECENT_TOTAL_THRESHOLD = 0.8
+BB_BOND_MULTIPLIER = 1.02
+
+# Final solidity (TOTAL_SCORE_NORM, MKTCAP_NORM, CRDT_SCORE_NORM); eşik Normalized COM 6M + 3M < 80
+FINAL_LOW_PERF_WEIGHTS = (0.40, 0.32, 0.28)
+FINAL_HIGH_PERF_WEIGHTS = (0.20, 0.42, 0.38)
+FINAL_RECENT_THRESHOLD = 80
+
+# Market cap puan aralıkları (milyar $): [alt sınır, üst sınır) -> [alt puan, üst puan]
+MKTCAP_BANDS = [
+    (200, 500, 90, 95),
+    (100, 200, 85, 90),
+    (50, 100, 77, 85),
+    (10, 50, 60, 77),
+    (5, 10, 50, 60),
+    (1, 5, 40, 50),
+]
+
+def _values(x):
+    """Series/array/scalar -> float64 ndarray"""
+    if isinstance(x, pd.Series):
+        return pd.to_numeric(x, errors='coerce').to_numpy(dtype=float)
+    return np.asarray(x, dtype=float)
+
+def _like(values, ref):
+    """Sonucu girdiyle aynı tipte (Series ise aynı index ile) döndür"""
+    if isinstance(ref, pd.Series):
+        return pd.Series(values, index=ref.index)
+    return values
+
+def round2(values):
+    """Python round(x, 2) ile aynı sonuç; np.round x*100 ara adımı yüzünden yarım değerlerde 0.01 sapabilir"""
+    x = _values(values)
+    return _like(np.char.mod('%.2f', x).astype(float), values)
+
+def is_bb_bond(bond, n=None):
+    """BOND_ kolonu 'BB' olan satırlar (kolon yoksa hepsi False)"""
+    if bond is None:
+        return np.zeros(n or 0, dtype=bool)
+    return pd.Series(bond).astype(str).str.strip().eq('BB').to_numpy()
+
+def score_ratio(current, high):
+    """Fiyat/High oranını 10-90 arası skora çevir (eksik veya sıfır High için 10)"""
+    c, h = _values(current), _values(high)
+    valid = ~np.isnan(c) & ~np.isnan(h) & (h != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = np.clip(90 * (c / h), 10, 90)
+    return _like(np.where(valid, score, 10.0), current)
+
+def low_score(change):
+    """LOW'dan artış oranı skoru: düşüş/eksik veri 10, artışla orantılı en fazla 90"""
+    x = _values(change)
+    with np.errstate(invalid='ignore'):
+        score = np.where(np.isnan(x) | (x <= 0), 10.0, np.minimum(90, 10 + x * 80))
+    return _like(score, change)
+
+def market_cap_score(billions):
+    """Market Cap (milyar $) için yumuşak parçalı doğrusal puan (35-95, eksik veri 35)"""
+    x = _values(billions)
+    conditions = [np.isnan(x), x >= 500]
+    choices = [35.0, 95.0]
+    for lo, hi, lo_score, hi_score in MKTCAP_BANDS:
+        conditions.append(x >= lo)
+        choices.append(lo_score + (x - lo) / (hi - lo) * (hi_score - lo_score))
+    with np.errstate(invalid='ignore'):
+        score = np.select(conditions, choices, default=np.maximum(35, 35 + x * 5))
+    return _like(score, billions)
+
+def custom_score(series, threshold, multiplier):
+    """Excel'deki H2020/L2020 skor formülü; eşiğin altı ortalamaya göre doğrusal, üstü logaritmik"""
+    x = _values(series)
+    avg = np.nanmean(x) if (~np.isnan(x)).any() else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        below = ((x + 1) / (avg + 1) - 1) * 25 * multiplier
+        above = (np.log((x / avg) + 1) + 1) * 25
+    score = np.where(np.isnan(x), 0.0, np.where(x < threshold, below, above))
+    return _like(score, series)
+
+def change_score(change, threshold=-0.22, multiplier=1.25):
+    """6M/3M değişim skoru: ortalamaya göre göreli değişim, eşiğin altında `multiplier` ile ağırlaştırılır"""
+    x = _values(change)
+    mean = np.nanmean(x) if (~np.isnan(x)).any() else np.nan
+    with np.errstate(invalid='ignore'):
+        score = ((x + 1) / (mean + 1) - 1) * 25 * np.where(x < threshold, multiplier, 1.0)
+    return _like(score, change)
+
+def _weighted(high_perf, components, high_weights, low_weights, bond):
+    a, b, c = (_values(v) for v in components)
+    high = (a * high_weights[0] + b * high_weights[1] + c * high_weights[2])
+    low = (a * low_weights[0] + b * low_weights[1] + c * low_weights[2])
+    score = np.where(high_perf, high, low)
+    return score * np.where(is_bb_bond(bond, len(score)), BB_BOND_MULTIPLIER, 1.0)
+
+def solidity_score(total_high_score, mktcap_norm, crdt_norm, recent_total, bond=None):
+    """SOLIDITY_SCORE: RECENT_TOTAL >= 0.8 ise yüksek performans ağırlıkları, BB bond'larda x1.02"""
+    recent = _values(recent_total)
+    with np.errstate(invalid='ignore'):
+        high_perf = recent >= RECENT_TOTAL_THRESHOLD
+    score = _weighted(high_perf, (total_high_score, mktcap_norm, crdt_norm),
+                      SOLIDITY_HIGH_PERF_WEIGHTS, SOLIDITY_LOW_PERF_WEIGHTS, bond)
+    return _like(score, total_high_score)
+
+def final_solidity_score(total_score_norm, mktcap_norm, crdt_score_norm, recent_perf, bond=None):
+    """Spreadsheet AK kolonu: Normalized COM 6M + 3M < 80 ise düşük performans ağırlıkları"""
+    recent = _values(recent_perf)
+    with np.errstate(invalid='ignore'):
+        high_perf = ~(recent < FINAL_RECENT_THRESHOLD)
+    score = _weighted(high_perf, (total_score_norm, mktcap_norm, crdt_score_norm),
+                      FINAL_HIGH_PERF_WEIGHTS, FINAL_LOW_PERF_WEIGHTS, bond)
+    return _like(score, total_score_norm)
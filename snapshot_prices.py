@@ -0,0 +1,184 @@
+import asyncio
+import math
+import time
+
+from ib_insync import IB, Stock, util
+
+# IB: aynı anda açık market data satırı sınırı (standart hesapta 100); yarısını kullan
+MAX_IN_FLIGHT = 50
+# Snapshot isteği IB tarafında ~11 sn içinde kapanır; bu sürede snapshot sonu gelmezse eldeki
+# kapanış fiyatı kullanılır, o da yoksa sembol eksik sayılır
+SNAPSHOT_TIMEOUT = 11
+DEFAULT_PORTS = [7496, 4001]  # TWS ve Gateway portları
+
+def snapshot_price(ticker, fields=('last', 'close')):
+    """Ticker'dan geçerli son fiyatı, yoksa kapanış fiyatını döndür (ikisi de yoksa None)"""
+    for field in fields:
+        value = getattr(ticker, field, None)
+        if value is not None and not math.isnan(value) and value > 0:
+            return field, float(value)
+    return None
+
+
+class SnapshotCollector:
+    """Çok sayıda sembolün son fiyatını snapshot market data istekleriyle toplar.
+
+    Her sembol için bir future açılır ve ticker'a geçerli last geldiği anda
+    çözülür; sabit bekleme ya da tüm ticker'ları tarayan döngü yoktur. Close
+    genelde last'tan önce gelir ve bir önceki günün kapanışıdır, bu yüzden
+    sadece aday olarak tutulur: IB snapshot'ın bittiğini bildirdiğinde
+    (tickSnapshotEnd) ya da zaman aşımında last hâlâ yoksa close kullanılır.
+    Aynı anda en fazla `max_in_flight` istek açık tutulur, biten her isteğin
+    yerine hemen sıradaki sembol istenir.
+    """
+
+    def __init__(self, ib, max_in_flight=MAX_IN_FLIGHT, timeout=SNAPSHOT_TIMEOUT, progress_every=50):
+        self.ib = ib
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.progress_every = progress_every
+        self.stats = {'symbols': 0, 'last': 0, 'close': 0, 'timeouts': 0, 'errors': 0, 'elapsed_s': 0.0}
+        self._snapshot_ends = {}  # id(ticker) -> snapshot sonu callback'i
+
+    def _hook_snapshot_end(self):
+        """wrapper.tickSnapshotEnd'i sarıp bitişi ilgili ticker'ın callback'ine ilet; eski metodu döndür"""
+        wrapper = getattr(self.ib, 'wrapper', None)
+        original = getattr(wrapper, 'tickSnapshotEnd', None)
+        if original is None:
+            return None
+
+        def tickSnapshotEnd(reqId):
+            original(reqId)
+            ticker = getattr(wrapper, 'reqId2Ticker', {}).get(reqId)
+            callback = self._snapshot_ends.get(id(ticker))
+            if callback:
+                callback()
+
+        wrapper.tickSnapshotEnd = tickSnapshotEnd
+        return original
+
+    async def _collect_one(self, symbol, semaphore, progress, contract=None):
+        async with semaphore:
+            future = asyncio.get_running_loop().create_future()
+
+            def on_update(ticker):
+                result = snapshot_price(ticker, ('last',))
+                if result and not future.done():
+                    future.set_result(result)
+
+            def on_end():
+                if not future.done():
+                    future.set_result(snapshot_price(ticker))
+
+            if contract is None:
+                contract = Stock(symbol=symbol, exchange='SMART', currency='USD')
+            ticker = None
+            try:
+                ticker = self.ib.reqMktData(contract, '', True, False)
+                self._snapshot_ends[id(ticker)] = on_end
+                on_update(ticker)  # önbellekte zaten fiyat olabilir
+                ticker.updateEvent += on_update
+                try:
+                    result = await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    self.stats['timeouts'] += 1
+                    result = snapshot_price(ticker)  # last gelmedi; varsa close adayı
+                if result is None:
+                    return symbol, None
+                field, price = result
+                self.stats[field] += 1
+                return symbol, price
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"! {symbol} veri isteği hatası: {e}")
+                return symbol, None
+            finally:
+                if ticker is not None:
+                    self._snapshot_ends.pop(id(ticker), None)
+                    ticker.updateEvent -= on_update
+                    try:
+                        self.ib.cancelMktData(contract)
+                    except Exception:
+                        pass
+                progress(symbol)
+
+    async def collect(self, symbols, contracts=None):
+        """{sembol: fiyat} döndür; fiyatı alınamayan semboller sonuçta yer almaz
+
+        contracts: {sembol: nitelikli kontrat}; verilmeyen semboller için SMART/USD hisse kullanılır.
+        """
+        contracts = contracts or {}
+        started = time.perf_counter()
+        symbols = list(dict.fromkeys(s for s in symbols if isinstance(s, str) and s and s != '-'))
+        total = len(symbols)
+        done = [0]
+
+        def progress(symbol):
+            done[0] += 1
+            if done[0] % self.progress_every == 0 or done[0] == total:
+                print(f"Fiyat: {done[0]}/{total} sembol ({time.perf_counter() - started:.1f} sn)")
+
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        original = self._hook_snapshot_end()
+        try:
+            results = await asyncio.gather(*(
+                self._collect_one(s, semaphore, progress, contracts.get(s)) for s in symbols
+            ))
+        finally:
+            if original is not None:
+                self.ib.wrapper.tickSnapshotEnd = original
+        self.stats['symbols'] += total
+        self.stats['elapsed_s'] = round(time.perf_counter() - started, 2)
+        print(f"Fiyat toplama tamamlandı: {self.stats}")
+        return {symbol: price for symbol, price in results if price is not None}
+
+
+def get_last_prices(symbols, client_id=10, ports=DEFAULT_PORTS, market_data_type=3):
+    """IBKR Gateway'den son fiyatları al (bağlan, snapshot'larla topla, eksikleri raporla, bağlantıyı kapat)"""
+    last_prices = {}
+    print("\nIBKR Gateway'den son fiyatlar alınıyor...")
+
+    ib = IB()
+    connected = False
+    try:
+        for port in ports:
+            try:
+                ib.connect('127.0.0.1', port, clientId=client_id, readonly=True)
+                connected = True
+                print(f"✓ IBKR {port} portu ile bağlantı başarılı!")
+                break
+            except Exception as e:
+                print(f"! IBKR {port} bağlantı hatası: {e}")
+
+        if not connected:
+            print("! Hiçbir porta bağlanılamadı. TWS veya Gateway çalışıyor mu?")
+            return {}
+
+        # Delayed data (gerçek hesap yoksa)
+        ib.reqMarketDataType(market_data_type)
+        last_prices = util.run(SnapshotCollector(ib).collect(symbols))
+
+        # Eksik sembolleri raporla
+        valid = [s for s in symbols if isinstance(s, str) and s and s != '-']
+        missing = [s for s in valid if s not in last_prices]
+        if missing:
+            print(f"\n! {len(missing)} sembol için fiyat alınamadı:")
+            if len(missing) <= 20:
+                for symbol in missing:
+                    print(f"- {symbol}")
+            else:
+                print(f"- İlk 20 sembol: {missing[:20]}...")
+
+        if valid:
+            print(f"\nToplam {len(last_prices)} sembol için fiyat alındı ({len(last_prices)/len(valid)*100:.1f}%)")
+
+    except Exception as e:
+        print(f"Veri çekme hatası: {e}")
+
+    finally:
+        # Bağlantıyı her durumda kapat
+        if ib.isConnected():
+            ib.disconnect()
+            print("IBKR bağlantısı kapatıldı.")
+
+    return last_prices
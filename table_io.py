@@ -0,0 +1,103 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 - parquet motoru varsa kolon bazlı dosya kullan
+    TABLE_FORMAT = "parquet"
+except ImportError:
+    TABLE_FORMAT = "npz"
+
+DEFAULT_TABLE_DIR = "tables"
+
+def table_path(csv_path, root=DEFAULT_TABLE_DIR):
+    """CSV çıktısının tipli kopyasının yolu (tables/<isim>.parquet ya da .npz)"""
+    folder, name = os.path.split(csv_path)
+    stem = os.path.splitext(name)[0]
+    return os.path.join(folder, root, f"{stem}.{TABLE_FORMAT}")
+
+def is_current(csv_path):
+    """Tipli kopya var mı ve CSV'den yeni mi? (CSV elle düzenlendiyse CSV okunur)"""
+    path = table_path(csv_path)
+    if not os.path.exists(path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+def _prepare(df):
+    """None ile açılıp sonradan sayı yazılan object kolonları sayısala çevir; karışık kolonlar metin olur"""
+    df = df.reset_index(drop=True).infer_objects()
+    for col in df.columns:
+        if df[col].dtype == object:
+            values = df[col]
+            df[col] = values.where(values.isna(), values.astype(str))
+    return df
+
+def _save_npz(df, path):
+    arrays, schema = {}, []
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        dtype = str(s.dtype)
+        if pd.api.types.is_datetime64_any_dtype(s) and getattr(s.dt, 'tz', None) is None:
+            kind, values = 'datetime', s.to_numpy(dtype='datetime64[ns]')
+        elif pd.api.types.is_bool_dtype(s) and not s.isna().any():
+            kind, values = 'bool', s.to_numpy(dtype=bool)
+        elif pd.api.types.is_integer_dtype(s) and not s.isna().any():
+            kind, values = 'int', s.to_numpy(dtype='int64')
+        elif pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+            # Eksik değerli Int64/boolean kolonlar NaN'lı float olarak saklanır
+            kind, values = 'float', s.to_numpy(dtype=float, na_value=np.nan)
+        else:
+            kind, values = 'str', s.astype(object).where(s.notna(), '').astype(str).to_numpy(dtype=str)
+            arrays[f"m{i}"] = s.isna().to_numpy()
+        arrays[f"c{i}"] = values
+        schema.append({'name': str(col), 'kind': kind, 'dtype': dtype})
+    arrays['__schema__'] = np.array(json.dumps(schema))
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+def _load_npz(path):
+    with np.load(path, allow_pickle=False) as data:
+        schema = json.loads(str(data['__schema__']))
+        columns = {}
+        for i, col in enumerate(schema):
+            values = data[f"c{i}"]
+            if col['kind'] == 'str':
+                values = values.astype(object)
+                values[data[f"m{i}"]] = np.nan
+                series = pd.Series(values, dtype=object)
+                columns[col['name']] = series if col['dtype'] == 'object' else series.astype(col['dtype'])
+            else:
+                columns[col['name']] = pd.Series(values).astype(col['dtype'])
+    return pd.DataFrame(columns)
+
+def write_table(df, csv_path, csv=True, **csv_kwargs):
+    """Aşama çıktısını tipli kolon dosyasına, istenirse okunabilir CSV olarak da yaz.
+
+    Sonraki aşamalar read_table ile tipli kopyayı okur; sayılar metne
+    çevrilip yeniden parse edilmez ve hassasiyet kaybı olmaz. CSV sadece
+    insanlar ve dış araçlar için çıktıdır (önce CSV yazılır ki tipli kopya
+    ondan yeni görünsün).
+    """
+    if csv:
+        df.to_csv(csv_path, **csv_kwargs)
+    path = table_path(csv_path)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    prepared = _prepare(df)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if TABLE_FORMAT == "parquet":
+        prepared.to_parquet(tmp, index=False)
+    else:
+        _save_npz(prepared, tmp)
+    os.replace(tmp, path)
+    return path
+
+def read_table(csv_path, **csv_kwargs):
+    """Önceki aşamanın çıktısını oku: güncel tipli kopya varsa o, yoksa CSV (read_csv seçenekleriyle)"""
+    if is_current(csv_path):
+        path = table_path(csv_path)
+        if TABLE_FORMAT == "parquet":
+            return pd.read_parquet(path)
+        return _load_npz(path)
+    return pd.read_csv(csv_path, **csv_kwargs)
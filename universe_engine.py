@@ -0,0 +1,299 @@
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from ib_insync import IB, Stock, util
+
+from bar_store import get_store, days_to_duration
+from fundamentals import FinvizSource, MarketCapFetcher
+from historical_fetcher import HistoricalFetcher, MAX_OPEN_REQUESTS
+from snapshot_prices import SnapshotCollector
+from table_io import is_current, read_table, write_table
+
+UNIVERSE_COLUMN = 'UNIVERSE'
+
+class Universe:
+    """T (historical) ya da C (extlt) evreninin dosyaları ve farkları"""
+
+    def __init__(self, name, source, common_output, scored_output, market_cap):
+        self.name = name
+        self.source = source                # PREF + CMON listesi (ibkrtry/extltib çıktısı)
+        self.common_output = common_output  # common stock verileri + skorları
+        self.scored_output = scored_output  # calculate_scores çıktısı
+        self.market_cap = market_cap        # 'finviz' ya da 'outs_shares' (CMON OUTS SHARES x fiyat)
+
+
+UNIVERSES = {
+    'T': Universe('T', 'sma_results.csv', 'common_stock_results.csv', 'scored_stocks.csv', 'finviz'),
+    'C': Universe('C', 'extlt_results.csv', 'common_extlt.csv', 'scored_extlt.csv', 'outs_shares'),
+}
+
+COMMON_CLIENT_ID = 189
+# Şubat 2020 fiyatlarını da kapsayacak kadar geçmiş
+HISTORY_DURATION = days_to_duration((datetime.now() - datetime(2020, 2, 1)).days)
+
+COMMON_COLUMNS = [
+    'COM_LAST_PRICE', 'COM_52W_LOW', 'COM_52W_HIGH', 'COM_6M_PRICE', 'COM_3M_PRICE',
+    'COM_5Y_LOW', 'COM_5Y_HIGH', 'COM_MKTCAP', 'CRDT_SCORE', 'COM_FEB2020_PRICE', 'COM_MAR2020_PRICE'
+]
+PRICE_COLUMNS = [c for c in COMMON_COLUMNS if c not in ('COM_MKTCAP', 'CRDT_SCORE')]
+
+# Değişim kolonu -> (referans fiyat kolonu, skor kolonu, normalize kolonu, skor fonksiyonu adı)
+CHANGE_SCORES = [
+    ('COM_5Y_LOW_CHG', 'COM_5Y_LOW', '5Y_LOW_SKOR', 'Normalized_5Y_LOW', 'low'),
+    ('COM_5Y_HIGH_CHG', 'COM_5Y_HIGH', '5Y_HIGH_SKOR', 'Normalized_5Y_HIGH', 'high'),
+    ('COM_52W_LOW_CHG', 'COM_52W_LOW', '52W_LOW_SKOR', 'Normalized_52W_LOW', 'low'),
+    ('COM_52W_HIGH_CHG', 'COM_52W_HIGH', '52W_HIGH_SKOR', 'Normalized_52W_HIGH', 'high'),
+    ('COM_6M_CHG', 'COM_6M_PRICE', 'COM_6M_SKOR', 'Normalized_COM_6M', 'period'),
+    ('COM_3M_CHG', 'COM_3M_PRICE', 'COM_3M_SKOR', 'Normalized_COM_3M', 'period'),
+    ('COM_FEB2020_CHG', 'COM_FEB2020_PRICE', 'FEB2020_SKOR', 'Normalized_FEB2020', 'period'),
+    ('COM_MAR2020_CHG', 'COM_MAR2020_PRICE', 'MAR2020_SKOR', 'Normalized_MAR2020', 'period'),
+]
+
+def read_source(path):
+    """Evren dosyasını oku: tipli kopya varsa o, yoksa CSV (tek kolona sıkışmış dosyalarda ayracı otomatik bul)"""
+    if is_current(path):
+        df = read_table(path)
+    elif len(pd.read_csv(path, nrows=5).columns) == 1:
+        df = pd.read_csv(path, sep=None, engine='python', encoding='utf-8-sig')
+    else:
+        df = pd.read_csv(path, encoding='utf-8-sig')
+    if 'CMON' not in df.columns:
+        raise ValueError(f"{path}: CMON kolonu bulunamadı!")
+    return df
+
+def load_universes(names):
+    """Seçilen evrenlerin ana tabloları; {evren: DataFrame}"""
+    frames = {}
+    for name in names:
+        frames[name] = read_source(UNIVERSES[name].source)
+        print(f"{UNIVERSES[name].source}: {len(frames[name])} satır, {frames[name]['CMON'].dropna().nunique()} common stock")
+    return frames
+
+def tag_universes(frames, columns=('PREF IBKR', 'CMON')):
+    """Evrenleri UNIVERSE kolonu ile etiketlenmiş tek bir DataFrame'de birleştir"""
+    return pd.concat([df[list(columns)].assign(**{UNIVERSE_COLUMN: name}) for name, df in frames.items()],
+                     ignore_index=True)
+
+# --- Market cap kaynakları ---
+
+def parse_outs_shares(raw):
+    """CMON OUTS SHARES değerini milyon hisse cinsinden sayıya çevir ('1.2B', '850M', '900K', '1,234')"""
+    if pd.isna(raw) or raw == 0:
+        return None
+    text = str(raw).replace(',', '').strip()
+    multiplier = 1.0  # Zaten milyon olarak kabul ediyoruz
+    if text.endswith('M'):
+        text = text[:-1]
+    elif text.endswith('B'):
+        text, multiplier = text[:-1], 1000.0
+    elif text.endswith('K'):
+        text, multiplier = text[:-1], 0.001
+    return float(text) * multiplier
+
+def market_cap_from_outs_shares(ticker, raw_shares, last_price):
+    """Market Cap = CMON OUTS SHARES x Last Price / 1000 (milyar $)"""
+    try:
+        outs_shares = parse_outs_shares(raw_shares)
+        if outs_shares is None:
+            print(f"! {ticker}: CMON OUTS SHARES değeri bulunamadı veya sıfır.")
+            return None
+        if pd.isna(last_price) or last_price == 0:
+            print(f"! {ticker}: Last Price değeri geçersiz.")
+            return None
+        market_cap = outs_shares * float(last_price) / 1000.0
+        print(f"✓ {ticker} Market Cap: {market_cap:.3f}B")
+        return market_cap
+    except Exception as e:
+        print(f"! {ticker} için Market Cap hesaplama hatası: {str(e)} (CMON OUTS SHARES = '{raw_shares}')")
+        return None
+
+# --- IBKR ---
+
+async def qualify_all(ib, tickers, chunk=MAX_OPEN_REQUESTS):
+    """Kontrat detaylarını parça parça eşzamanlı çek; {ticker: contract ya da None}"""
+    async def one(ticker):
+        try:
+            details = await ib.reqContractDetailsAsync(Stock(symbol=ticker, exchange='SMART', currency='USD'))
+            return ticker, details[0].contract if details else None
+        except Exception as e:
+            print(f"{ticker} için hata: {e}")
+            return ticker, None
+
+    contracts = {}
+    for i in range(0, len(tickers), chunk):
+        contracts.update(await asyncio.gather(*(one(t) for t in tickers[i:i + chunk])))
+    return contracts
+
+def price_stats(store, ticker, now=None):
+    """Depodaki günlük barlardan 52W/5Y low-high ve 6M/3M/Şubat-Mart 2020 fiyatları"""
+    bars = store.window(ticker, HISTORY_DURATION)
+    stats = dict.fromkeys(PRICE_COLUMNS[1:])
+    if bars is None or len(bars) == 0:
+        return stats
+    now = now or pd.Timestamp(datetime.now())
+    df_1y = bars[bars['date'] >= now - pd.DateOffset(years=1)]
+    df_5y = bars[bars['date'] >= now - pd.DateOffset(years=5)]
+    stats.update({
+        'COM_52W_LOW': df_1y['low'].min(),
+        'COM_52W_HIGH': df_1y['high'].max(),
+        'COM_6M_PRICE': store.close_on(ticker, now - timedelta(days=180)),
+        'COM_3M_PRICE': store.close_on(ticker, now - timedelta(days=90)),
+        'COM_5Y_LOW': df_5y['low'].min(),
+        'COM_5Y_HIGH': df_5y['high'].max(),
+        'COM_FEB2020_PRICE': store.close_on(ticker, '2020-02-10'),
+        'COM_MAR2020_PRICE': store.close_on(ticker, '2020-03-20'),
+    })
+    return stats
+
+def fetch_common_prices(ib, tickers):
+    """Her common stock için bir kez: kontrat, last price ve bar deposundan fiyat istatistikleri.
+
+    İki evrende birden geçen hisseler tek sefer çekilir. Sonuç CMON indeksli
+    DataFrame'dir; kontratı ya da fiyatı alınamayanlar sonuçta yer almaz.
+    """
+    store = get_store()
+    contracts = util.run(qualify_all(ib, tickers))
+    valid = {t: c for t, c in contracts.items() if c is not None}
+    print(f"{len(valid)}/{len(tickers)} kontrat doğrulandı")
+
+    # Günlük barları tüm hisseler için eşzamanlı çek; aşağıda sadece depodan okunur
+    util.run(HistoricalFetcher(ib, store).fetch(list(valid), HISTORY_DURATION, contracts=valid))
+
+    # Son fiyatlar snapshot istekleriyle eşzamanlı (normalize_data/normalize_extlt ile aynı toplayıcı)
+    ib.reqMarketDataType(3)  # 3 = Delayed
+    last_prices = util.run(SnapshotCollector(ib).collect(list(valid), contracts=valid))
+    rows = {}
+    for ticker in valid:
+        last_price = last_prices.get(ticker)
+        if last_price is None:
+            print(f"! {ticker} için last price alınamadı")
+            continue
+        try:
+            rows[ticker] = {'COM_LAST_PRICE': last_price, **price_stats(store, ticker)}
+        except Exception as e:
+            print(f"{ticker} için hata oluştu: {e}")
+            rows[ticker] = dict.fromkeys(PRICE_COLUMNS)
+    return pd.DataFrame.from_dict(rows, orient='index', columns=PRICE_COLUMNS)
+
+# --- Skorlar (her evren kendi dağılımına göre) ---
+
+def change_score(change, kind):
+    """Excel skor formülleri; `kind`: 'low' (5Y/52W LOW), 'high' (5Y/52W HIGH) ya da 'period' (6M/3M/2020)"""
+    x = change.to_numpy(dtype=float)
+    m = np.nanmin(x) if (~np.isnan(x)).any() else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        linear = ((x + 1) / (m + 1) - 1) * 25
+        log = (np.log(x / m + 1) + 1) * 25
+        if kind == 'low':
+            score = np.where(x < 0.15, linear * 1.5, log)
+        elif kind == 'high':
+            score = np.where(x <= -0.2, linear * 1.25, np.where(x > -0.1, log, linear * 1.1))
+        else:
+            score = np.where(x < -0.22, linear * 1.25, linear)
+    return pd.Series(np.where(np.isnan(x), np.nan, score), index=change.index)
+
+def normalize_scores(series):
+    """Skorları 1-100 arasında normalize et: 1 + ((value - min) / (max - min)) * 99"""
+    if series.empty or series.isna().all():
+        return pd.Series(np.nan, index=series.index)
+    min_val = series.min()
+    max_val = series.max()
+    if min_val == max_val:
+        return pd.Series(1, index=series.index)
+    return 1 + ((series - min_val) / (max_val - min_val)) * 99
+
+def score_common(df):
+    """Değişim, skor ve normalize kolonlarını ekle (tek bir evren için)"""
+    for chg_col, ref_col, _, _, _ in CHANGE_SCORES:
+        df[chg_col] = (df['COM_LAST_PRICE'] - df[ref_col]) / df[ref_col]
+    for chg_col, _, skor_col, _, kind in CHANGE_SCORES:
+        df[skor_col] = change_score(df[chg_col], kind)
+    for _, _, skor_col, norm_col, _ in CHANGE_SCORES:
+        df[norm_col] = normalize_scores(df[skor_col])
+    return df
+
+def build_universe(df_main, prices, universe, market_caps=None):
+    """Bir evrenin ana tablosunu ortak fiyatlarla birleştirip market cap, CRDT ve skorları ekle"""
+    tickers = [t for t in df_main['CMON'].dropna().unique() if t in prices.index]
+    common = prices.loc[tickers].copy()
+    if universe.market_cap == 'finviz':
+        market_caps = market_caps or {}
+        common['COM_MKTCAP'] = [market_caps.get(t) for t in tickers]
+    else:
+        outs = df_main.drop_duplicates('CMON').set_index('CMON')['CMON OUTS SHARES']
+        common['COM_MKTCAP'] = [market_cap_from_outs_shares(t, outs.get(t), common.at[t, 'COM_LAST_PRICE'])
+                                for t in tickers]
+    common['CRDT_SCORE'] = df_main.drop_duplicates('CMON').set_index('CMON')['CRDT SCORE_'].reindex(tickers).to_numpy()
+    common = common[COMMON_COLUMNS].rename_axis('CMON').reset_index()
+
+    print(f"\n=== {universe.name} Market Cap İstatistikleri ===")
+    print("Minimum Market Cap (milyar $):", common['COM_MKTCAP'].min())
+    print("Maximum Market Cap (milyar $):", common['COM_MKTCAP'].max())
+    print("Ortalama Market Cap (milyar $):", common['COM_MKTCAP'].mean())
+
+    df_final = df_main.merge(common, on='CMON', how='left')
+    return score_common(df_final)
+
+def save_common(df, path):
+    write_table(df, path, index=False, sep=',', encoding='utf-8-sig', float_format='%.6f',
+                lineterminator='\n', quoting=1)  # Tüm değerleri tırnak içine al
+    print(f"Sonuçlar '{path}' dosyasına kaydedildi ({len(df)} satır).")
+
+def fetch_market_caps(frames, prices, source=None):
+    """Market cap'i Finviz'den gelen evrenlerin tüm hisseleri için tek seferde (önbellekli, eşzamanlı) çek"""
+    tickers = [t for name, df in frames.items() if UNIVERSES[name].market_cap == 'finviz'
+               for t in df['CMON'].dropna().unique() if t in prices.index]
+    if not tickers:
+        return {}
+    return MarketCapFetcher(source).fetch(tickers)
+
+def run_common(names=('T', 'C'), client_id=COMMON_CLIENT_ID, fundamentals_url=None):
+    """Seçilen evrenler için common stock verilerini tek geçişte çek, her evreni kendi içinde skorla ve kaydet
+
+    `fundamentals_url` verilirse market cap Finviz yerine aynı sayfa yapısını
+    sunan bu adresten çekilir (yerel test/benchmark sunucusu).
+    """
+    frames = load_universes(names)
+    combined = tag_universes(frames)
+    tickers = combined['CMON'].dropna().unique().tolist()
+    shared = combined.dropna(subset=['CMON']).groupby('CMON')[UNIVERSE_COLUMN].nunique()
+    print(f"Toplam {len(tickers)} farklı common stock ({int((shared > 1).sum())} tanesi birden fazla evrende, tek sefer çekilecek)")
+
+    ib = IB()
+    ib.connect('127.0.0.1', 4001, clientId=client_id)
+    try:
+        prices = fetch_common_prices(ib, tickers)
+    finally:
+        ib.disconnect()
+
+    source = FinvizSource(fundamentals_url) if fundamentals_url else None
+    market_caps = fetch_market_caps(frames, prices, source)
+
+    results = {}
+    for name, df_main in frames.items():
+        universe = UNIVERSES[name]
+        results[name] = build_universe(df_main, prices, universe, market_caps)
+        save_common(results[name], universe.common_output)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="T ve C evrenleri için ortak common stock verisi ve skorları")
+    # nargs='*' ile choices varsayılan listeyi reddeder; seçim elle doğrulanır
+    parser.add_argument('universes', nargs='*', default=['T', 'C'], help=f"Evrenler: {', '.join(sorted(UNIVERSES))}")
+    parser.add_argument('--fundamentals-url', help="Market cap için Finviz yerine kullanılacak adres (ör. http://127.0.0.1:8000)")
+    args = parser.parse_args()
+    unknown = sorted(set(args.universes) - set(UNIVERSES))
+    if unknown:
+        parser.error(f"Bilinmeyen evren: {', '.join(unknown)}")
+    try:
+        run_common(args.universes, fundamentals_url=args.fundamentals_url)
+    except FileNotFoundError as e:
+        print(f"Dosya bulunamadı: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()